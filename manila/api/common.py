@@ -58,14 +58,15 @@ def validate_key_names(key_names_list):
 
 
 def get_pagination_params(request):
-    """Return marker, limit tuple from request.
+    """Return marker, limit and offset dict from request.
 
-    :param request: `wsgi.Request` possibly containing 'marker' and 'limit'
-                    GET variables. 'marker' is the id of the last element
-                    the client has seen, and 'limit' is the maximum number
-                    of items to return. If 'limit' is not specified, 0, or
+    :param request: `wsgi.Request` possibly containing 'marker', 'limit'
+                    and 'offset' GET variables. 'marker' is the id of the
+                    last element the client has seen, 'limit' is the maximum
+                    number of items to return and 'offset' is the number of
+                    items to skip. If 'limit' is not specified, 0, or
                     > max_limit, we default to max_limit. Negative values
-                    for either marker or limit will cause
+                    for either limit or offset will cause
                     exc.HTTPBadRequest() exceptions to be raised.
 
     """
@@ -74,6 +75,8 @@ def get_pagination_params(request):
         params['limit'] = _get_limit_param(request)
     if 'marker' in request.GET:
         params['marker'] = _get_marker_param(request)
+    if 'offset' in request.GET:
+        params['offset'] = _get_offset_param(request)
     return params
 
 
@@ -90,6 +93,19 @@ def _get_limit_param(request):
     return limit
 
 
+def _get_offset_param(request):
+    """Extract integer offset from request or fail."""
+    try:
+        offset = int(request.GET['offset'])
+    except ValueError:
+        msg = _('offset param must be an integer')
+        raise webob.exc.HTTPBadRequest(explanation=msg)
+    if offset < 0:
+        msg = _('offset param must be positive')
+        raise webob.exc.HTTPBadRequest(explanation=msg)
+    return offset
+
+
 def _get_marker_param(request):
     """Extract marker ID from request or fail."""
     return request.GET['marker']
@@ -214,6 +230,8 @@ class ViewBuilder(object):
         """Return href string with proper limit and marker params."""
         params = request.params.copy()
         params["marker"] = identifier
+        # NOTE: the marker already points at the start of the next page.
+        params.pop("offset", None)
         prefix = self._update_link_prefix(request.application_url,
                                           CONF.osapi_share_base_URL)
         url = os.path.join(prefix,
@@ -240,10 +258,18 @@ class ViewBuilder(object):
                             self._collection_name,
                             str(identifier))
 
-    def _get_collection_links(self, request, items, id_key="uuid"):
-        """Retrieve 'next' link, if applicable."""
+    def _get_collection_links(self, request, items, id_key="uuid",
+                              max_limit=None):
+        """Retrieve 'next' link, if applicable.
+
+        :param max_limit: the limit applied to the collection when the
+            request did not ask for a (smaller) one. When it is provided, a
+            full page of unlimited request results also gets a 'next' link.
+        """
         links = []
         limit = int(request.params.get("limit", 0))
+        if max_limit:
+            limit = min(max_limit, limit or max_limit)
         if limit and limit == len(items):
             last_item = items[-1]
             if id_key in last_item:
@@ -264,13 +290,16 @@ class ViewBuilder(object):
         url_parts[0:2] = prefix_parts[0:2]
         return parse.urlunsplit(url_parts)
 
-    def update_versioned_resource_dict(self, request, resource_dict, resource):
+    def update_versioned_resource_dict(self, request, resource_dict, resource,
+                                       modifiers=None):
         """Updates the given resource dict for the given request version.
 
         This method calls every method, that is applicable to the request
-        version, in _detail_version_modifiers.
+        version, in modifiers, _detail_version_modifiers by default.
         """
-        for method_name in self._detail_version_modifiers:
+        if modifiers is None:
+            modifiers = self._detail_version_modifiers
+        for method_name in modifiers:
             method = getattr(self, method_name)
             if request.api_version_request.matches_versioned_method(method):
                 method.func(self, resource_dict, resource)
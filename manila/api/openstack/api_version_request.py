@@ -65,13 +65,17 @@ REST_API_VERSION_HISTORY = """
             'migration_get_progress', 'migration_complete' APIs, renamed
             'migrate_share' to 'migration_start' and added notify parameter
              to 'migration_start'.
+    * 2.16 - Admin-only DB statistics API.
+    * 2.17 - Added 'throughput' and 'eta' to share migration progress.
+    * 2.18 - Added creation of several shares in a single request.
+    * 2.19 - Admin-only scheduler decision cache statistics API.
 """
 
 # The minimum and maximum versions of the API supported
 # The default api version request is defined to be the
 # the minimum version of the API supported.
 _MIN_API_VERSION = "2.0"
-_MAX_API_VERSION = "2.15"
+_MAX_API_VERSION = "2.19"
 DEFAULT_API_VERSION = _MIN_API_VERSION
 
 
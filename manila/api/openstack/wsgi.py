@@ -28,6 +28,7 @@ import webob.exc
 from manila.api.openstack import api_version_request as api_version
 from manila.api.openstack import versioned_method
 from manila.common import constants
+from manila.db import instrumentation
 from manila import exception
 from manila.i18n import _
 from manila.i18n import _LE
@@ -759,8 +760,10 @@ class Resource(wsgi.Application):
         #            function.  If we try to audit __call__(), we can
         #            run into troubles due to the @webob.dec.wsgify()
         #            decorator.
-        return self._process_stack(request, action, action_args,
-                                   content_type, body, accept)
+        with instrumentation.scope(instrumentation.SCOPE_API, '%s %s.%s' % (
+                request.method, type(self.controller).__name__, action)):
+            return self._process_stack(request, action, action_args,
+                                       content_type, body, accept)
 
     def _process_stack(self, request, action, action_args,
                        content_type, body, accept):
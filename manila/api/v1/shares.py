@@ -19,6 +19,7 @@ import ast
 import re
 import string
 
+from oslo_config import cfg
 from oslo_log import log
 from oslo_utils import strutils
 from oslo_utils import uuidutils
@@ -29,6 +30,7 @@ from webob import exc
 from manila.api import common
 from manila.api.openstack import wsgi
 from manila.api.views import shares as share_views
+from manila.common import constants
 from manila import db
 from manila import exception
 from manila.i18n import _
@@ -36,6 +38,7 @@ from manila.i18n import _LI
 from manila import share
 from manila.share import share_types
 
+CONF = cfg.CONF
 LOG = log.getLogger(__name__)
 
 
@@ -173,7 +176,7 @@ class ShareMixin(object):
             msg = _("Share %s not found.") % id
             raise exc.HTTPNotFound(explanation=msg)
         result = self.share_api.migration_get_progress(context, share)
-        return self._view_builder.migration_get_progress(result)
+        return self._view_builder.migration_get_progress(req, result)
 
     def index(self, req):
         """Returns a summary list of shares."""
@@ -193,6 +196,10 @@ class ShareMixin(object):
         # Remove keys that are not related to share attrs
         search_opts.pop('limit', None)
         search_opts.pop('offset', None)
+        search_opts.pop('marker', None)
+        pagination = common.get_pagination_params(req)
+        max_limit = CONF.osapi_max_limit
+        limit = min(max_limit, pagination.get('limit') or max_limit)
         sort_key = search_opts.pop('sort_key', 'created_at')
         sort_dir = search_opts.pop('sort_dir', 'desc')
 
@@ -214,16 +221,21 @@ class ShareMixin(object):
         common.remove_invalid_options(
             context, search_opts, self._get_share_search_options())
 
-        shares = self.share_api.get_all(
-            context, search_opts=search_opts, sort_key=sort_key,
-            sort_dir=sort_dir)
-
-        limited_list = common.limited(shares, req)
+        try:
+            shares = self.share_api.get_all(
+                context, search_opts=search_opts, sort_key=sort_key,
+                sort_dir=sort_dir, limit=limit,
+                offset=pagination.get('offset'),
+                marker=pagination.get('marker'),
+                view=(constants.SHARE_VIEW_DETAIL if is_detail
+                      else constants.SHARE_VIEW_SUMMARY))
+        except exception.InvalidInput as e:
+            raise exc.HTTPBadRequest(explanation=six.text_type(e))
 
         if is_detail:
-            shares = self._view_builder.detail_list(req, limited_list)
+            shares = self._view_builder.detail_list(req, shares)
         else:
-            shares = self._view_builder.summary_list(req, limited_list)
+            shares = self._view_builder.summary_list(req, shares)
         return shares
 
     def _get_share_search_options(self):
@@ -279,8 +291,31 @@ class ShareMixin(object):
         if not self.is_valid_body(body, 'share'):
             raise exc.HTTPUnprocessableEntity()
 
-        share = body['share']
+        share_request = self._get_share_request(context, body['share'])
+        new_share = self.share_api.create(context, **share_request)
+
+        return self._view_builder.detail(req, new_share)
+
+    def _create_many(self, req, body):
+        """Creates several shares, scheduled in a single pass."""
+        context = req.environ['manila.context']
+
+        shares = body.get('shares') if body else None
+        if not (isinstance(shares, list) and shares and
+                all(isinstance(share, dict) for share in shares)):
+            raise exc.HTTPUnprocessableEntity()
+
+        share_requests = [self._get_share_request(context, share)
+                          for share in shares]
+        new_shares = self.share_api.create_many(context, share_requests)
+
+        return self._view_builder.detail_list(req, new_shares)
+
+    def _get_share_request(self, context, share):
+        """Validates a share of a create request.
 
+        :returns: the arguments of share.API.create() for the share.
+        """
         # NOTE(rushiagr): Manila API allows 'name' instead of 'display_name'.
         if share.get('name'):
             share['display_name'] = share.get('name')
@@ -387,14 +422,9 @@ class ShareMixin(object):
 
         if share_type:
             kwargs['share_type'] = share_type
-        new_share = self.share_api.create(context,
-                                          share_proto,
-                                          size,
-                                          display_name,
-                                          display_description,
-                                          **kwargs)
-
-        return self._view_builder.detail(req, new_share)
+        kwargs.update(share_proto=share_proto, size=size, name=display_name,
+                      description=display_description)
+        return kwargs
 
     @staticmethod
     def _validate_common_name(access):
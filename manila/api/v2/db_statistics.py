@@ -0,0 +1,47 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import webob
+
+from manila.api.openstack import wsgi
+from manila.api.views import db_statistics as db_statistics_views
+from manila.db import instrumentation
+
+
+class DBStatisticsController(wsgi.Controller):
+    """The DB statistics API controller for the OpenStack API.
+
+    Returns the SQL statements counted by the API worker serving the
+    request when the 'db_instrumentation' option is enabled. RPC methods
+    are accounted by the services running them, which log their counts.
+    """
+
+    resource_name = 'db_statistics'
+    _view_builder_class = db_statistics_views.ViewBuilder
+
+    @wsgi.Controller.api_version('2.16')
+    @wsgi.Controller.authorize
+    def index(self, req):
+        """Returns the DB statistics of this API worker."""
+        return self._view_builder.detail(instrumentation.enabled(),
+                                         instrumentation.get_statistics())
+
+    @wsgi.Controller.api_version('2.16')
+    @wsgi.Controller.authorize
+    def reset(self, req):
+        """Clears the DB statistics of this API worker."""
+        instrumentation.reset_statistics()
+        return webob.Response(status_int=202)
+
+
+def create_resource():
+    return wsgi.Resource(DBStatisticsController())
@@ -0,0 +1,42 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from manila.api.openstack import wsgi
+from manila.api.views import scheduler_stats as scheduler_stats_views
+from manila.scheduler import rpcapi
+
+
+class DecisionCacheController(wsgi.Controller):
+    """The scheduler decision cache API controller for the OpenStack API.
+
+    Returns the statistics of the decision cache of the scheduler answering
+    the request. With several schedulers, each of them has its own cache.
+    """
+
+    resource_name = 'scheduler_stats:decision_cache'
+    _view_builder_class = scheduler_stats_views.ViewBuilder
+
+    def __init__(self):
+        self.scheduler_api = rpcapi.SchedulerAPI()
+        super(DecisionCacheController, self).__init__()
+
+    @wsgi.Controller.api_version('2.19')
+    @wsgi.Controller.authorize
+    def index(self, req):
+        """Returns the statistics of the scheduler decision cache."""
+        context = req.environ['manila.context']
+        stats = self.scheduler_api.get_decision_cache_stats(context)
+        return self._view_builder.decision_cache(stats)
+
+
+def create_resource():
+    return wsgi.Resource(DecisionCacheController())
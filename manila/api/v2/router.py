@@ -34,6 +34,8 @@ from manila.api.v1 import share_unmanage
 from manila.api.v2 import availability_zones
 from manila.api.v2 import cgsnapshots
 from manila.api.v2 import consistency_groups
+from manila.api.v2 import decision_cache
+from manila.api.v2 import db_statistics
 from manila.api.v2 import quota_class_sets
 from manila.api.v2 import quota_sets
 from manila.api.v2 import services
@@ -271,6 +273,23 @@ class APIRouter(manila.api.openstack.APIRouter):
                        action="pools_detail",
                        conditions={"method": ["GET"]})
 
+        self.resources["decision_cache"] = decision_cache.create_resource()
+        mapper.connect("decision_cache",
+                       "/{project_id}/scheduler-stats/decision-cache",
+                       controller=self.resources["decision_cache"],
+                       action="index",
+                       conditions={"method": ["GET"]})
+
+        self.resources["db_statistics"] = db_statistics.create_resource()
+        mapper.connect("db_statistics", "/{project_id}/db-statistics",
+                       controller=self.resources["db_statistics"],
+                       action="index",
+                       conditions={"method": ["GET"]})
+        mapper.connect("db_statistics", "/{project_id}/db-statistics",
+                       controller=self.resources["db_statistics"],
+                       action="reset",
+                       conditions={"method": ["DELETE"]})
+
         self.resources["consistency-groups"] = (
             consistency_groups.create_resource())
         mapper.resource("consistency-group", "consistency-groups",
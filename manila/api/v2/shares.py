@@ -35,8 +35,14 @@ class ShareController(shares.ShareMixin,
         super(self.__class__, self).__init__()
         self.share_api = share.API()
 
-    @wsgi.Controller.api_version("2.4")
+    @wsgi.Controller.api_version("2.18")
     def create(self, req, body):
+        if body and 'shares' in body:
+            return self._create_many(req, body)
+        return self._create(req, body)
+
+    @wsgi.Controller.api_version("2.4", "2.17")  # noqa
+    def create(self, req, body):  # pylint: disable=E0102
         return self._create(req, body)
 
     @wsgi.Controller.api_version("2.0", "2.3")  # noqa
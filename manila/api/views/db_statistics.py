@@ -0,0 +1,39 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from manila.api import common
+
+
+class ViewBuilder(common.ViewBuilder):
+    """Model DB statistics API responses as a python dictionary."""
+
+    _collection_name = "db_statistics"
+
+    def _calls(self, calls):
+        result = []
+        for name in sorted(calls):
+            call = dict(calls[name], name=name)
+            functions = call.pop('functions')
+            call['functions'] = [dict(functions[function], name=function)
+                                 for function in sorted(functions)]
+            result.append(call)
+        return result
+
+    def detail(self, enabled, statistics):
+        """Detailed view of the DB statistics of an API worker."""
+        return {
+            self._collection_name: {
+                'enabled': enabled,
+                'api': self._calls(statistics['api']),
+                'rpc': self._calls(statistics['rpc']),
+            }
+        }
@@ -50,3 +50,16 @@ class ViewBuilder(common.ViewBuilder):
         """View of a list of pools seen by scheduler."""
         view_method = self.pool_detail if detail else self.pool_summary
         return {"pools": [view_method(pool)['pool'] for pool in pools]}
+
+    def decision_cache(self, stats):
+        """View of the statistics of the scheduler decision cache."""
+        stats = stats or {}
+        return {
+            'decision_cache': {
+                'enabled': bool(stats),
+                'hits': stats.get('hits', 0),
+                'misses': stats.get('misses', 0),
+                'invalidations': stats.get('invalidations', 0),
+                'size': stats.get('size', 0),
+            }
+        }
@@ -13,8 +13,12 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from oslo_config import cfg
+
 from manila.api import common
 
+CONF = cfg.CONF
+
 
 class ViewBuilder(common.ViewBuilder):
     """Model a server API response as a python dictionary."""
@@ -29,6 +33,9 @@ class ViewBuilder(common.ViewBuilder):
         "add_access_rules_status_field",
         "add_replication_fields",
     ]
+    _migration_progress_version_modifiers = [
+        "add_migration_throughput_fields",
+    ]
 
     def summary_list(self, request, shares):
         """Show a list of shares without many details."""
@@ -94,14 +101,22 @@ class ViewBuilder(common.ViewBuilder):
                 'share_server_id')
         return {'share': share_dict}
 
-    def migration_get_progress(self, progress):
+    def migration_get_progress(self, request, progress):
         result = {
             'total_progress': progress['total_progress'],
-            'current_file_path': progress['current_file_path'],
-            'current_file_progress': progress['current_file_progress']
+            'current_file_path': progress.get('current_file_path'),
+            'current_file_progress': progress.get('current_file_progress')
         }
+        self.update_versioned_resource_dict(
+            request, result, progress,
+            modifiers=self._migration_progress_version_modifiers)
         return result
 
+    @common.ViewBuilder.versioned_method("2.17")
+    def add_migration_throughput_fields(self, progress_dict, progress):
+        progress_dict['throughput'] = progress.get('throughput')
+        progress_dict['eta'] = progress.get('eta')
+
     @common.ViewBuilder.versioned_method("2.2")
     def add_snapshot_support_field(self, share_dict, share):
         share_dict['snapshot_support'] = share.get('snapshot_support')
@@ -147,9 +162,9 @@ class ViewBuilder(common.ViewBuilder):
     def _list_view(self, func, request, shares):
         """Provide a view for a list of shares."""
         shares_list = [func(request, share)['share'] for share in shares]
-        shares_links = self._get_collection_links(request,
-                                                  shares,
-                                                  self._collection_name)
+        shares_links = self._get_collection_links(
+            request, shares, self._collection_name,
+            max_limit=CONF.osapi_max_limit)
         shares_dict = dict(shares=shares_list)
 
         if shares_links:
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Privileged helper copying a directory tree for the data service.
+
+Run through rootwrap once for every copy, so that files are read and
+written with a single privileged process instead of one per file. The
+progress of the copy is written as JSON lines on stdout, the copy is
+cancelled when stdin is closed.
+
+Usage: manila-data-copy [--workers N] [--ignore NAME ...] [--resume]
+                        [--manifest PATH [--delta]] [--bwlimit BYTES]
+                        SRC DEST
+"""
+
+import argparse
+import logging
+import sys
+import threading
+
+from oslo_serialization import jsonutils
+
+from manila.data import copy_engine
+
+PROGRESS_INTERVAL = 1
+
+
+def _report(progress):
+    sys.stdout.write(jsonutils.dumps(progress) + '\n')
+    sys.stdout.flush()
+
+
+def _report_progress(engine, done):
+    while not done.wait(PROGRESS_INTERVAL):
+        _report(engine.get_progress())
+
+
+def _cancel_on_eof(engine):
+    while sys.stdin.read(1):
+        pass
+    engine.cancel()
+
+
+def _start_thread(target, *args):
+    thread = threading.Thread(target=target, args=args)
+    thread.daemon = True
+    thread.start()
+    return thread
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Copy the contents of the SRC directory into DEST, '
+                    'preserving ownership, mode, times and extended '
+                    'attributes.')
+    parser.add_argument('--workers', type=int, default=4,
+                        help='Number of files copied at the same time.')
+    parser.add_argument('--ignore', action='append', default=[],
+                        help='Name of files and directories not to copy.')
+    parser.add_argument('--resume', action='store_true',
+                        help='Skip files already copied, having the same '
+                             'size and modification time in DEST.')
+    parser.add_argument('--manifest',
+                        help='File recording the copied files once the '
+                             'copy completes, read by --delta.')
+    parser.add_argument('--delta', action='store_true',
+                        help='Only copy the files changed since the copy '
+                             'which wrote the manifest, removing from DEST '
+                             'the files no longer in SRC.')
+    parser.add_argument('--bwlimit', type=int, default=0,
+                        help='Maximum number of bytes written per second, '
+                             '0 for no limit.')
+    parser.add_argument('src')
+    parser.add_argument('dest')
+    args = parser.parse_args(argv)
+    if args.delta and not args.manifest:
+        parser.error('--delta requires --manifest')
+    logging.basicConfig(level=logging.WARNING)
+
+    engine = copy_engine.CopyEngine(args.src, args.dest, args.ignore,
+                                    max(args.workers, 1), args.resume,
+                                    args.manifest, args.delta,
+                                    max(args.bwlimit, 0))
+    done = threading.Event()
+    _start_thread(_cancel_on_eof, engine)
+    reporter = _start_thread(_report_progress, engine, done)
+    try:
+        completed = engine.run()
+    except Exception as e:
+        sys.stderr.write('%s\n' % e)
+        return 1
+    finally:
+        done.set()
+        reporter.join()
+
+    progress = engine.get_progress()
+    progress['cancelled'] = not completed
+    _report(progress)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -67,9 +67,11 @@ from oslo_utils import uuidutils
 
 from manila.common import config  # Need to register global_opts  # noqa
 from manila import context
+from manila.data import rpcapi as data_rpcapi
 from manila import db
 from manila.db import migration
 from manila.i18n import _
+from manila import rpc
 from manila import utils
 from manila import version
 
@@ -342,8 +344,39 @@ class ServiceCommands(object):
             ))
 
 
+class DataCommands(object):
+    """Methods for the data service."""
+    def jobs(self):
+        """Show the data copy jobs of every data service host."""
+        if not rpc.initialized():
+            rpc.init(CONF)
+        ctxt = context.get_admin_context()
+        jobs = data_rpcapi.DataAPI().get_jobs(ctxt)
+        print_format = "%-36s %-36s %-8s %-26s %-26s %-8s"
+        print(print_format % (
+            _('Host'),
+            _('Share ID'),
+            _('State'),
+            _('Queued At'),
+            _('Started At'),
+            _('Progress'))
+        )
+        for host in sorted(jobs):
+            for job in jobs[host]:
+                progress = job['progress'] or {}
+                print(print_format % (
+                    host,
+                    job['share_id'],
+                    job['state'],
+                    job['queued_at'],
+                    job['started_at'] or '-',
+                    progress.get('total_progress', '-'),
+                ))
+
+
 CATEGORIES = {
     'config': ConfigCommands,
+    'data': DataCommands,
     'db': DbCommands,
     'host': HostCommands,
     'logs': GetLogCommands,
@@ -70,6 +70,11 @@ global_opts = [
     cfg.StrOpt('data_topic',
                default='manila-data',
                help='The topic data nodes listen on.'),
+    cfg.IntOpt('data_host_selection_timeout',
+               default=5,
+               help='Seconds to wait for each data service host to report '
+                    'its data copy jobs when choosing the host of a new '
+                    'job.'),
     cfg.BoolOpt('enable_v1_api',
                 default=False,
                 help=_('Deploy v1 of the Manila API. This option is '
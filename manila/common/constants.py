@@ -150,6 +150,10 @@ REPLICA_STATE_ACTIVE = 'active'
 REPLICA_STATE_IN_SYNC = 'in_sync'
 REPLICA_STATE_OUT_OF_SYNC = 'out_of_sync'
 
+# Related data loaded with shares by list queries
+SHARE_VIEW_SUMMARY = 'summary'
+SHARE_VIEW_DETAIL = 'detail'
+
 
 class ExtraSpecs(object):
 
@@ -0,0 +1,593 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""In-process copy of a directory tree.
+
+The source tree is walked once with ``os.scandir``, then regular files are
+copied by a pool of worker threads with ``os.copy_file_range`` or
+``os.sendfile`` where the platform supports them, falling back to reads
+and writes otherwise. Ownership, mode, extended attributes and times of
+every item are preserved, symbolic links are copied as links and hard
+links within the tree are kept.
+
+A copy may record a manifest of the files it copied, so that a later delta
+copy of the same tree only copies the files changed in the meantime and
+removes the ones which were deleted, as ``rsync --delete`` does.
+
+The engine does not use eventlet and is meant to run in a separate process
+with the privileges needed to read and write both trees, see
+manila/cmd/data_copy.py.
+"""
+
+import collections
+import errno
+import os
+import shutil
+import stat
+import threading
+import time
+
+from oslo_log import log
+from oslo_serialization import jsonutils
+from oslo_utils import timeutils
+import six
+
+from manila.i18n import _LE, _LW
+
+LOG = log.getLogger(__name__)
+
+CHUNK_SIZE = 8 * 1024 * 1024
+
+# Errors telling that a zero copy system call cannot be used for a pair of
+# files, in which case the next copy method is tried.
+_UNSUPPORTED_ERRNOS = (errno.EINVAL, errno.ENOSYS, errno.EXDEV,
+                       errno.EOPNOTSUPP, errno.ENOTSUP, errno.EBADF)
+
+_XATTR_SUPPORTED = hasattr(os, 'listxattr')
+
+
+def _scandir(path):
+    """Returns (name, lstat result) of the entries of a directory.
+
+    Entries removed while the directory is listed are left out, as well as
+    the entries of a removed directory.
+    """
+    scandir = getattr(os, 'scandir', None)
+    try:
+        listing = list(scandir(path)) if scandir else os.listdir(path)
+    except OSError as e:
+        if e.errno != errno.ENOENT:
+            raise
+        return []
+    entries = []
+    for item in listing:
+        try:
+            if scandir is None:
+                entries.append((item, os.lstat(os.path.join(path, item))))
+            else:
+                entries.append((item.name, item.stat(follow_symlinks=False)))
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
+    return entries
+
+
+class CopyEngine(object):
+    """Copies the contents of the src directory into the dest directory.
+
+    :param src: source directory.
+    :param dest: destination directory, created if missing.
+    :param ignore_list: names of files and directories not to copy,
+        wherever they are in the tree.
+    :param workers: number of files copied at the same time.
+    :param resume: whether to skip the files already copied to dest, which
+        have the size and modification time of their source.
+    :param manifest: path of the manifest of the copied files, written once
+        the copy completes, or read by delta copies.
+    :param delta: whether to only copy the files changed since the copy
+        which wrote the manifest, removing from dest the items no longer
+        in src.
+    :param bwlimit: maximum number of bytes written per second by all the
+        workers, 0 for no limit.
+    """
+
+    def __init__(self, src, dest, ignore_list=None, workers=4,
+                 resume=False, manifest=None, delta=False, bwlimit=0):
+        self.src = src
+        self.dest = dest
+        self.ignore_list = set(ignore_list or [])
+        self.workers = workers
+        self.resume = resume
+        self.manifest = manifest
+        self.delta = delta
+        self.bwlimit = bwlimit
+        self.total_size = 0
+        self.current_size = 0
+        self.total_files = 0
+        self.copied_files = 0
+        self.last_path = None
+        self.written_size = 0
+        self.started_at = None
+        self.cancelled = False
+        self.completed = False
+        self._lock = threading.Lock()
+        self._copied = {}
+        # NOTE: path: [size, copied size] of the files being copied.
+        self._current_files = collections.OrderedDict()
+
+    def cancel(self):
+        self.cancelled = True
+
+    def get_progress(self):
+        """Returns the progress of the copy from its counters.
+
+        The file reported as being copied is the one copied for the longest
+        time, the throughput is the number of bytes written per second
+        since the copy started, and the ETA is the time left at that rate,
+        both being None until known.
+        """
+        with self._lock:
+            total_progress = 0
+            if self.completed:
+                total_progress = 100
+            elif self.total_size > 0:
+                total_progress = self.current_size * 100 / self.total_size
+            current_file_path = self.last_path
+            current_file_progress = 100 if self.last_path else 0
+            for path, (size, copied) in self._current_files.items():
+                current_file_path = path
+                current_file_progress = copied * 100 / size if size else 0
+                break
+            elapsed = None
+            if self.started_at is not None:
+                elapsed = timeutils.now() - self.started_at
+            throughput, eta = estimate(
+                self.written_size, self.total_size - self.current_size,
+                elapsed)
+            return {
+                'total_progress': total_progress,
+                'total_size': self.total_size,
+                'current_size': self.current_size,
+                'total_files': self.total_files,
+                'copied_files': self.copied_files,
+                'last_path': self.last_path,
+                'current_file_path': current_file_path,
+                'current_file_progress': current_file_progress,
+                'throughput': throughput,
+                'eta': eta,
+            }
+
+    def run(self):
+        """Copies the tree, returning False if the copy was cancelled."""
+        if self.delta:
+            self._copied = load_manifest(self.manifest)
+        dirs, files = self.walk()
+        if self.cancelled:
+            return False
+
+        self.started_at = timeutils.now()
+        if not os.path.isdir(self.dest):
+            os.makedirs(self.dest)
+        if self.delta:
+            self.prune(dirs + files)
+        for path, st in dirs:
+            dest = os.path.join(self.dest, path)
+            if os.path.islink(dest):
+                os.unlink(dest)
+            if not os.path.isdir(dest):
+                os.mkdir(dest)
+
+        self._copy_files(files)
+        if self.cancelled:
+            return False
+
+        # NOTE: directories are updated once all of their contents are
+        # written, deepest first, for their times to be kept.
+        for path, st in reversed(dirs):
+            copy_metadata(os.path.join(self.src, path),
+                          os.path.join(self.dest, path), st)
+        if self.manifest and not self.delta:
+            save_manifest(self.manifest, files)
+        self.completed = True
+        return True
+
+    def prune(self, items):
+        """Removes the items of dest not in src or of another file type.
+
+        :param items: the items of src, as (relative path, lstat result).
+        """
+        modes = {path: stat.S_IFMT(st.st_mode) for path, st in items}
+        pending = ['']
+        while pending and not self.cancelled:
+            path = pending.pop()
+            for name, st in _scandir(os.path.join(self.dest, path)):
+                if name in self.ignore_list:
+                    continue
+                item = os.path.join(path, name)
+                if modes.get(item) == stat.S_IFMT(st.st_mode):
+                    if stat.S_ISDIR(st.st_mode):
+                        pending.append(item)
+                    continue
+                dest = os.path.join(self.dest, item)
+                if stat.S_ISDIR(st.st_mode):
+                    shutil.rmtree(dest)
+                else:
+                    os.unlink(dest)
+
+    def walk(self):
+        """Lists the tree, adding the size of its files to total_size.
+
+        :returns: a tuple of the directories, top down, and of the other
+            items of the tree, as lists of (relative path, lstat result).
+        """
+        if not os.path.isdir(self.src):
+            raise OSError(errno.ENOTDIR, os.strerror(errno.ENOTDIR),
+                          self.src)
+        dirs = []
+        files = []
+        inodes = set()
+        pending = ['']
+        while pending and not self.cancelled:
+            path = pending.pop()
+            for name, st in sorted(_scandir(os.path.join(self.src, path))):
+                if name in self.ignore_list:
+                    continue
+                item = os.path.join(path, name)
+                if stat.S_ISDIR(st.st_mode):
+                    dirs.append((item, st))
+                    pending.append(item)
+                else:
+                    files.append((item, st))
+                    if not stat.S_ISREG(st.st_mode):
+                        continue
+                    if st.st_nlink > 1:
+                        # NOTE: hard links are only copied once.
+                        if (st.st_dev, st.st_ino) in inodes:
+                            continue
+                        inodes.add((st.st_dev, st.st_ino))
+                    self.total_size += st.st_size
+        self.total_files = len(files)
+        return dirs, files
+
+    def _copy_files(self, files):
+        # NOTE: the first occurrence of a file with several links is
+        # copied, the other ones are linked to the copy once it is done.
+        links = []
+        first_links = {}
+        to_copy = []
+        for path, st in files:
+            if stat.S_ISREG(st.st_mode) and st.st_nlink > 1:
+                key = (st.st_dev, st.st_ino)
+                if key in first_links:
+                    links.append((first_links[key], path, st))
+                    continue
+                first_links[key] = path
+            to_copy.append((path, st))
+
+        errors = []
+
+        items = six.moves.queue.Queue()
+        for item in to_copy:
+            items.put(item)
+
+        def copy():
+            while not self.cancelled:
+                try:
+                    path, st = items.get_nowait()
+                except six.moves.queue.Empty:
+                    return
+                try:
+                    self._copy_item(path, st)
+                except Exception as e:
+                    LOG.error(_LE("Failed to copy %(path)s: %(error)s"),
+                              {'path': path, 'error': e})
+                    errors.append(e)
+                    self.cancel()
+
+        workers = [threading.Thread(target=copy)
+                   for __ in range(min(self.workers, len(to_copy)))]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        if errors:
+            raise errors[0]
+
+        for target, path, st in links:
+            if self.cancelled:
+                return
+            if not os.path.lexists(os.path.join(self.dest, target)):
+                # NOTE: the first link was removed before being copied.
+                self._copy_item(path, st)
+                continue
+            dest = os.path.join(self.dest, path)
+            if os.path.lexists(dest):
+                os.unlink(dest)
+            os.link(os.path.join(self.dest, target), dest)
+            self._item_copied(path)
+
+    def _copy_item(self, path, st):
+        src = os.path.join(self.src, path)
+        dest = os.path.join(self.dest, path)
+        if self._is_unchanged(path, st, dest):
+            self._add_copied_size(st.st_size)
+            self._item_copied(path)
+            return
+
+        # NOTE: existing links are replaced rather than written through.
+        if os.path.islink(dest) or (os.path.lexists(dest) and
+                                    not stat.S_ISREG(st.st_mode)):
+            os.unlink(dest)
+
+        try:
+            if stat.S_ISREG(st.st_mode):
+                self._copy_file(path, st)
+            elif stat.S_ISLNK(st.st_mode):
+                os.symlink(os.readlink(src), dest)
+            elif stat.S_ISFIFO(st.st_mode):
+                os.mkfifo(dest)
+            else:
+                os.mknod(dest, st.st_mode, st.st_rdev)
+        except (IOError, OSError) as e:
+            # NOTE: files of a writable source may be removed once listed.
+            if e.errno != errno.ENOENT or os.path.lexists(src):
+                raise
+            LOG.debug("%s was removed before being copied.", src)
+            self._item_copied(path)
+            return
+        if not self.cancelled:
+            copy_metadata(src, dest, st)
+            self._item_copied(path)
+
+    def _is_unchanged(self, path, st, dest):
+        if not stat.S_ISREG(st.st_mode):
+            return False
+        if self.delta:
+            # NOTE: files replaced since the previous copy have another
+            # inode, even if their size and modification time are kept.
+            if self._copied.get(path) != _manifest_entry(st):
+                return False
+        elif not self.resume:
+            return False
+        return is_copied(st, dest)
+
+    def _copy_file(self, path, st):
+        with self._lock:
+            self._current_files[path] = [st.st_size, 0]
+
+        def copied(size):
+            with self._lock:
+                self.current_size += size
+                self.written_size += size
+                self._current_files[path][1] += size
+                delay = self._throttle_delay()
+            if delay > 0:
+                time.sleep(delay)
+
+        try:
+            copy_file_data(os.path.join(self.src, path),
+                           os.path.join(self.dest, path), copied,
+                           lambda: self.cancelled)
+        finally:
+            with self._lock:
+                del self._current_files[path]
+
+    def _throttle_delay(self):
+        # NOTE: the average rate since the copy started is kept under the
+        # limit, so that the workers share it.
+        if not self.bwlimit or self.started_at is None:
+            return 0
+        return (float(self.written_size) / self.bwlimit -
+                (timeutils.now() - self.started_at))
+
+    def _add_copied_size(self, size):
+        with self._lock:
+            self.current_size += size
+
+    def _item_copied(self, path):
+        with self._lock:
+            self.copied_files += 1
+            self.last_path = path
+
+
+def is_copied(st, dest):
+    """Tells whether dest is a complete copy of a file of lstat result st.
+
+    The modification time of copies is set once their contents and other
+    attributes are, so partial copies do not match.
+    """
+    try:
+        dest_st = os.lstat(dest)
+    except OSError as e:
+        if e.errno == errno.ENOENT:
+            return False
+        raise
+    if not stat.S_ISREG(dest_st.st_mode) or dest_st.st_size != st.st_size:
+        return False
+    if six.PY3:
+        return dest_st.st_mtime_ns == st.st_mtime_ns
+    return dest_st.st_mtime == st.st_mtime
+
+
+def estimate(written_size, remaining_size, elapsed):
+    """Returns the throughput and ETA of a copy, or None if unknown.
+
+    :param written_size: number of bytes written since the copy started.
+    :param remaining_size: number of bytes left to copy.
+    :param elapsed: seconds since the copy started, or None.
+    """
+    if not elapsed or not written_size:
+        return None, None
+    throughput = int(written_size / elapsed)
+    if not throughput:
+        return throughput, None
+    return throughput, int(max(remaining_size, 0) / throughput)
+
+
+def _manifest_entry(st):
+    return [st.st_ino, st.st_size, st.st_mtime_ns if six.PY3 else st.st_mtime]
+
+
+def write_file(path, data, sync=False):
+    """Replaces the file at path with one holding data.
+
+    The data is written to a temporary file renamed once written. The
+    temporary file is created exclusively and without following links, so
+    that a link planted in its place is never written through.
+
+    :param sync: whether to flush the data to disk before the rename.
+    """
+    tmp_path = path + '.tmp'
+    try:
+        os.unlink(tmp_path)
+    except OSError as e:
+        if e.errno != errno.ENOENT:
+            raise
+    fd = os.open(tmp_path, (os.O_WRONLY | os.O_CREAT | os.O_EXCL |
+                            getattr(os, 'O_NOFOLLOW', 0)), 0o600)
+    with os.fdopen(fd, 'w') as f:
+        f.write(data)
+        if sync:
+            f.flush()
+            os.fsync(f.fileno())
+    os.rename(tmp_path, path)
+
+
+def save_manifest(path, items):
+    """Records the inode, size and modification time of regular files.
+
+    :param items: the copied items, as (relative path, lstat result).
+    """
+    manifest = {item: _manifest_entry(st) for item, st in items
+                if stat.S_ISREG(st.st_mode)}
+    write_file(path, jsonutils.dumps(manifest))
+
+
+def load_manifest(path):
+    """Returns the entries of a manifest, or {} if there is none."""
+    try:
+        with open(path) as f:
+            return jsonutils.loads(f.read())
+    except (IOError, OSError) as e:
+        if e.errno != errno.ENOENT:
+            raise
+    except ValueError:
+        LOG.warning(_LW("Ignoring corrupted copy manifest %s."), path)
+    return {}
+
+
+def copy_file_data(src, dest, callback=None, cancelled=None):
+    """Copies the contents of the src file into the dest file.
+
+    :param callback: called with the number of bytes of every copied chunk.
+    :param cancelled: callable telling whether to stop copying.
+    """
+    with open(src, 'rb') as fsrc:
+        with open(dest, 'wb') as fdest:
+            for method in (_copy_file_range, _sendfile, _read_write):
+                try:
+                    method(fsrc, fdest, callback, cancelled)
+                except _Unsupported:
+                    continue
+                return
+
+
+class _Unsupported(Exception):
+    pass
+
+
+def _copy_chunks(copy_chunk, callback, cancelled):
+    offset = 0
+    while not (cancelled and cancelled()):
+        try:
+            copied = copy_chunk(offset)
+        except OSError as e:
+            if offset == 0 and e.errno in _UNSUPPORTED_ERRNOS:
+                raise _Unsupported()
+            raise
+        if not copied:
+            return
+        offset += copied
+        if callback:
+            callback(copied)
+
+
+def _copy_file_range(fsrc, fdest, callback, cancelled):
+    copy_file_range = getattr(os, 'copy_file_range', None)
+    if copy_file_range is None:
+        raise _Unsupported()
+    _copy_chunks(
+        lambda offset: copy_file_range(fsrc.fileno(), fdest.fileno(),
+                                       CHUNK_SIZE),
+        callback, cancelled)
+
+
+def _sendfile(fsrc, fdest, callback, cancelled):
+    sendfile = getattr(os, 'sendfile', None)
+    if sendfile is None:
+        raise _Unsupported()
+    _copy_chunks(
+        lambda offset: sendfile(fdest.fileno(), fsrc.fileno(), offset,
+                                CHUNK_SIZE),
+        callback, cancelled)
+
+
+def _read_write(fsrc, fdest, callback, cancelled):
+    def copy_chunk(offset):
+        data = fsrc.read(CHUNK_SIZE)
+        fdest.write(data)
+        return len(data)
+
+    _copy_chunks(copy_chunk, callback, cancelled)
+
+
+def copy_metadata(src, dest, st):
+    """Applies ownership, mode, extended attributes and times of src."""
+    is_link = stat.S_ISLNK(st.st_mode)
+    os.lchown(dest, st.st_uid, st.st_gid)
+    if not is_link:
+        # NOTE: set after the owner, changing it clears setuid bits.
+        os.chmod(dest, stat.S_IMODE(st.st_mode))
+    copy_xattrs(src, dest, is_link)
+    if six.PY3:
+        if not is_link:
+            os.utime(dest, ns=(st.st_atime_ns, st.st_mtime_ns))
+        elif os.utime in os.supports_follow_symlinks:
+            os.utime(dest, ns=(st.st_atime_ns, st.st_mtime_ns),
+                     follow_symlinks=False)
+    elif not is_link:
+        os.utime(dest, (st.st_atime, st.st_mtime))
+
+
+def copy_xattrs(src, dest, is_link=False):
+    """Copies extended attributes, ignoring the unsupported ones.
+
+    As ``cp --preserve=all`` does, attributes that the destination does not
+    support or that cannot be read are skipped.
+    """
+    if not _XATTR_SUPPORTED:
+        return
+    follow = not is_link
+    try:
+        names = os.listxattr(src, follow_symlinks=follow)
+    except OSError as e:
+        LOG.debug("Cannot list extended attributes of %(path)s: %(error)s",
+                  {'path': src, 'error': e})
+        return
+    for name in names:
+        try:
+            value = os.getxattr(src, name, follow_symlinks=follow)
+            os.setxattr(dest, name, value, follow_symlinks=follow)
+        except OSError as e:
+            LOG.debug("Cannot copy extended attribute %(name)s of "
+                      "%(path)s: %(error)s",
+                      {'name': name, 'path': src, 'error': e})
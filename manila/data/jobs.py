@@ -0,0 +1,87 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""Queue of the data copy jobs of a data service."""
+
+import collections
+import functools
+
+import eventlet
+from oslo_log import log
+from oslo_utils import timeutils
+
+from manila import exception
+from manila.i18n import _, _LE
+
+LOG = log.getLogger(__name__)
+
+JOB_STATE_QUEUED = 'queued'
+JOB_STATE_RUNNING = 'running'
+
+
+class JobQueue(object):
+    """Runs jobs in green threads, at most max_jobs at the same time.
+
+    Jobs are identified by the ID of the share they copy and are started in
+    the order they were submitted.
+    """
+
+    def __init__(self, max_jobs):
+        self.max_jobs = max_jobs
+        self._queued = collections.OrderedDict()
+        self._running = collections.OrderedDict()
+
+    def submit(self, share_id, func, *args, **kwargs):
+        """Queues a job calling func, starting it if a slot is free."""
+        if share_id in self._queued or share_id in self._running:
+            msg = _("A data copy job of share %s already exists.") % share_id
+            raise exception.InvalidShare(reason=msg)
+        self._queued[share_id] = {
+            'func': functools.partial(func, *args, **kwargs),
+            'queued_at': timeutils.utcnow(),
+            'started_at': None,
+        }
+        self._start_jobs()
+
+    def remove(self, share_id):
+        """Removes a queued job, returning False if it is not queued."""
+        return self._queued.pop(share_id, None) is not None
+
+    def list_jobs(self):
+        """Returns the running jobs, then the queued ones in their order."""
+        jobs = []
+        for state, queue in ((JOB_STATE_RUNNING, self._running),
+                             (JOB_STATE_QUEUED, self._queued)):
+            for share_id, job in queue.items():
+                jobs.append({
+                    'share_id': share_id,
+                    'state': state,
+                    'queued_at': job['queued_at'].isoformat(),
+                    'started_at': (job['started_at'] and
+                                   job['started_at'].isoformat()),
+                })
+        return jobs
+
+    def _start_jobs(self):
+        while self._queued and len(self._running) < self.max_jobs:
+            share_id, job = self._queued.popitem(last=False)
+            job['started_at'] = timeutils.utcnow()
+            self._running[share_id] = job
+            eventlet.spawn_n(self._run, share_id, job)
+
+    def _run(self, share_id, job):
+        try:
+            job['func']()
+        except Exception:
+            LOG.exception(_LE("Data copy job of share %s failed."), share_id)
+        finally:
+            self._running.pop(share_id, None)
+            self._start_jobs()
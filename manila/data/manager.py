@@ -26,6 +26,8 @@ from manila.i18n import _, _LE, _LI, _LW
 from manila.common import constants
 from manila import context
 from manila.data import helper
+from manila.data import jobs
+from manila.data import rpcapi as data_rpcapi
 from manila.data import utils as data_utils
 from manila import exception
 from manila import manager
@@ -38,6 +40,12 @@ data_opts = [
         'migration_tmp_location',
         default='/tmp/',
         help="Temporary path to create and mount shares during migration."),
+    cfg.IntOpt(
+        'data_max_concurrent_jobs',
+        default=4,
+        min=1,
+        help="Maximum number of data copies run at the same time by a data "
+             "service, the other ones being queued until one completes."),
 ]
 
 CONF = cfg.CONF
@@ -47,24 +55,41 @@ CONF.register_opts(data_opts)
 class DataManager(manager.Manager):
     """Receives requests to handle data and sends responses."""
 
-    RPC_API_VERSION = '1.0'
+    RPC_API_VERSION = '1.3'
 
     def __init__(self, service_name=None, *args, **kwargs):
         super(DataManager, self).__init__(*args, **kwargs)
         self.busy_tasks_shares = {}
+        self.jobs = jobs.JobQueue(CONF.data_max_concurrent_jobs)
 
     def init_host(self):
         ctxt = context.get_admin_context()
         shares = self.db.share_get_all(ctxt)
         for share in shares:
+            # NOTE: copies run by other data service hosts are left alone.
+            # Shares without a data copy host were copied before it was
+            # recorded, when a single data service host was supported.
+            if share['data_copy_host'] not in (None, self.host):
+                continue
             if share['task_state'] in constants.BUSY_COPYING_STATES:
+                checkpoint = self._get_checkpoint(share['id'])
+                if checkpoint.load():
+                    LOG.info(_LI("Resuming interrupted data copy of share "
+                                 "%s."), share['id'])
+                    data_rpcapi.DataAPI().migration_resume(
+                        ctxt, share['id'], self.host)
+                    continue
                 self.db.share_update(
                     ctxt, share['id'],
                     {'task_state': constants.TASK_STATE_DATA_COPYING_ERROR})
 
+    def _get_checkpoint(self, share_id):
+        return data_utils.Checkpoint(CONF.data_copy_state_path, share_id)
+
     def migration_start(self, context, ignore_list, share_id,
                         share_instance_id, dest_share_instance_id,
-                        migration_info_src, migration_info_dest, notify):
+                        migration_info_src, migration_info_dest, notify,
+                        two_phase=False):
 
         LOG.info(_LI(
             "Received request to migrate share content from share instance "
@@ -72,27 +97,125 @@ class DataManager(manager.Manager):
             {'instance_id': share_instance_id,
              'dest_instance_id': dest_share_instance_id})
 
+        checkpoint = self._get_checkpoint(share_id)
+        checkpoint.save(
+            ignore_list=ignore_list,
+            share_instance_id=share_instance_id,
+            dest_share_instance_id=dest_share_instance_id,
+            migration_info_src=migration_info_src,
+            migration_info_dest=migration_info_dest,
+            notify=notify,
+            two_phase=two_phase)
+
+        self._submit_job(
+            context, checkpoint, ignore_list, share_id, share_instance_id,
+            dest_share_instance_id, migration_info_src, migration_info_dest,
+            notify, two_phase=two_phase)
+
+    def migration_resume(self, context, share_id):
+        """Resumes a data copy interrupted by a restart of the service.
+
+        The copy is restarted from its checkpoint, files already copied to
+        the destination share with the same size and modification time as
+        their source are not copied again.
+        """
+        LOG.info(_LI("Received request to resume data copy of share %s."),
+                 share_id)
+
+        share_ref = self.db.share_get(context, share_id)
+        checkpoint = self._get_checkpoint(share_id)
+        job = checkpoint.load()
+        if job and (share_ref['task_state'] not in
+                    constants.BUSY_COPYING_STATES):
+            # NOTE: the migration was given up in the meantime.
+            checkpoint.delete()
+            job = None
+        if not job:
+            msg = _("Data copy of share %s cannot be resumed.") % share_id
+            LOG.error(msg)
+            raise exception.InvalidShare(reason=msg)
+
+        # NOTE: share instances may still be mounted by the interrupted copy.
+        helper_src = helper.DataServiceHelper(context, self.db, share_ref)
+        for instance_id, migration_info in (
+                (job['share_instance_id'], job['migration_info_src']),
+                (job['dest_share_instance_id'],
+                 job['migration_info_dest'])):
+            helper_src.cleanup_unmount_temp_folder(
+                migration_info['unmount'], CONF.migration_tmp_location,
+                instance_id)
+
+        self._submit_job(
+            context, checkpoint, job['ignore_list'], share_id,
+            job['share_instance_id'], job['dest_share_instance_id'],
+            job['migration_info_src'], job['migration_info_dest'],
+            job['notify'], two_phase=job.get('two_phase', False),
+            resume=True)
+
+    def _submit_job(self, context, checkpoint, ignore_list, share_id,
+                    *args, **kwargs):
+        # NOTE: the share stays in the starting state while its copy is
+        # queued, for the copy to be cancelled. The host is recorded for
+        # cancel and progress requests to be sent straight to it.
+        self.db.share_update(
+            context, share_id,
+            {'task_state': constants.TASK_STATE_DATA_COPYING_STARTING,
+             'data_copy_host': self.host})
+        self.jobs.submit(share_id, self._migration_start, context,
+                         checkpoint, ignore_list, share_id, *args, **kwargs)
+
+    def _migration_start(self, context, checkpoint, ignore_list, share_id,
+                         share_instance_id, dest_share_instance_id,
+                         migration_info_src, migration_info_dest, notify,
+                         two_phase=False, resume=False):
+
         share_ref = self.db.share_get(context, share_id)
 
         share_rpcapi = share_rpc.ShareAPI()
 
         mount_path = CONF.migration_tmp_location
 
+        # NOTE: only the native copy records the files it copied, the whole
+        # share is copied once it is read-only with the other methods.
+        single_phase = two_phase and CONF.data_copy_method != 'native'
+        two_phase = two_phase and not single_phase
+
+        # NOTE: the checkpoint is kept if the service stops mid-way through
+        # the copy, for the copy to be resumed once it is started again.
         try:
+            if single_phase:
+                LOG.warning(_LW("Copying the data of share %s in two phases "
+                                "requires the native data copy method."),
+                            share_id)
+                self._change_to_read_only(context, share_instance_id)
+
             copy = data_utils.Copy(
                 os.path.join(mount_path, share_instance_id),
                 os.path.join(mount_path, dest_share_instance_id),
-                ignore_list)
+                ignore_list, resume=resume, checkpoint=checkpoint,
+                manifest=checkpoint.manifest_path if two_phase else None)
+
+            if two_phase:
+                if checkpoint.data.get('phase') != 2:
+                    self._copy_share_data(
+                        context, copy, share_ref, share_instance_id,
+                        dest_share_instance_id, migration_info_src,
+                        migration_info_dest, final=False)
+                    self._change_to_read_only(context, share_instance_id)
+                    checkpoint.save(phase=2)
+                copy.start_delta()
 
             self._copy_share_data(
                 context, copy, share_ref, share_instance_id,
                 dest_share_instance_id, migration_info_src,
                 migration_info_dest)
         except exception.ShareDataCopyCancelled:
+            self._delete_checkpoint(checkpoint, two_phase)
             share_rpcapi.migration_complete(
                 context, share_ref, share_instance_id, dest_share_instance_id)
             return
         except Exception:
+            self._delete_checkpoint(checkpoint, two_phase)
             self.db.share_update(
                 context, share_id,
                 {'task_state': constants.TASK_STATE_DATA_COPYING_ERROR})
@@ -106,6 +229,8 @@ class DataManager(manager.Manager):
         finally:
             self.busy_tasks_shares.pop(share_id, None)
 
+        self._delete_checkpoint(checkpoint, two_phase)
+
         LOG.info(_LI(
             "Completed copy operation of migrating share content from share "
             "instance %(instance_id)s to instance %(dest_instance_id)s."),
@@ -123,18 +248,60 @@ class DataManager(manager.Manager):
             share_rpcapi.migration_complete(
                 context, share_ref, share_instance_id, dest_share_instance_id)
 
+    def _change_to_read_only(self, context, share_instance_id):
+        LOG.info(_LI("Making share instance %s read-only for the last "
+                     "phase of its data copy."), share_instance_id)
+        share_instance = self.db.share_instance_get(
+            context, share_instance_id, with_share_data=True)
+        share_rpc.ShareAPI().migration_change_to_read_only(
+            context, share_instance)
+
+    def _delete_checkpoint(self, checkpoint, two_phase):
+        checkpoint.delete()
+        if two_phase:
+            try:
+                checkpoint.delete_manifest()
+            except Exception:
+                LOG.exception(_LE("Could not delete data copy manifest "
+                                  "%s."), checkpoint.manifest_path)
+
     def data_copy_cancel(self, context, share_id):
         LOG.info(_LI("Received request to cancel share migration "
                      "of share %s."), share_id)
         copy = self.busy_tasks_shares.get(share_id)
         if copy:
             copy.cancel()
+        elif self.jobs.remove(share_id):
+            self._cancel_queued_job(context, share_id)
         else:
             msg = _("Data copy for migration of share %s cannot be cancelled"
                     " at this moment.") % share_id
             LOG.error(msg)
             raise exception.InvalidShare(reason=msg)
 
+    def _cancel_queued_job(self, context, share_id):
+        checkpoint = self._get_checkpoint(share_id)
+        job = checkpoint.load() or {}
+        self._delete_checkpoint(checkpoint, job.get('two_phase', False))
+        self.db.share_update(
+            context, share_id,
+            {'task_state': constants.TASK_STATE_DATA_COPYING_CANCELLED})
+        LOG.warning(_LW("Queued copy of data of share %s was cancelled."),
+                    share_id)
+        if job:
+            share_ref = self.db.share_get(context, share_id)
+            share_rpc.ShareAPI().migration_complete(
+                context, share_ref, job['share_instance_id'],
+                job['dest_share_instance_id'])
+
+    def data_copy_get_jobs(self, context):
+        """Returns the running and queued data copies of this service."""
+        result = self.jobs.list_jobs()
+        for job in result:
+            copy = self.busy_tasks_shares.get(job['share_id'])
+            job['progress'] = copy.get_progress() if copy else None
+        return result
+
     def data_copy_get_progress(self, context, share_id):
         LOG.info(_LI("Received request to get share migration information "
                      "of share %s."), share_id)
@@ -154,7 +321,8 @@ class DataManager(manager.Manager):
 
     def _copy_share_data(
             self, context, copy, src_share, share_instance_id,
-            dest_share_instance_id, migration_info_src, migration_info_dest):
+            dest_share_instance_id, migration_info_src, migration_info_dest,
+            final=True):
 
         copied = False
         mount_path = CONF.migration_tmp_location
@@ -281,6 +449,11 @@ class DataManager(manager.Manager):
                  'dest_instance_id': dest_share_instance_id})
             raise exception.ShareDataCopyFailed(reason=msg)
 
+        # NOTE: the share is left copying until the last phase of its copy
+        # is done, for its migration not to be completed before.
+        if not final:
+            return
+
         self.db.share_update(
             context, src_share['id'],
             {'task_state': constants.TASK_STATE_DATA_COPYING_COMPLETED})
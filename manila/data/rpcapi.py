@@ -17,11 +17,16 @@ Client side of the data manager RPC API.
 """
 
 from oslo_config import cfg
+from oslo_log import log
 import oslo_messaging as messaging
 
+from manila import db
+from manila.i18n import _LW
 from manila import rpc
+from manila import utils
 
 CONF = cfg.CONF
+LOG = log.getLogger(__name__)
 
 
 class DataAPI(object):
@@ -33,6 +38,9 @@ class DataAPI(object):
               Add migration_start(),
               data_copy_cancel(),
               data_copy_get_progress()
+        1.1 - Add migration_resume()
+        1.2 - Add two_phase argument to migration_start()
+        1.3 - Add data_copy_get_jobs()
     """
 
     BASE_RPC_API_VERSION = '1.0'
@@ -41,12 +49,15 @@ class DataAPI(object):
         super(DataAPI, self).__init__()
         target = messaging.Target(topic=CONF.data_topic,
                                   version=self.BASE_RPC_API_VERSION)
-        self.client = rpc.get_client(target, version_cap='1.0')
+        self.client = rpc.get_client(target, version_cap='1.3')
 
     def migration_start(self, context, share_id, ignore_list,
                         share_instance_id, dest_share_instance_id,
-                        migration_info_src, migration_info_dest, notify):
-        call_context = self.client.prepare(version='1.0')
+                        migration_info_src, migration_info_dest, notify,
+                        two_phase=False, host=None):
+        if host is None:
+            host = self.select_host(context)
+        call_context = self.client.prepare(version='1.2', server=host)
         call_context.cast(
             context,
             'migration_start',
@@ -56,13 +67,63 @@ class DataAPI(object):
             dest_share_instance_id=dest_share_instance_id,
             migration_info_src=migration_info_src,
             migration_info_dest=migration_info_dest,
-            notify=notify)
+            notify=notify,
+            two_phase=two_phase)
 
-    def data_copy_cancel(self, context, share_id):
-        call_context = self.client.prepare(version='1.0')
+    def migration_resume(self, context, share_id, host):
+        call_context = self.client.prepare(version='1.1', server=host)
+        call_context.cast(context, 'migration_resume', share_id=share_id)
+
+    def data_copy_cancel(self, context, share_id, host=None):
+        call_context = self.client.prepare(version='1.0', server=host)
         call_context.call(context, 'data_copy_cancel', share_id=share_id)
 
-    def data_copy_get_progress(self, context, share_id):
-        call_context = self.client.prepare(version='1.0')
+    def data_copy_get_progress(self, context, share_id, host=None):
+        call_context = self.client.prepare(version='1.0', server=host)
         return call_context.call(context, 'data_copy_get_progress',
                                  share_id=share_id)
+
+    def data_copy_get_jobs(self, context, host, timeout=None):
+        call_context = self.client.prepare(version='1.3', server=host,
+                                           timeout=timeout)
+        return call_context.call(context, 'data_copy_get_jobs')
+
+    def get_jobs(self, context):
+        """Returns the data copy jobs of every data service host.
+
+        Hosts which do not answer within data_host_selection_timeout
+        seconds are left out.
+        """
+        return self._get_jobs(context, self._hosts_up(context))
+
+    def _get_jobs(self, context, hosts):
+        jobs = {}
+        for host in hosts:
+            try:
+                jobs[host] = self.data_copy_get_jobs(
+                    context, host, timeout=CONF.data_host_selection_timeout)
+            except Exception as e:
+                LOG.warning(_LW("Could not get the data copy jobs of host "
+                                "%(host)s: %(error)s"),
+                            {'host': host, 'error': e})
+        return jobs
+
+    def select_host(self, context):
+        """Returns the data service host with the fewest jobs.
+
+        None is returned when there is a single host, for the message to be
+        sent to the data topic.
+        """
+        hosts = self._hosts_up(context)
+        if len(hosts) < 2:
+            return None
+        jobs = self._get_jobs(context, hosts)
+        if not jobs:
+            return None
+        return min(sorted(jobs), key=lambda host: len(jobs[host]))
+
+    def _hosts_up(self, context):
+        services = db.service_get_all_by_topic(context.elevated(),
+                                               CONF.data_topic)
+        return [service['host'] for service in services
+                if utils.service_is_up(service)]
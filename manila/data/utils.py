@@ -12,19 +12,131 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import errno
 import os
+import shlex
 
+from eventlet.green import subprocess
+from oslo_config import cfg
 from oslo_log import log
+from oslo_serialization import jsonutils
+from oslo_utils import timeutils
 import six
 
+from manila.data import copy_engine
+from manila.i18n import _LW
 from manila import utils
 
 LOG = log.getLogger(__name__)
 
+data_copy_opts = [
+    cfg.StrOpt(
+        'data_copy_method',
+        default='native',
+        choices=['native', 'shell'],
+        help="How share contents are copied. 'native' copies the whole "
+             "tree with a single privileged helper process, "
+             "manila-data-copy. 'shell' runs ls, stat, cp, chmod, touch "
+             "and chown for every file and directory."),
+    cfg.IntOpt(
+        'data_copy_workers',
+        default=4,
+        min=1,
+        help="Number of files copied at the same time by the native copy "
+             "method."),
+    cfg.IntOpt(
+        'data_copy_checkpoint_interval',
+        default=60,
+        min=0,
+        help="Minimum number of seconds between two saves of the progress "
+             "of a data copy to its checkpoint file, from which the copy "
+             "is resumed if the data service restarts."),
+    cfg.StrOpt(
+        'data_copy_state_path',
+        default='$state_path/data_copy',
+        help="Directory where the checkpoints and manifests of data copies "
+             "are kept. Created if missing, it must only be writable by the "
+             "data service."),
+    cfg.IntOpt(
+        'data_copy_bandwidth_limit',
+        default=0,
+        min=0,
+        help="Maximum number of bytes written per second by every data "
+             "copy job of the native copy method, 0 for no limit."),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(data_copy_opts)
+
+
+class Checkpoint(object):
+    """Sidecar file recording a data copy, for it to be resumed.
+
+    Holds the parameters the copy was started with and its last saved
+    progress, including the last copied path.
+    """
+
+    def __init__(self, directory, share_id):
+        self.directory = directory
+        self.path = os.path.join(directory, '%s.checkpoint' % share_id)
+        self.data = {}
+        self.saved_at = None
+
+    def load(self):
+        """Returns the saved data, or None if there is no checkpoint."""
+        try:
+            with open(self.path) as f:
+                self.data = jsonutils.loads(f.read())
+        except (IOError, OSError) as e:
+            if e.errno != errno.ENOENT:
+                raise
+            return None
+        except ValueError:
+            LOG.warning(_LW("Ignoring corrupted data copy checkpoint %s."),
+                        self.path)
+            return None
+        return self.data
+
+    def save(self, **values):
+        self.data.update(values)
+        try:
+            os.makedirs(self.directory, 0o700)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+        # NOTE: renamed once written, for the checkpoint to be either the
+        # previous or the new one if the service stops while saving it.
+        copy_engine.write_file(self.path, jsonutils.dumps(self.data),
+                               sync=True)
+        self.saved_at = timeutils.now()
+
+    def save_progress(self, progress):
+        """Saves the progress unless it was saved recently."""
+        if (self.saved_at is None or timeutils.now() - self.saved_at >=
+                CONF.data_copy_checkpoint_interval):
+            self.save(progress=progress)
+
+    def delete(self):
+        try:
+            os.unlink(self.path)
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
+
+    @property
+    def manifest_path(self):
+        """Path of the manifest of the copied files, see copy_engine."""
+        return os.path.splitext(self.path)[0] + '.manifest'
+
+    def delete_manifest(self):
+        # NOTE: the manifest is written by the privileged copy helper.
+        utils.execute('rm', '-f', self.manifest_path, run_as_root=True)
+
 
 class Copy(object):
 
-    def __init__(self, src, dest, ignore_list):
+    def __init__(self, src, dest, ignore_list, resume=False,
+                 checkpoint=None, manifest=None):
         self.src = src
         self.dest = dest
         self.total_size = 0
@@ -34,31 +146,73 @@ class Copy(object):
         self.current_copy = None
         self.ignore_list = ignore_list
         self.cancelled = False
+        self.process = None
+        self.progress = None
+        self.started_at = None
+        self.resume = resume
+        self.checkpoint = checkpoint
+        self.manifest = manifest
+        self.delta = False
+        self.phase = 1 if manifest else None
+
+    def start_delta(self):
+        """Makes the next run only copy the files changed since this one.
+
+        The changes are found from the manifest recorded by the previous
+        run, which only the native copy method writes.
+        """
+        self.phase = 2
+        self.delta = True
+        self.resume = False
+        self.progress = None
+        self.total_size = 0
+        self.current_size = 0
 
     def get_progress(self):
 
-        if self.current_copy is not None:
+        progress = self._get_progress()
+        if self.phase is not None:
+            progress['phase'] = self.phase
+        return progress
 
-            try:
-                size, err = utils.execute("stat", "-c", "%s",
-                                          self.current_copy['file_path'],
-                                          run_as_root=True)
-                size = int(size)
-            except utils.processutils.ProcessExecutionError:
-                size = 0
+    def _get_progress(self):
+
+        # NOTE: progress is only computed from counters kept in memory, as
+        # it is polled through the API and logged after every copied file.
+        if self.progress is not None:
+            return {
+                'total_progress': self.progress['total_progress'],
+                'current_file_path': self.progress.get('current_file_path'),
+                'current_file_progress': self.progress.get(
+                    'current_file_progress', 0),
+                'throughput': self.progress.get('throughput'),
+                'eta': self.progress.get('eta'),
+            }
+
+        if self.current_copy is not None:
 
             total_progress = 0
             if self.total_size > 0:
                 total_progress = self.current_size * 100 / self.total_size
             current_file_progress = 0
             if self.current_copy['size'] > 0:
-                current_file_progress = size * 100 / self.current_copy['size']
+                current_file_progress = (self.current_copy['copied'] * 100 /
+                                         self.current_copy['size'])
             current_file_path = self.current_copy['file_path']
 
+            elapsed = None
+            if self.started_at is not None:
+                elapsed = timeutils.now() - self.started_at
+            throughput, eta = copy_engine.estimate(
+                self.current_size, self.total_size - self.current_size,
+                elapsed)
+
             progress = {
                 'total_progress': total_progress,
                 'current_file_path': current_file_path,
-                'current_file_progress': current_file_progress
+                'current_file_progress': current_file_progress,
+                'throughput': throughput,
+                'eta': eta,
             }
 
             return progress
@@ -68,15 +222,64 @@ class Copy(object):
     def cancel(self):
 
         self.cancelled = True
+        if self.process is not None:
+            # NOTE: the helper cancels the copy once its stdin is closed.
+            self.process.stdin.close()
 
     def run(self):
 
-        self.get_total_size(self.src)
-        self.copy_data(self.src)
-        self.copy_stats(self.src)
+        if CONF.data_copy_method == 'native':
+            self.copy_tree()
+        else:
+            self.get_total_size(self.src)
+            self.started_at = timeutils.now()
+            self.copy_data(self.src)
+            self.copy_stats(self.src)
 
         LOG.info(six.text_type(self.get_progress()))
 
+    def copy_tree(self):
+        """Copies the tree with the privileged manila-data-copy helper."""
+        cmd = ['manila-data-copy', '--workers',
+               six.text_type(CONF.data_copy_workers)]
+        for name in self.ignore_list:
+            cmd.extend(['--ignore', name])
+        if self.resume:
+            cmd.append('--resume')
+        if self.manifest:
+            cmd.extend(['--manifest', self.manifest])
+        if self.delta:
+            cmd.append('--delta')
+        if CONF.data_copy_bandwidth_limit:
+            cmd.extend(['--bwlimit',
+                        six.text_type(CONF.data_copy_bandwidth_limit)])
+        cmd.extend([self.src, self.dest])
+        cmd = shlex.split(utils._get_root_helper()) + cmd
+
+        self.progress = {'total_progress': 0}
+        self.process = subprocess.Popen(
+            cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE, close_fds=True)
+        if self.cancelled:
+            self.process.stdin.close()
+        try:
+            for line in iter(self.process.stdout.readline, b''):
+                self.progress = jsonutils.loads(line)
+                self.total_size = self.progress['total_size']
+                self.current_size = self.progress['current_size']
+                if self.checkpoint is not None:
+                    self.checkpoint.save_progress(self.progress)
+            stderr = self.process.stderr.read()
+            exit_code = self.process.wait()
+        finally:
+            if not self.process.stdin.closed:
+                self.process.stdin.close()
+            self.process = None
+
+        if exit_code != 0:
+            raise utils.processutils.ProcessExecutionError(
+                exit_code=exit_code, stderr=stderr, cmd=' '.join(cmd))
+
     def get_total_size(self, path):
         if self.cancelled:
             return
@@ -125,11 +328,13 @@ class Copy(object):
                                           run_as_root=True)
 
                 self.current_copy = {'file_path': dest_item,
-                                     'size': int(size)}
+                                     'size': int(size),
+                                     'copied': 0}
 
                 utils.execute("cp", "-P", "--preserve=all", src_item,
                               dest_item, run_as_root=True)
 
+                self.current_copy['copied'] = int(size)
                 self.current_size += int(size)
 
                 LOG.info(six.text_type(self.get_progress()))
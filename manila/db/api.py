@@ -43,6 +43,8 @@ these objects be simple dictionaries.
 from oslo_config import cfg
 from oslo_db import api as db_api
 
+from manila.common import constants
+
 db_opts = [
     cfg.StrOpt('db_backend',
                default='sqlalchemy',
@@ -259,6 +261,11 @@ def quota_reserve(context, resources, quotas, user_quotas, deltas, expire,
                               project_id=project_id, user_id=user_id)
 
 
+def quota_usage_reconcile(context, resources, until_refresh):
+    """Recount the in_use of quota usages due for a refresh."""
+    return IMPL.quota_usage_reconcile(context, resources, until_refresh)
+
+
 def reservation_commit(context, reservations, project_id=None, user_id=None):
     """Commit quota reservations."""
     return IMPL.reservation_commit(context, reservations,
@@ -369,19 +376,30 @@ def share_get(context, share_id):
     return IMPL.share_get(context, share_id)
 
 
-def share_get_all(context, filters=None, sort_key=None, sort_dir=None):
+def share_get_all(context, filters=None, sort_key=None, sort_dir=None,
+                  limit=None, offset=None, marker=None,
+                  view=constants.SHARE_VIEW_DETAIL):
     """Get all shares."""
     return IMPL.share_get_all(
         context, filters=filters, sort_key=sort_key, sort_dir=sort_dir,
+        limit=limit, offset=offset, marker=marker, view=view,
     )
 
 
+def share_get_all_by_host(context, host):
+    """Returns all shares with an instance on given host."""
+    return IMPL.share_get_all_by_host(context, host)
+
+
 def share_get_all_by_project(context, project_id, filters=None,
-                             is_public=False, sort_key=None, sort_dir=None):
+                             is_public=False, sort_key=None, sort_dir=None,
+                             limit=None, offset=None, marker=None,
+                             view=constants.SHARE_VIEW_DETAIL):
     """Returns all shares with given project ID."""
     return IMPL.share_get_all_by_project(
         context, project_id, filters=filters, is_public=is_public,
-        sort_key=sort_key, sort_dir=sort_dir,
+        sort_key=sort_key, sort_dir=sort_dir, limit=limit, offset=offset,
+        marker=marker, view=view,
     )
 
 
@@ -395,11 +413,14 @@ def share_get_all_by_consistency_group_id(context, cg_id,
 
 
 def share_get_all_by_share_server(context, share_server_id, filters=None,
-                                  sort_key=None, sort_dir=None):
+                                  sort_key=None, sort_dir=None, limit=None,
+                                  offset=None, marker=None,
+                                  view=constants.SHARE_VIEW_DETAIL):
     """Returns all shares with given share server ID."""
     return IMPL.share_get_all_by_share_server(
         context, share_server_id, filters=filters, sort_key=sort_key,
-        sort_dir=sort_dir,
+        sort_dir=sort_dir, limit=limit, offset=offset, marker=marker,
+        view=view,
     )
 
 
@@ -504,6 +525,14 @@ def share_snapshot_instance_get_all_with_filters(context, filters,
         context, filters, with_share_data=with_share_data)
 
 
+def share_replica_snapshot_instances_get_all_by_host(context, host,
+                                                     statuses=None,
+                                                     with_share_data=False):
+    """Get snapshot instances of non-active share replicas on a host."""
+    return IMPL.share_replica_snapshot_instances_get_all_by_host(
+        context, host, statuses=statuses, with_share_data=with_share_data)
+
+
 def share_snapshot_instance_delete(context, snapshot_instance_id):
     """Delete a share snapshot instance."""
     return IMPL.share_snapshot_instance_delete(context, snapshot_instance_id)
@@ -656,6 +685,13 @@ def share_export_locations_update(context, share_instance_id, export_locations,
         context, share_instance_id, export_locations, delete)
 
 
+def share_export_locations_update_many(context, export_locations,
+                                       delete=True):
+    """Update export locations of several share instances at once."""
+    return IMPL.share_export_locations_update_many(
+        context, export_locations, delete)
+
+
 ####################
 
 def export_location_metadata_get(context, export_location_uuid, session=None):
@@ -758,6 +794,11 @@ def network_allocations_get_by_ip_address(context, ip_address):
     return IMPL.network_allocations_get_by_ip_address(context, ip_address)
 
 
+def network_allocations_get_ip_addresses(context):
+    """Get the set of IP addresses of all network allocations."""
+    return IMPL.network_allocations_get_ip_addresses(context)
+
+
 ##################
 
 
@@ -1070,6 +1111,14 @@ def share_replicas_get_all(context, with_share_server=False,
         with_share_data=with_share_data)
 
 
+def share_replicas_get_all_by_host(context, host, with_share_server=False,
+                                   with_share_data=False):
+    """Returns all share replicas hosted on a given host."""
+    return IMPL.share_replicas_get_all_by_host(
+        context, host, with_share_server=with_share_server,
+        with_share_data=with_share_data)
+
+
 def share_replicas_get_all_by_share(context, share_id, with_share_server=False,
                                     with_share_data=False):
     """Returns all share replicas for a given share."""
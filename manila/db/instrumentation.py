@@ -0,0 +1,243 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Accounting of the SQL statements run by DB API functions.
+
+The database backend reports every statement it executes with
+:func:`record_statement`. Statements are counted, with the rows they
+returned or changed and the time they took, by the DB API function that
+issued them, in every statistics collection open in the current thread.
+
+API requests and RPC methods open a :func:`scope` around their handler when
+``db_instrumentation`` is enabled. Scopes log the statements of each call
+and add them to per process aggregates, which are returned by
+:func:`get_statistics`. Tests can use :func:`collect` directly to check the
+statements run by a block of code, whatever the configuration.
+"""
+
+import contextlib
+import sys
+import threading
+
+from oslo_config import cfg
+from oslo_log import log
+from oslo_utils import timeutils
+
+from manila.i18n import _LI
+
+instrumentation_opts = [
+    cfg.BoolOpt('db_instrumentation',
+                default=False,
+                help='Count the SQL statements, rows and time of the DB API '
+                     'functions called by each API request and RPC method. '
+                     'Counts of every call are logged and aggregates are '
+                     'returned by the admin DB statistics API. Adds '
+                     'overhead to every statement, intended for debugging.'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(instrumentation_opts)
+
+LOG = log.getLogger(__name__)
+
+SCOPE_API = 'api'
+SCOPE_RPC = 'rpc'
+
+# Modules whose public functions statements are accounted to, the DB API
+# facade first as it is the outermost one.
+DB_API_MODULES = ('manila.db.api', 'manila.db.sqlalchemy.api')
+
+_local = threading.local()
+_lock = threading.Lock()
+_aggregates = {SCOPE_API: {}, SCOPE_RPC: {}}
+
+
+class Counts(object):
+    """Statements, rows and seconds spent in the database."""
+
+    def __init__(self):
+        self.statements = 0
+        self.rows = 0
+        self.time = 0.0
+
+    def add(self, statements, rows, elapsed):
+        self.statements += statements
+        self.rows += rows
+        self.time += elapsed
+
+    def to_dict(self):
+        return {
+            'statements': self.statements,
+            'rows': self.rows,
+            'time': round(self.time, 6),
+        }
+
+    def __str__(self):
+        return '%d statements, %d rows, %.1f ms' % (
+            self.statements, self.rows, self.time * 1000)
+
+
+class Statistics(Counts):
+    """Counts of a set of calls, by the DB API function of the statements."""
+
+    def __init__(self):
+        super(Statistics, self).__init__()
+        self.calls = 0
+        self.functions = {}
+
+    def record(self, function, rows, elapsed):
+        self.add(1, rows, elapsed)
+        if function not in self.functions:
+            self.functions[function] = Counts()
+        self.functions[function].add(1, rows, elapsed)
+
+    def merge(self, other):
+        self.calls += other.calls
+        self.add(other.statements, other.rows, other.time)
+        for function, counts in other.functions.items():
+            if function not in self.functions:
+                self.functions[function] = Counts()
+            self.functions[function].add(
+                counts.statements, counts.rows, counts.time)
+
+    def to_dict(self):
+        result = super(Statistics, self).to_dict()
+        result['calls'] = self.calls
+        result['functions'] = {function: counts.to_dict()
+                               for function, counts in self.functions.items()}
+        return result
+
+    def __str__(self):
+        functions = '; '.join(
+            '%s: %s' % (function, self.functions[function])
+            for function in sorted(self.functions))
+        return '%s (%s)' % (super(Statistics, self).__str__(), functions)
+
+
+def enabled():
+    return CONF.db_instrumentation
+
+
+def _get_collections():
+    if not hasattr(_local, 'collections'):
+        _local.collections = []
+    return _local.collections
+
+
+def is_collecting():
+    """Tells whether statements of the current thread are being counted."""
+    return bool(getattr(_local, 'collections', None))
+
+
+def _get_caller():
+    """Returns the name statements of the current call are accounted to.
+
+    That is the outermost public DB API function on the stack, or for
+    statements run outside of DB API functions, like lazy loads of model
+    relationships, the innermost Manila function running them.
+    """
+    function = None
+    caller = None
+    frame = sys._getframe(2)
+    while frame is not None:
+        module = frame.f_globals.get('__name__', '')
+        name = frame.f_code.co_name
+        if module in DB_API_MODULES:
+            if not name.startswith('_') and name != 'wrapper':
+                function = name
+        elif (caller is None and module.startswith('manila.') and
+                module != __name__):
+            caller = '%s:%s' % (module, name)
+        frame = frame.f_back
+    return function or caller or 'unknown'
+
+
+def record_statement(rows, elapsed):
+    """Accounts an executed statement to the DB API function running it.
+
+    :param rows: number of rows returned or changed by the statement, as
+        reported by the database driver, or a negative number if unknown.
+    :param elapsed: seconds the statement took.
+    """
+    collections = getattr(_local, 'collections', None)
+    if not collections:
+        return
+    function = _get_caller()
+    rows = max(rows, 0)
+    for statistics in collections:
+        statistics.record(function, rows, elapsed)
+
+
+@contextlib.contextmanager
+def collect():
+    """Counts the statements run by the current thread within the block.
+
+    Yields the :class:`Statistics` being filled.
+    """
+    statistics = Statistics()
+    collections = _get_collections()
+    collections.append(statistics)
+    try:
+        yield statistics
+    finally:
+        collections.remove(statistics)
+
+
+@contextlib.contextmanager
+def scope(kind, name):
+    """Accounts the statements of an API request or RPC method call.
+
+    Does nothing unless ``db_instrumentation`` is enabled. Otherwise the
+    statements run within the block are logged and added to the aggregates
+    of the named request or method.
+
+    :param kind: SCOPE_API or SCOPE_RPC.
+    :param name: name of the request or RPC method.
+    """
+    if not enabled():
+        yield
+        return
+
+    start = timeutils.now()
+    with collect() as statistics:
+        try:
+            yield
+        finally:
+            statistics.calls = 1
+            LOG.info(_LI("DB statements of %(kind)s call %(name)s in "
+                         "%(elapsed).1f ms: %(statistics)s"),
+                     {'kind': kind, 'name': name,
+                      'elapsed': (timeutils.now() - start) * 1000,
+                      'statistics': statistics})
+            with _lock:
+                aggregates = _aggregates[kind]
+                if name not in aggregates:
+                    aggregates[name] = Statistics()
+                aggregates[name].merge(statistics)
+
+
+def get_statistics():
+    """Returns the aggregated statistics of this process, by scope kind.
+
+    :returns: dict mapping SCOPE_API and SCOPE_RPC to dicts mapping request
+        and method names to :meth:`Statistics.to_dict` results.
+    """
+    with _lock:
+        return {kind: {name: statistics.to_dict()
+                       for name, statistics in aggregates.items()}
+                for kind, aggregates in _aggregates.items()}
+
+
+def reset_statistics():
+    with _lock:
+        for aggregates in _aggregates.values():
+            aggregates.clear()
@@ -0,0 +1,35 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Add shares.data_copy_host
+
+Revision ID: a77e2ad5012d
+Revises: bc8b11ff1109
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'a77e2ad5012d'
+down_revision = 'bc8b11ff1109'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.add_column('shares',
+                  sa.Column('data_copy_host', sa.String(255)))
+
+
+def downgrade():
+    op.drop_column('shares', 'data_copy_host')
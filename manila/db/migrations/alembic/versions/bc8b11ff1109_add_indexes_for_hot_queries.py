@@ -0,0 +1,72 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""add indexes for hot queries
+
+Revision ID: bc8b11ff1109
+Revises: eb6d5544cbbd
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'bc8b11ff1109'
+down_revision = 'eb6d5544cbbd'
+
+from alembic import op
+
+# NOTE: Long string columns like 'host' are indexed alone, so that indexes
+# fit into the 767 bytes key prefix limit of InnoDB with utf8.
+INDEXES = (
+    ('services_topic_idx', 'services', ['topic']),
+    ('reservations_deleted_expire_idx', 'reservations',
+     ['deleted', 'expire']),
+    ('share_instances_host_idx', 'share_instances', ['host']),
+    ('share_servers_host_idx', 'share_servers', ['host']),
+    ('network_allocations_ip_address_deleted_idx', 'network_allocations',
+     ['ip_address', 'deleted']),
+)
+
+# Indexes led by a foreign key column
+FK_INDEXES = (
+    ('share_instances_share_server_id_deleted_idx', 'share_instances',
+     ['share_server_id', 'deleted']),
+    ('share_instance_export_locations_share_instance_id_deleted_idx',
+     'share_instance_export_locations', ['share_instance_id', 'deleted']),
+    ('share_instance_access_map_share_instance_id_deleted_idx',
+     'share_instance_access_map', ['share_instance_id', 'deleted']),
+    ('share_instance_access_map_access_id_deleted_idx',
+     'share_instance_access_map', ['access_id', 'deleted']),
+    ('share_instance_export_locations_metadata_el_id_deleted_idx',
+     'share_instance_export_locations_metadata',
+     ['export_location_id', 'deleted']),
+    ('network_allocations_share_server_id_deleted_idx',
+     'network_allocations', ['share_server_id', 'deleted']),
+)
+
+
+def upgrade():
+    for name, table_name, columns in INDEXES + FK_INDEXES:
+        op.create_index(name, table_name, columns)
+
+
+def downgrade():
+    for name, table_name, columns in FK_INDEXES:
+        if op.get_bind().engine.name == 'mysql':
+            # NOTE: MySQL drops the index it created for a foreign key
+            # once another index can be used for it, so the foreign key
+            # column gets its own index before this one can be dropped.
+            op.create_index(name.replace('_deleted_idx', '_fk_idx'),
+                            table_name, columns[:1])
+        op.drop_index(name, table_name=table_name)
+    for name, table_name, columns in INDEXES:
+        op.drop_index(name, table_name=table_name)
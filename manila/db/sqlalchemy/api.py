@@ -18,6 +18,7 @@
 
 """Implementation of SQLAlchemy backend."""
 
+import collections
 import copy
 import datetime
 import sys
@@ -34,15 +35,21 @@ from oslo_db import options as db_options
 from oslo_db.sqlalchemy import session
 from oslo_db.sqlalchemy import utils as db_utils
 from oslo_log import log
+from oslo_utils import strutils
 from oslo_utils import timeutils
 from oslo_utils import uuidutils
 import six
+import sqlalchemy
+from sqlalchemy import and_
 from sqlalchemy import or_
 from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import subqueryload
+from sqlalchemy.sql.expression import false
 from sqlalchemy.sql.expression import true
 from sqlalchemy.sql import func
 
 from manila.common import constants
+from manila.db import instrumentation
 from manila.db.sqlalchemy import models
 from manila import exception
 from manila.i18n import _
@@ -67,9 +74,28 @@ def _create_facade_lazily():
     global _FACADE
     if _FACADE is None:
         _FACADE = session.EngineFacade.from_config(cfg.CONF)
+        _instrument_engine(_FACADE.get_engine())
     return _FACADE
 
 
+def _instrument_engine(engine):
+    """Reports the statements executed by the engine to instrumentation."""
+
+    @sqlalchemy.event.listens_for(engine, 'before_cursor_execute')
+    def _before_cursor_execute(conn, cursor, statement, parameters, context,
+                               executemany):
+        if instrumentation.is_collecting():
+            conn.info['instrumentation_start'] = timeutils.now()
+
+    @sqlalchemy.event.listens_for(engine, 'after_cursor_execute')
+    def _after_cursor_execute(conn, cursor, statement, parameters, context,
+                              executemany):
+        start = conn.info.pop('instrumentation_start', None)
+        if start is not None:
+            instrumentation.record_statement(
+                cursor.rowcount, timeutils.now() - start)
+
+
 def get_engine():
     facade = _create_facade_lazily()
     return facade.get_engine()
@@ -219,6 +245,53 @@ def model_query(context, model, *args, **kwargs):
         model=model, session=session, args=args, **kwargs)
 
 
+class ProjectedRecord(object):
+    """Read-only record with the columns a list view renders.
+
+    Records are returned instead of models by list queries whose callers
+    only render a few columns. They support the dict-style access views
+    use on models, but carry no session, relationship or identity map
+    state, which makes them much cheaper to build for long lists.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, *values):
+        for field, value in zip(self.__slots__, values):
+            setattr(self, field, value)
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in self.__slots__
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def __repr__(self):
+        return '%s(%s)' % (self.__class__.__name__, ', '.join(
+            '%s=%r' % (field, self.get(field)) for field in self.__slots__))
+
+
+def _project_query(query, record_class, columns):
+    """Returns records with values of 'columns' for rows of the query.
+
+    Rows are unique by their first column, like models of an ORM query are
+    unique by their identity.
+    """
+    records = []
+    seen = set()
+    for row in query.with_entities(*columns):
+        if row[0] not in seen:
+            seen.add(row[0])
+            records.append(record_class(*row))
+    return records
+
+
 def exact_filter(query, model, filters, legal_keys):
     """Applies exact match filtering to a query.
 
@@ -766,6 +839,30 @@ def _reservation_create(context, uuid, usage, project_id, user_id, resource,
     return reservation_ref
 
 
+def _reservations_create(context, usages, project_id, user_id, deltas,
+                         expire, session):
+    """Creates reservations for all 'deltas' with a single INSERT.
+
+    :returns: list of reservation UUIDs, ordered by resource name
+    """
+    now = timeutils.utcnow()
+    values = [{
+        'uuid': uuidutils.generate_uuid(),
+        'usage_id': usages[resource]['id'],
+        'project_id': project_id,
+        'user_id': user_id,
+        'resource': resource,
+        'delta': deltas[resource],
+        'expire': expire,
+        'created_at': now,
+        'deleted': 0,
+    } for resource in sorted(deltas)]
+
+    if values:
+        session.execute(models.Reservation.__table__.insert().values(values))
+    return [value['uuid'] for value in values]
+
+
 ###################
 
 
@@ -774,26 +871,36 @@ def _reservation_create(context, uuid, usage, project_id, user_id, resource,
 # code always acquires the lock on quota_usages before acquiring the lock
 # on reservations.
 
-def _get_user_quota_usages(context, session, project_id, user_id):
+def _quota_usages_query(context, session, project_id, resources=None):
+    """Returns a query locking usages of 'resources' in a fixed order.
+
+    Rows are always locked ordered by resource name, so concurrent
+    reservations for the same project wait for each other instead of
+    deadlocking on rows locked in different orders.
+    """
+    query = model_query(context, models.QuotaUsage,
+                        read_deleted="no",
+                        session=session).\
+        filter_by(project_id=project_id)
+    if resources is not None:
+        query = query.filter(models.QuotaUsage.resource.in_(resources))
+    return query.order_by(models.QuotaUsage.resource,
+                          models.QuotaUsage.id).with_lockmode('update')
+
+
+def _get_user_quota_usages(context, session, project_id, user_id,
+                           resources=None):
     # Broken out for testability
-    rows = model_query(context, models.QuotaUsage,
-                       read_deleted="no",
-                       session=session).\
-        filter_by(project_id=project_id).\
+    rows = _quota_usages_query(context, session, project_id, resources).\
         filter(or_(models.QuotaUsage.user_id == user_id,
                    models.QuotaUsage.user_id is None)).\
-        with_lockmode('update').\
         all()
     return {row.resource: row for row in rows}
 
 
-def _get_project_quota_usages(context, session, project_id):
-    rows = model_query(context, models.QuotaUsage,
-                       read_deleted="no",
-                       session=session).\
-        filter_by(project_id=project_id).\
-        with_lockmode('update').\
-        all()
+def _get_project_quota_usages(context, session, project_id, resources=None):
+    rows = _quota_usages_query(
+        context, session, project_id, resources).all()
     result = dict()
     # Get the total count of in_use,reserved
     for row in rows:
@@ -808,11 +915,40 @@ def _get_project_quota_usages(context, session, project_id):
     return result
 
 
+def _quota_usages_create(context, project_id, user_id, resources,
+                         until_refresh, session):
+    """Creates empty usages of 'resources' in a single flush."""
+    usages = {}
+    for resource in resources:
+        usage_ref = models.QuotaUsage()
+        usage_ref.project_id = project_id
+        usage_ref.user_id = (
+            None if resource in PER_PROJECT_QUOTAS else user_id)
+        usage_ref.resource = resource
+        usage_ref.in_use = 0
+        usage_ref.reserved = 0
+        usage_ref.until_refresh = until_refresh
+        # updated_at is needed for judgement of max_age
+        usage_ref.updated_at = timeutils.utcnow()
+        usages[resource] = usage_ref
+    session.add_all(usages.values())
+    session.flush()
+    return usages
+
+
 @require_context
 @oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
 def quota_reserve(context, resources, project_quotas, user_quotas, deltas,
                   expire, until_refresh, max_age, project_id=None,
                   user_id=None):
+    """Reserves 'deltas' of resources in a single transaction.
+
+    Only usages of the reserved resources are locked, always in resource
+    name order. Missing usages are created at once and all reservations
+    are written with a single INSERT, so reserving for many shares is done
+    with one call with the summed deltas, e.g. shares=N, gigabytes=N*size.
+    Usages are not recounted here, see quota_usage_reconcile().
+    """
     elevated = context.elevated()
     session = get_session()
     with session.begin():
@@ -823,109 +959,33 @@ def quota_reserve(context, resources, project_quotas, user_quotas, deltas,
             user_id = context.user_id
 
         # Get the current usages
+        resource_names = sorted(deltas.keys())
         user_usages = _get_user_quota_usages(context, session,
-                                             project_id, user_id)
+                                             project_id, user_id,
+                                             resources=resource_names)
         project_usages = _get_project_quota_usages(context, session,
-                                                   project_id)
-
-        # Handle usage refresh
-        work = set(deltas.keys())
-        while work:
-            resource = work.pop()
-
-            # Do we need to refresh the usage?
-            refresh = False
-            if ((resource not in PER_PROJECT_QUOTAS) and
-                    (resource not in user_usages)):
-                user_usages[resource] = _quota_usage_create(
-                    elevated,
-                    project_id,
-                    user_id,
-                    resource,
-                    0, 0,
-                    until_refresh or None,
-                    session=session)
-                refresh = True
-            elif ((resource in PER_PROJECT_QUOTAS) and
-                    (resource not in user_usages)):
-                user_usages[resource] = _quota_usage_create(
-                    elevated,
-                    project_id,
-                    None,
-                    resource,
-                    0, 0,
-                    until_refresh or None,
-                    session=session)
-                refresh = True
-            elif user_usages[resource].in_use < 0:
-                # Negative in_use count indicates a desync, so try to
-                # heal from that...
-                refresh = True
-            elif user_usages[resource].until_refresh is not None:
-                user_usages[resource].until_refresh -= 1
-                if user_usages[resource].until_refresh <= 0:
-                    refresh = True
-            elif max_age and (user_usages[resource].updated_at -
+                                                   project_id,
+                                                   resources=resource_names)
+
+        # Create the missing usages, they are due for a refresh
+        created = [res for res in resource_names if res not in user_usages]
+        if created:
+            user_usages.update(_quota_usages_create(
+                elevated, project_id, user_id, created, 0, session=session))
+
+        # Usages due for a refresh are only marked here by zeroing their
+        # until_refresh, the aggregate queries recounting them are run
+        # by quota_usage_reconcile() outside of the reservation path.
+        for resource in resource_names:
+            usage_ref = user_usages[resource]
+            if usage_ref.in_use < 0:
+                # Negative in_use count indicates a desync
+                usage_ref.until_refresh = 0
+            elif usage_ref.until_refresh is not None:
+                usage_ref.until_refresh = max(usage_ref.until_refresh - 1, 0)
+            elif max_age and (usage_ref.updated_at -
                               timeutils.utcnow()).seconds >= max_age:
-                refresh = True
-
-            # OK, refresh the usage
-            if refresh:
-                # Grab the sync routine
-                sync = QUOTA_SYNC_FUNCTIONS[resources[resource].sync]
-
-                updates = sync(elevated, project_id, user_id, session)
-                for res, in_use in updates.items():
-                    # Make sure we have a destination for the usage!
-                    if ((res not in PER_PROJECT_QUOTAS) and
-                            (res not in user_usages)):
-                        user_usages[res] = _quota_usage_create(
-                            elevated,
-                            project_id,
-                            user_id,
-                            res,
-                            0, 0,
-                            until_refresh or None,
-                            session=session)
-                    if ((res in PER_PROJECT_QUOTAS) and
-                            (res not in user_usages)):
-                        user_usages[res] = _quota_usage_create(
-                            elevated,
-                            project_id,
-                            None,
-                            res,
-                            0, 0,
-                            until_refresh or None,
-                            session=session)
-
-                    if user_usages[res].in_use != in_use:
-                        LOG.debug('quota_usages out of sync, updating. '
-                                  'project_id: %(project_id)s, '
-                                  'user_id: %(user_id)s, '
-                                  'resource: %(res)s, '
-                                  'tracked usage: %(tracked_use)s, '
-                                  'actual usage: %(in_use)s',
-                                  {'project_id': project_id,
-                                   'user_id': user_id,
-                                   'res': res,
-                                   'tracked_use': user_usages[res].in_use,
-                                   'in_use': in_use})
-
-                    # Update the usage
-                    user_usages[res].in_use = in_use
-                    user_usages[res].until_refresh = until_refresh or None
-
-                    # Because more than one resource may be refreshed
-                    # by the call to the sync routine, and we don't
-                    # want to double-sync, we make sure all refreshed
-                    # resources are dropped from the work set.
-                    work.discard(res)
-
-                    # NOTE(Vek): We make the assumption that the sync
-                    #            routine actually refreshes the
-                    #            resources that it is the sync routine
-                    #            for.  We don't check, because this is
-                    #            a best-effort mechanism.
+                usage_ref.until_refresh = 0
 
         # Check for deltas that would go negative
         unders = [res for res, delta in deltas.items()
@@ -956,17 +1016,10 @@ def quota_reserve(context, resources, project_quotas, user_quotas, deltas,
 
         # Create the reservations
         if not overs:
-            reservations = []
+            reservations = _reservations_create(elevated, user_usages,
+                                                project_id, user_id, deltas,
+                                                expire, session=session)
             for res, delta in deltas.items():
-                reservation = _reservation_create(elevated,
-                                                  uuidutils.generate_uuid(),
-                                                  user_usages[res],
-                                                  project_id,
-                                                  user_id,
-                                                  res, delta, expire,
-                                                  session=session)
-                reservations.append(reservation.uuid)
-
                 # Also update the reserved quantity
                 # NOTE(Vek): Again, we are only concerned here about
                 #            positive increments.  Here, though, we're
@@ -1002,6 +1055,64 @@ def quota_reserve(context, resources, project_quotas, user_quotas, deltas,
     return reservations
 
 
+def _quota_usages_reconcile(context, resources, until_refresh, project_id,
+                            user_id):
+    session = get_session()
+    with session.begin():
+        usages = _get_user_quota_usages(context, session, project_id,
+                                        user_id)
+        syncs = set(resources[res].sync for res, usage in usages.items()
+                    if res in resources and
+                    (usage.in_use < 0 or
+                     (usage.until_refresh is not None and
+                      usage.until_refresh <= 0)))
+
+        out_of_sync = 0
+        for sync in sorted(syncs):
+            updates = QUOTA_SYNC_FUNCTIONS[sync](context, project_id,
+                                                 user_id, session)
+            for res, in_use in updates.items():
+                if res not in usages:
+                    continue
+                if usages[res].in_use != in_use:
+                    LOG.debug('quota_usages out of sync, updating. '
+                              'project_id: %(project_id)s, '
+                              'user_id: %(user_id)s, '
+                              'resource: %(res)s, '
+                              'tracked usage: %(tracked_use)s, '
+                              'actual usage: %(in_use)s',
+                              {'project_id': project_id,
+                               'user_id': user_id,
+                               'res': res,
+                               'tracked_use': usages[res].in_use,
+                               'in_use': in_use})
+                    out_of_sync += 1
+                usages[res].in_use = in_use
+                usages[res].until_refresh = until_refresh or None
+    return out_of_sync
+
+
+@require_admin_context
+def quota_usage_reconcile(context, resources, until_refresh):
+    """Recounts the in_use of quota usages due for a refresh.
+
+    quota_reserve() marks usages that are new, negative or past their
+    until_refresh or max_age. They are recounted here with the aggregate
+    queries, locking the usages of one project and user at a time.
+    Returns the number of usages whose in_use was out of sync.
+    """
+    owners = model_query(context, models.QuotaUsage,
+                         models.QuotaUsage.project_id,
+                         models.QuotaUsage.user_id,
+                         read_deleted="no").\
+        filter(or_(models.QuotaUsage.in_use < 0,
+                   models.QuotaUsage.until_refresh <= 0)).\
+        distinct().all()
+    return sum(_quota_usages_reconcile(context, resources, until_refresh,
+                                       project_id, user_id)
+               for project_id, user_id in owners)
+
+
 def _quota_reservations_query(session, context, reservations):
     """Return the relevant reservations."""
 
@@ -1202,14 +1313,64 @@ def share_instance_get(context, share_instance_id, session=None,
     return result
 
 
+class ShareInstanceRecord(ProjectedRecord):
+    """Share instance data rendered by share instance list views."""
+
+    __slots__ = ('id', 'share_id', 'created_at', 'host', 'status',
+                 'share_network_id', 'share_server_id', 'access_rules_status',
+                 'replica_state', 'availability_zone', 'export_locations',
+                 'export_location')
+
+
 @require_admin_context
 def share_instances_get_all(context):
+    """Returns records of all share instances with their export locations."""
     session = get_session()
-    return model_query(
+    query = model_query(
         context, models.ShareInstance, session=session, read_deleted="no",
-    ).options(
-        joinedload('export_locations'),
-    ).all()
+    ).outerjoin(
+        models.AvailabilityZone,
+        and_(models.ShareInstance.availability_zone_id ==
+             models.AvailabilityZone.id,
+             models.AvailabilityZone.deleted == 'False'))
+    instances = _project_query(query, ShareInstanceRecord, [
+        models.ShareInstance.id,
+        models.ShareInstance.share_id,
+        models.ShareInstance.created_at,
+        models.ShareInstance.host,
+        models.ShareInstance.status,
+        models.ShareInstance.share_network_id,
+        models.ShareInstance.share_server_id,
+        models.ShareInstance.access_rules_status,
+        models.ShareInstance.replica_state,
+        models.AvailabilityZone.name,
+    ])
+
+    export_locations = collections.defaultdict(list)
+    query = model_query(
+        context, models.ShareInstanceExportLocations, session=session,
+        read_deleted="no",
+    ).join(
+        models.ShareInstance,
+        models.ShareInstance.id ==
+        models.ShareInstanceExportLocations.share_instance_id,
+    ).filter(
+        models.ShareInstance.deleted == 'False',
+    ).order_by(
+        models.ShareInstanceExportLocations.id,
+    ).with_entities(
+        models.ShareInstanceExportLocations.share_instance_id,
+        models.ShareInstanceExportLocations.path,
+    )
+    for instance_id, path in query:
+        export_locations[instance_id].append({'path': path})
+
+    for instance in instances:
+        instance.export_locations = export_locations.get(instance.id, [])
+        instance.export_location = (
+            instance.export_locations[0]['path']
+            if instance.export_locations else None)
+    return instances
 
 
 @require_context
@@ -1296,7 +1457,8 @@ def share_instances_get_all_by_consistency_group_id(context, cg_id):
 
 def _share_replica_get_with_filters(context, share_id=None, replica_id=None,
                                     replica_state=None, status=None,
-                                    with_share_server=True, session=None):
+                                    host=None, with_share_server=True,
+                                    session=None):
 
     query = model_query(context, models.ShareInstance, session=session,
                         read_deleted="no")
@@ -1304,6 +1466,12 @@ def _share_replica_get_with_filters(context, share_id=None, replica_id=None,
     if share_id is not None:
         query = query.filter(models.ShareInstance.share_id == share_id)
 
+    if host is not None:
+        query = query.filter(or_(
+            models.ShareInstance.host == host,
+            models.ShareInstance.host.like("{0}#%".format(host)),
+        ))
+
     if replica_id is not None:
         query = query.filter(models.ShareInstance.id == replica_id)
 
@@ -1326,8 +1494,20 @@ def _set_replica_share_data(context, replicas, session):
     if replicas and not isinstance(replicas, list):
         replicas = [replicas]
 
+    if not replicas:
+        return replicas
+
+    # Fetch the parent shares of all replicas at once.
+    share_ids = set(replica['share_id'] for replica in replicas)
+    parent_shares = {
+        share['id']: share for share in
+        _share_get_query(context, session).filter(
+            models.Share.id.in_(share_ids)).all()}
+
     for replica in replicas:
-        parent_share = share_get(context, replica['share_id'], session=session)
+        parent_share = parent_shares.get(replica['share_id'])
+        if parent_share is None:
+            raise exception.ShareNotFound(share_id=replica['share_id'])
         replica.set_share_data(parent_share)
 
     return replicas
@@ -1348,6 +1528,22 @@ def share_replicas_get_all(context, with_share_data=False,
     return result
 
 
+@require_context
+def share_replicas_get_all_by_host(context, host, with_share_data=False,
+                                   with_share_server=True, session=None):
+    """Returns replica instances hosted on a given host."""
+    session = session or get_session()
+
+    result = _share_replica_get_with_filters(
+        context, host=host, with_share_server=with_share_server,
+        session=session).all()
+
+    if with_share_data:
+        result = _set_replica_share_data(context, result, session)
+
+    return result
+
+
 @require_context
 def share_replicas_get_all_by_share(context, share_id,
                                     with_share_data=False,
@@ -1451,12 +1647,41 @@ def share_replica_delete(context, share_replica_id, session=None):
 ################
 
 
+def _share_instances_load_options(instances):
+    """Return loader options for share instances reached by 'instances'.
+
+    Share instance relationships are declared with lazy='immediate', which
+    issues separate statements for every loaded instance. These options load
+    them in batches instead: the availability zone is joined to the
+    instances and export locations with their metadata are fetched with one
+    statement per relationship, whatever the number of instances is.
+
+    :param instances: loader option pointing at share instances
+    """
+    export_locations = instances.subqueryload(
+        models.ShareInstance.export_locations)
+    return [
+        instances.joinedload(models.ShareInstance._availability_zone),
+        export_locations.subqueryload(
+            models.ShareInstanceExportLocations._el_metadata_bare).joinedload(
+                models.ShareInstanceExportLocationsMetadata.export_location),
+    ]
+
+
+class ShareSummaryRecord(ProjectedRecord):
+    """Share data rendered by share summary list views."""
+
+    __slots__ = ('id', 'display_name')
+
+
 def _share_get_query(context, session=None):
     if session is None:
         session = get_session()
     return model_query(context, models.Share, session=session).\
         options(joinedload('share_metadata')).\
-        options(joinedload('share_type'))
+        options(joinedload('share_type')).\
+        options(*_share_instances_load_options(
+            subqueryload(models.Share.instances)))
 
 
 def _metadata_refs(metadata_dict, meta_class):
@@ -1542,34 +1767,145 @@ def share_get(context, share_id, session=None):
     return result
 
 
+def _get_share_filter_criterion(key, value):
+    """Returns SQL criterion matching shares by a share or instance attr.
+
+    Attributes of share instances match if any instance of the share has
+    the given value.
+    """
+    share_columns = models.Share.__table__.columns
+    instance_columns = models.ShareInstance.__table__.columns
+    if key in share_columns:
+        if (isinstance(share_columns[key].type, sqlalchemy.Boolean) and
+                isinstance(value, six.string_types)):
+            try:
+                value = strutils.bool_from_string(value, strict=True)
+            except ValueError:
+                msg = _("Invalid value '%(value)s' for the '%(key)s' "
+                        "filter, a boolean is expected.") % {
+                    'value': value, 'key': key}
+                raise exception.InvalidInput(reason=msg)
+        return getattr(models.Share, key) == value
+
+    if key == 'availability_zone':
+        criterion = models.ShareInstance._availability_zone.has(
+            models.AvailabilityZone.name == value)
+    elif key == 'export_location':
+        criterion = models.ShareInstance.export_locations.any(
+            models.ShareInstanceExportLocations.path == value)
+    elif key in instance_columns:
+        criterion = getattr(models.ShareInstance, key) == value
+    else:
+        # NOTE: shares have no such attribute, so none of them matches.
+        return false()
+    return models.Share.instances.any(criterion)
+
+
+def _get_share_sort_expression(sort_key):
+    """Returns SQL expression shares are sorted by for the given key.
+
+    Share instance attributes are sorted by their smallest value among the
+    instances of a share, so that every share is returned only once.
+    """
+    if sort_key in models.Share.__table__.columns:
+        return getattr(models.Share, sort_key)
+    if sort_key in models.ShareInstance.__table__.columns:
+        return sqlalchemy.select(
+            [func.min(getattr(models.ShareInstance, sort_key))]
+        ).where(
+            sqlalchemy.and_(
+                models.ShareInstance.share_id == models.Share.id,
+                models.ShareInstance.deleted == 'False',
+            )
+        ).as_scalar()
+    msg = _("Wrong sorting key provided - '%s'.") % sort_key
+    raise exception.InvalidInput(reason=msg)
+
+
+def _paginate_query(query, sort_expr, id_column, sort_dir, limit=None,
+                    offset=None, marker=None):
+    """Applies sorting and keyset pagination to a query.
+
+    Rows are sorted by (sort_expr, id_column) and only the rows following
+    the marker in this order are returned. NULL sort values are ordered the
+    way the database orders them.
+
+    :param marker: tuple of the sort value and the ID of the last row of
+                   the previous page, or None.
+    """
+    ascending = sort_dir.lower() == 'asc'
+    direction = sqlalchemy.asc if ascending else sqlalchemy.desc
+    query = query.order_by(direction(sort_expr), direction(id_column))
+
+    if marker is not None:
+        marker_value, marker_id = marker
+        dialect = query.session.get_bind().dialect.name
+        # NOTE: PostgreSQL places NULL values last in ascending order while
+        # MySQL and SQLite place them first.
+        nulls_first = ascending != (dialect == 'postgresql')
+        if ascending:
+            after_value = sort_expr > marker_value
+            after_id = id_column > marker_id
+        else:
+            after_value = sort_expr < marker_value
+            after_id = id_column < marker_id
+
+        if marker_value is None:
+            criteria = [sqlalchemy.and_(sort_expr.is_(None), after_id)]
+            if nulls_first:
+                criteria.append(sort_expr.isnot(None))
+        else:
+            criteria = [
+                after_value,
+                sqlalchemy.and_(sort_expr == marker_value, after_id),
+            ]
+            if not nulls_first:
+                criteria.append(sort_expr.is_(None))
+        query = query.filter(or_(*criteria))
+
+    if limit is not None:
+        query = query.limit(limit)
+    if offset:
+        query = query.offset(offset)
+    return query
+
+
 @require_context
 def _share_get_all_with_filters(context, project_id=None, share_server_id=None,
                                 consistency_group_id=None, filters=None,
                                 is_public=False, sort_key=None,
-                                sort_dir=None):
+                                sort_dir=None, limit=None, offset=None,
+                                marker=None,
+                                view=constants.SHARE_VIEW_DETAIL):
     """Returns sorted list of shares that satisfies filters.
 
     :param context: context to query under
     :param project_id: project id that owns shares
     :param share_server_id: share server that hosts shares
-    :param filters: dict of filters to specify share selection
+    :param filters: dict of filters to specify share selection. Keys other
+                    than 'metadata' and 'extra_specs' are matched against
+                    share or share instance attributes.
     :param is_public: public shares from other projects will be added
                       to result if True
     :param sort_key: key of models.Share to be used for sorting
     :param sort_dir: desired direction of sorting, can be 'asc' and 'desc'
-    :returns: list -- models.Share
+    :param limit: maximum number of shares to return
+    :param offset: number of shares to skip
+    :param marker: ID of the last share of the previous page
+    :param view: constants.SHARE_VIEW_DETAIL returns models with their
+                 related data loaded, constants.SHARE_VIEW_SUMMARY returns
+                 ShareSummaryRecord objects
+    :returns: list -- models.Share or ShareSummaryRecord
     :raises: exception.InvalidInput
     """
     if not sort_key:
         sort_key = 'created_at'
     if not sort_dir:
         sort_dir = 'desc'
-    query = (
-        _share_get_query(context).join(
-            models.ShareInstance,
-            models.ShareInstance.share_id == models.Share.id
-        )
-    )
+    if view == constants.SHARE_VIEW_SUMMARY:
+        query = model_query(context, models.Share)
+    else:
+        query = _share_get_query(context)
 
     if project_id:
         if is_public:
@@ -1578,8 +1914,8 @@ def _share_get_all_with_filters(context, project_id=None, share_server_id=None,
         else:
             query = query.filter(models.Share.project_id == project_id)
     if share_server_id:
-        query = query.filter(
-            models.ShareInstance.share_server_id == share_server_id)
+        query = query.filter(models.Share.instances.any(
+            models.ShareInstance.share_server_id == share_server_id))
 
     if consistency_group_id:
         query = query.filter(
@@ -1601,47 +1937,76 @@ def _share_get_all_with_filters(context, project_id=None, share_server_id=None,
         for k, v in filters['extra_specs'].items():
             query = query.filter(or_(models.ShareTypeExtraSpecs.key == k,
                                      models.ShareTypeExtraSpecs.value == v))
+    for k, v in filters.items():
+        if k not in ('metadata', 'extra_specs'):
+            query = query.filter(_get_share_filter_criterion(k, v))
 
-    # Apply sorting
+    # Apply sorting and pagination
     if sort_dir.lower() not in ('desc', 'asc'):
         msg = _("Wrong sorting data provided: sort key is '%(sort_key)s' "
                 "and sort direction is '%(sort_dir)s'.") % {
                     "sort_key": sort_key, "sort_dir": sort_dir}
         raise exception.InvalidInput(reason=msg)
 
-    def apply_sorting(model, query):
-        sort_attr = getattr(model, sort_key)
-        sort_method = getattr(sort_attr, sort_dir.lower())
-        return query.order_by(sort_method())
+    sort_expr = _get_share_sort_expression(sort_key)
 
-    try:
-        query = apply_sorting(models.Share, query)
-    except AttributeError:
-        try:
-            query = apply_sorting(models.ShareInstance, query)
-        except AttributeError:
-            msg = _("Wrong sorting key provided - '%s'.") % sort_key
+    if marker is not None:
+        marker_row = model_query(context, models.Share).filter_by(
+            id=marker).with_entities(sort_expr).first()
+        if marker_row is None:
+            msg = _("Marker share %s could not be found.") % marker
             raise exception.InvalidInput(reason=msg)
+        marker = (marker_row[0], marker)
+
+    query = _paginate_query(query, sort_expr, models.Share.id, sort_dir,
+                            limit=limit, offset=offset, marker=marker)
 
     # Returns list of shares that satisfy filters.
+    if view == constants.SHARE_VIEW_SUMMARY:
+        return _project_query(query, ShareSummaryRecord, [
+            getattr(models.Share, field)
+            for field in ShareSummaryRecord.__slots__])
     query = query.all()
     return query
 
 
 @require_admin_context
-def share_get_all(context, filters=None, sort_key=None, sort_dir=None):
+def share_get_all(context, filters=None, sort_key=None, sort_dir=None,
+                  limit=None, offset=None, marker=None,
+                  view=constants.SHARE_VIEW_DETAIL):
     query = _share_get_all_with_filters(
-        context, filters=filters, sort_key=sort_key, sort_dir=sort_dir)
+        context, filters=filters, sort_key=sort_key, sort_dir=sort_dir,
+        limit=limit, offset=offset, marker=marker, view=view)
     return query
 
 
+@require_admin_context
+def share_get_all_by_host(context, host):
+    """Retrieves all shares with an instance hosted on a host."""
+    return (
+        _share_get_query(context).join(
+            models.ShareInstance,
+            models.ShareInstance.share_id == models.Share.id
+        ).filter(
+            models.ShareInstance.deleted == 'False',
+            or_(
+                models.ShareInstance.host == host,
+                models.ShareInstance.host.like("{0}#%".format(host))
+            )
+        ).all()
+    )
+
+
 @require_context
 def share_get_all_by_project(context, project_id, filters=None,
-                             is_public=False, sort_key=None, sort_dir=None):
+                             is_public=False, sort_key=None, sort_dir=None,
+                             limit=None, offset=None, marker=None,
+                             view=constants.SHARE_VIEW_DETAIL):
     """Returns list of shares with given project ID."""
     query = _share_get_all_with_filters(
         context, project_id=project_id, filters=filters, is_public=is_public,
-        sort_key=sort_key, sort_dir=sort_dir,
+        sort_key=sort_key, sort_dir=sort_dir, limit=limit, offset=offset,
+        marker=marker, view=view,
     )
     return query
 
@@ -1660,11 +2025,14 @@ def share_get_all_by_consistency_group_id(context, cg_id,
 
 @require_context
 def share_get_all_by_share_server(context, share_server_id, filters=None,
-                                  sort_key=None, sort_dir=None):
+                                  sort_key=None, sort_dir=None, limit=None,
+                                  offset=None, marker=None,
+                                  view=constants.SHARE_VIEW_DETAIL):
     """Returns list of shares with given share server."""
     query = _share_get_all_with_filters(
         context, share_server_id=share_server_id, filters=filters,
-        sort_key=sort_key, sort_dir=sort_dir,
+        sort_key=sort_key, sort_dir=sort_dir, limit=limit, offset=offset,
+        marker=marker, view=view,
     )
     return query
 
@@ -1981,6 +2349,44 @@ def share_snapshot_instance_get_all_with_filters(context, search_filters,
     return result
 
 
+@require_context
+def share_replica_snapshot_instances_get_all_by_host(context, host,
+                                                     statuses=None,
+                                                     with_share_data=False,
+                                                     session=None):
+    """Get snapshot instances of non-active replicas hosted on a host."""
+    session = session or get_session()
+
+    query = model_query(
+        context, models.ShareSnapshotInstance, session=session,
+        read_deleted="no",
+    ).join(
+        models.ShareInstance,
+        models.ShareInstance.id ==
+        models.ShareSnapshotInstance.share_instance_id,
+    ).filter(
+        models.ShareInstance.deleted == 'False',
+        models.ShareInstance.replica_state.isnot(None),
+        models.ShareInstance.replica_state !=
+        constants.REPLICA_STATE_ACTIVE,
+        or_(
+            models.ShareInstance.host == host,
+            models.ShareInstance.host.like("{0}#%".format(host)),
+        ),
+    )
+
+    if statuses is not None:
+        query = query.filter(
+            models.ShareSnapshotInstance.status.in_(statuses))
+
+    result = query.all()
+
+    if with_share_data:
+        result = _set_share_snapshot_instance_data(context, result, session)
+
+    return result
+
+
 def _share_snapshot_instance_get_with_filters(context, instance_ids=None,
                                               snapshot_ids=None, statuses=None,
                                               share_instance_ids=None,
@@ -2109,6 +2515,11 @@ def _share_snapshot_get_all_with_filters(context, project_id=None,
     if share_id:
         query = query.filter_by(share_id=share_id)
     query = query.options(joinedload('share'))
+    query = query.options(*_share_instances_load_options(
+        joinedload('share').subqueryload(models.Share.instances)))
+    query = query.options(*_share_instances_load_options(
+        subqueryload(models.ShareSnapshot.instances).joinedload(
+            models.ShareSnapshotInstance.share_instance)))
 
     # Apply filters
     if 'usage' in filters:
@@ -2390,10 +2801,7 @@ def share_export_location_get_by_uuid(context, export_location_uuid,
     return result
 
 
-@require_context
-@oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
-def share_export_locations_update(context, share_instance_id, export_locations,
-                                  delete):
+def _export_locations_as_dicts(export_locations):
     # NOTE(u_glide):
     # Backward compatibility code for drivers,
     # which return single export_location as string
@@ -2416,69 +2824,180 @@ def share_export_locations_update(context, share_instance_id, export_locations,
             raise exception.ManilaException(
                 _("Wrong export location type '%s'.") % type(export_location))
         export_locations_as_dicts.append(export_location)
-    export_locations = export_locations_as_dicts
+    return export_locations_as_dicts
 
-    export_locations_paths = [el['path'] for el in export_locations]
 
-    session = get_session()
+def _export_location_metadata_upsert(context, metadata, session):
+    """Writes metadata keyed by export location id with bulk statements."""
+    meta_model = models.ShareInstanceExportLocationsMetadata
+    now = timeutils.utcnow()
+
+    existing = model_query(
+        context, meta_model, meta_model.id, meta_model.export_location_id,
+        meta_model.key, session=session, read_deleted="no",
+    ).filter(
+        meta_model.export_location_id.in_(list(metadata)),
+    ).all()
 
-    current_el_rows = _share_export_locations_get(
-        context, share_instance_id, session=session)
+    values = {}
+    for meta_id, export_location_id, key in existing:
+        if key in metadata[export_location_id]:
+            values[meta_id] = metadata[export_location_id][key]
+    if values:
+        model_query(
+            context, meta_model, session=session, read_deleted="no",
+        ).filter(
+            meta_model.id.in_(list(values)),
+        ).update({
+            'value': sqlalchemy.case(values, value=meta_model.id),
+            'updated_at': now,
+        }, synchronize_session=False)
+
+    existing_keys = set((export_location_id, key)
+                        for __, export_location_id, key in existing)
+    new_rows = [
+        {'export_location_id': export_location_id, 'key': key,
+         'value': value, 'created_at': now, 'updated_at': now,
+         'deleted': 0}
+        for export_location_id, el_metadata in metadata.items()
+        for key, value in el_metadata.items()
+        if (export_location_id, key) not in existing_keys
+    ]
+    if new_rows:
+        session.execute(meta_model.__table__.insert().values(new_rows))
 
-    def get_path_list_from_rows(rows):
-        return set([l['path'] for l in rows])
 
-    current_el_paths = get_path_list_from_rows(current_el_rows)
+def _share_export_locations_update(context, export_locations, delete,
+                                   session):
+    """Writes export locations of share instances with bulk statements.
 
-    def create_indexed_time_dict(key_list):
-        base = timeutils.utcnow()
-        return {
+    Runs one SELECT of the current export locations, one UPDATE of the
+    kept ones, one INSERT of the new ones and one soft-delete of the
+    removed ones, plus the bulk statements writing their metadata.
+    """
+    el_model = models.ShareInstanceExportLocations
+    now = timeutils.utcnow()
+
+    new_els = {}
+    indexed_update_time = {}
+    for share_instance_id, instance_els in export_locations.items():
+        new_els[share_instance_id] = collections.OrderedDict()
+        for el in _export_locations_as_dicts(instance_els):
+            new_els[share_instance_id].setdefault(el['path'], el)
+        for index, path in enumerate(new_els[share_instance_id]):
             # NOTE(u_glide): Incrementing timestamp by microseconds to make
             # timestamp order match index order.
-            key: base + datetime.timedelta(microseconds=index)
-            for index, key in enumerate(key_list)
-        }
+            indexed_update_time[(share_instance_id, path)] = (
+                now + datetime.timedelta(microseconds=index))
 
-    indexed_update_time = create_indexed_time_dict(export_locations_paths)
+    current_rows = model_query(
+        context, el_model, el_model.id, el_model.share_instance_id,
+        el_model.path, session=session, read_deleted="no",
+    ).filter(
+        el_model.share_instance_id.in_(list(new_els)),
+    ).all()
 
-    for el in current_el_rows:
-        if delete and el['path'] not in export_locations_paths:
-            export_location_metadata_delete(context, el['uuid'])
-            el.soft_delete(session)
-        else:
-            updated_at = indexed_update_time[el['path']]
-            el.update({
-                'updated_at': updated_at,
+    result = {share_instance_id: set() for share_instance_id in new_els}
+    updated_at = {}
+    metadata = {}
+    deleted_ids = []
+    for el_id, share_instance_id, path in current_rows:
+        el = new_els[share_instance_id].get(path)
+        if el is None and delete:
+            deleted_ids.append(el_id)
+            continue
+        result[share_instance_id].add(path)
+        if el is not None:
+            updated_at[el_id] = indexed_update_time[(share_instance_id, path)]
+            if el['metadata']:
+                metadata[el_id] = el['metadata']
+
+    if deleted_ids:
+        model_query(
+            context, models.ShareInstanceExportLocationsMetadata,
+            session=session, read_deleted="no",
+        ).filter(
+            models.ShareInstanceExportLocationsMetadata.export_location_id.in_(
+                deleted_ids),
+        ).soft_delete(synchronize_session=False)
+        model_query(
+            context, el_model, session=session, read_deleted="no",
+        ).filter(
+            el_model.id.in_(deleted_ids),
+        ).soft_delete(synchronize_session=False)
+
+    if updated_at:
+        model_query(
+            context, el_model, session=session, read_deleted="no",
+        ).filter(
+            el_model.id.in_(list(updated_at)),
+        ).update({
+            'updated_at': sqlalchemy.case(updated_at, value=el_model.id),
+        }, synchronize_session=False)
+
+    new_rows = []
+    new_metadata = {}
+    for share_instance_id, instance_els in new_els.items():
+        for path, el in instance_els.items():
+            if path in result[share_instance_id]:
+                # Already updated
+                continue
+            result[share_instance_id].add(path)
+            el_uuid = uuidutils.generate_uuid()
+            new_rows.append({
+                'uuid': el_uuid,
+                'path': path,
+                'share_instance_id': share_instance_id,
+                'created_at': now,
+                'updated_at': indexed_update_time[(share_instance_id, path)],
                 'deleted': 0,
+                'is_admin_only': el.get('is_admin_only', False),
             })
-            el.save(session=session)
-            if el['el_metadata']:
-                export_location_metadata_update(
-                    context, el['uuid'], el['el_metadata'], session=session)
+            if el.get('metadata'):
+                new_metadata[el_uuid] = el['metadata']
+    if new_rows:
+        session.execute(el_model.__table__.insert().values(new_rows))
+    if new_metadata:
+        rows = model_query(
+            context, el_model, el_model.id, el_model.uuid, session=session,
+            read_deleted="no",
+        ).filter(
+            el_model.uuid.in_(list(new_metadata)),
+        ).all()
+        for el_id, el_uuid in rows:
+            metadata[el_id] = new_metadata[el_uuid]
 
-    # Now add new export locations
-    for el in export_locations:
-        if el['path'] in current_el_paths:
-            # Already updated
-            continue
+    if metadata:
+        _export_location_metadata_upsert(context, metadata, session)
 
-        location_ref = models.ShareInstanceExportLocations()
-        location_ref.update({
-            'uuid': uuidutils.generate_uuid(),
-            'path': el['path'],
-            'share_instance_id': share_instance_id,
-            'updated_at': indexed_update_time[el['path']],
-            'deleted': 0,
-            'is_admin_only': el.get('is_admin_only', False),
-        })
-        location_ref.save(session=session)
-        if not el.get('metadata'):
-            continue
-        export_location_metadata_update(
-            context, location_ref['uuid'], el.get('metadata'), session=session)
+    return result
+
+
+@require_context
+@oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
+def share_export_locations_update(context, share_instance_id, export_locations,
+                                  delete):
+    session = get_session()
+    with session.begin():
+        return _share_export_locations_update(
+            context, {share_instance_id: export_locations}, delete,
+            session)[share_instance_id]
+
+
+@require_context
+@oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
+def share_export_locations_update_many(context, export_locations, delete):
+    """Updates export locations of many share instances at once.
 
-    return get_path_list_from_rows(_share_export_locations_get(
-        context, share_instance_id, session=session))
+    :param export_locations: dict of export locations keyed by share
+        instance ID, with the formats share_export_locations_update accepts.
+    :returns: dict of sets of export location paths keyed by share
+        instance ID.
+    """
+    session = get_session()
+    with session.begin():
+        return _share_export_locations_update(
+            context, export_locations, delete, session)
 
 
 #####################################
@@ -3030,6 +3549,16 @@ def network_allocations_get_by_ip_address(context, ip_address):
     return result or []
 
 
+@require_context
+def network_allocations_get_ip_addresses(context):
+    rows = model_query(context, models.NetworkAllocation,
+                       models.NetworkAllocation.ip_address,
+                       read_deleted="no").\
+        filter(models.NetworkAllocation.ip_address.isnot(None)).\
+        distinct().all()
+    return set(row.ip_address for row in rows)
+
+
 @require_context
 def network_allocations_get_for_share_server(context, share_server_id,
                                              session=None, label=None):
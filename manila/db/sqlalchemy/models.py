@@ -62,6 +62,9 @@ class Service(BASE, ManilaBase):
     """Represents a running service on a host."""
 
     __tablename__ = 'services'
+    __table_args__ = (
+        schema.Index('services_topic_idx', 'topic'),
+    )
     id = Column(Integer, primary_key=True)
     host = Column(String(255))  # , ForeignKey('hosts.id'))
     binary = Column(String(255))
@@ -165,6 +168,9 @@ class Reservation(BASE, ManilaBase):
     """Represents a resource reservation for quotas."""
 
     __tablename__ = 'reservations'
+    __table_args__ = (
+        schema.Index('reservations_deleted_expire_idx', 'deleted', 'expire'),
+    )
     id = Column(Integer, primary_key=True)
     uuid = Column(String(36), nullable=False)
 
@@ -312,6 +318,7 @@ class Share(BASE, ManilaBase):
 
     source_cgsnapshot_member_id = Column(String(36), nullable=True)
     task_state = Column(String(255))
+    data_copy_host = Column(String(255))
     instances = orm.relationship(
         "ShareInstance",
         lazy='immediate',
@@ -334,6 +341,11 @@ class Share(BASE, ManilaBase):
 
 class ShareInstance(BASE, ManilaBase):
     __tablename__ = 'share_instances'
+    __table_args__ = (
+        schema.Index('share_instances_host_idx', 'host'),
+        schema.Index('share_instances_share_server_id_deleted_idx',
+                     'share_server_id', 'deleted'),
+    )
 
     _extra_keys = ['name', 'export_location', 'availability_zone',
                    'replica_state']
@@ -421,6 +433,11 @@ class ShareInstance(BASE, ManilaBase):
 class ShareInstanceExportLocations(BASE, ManilaBase):
     """Represents export locations of share instances."""
     __tablename__ = 'share_instance_export_locations'
+    __table_args__ = (
+        schema.Index(
+            'share_instance_export_locations_share_instance_id_deleted_idx',
+            'share_instance_id', 'deleted'),
+    )
 
     _extra_keys = ['el_metadata', ]
 
@@ -442,6 +459,10 @@ class ShareInstanceExportLocations(BASE, ManilaBase):
 class ShareInstanceExportLocationsMetadata(BASE, ManilaBase):
     """Represents export location metadata of share instances."""
     __tablename__ = "share_instance_export_locations_metadata"
+    __table_args__ = (
+        schema.Index('share_instance_export_locations_metadata_el_id_'
+                     'deleted_idx', 'export_location_id', 'deleted'),
+    )
 
     _extra_keys = ['export_location_uuid', ]
 
@@ -571,6 +592,12 @@ class ShareInstanceAccessMapping(BASE, ManilaBase):
     """Represents access to individual share instances."""
 
     __tablename__ = 'share_instance_access_map'
+    __table_args__ = (
+        schema.Index('share_instance_access_map_share_instance_id_deleted_idx',
+                     'share_instance_id', 'deleted'),
+        schema.Index('share_instance_access_map_access_id_deleted_idx',
+                     'access_id', 'deleted'),
+    )
     id = Column(String(36), primary_key=True)
     deleted = Column(String(36), default='False')
     share_instance_id = Column(String(36), ForeignKey('share_instances.id'))
@@ -785,6 +812,9 @@ class ShareNetwork(BASE, ManilaBase):
 class ShareServer(BASE, ManilaBase):
     """Represents share server used by share."""
     __tablename__ = 'share_servers'
+    __table_args__ = (
+        schema.Index('share_servers_host_idx', 'host'),
+    )
     id = Column(String(36), primary_key=True, nullable=False)
     deleted = Column(String(36), default='False')
     share_network_id = Column(String(36), ForeignKey('share_networks.id'),
@@ -856,6 +886,12 @@ class ShareNetworkSecurityServiceAssociation(BASE, ManilaBase):
 class NetworkAllocation(BASE, ManilaBase):
     """Represents network allocation data."""
     __tablename__ = 'network_allocations'
+    __table_args__ = (
+        schema.Index('network_allocations_ip_address_deleted_idx',
+                     'ip_address', 'deleted'),
+        schema.Index('network_allocations_share_server_id_deleted_idx',
+                     'share_server_id', 'deleted'),
+    )
     id = Column(String(36), primary_key=True, nullable=False)
     deleted = Column(String(36), default='False')
     label = Column(String(255), nullable=True)
@@ -51,12 +51,15 @@ This module provides Manager, a base class for managers.
 
 """
 
+import copy
+
 from oslo_config import cfg
 from oslo_log import log
 from oslo_service import periodic_task
 
 from manila.db import base
 from manila.scheduler import rpcapi as scheduler_rpcapi
+from manila.share import utils as share_utils
 from manila import version
 
 CONF = cfg.CONF
@@ -123,10 +126,16 @@ class SchedulerDependentManager(Manager):
     manager.Manager directly. Updates are only sent after
     update_service_capabilities is called with non-None values.
 
+    The first update is a full snapshot of the capabilities, the following
+    ones only carry the changes since the previous update. Every update has
+    a sequence number, so that the Scheduler can detect a missed update and
+    ask for a new full snapshot.
     """
 
     def __init__(self, host=None, db_driver=None, service_name='undefined'):
         self.last_capabilities = None
+        self.published_capabilities = None
+        self.capabilities_sequence = 0
         self.service_name = service_name
         self.scheduler_rpcapi = scheduler_rpcapi.SchedulerAPI()
         super(SchedulerDependentManager, self).__init__(host, db_driver)
@@ -135,13 +144,32 @@ class SchedulerDependentManager(Manager):
         """Remember these capabilities to send on next periodic update."""
         self.last_capabilities = capabilities
 
+    def reset_published_capabilities(self):
+        """Send a full snapshot of the capabilities on next update."""
+        self.published_capabilities = None
+
     @periodic_task.periodic_task
     def _publish_service_capabilities(self, context):
         """Pass data back to the scheduler at a periodic interval."""
-        if self.last_capabilities:
+        if not self.last_capabilities:
+            return
+
+        self.capabilities_sequence += 1
+        if self.published_capabilities is None:
             LOG.debug('Notifying Schedulers of capabilities ...')
             self.scheduler_rpcapi.update_service_capabilities(
                 context,
                 self.service_name,
                 self.host,
-                self.last_capabilities)
+                self.last_capabilities,
+                sequence=self.capabilities_sequence)
+        else:
+            LOG.debug('Notifying Schedulers of capabilities changes ...')
+            self.scheduler_rpcapi.update_service_capabilities_delta(
+                context,
+                self.service_name,
+                self.host,
+                share_utils.get_capabilities_delta(
+                    self.published_capabilities, self.last_capabilities),
+                self.capabilities_sequence)
+        self.published_capabilities = copy.deepcopy(self.last_capabilities)
@@ -197,6 +197,32 @@ class API(object):
             raise exception.NetworkException(code=e.status_code,
                                              message=e.message)
 
+    def create_ports(self, tenant_id, network_id, count, subnet_id=None,
+                     device_owner=None):
+        """Create several identical ports with a single bulk request.
+
+        Neutron creates either all of the requested ports or none of them.
+        """
+        port = {
+            'network_id': network_id,
+            'admin_state_up': True,
+            'tenant_id': tenant_id,
+        }
+        if subnet_id:
+            port['fixed_ips'] = [{'subnet_id': subnet_id}]
+        if device_owner:
+            port['device_owner'] = device_owner
+        try:
+            ports_req_body = {'ports': [dict(port) for __ in range(count)]}
+            return self.client.create_port(ports_req_body).get('ports', [])
+        except neutron_client_exc.NeutronClientException as e:
+            LOG.exception(_LE('Neutron error creating ports on network %s'),
+                          network_id)
+            if e.status_code == 409:
+                raise exception.PortLimitExceeded()
+            raise exception.NetworkException(code=e.status_code,
+                                             message=e.message)
+
     def delete_port(self, port_id):
         try:
             self.client.delete_port(port_id)
@@ -14,15 +14,38 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import sys
+
+import eventlet
 from oslo_config import cfg
+from oslo_log import log
+from oslo_utils import excutils
+import six
 
 from manila.common import constants
 from manila import exception
+from manila.i18n import _LE
+from manila.i18n import _LW
 from manila import network
 from manila.network.neutron import api as neutron_api
 from manila.network.neutron import constants as neutron_constants
 from manila import utils
 
+neutron_network_plugin_opts = [
+    cfg.BoolOpt(
+        'neutron_port_bulk_create',
+        default=True,
+        help="Create all ports of a share server with a single Neutron bulk "
+             "request, that Neutron handles atomically. Ports are created "
+             "one by one if disabled or if Neutron rejects bulk requests."),
+    cfg.IntOpt(
+        'neutron_port_concurrency',
+        default=4,
+        min=1,
+        help="Maximum number of Neutron ports of a share server that are "
+             "created one by one, or deleted, at the same time."),
+]
+
 neutron_single_network_plugin_opts = [
     cfg.StrOpt(
         'neutron_net_id',
@@ -40,6 +63,7 @@ neutron_single_network_plugin_opts = [
 ]
 
 CONF = cfg.CONF
+LOG = log.getLogger(__name__)
 
 
 class NeutronNetworkPlugin(network.NetworkBaseAPI):
@@ -62,6 +86,8 @@ class NeutronNetworkPlugin(network.NetworkBaseAPI):
         if not self._neutron_api:
             self._neutron_api = neutron_api.API(*self._neutron_api_args,
                                                 **self._neutron_api_kwargs)
+            CONF.register_opts(neutron_network_plugin_opts,
+                               group=self._neutron_api.config_group_name)
         return self._neutron_api
 
     def allocate_network(self, context, share_server, share_network=None,
@@ -90,12 +116,8 @@ class NeutronNetworkPlugin(network.NetworkBaseAPI):
         allocation_count = kwargs.get('count', 1)
         device_owner = kwargs.get('device_owner', 'share')
 
-        ports = []
-        for __ in range(0, allocation_count):
-            ports.append(self._create_port(context, share_server,
-                                           share_network, device_owner))
-
-        return ports
+        return self._create_ports(context, share_server, share_network,
+                                  device_owner, allocation_count)
 
     def deallocate_network(self, context, share_server_id):
         """Deallocate neutron network resources for the given share server.
@@ -110,8 +132,54 @@ class NeutronNetworkPlugin(network.NetworkBaseAPI):
         ports = self.db.network_allocations_get_for_share_server(
             context, share_server_id)
 
-        for port in ports:
-            self._delete_port(context, port)
+        self._delete_ports(context, ports)
+
+    def _create_ports(self, context, share_server, share_network,
+                      device_owner, count):
+        """Create ports with a bulk request, or one by one concurrently.
+
+        Either all ports are created or, if creation of any of them fails,
+        the ones already created are deleted and the error is raised.
+        """
+        configuration = self.neutron_api.configuration
+        if count > 1 and configuration.neutron_port_bulk_create:
+            try:
+                ports = self.neutron_api.create_ports(
+                    share_network['project_id'],
+                    network_id=share_network['neutron_net_id'],
+                    count=count,
+                    subnet_id=share_network['neutron_subnet_id'],
+                    device_owner='manila:' + device_owner)
+            except exception.NetworkException as e:
+                if e.kwargs.get('code') != 400:
+                    raise
+                LOG.warning(_LW("Neutron rejected the bulk creation of "
+                                "%(count)s ports, creating them one by one. "
+                                "Error: %(error)s"),
+                            {'count': count, 'error': e})
+            else:
+                return self._create_port_allocations(
+                    context, share_server, share_network, ports)
+
+        def create_port(__):
+            try:
+                return self._create_port(
+                    context, share_server, share_network, device_owner), None
+            except Exception:
+                return None, sys.exc_info()
+
+        pool = eventlet.GreenPool(configuration.neutron_port_concurrency)
+        results = list(pool.imap(create_port, range(count)))
+        allocations = [allocation for allocation, __ in results if allocation]
+        errors = [exc_info for __, exc_info in results if exc_info]
+        if errors:
+            try:
+                self._delete_ports(context, allocations)
+            except Exception:
+                LOG.exception(_LE("Failed to delete ports created for share "
+                                  "server %s."), share_server['id'])
+            six.reraise(*errors[0])
+        return allocations
 
     def _create_port(self, context, share_server, share_network, device_owner):
         port = self.neutron_api.create_port(
@@ -119,7 +187,35 @@ class NeutronNetworkPlugin(network.NetworkBaseAPI):
             network_id=share_network['neutron_net_id'],
             subnet_id=share_network['neutron_subnet_id'],
             device_owner='manila:' + device_owner)
-        port_dict = {
+        return self._create_port_allocations(
+            context, share_server, share_network, [port])[0]
+
+    def _create_port_allocations(self, context, share_server, share_network,
+                                 ports):
+        """Create DB records of ports, deleting the ports on failure."""
+        allocations = []
+        try:
+            for port in ports:
+                allocations.append(self.db.network_allocation_create(
+                    context, self._get_port_allocation_dict(
+                        share_server, share_network, port)))
+        except Exception:
+            with excutils.save_and_reraise_exception():
+                for port in ports[len(allocations):]:
+                    try:
+                        self.neutron_api.delete_port(port['id'])
+                    except exception.NetworkException:
+                        LOG.exception(_LE("Failed to delete port %s."),
+                                      port['id'])
+                try:
+                    self._delete_ports(context, allocations)
+                except Exception:
+                    LOG.exception(_LE("Failed to delete ports created for "
+                                      "share server %s."), share_server['id'])
+        return allocations
+
+    def _get_port_allocation_dict(self, share_server, share_network, port):
+        return {
             'id': port['id'],
             'share_server_id': share_server['id'],
             'ip_address': port['fixed_ips'][0]['ip_address'],
@@ -131,7 +227,25 @@ class NeutronNetworkPlugin(network.NetworkBaseAPI):
             'ip_version': share_network['ip_version'],
             'cidr': share_network['cidr'],
         }
-        return self.db.network_allocation_create(context, port_dict)
+
+    def _delete_ports(self, context, ports):
+        """Delete ports concurrently.
+
+        Deletion of every port is attempted, the first error is raised
+        once all of them are done.
+        """
+        def delete_port(port):
+            try:
+                self._delete_port(context, port)
+            except Exception:
+                return sys.exc_info()
+
+        pool = eventlet.GreenPool(
+            self.neutron_api.configuration.neutron_port_concurrency)
+        errors = [exc_info for exc_info in pool.imap(delete_port, ports)
+                  if exc_info]
+        if errors:
+            six.reraise(*errors[0])
 
     def _delete_port(self, context, port):
         try:
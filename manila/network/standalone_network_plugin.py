@@ -224,12 +224,15 @@ class StandaloneNetworkPlugin(network.NetworkBaseAPI):
         ips = []
         if amount < 1:
             return ips
+        # NOTE: Allocated IPs are loaded at once instead of being looked up
+        # one by one, which took a query per used IP of the allowed range.
+        # Callers hold the allocation lock, so no IP gets allocated by
+        # this plugin in between.
+        allocated_ips = self.db.network_allocations_get_ip_addresses(context)
         iterator = netaddr.iter_unique_ips(*self.allowed_cidrs)
         for ip in iterator:
             ip = six.text_type(ip)
-            if (ip in self.reserved_addresses or
-                    self.db.network_allocations_get_by_ip_address(context,
-                                                                  ip)):
+            if ip in self.reserved_addresses or ip in allocated_ips:
                 continue
             else:
                 ips.append(ip)
@@ -29,8 +29,11 @@ import manila.api.middleware.auth
 import manila.common.config
 import manila.compute
 import manila.compute.nova
+import manila.data.manager
+import manila.data.utils
 import manila.db.api
 import manila.db.base
+import manila.db.instrumentation
 import manila.exception
 import manila.network
 import manila.network.linux.interface
@@ -91,13 +94,18 @@ _global_opt_lists = [
     manila.common.config.global_opts,
     manila.compute._compute_opts,
     manila.compute.nova.nova_opts,
+    manila.data.manager.data_opts,
+    manila.data.utils.data_copy_opts,
     manila.db.api.db_opts,
     [manila.db.base.db_driver_opt],
+    manila.db.instrumentation.instrumentation_opts,
     manila.exception.exc_log_opts,
     manila.network.linux.interface.OPTS,
     manila.network.network_opts,
     manila.network.neutron.api.neutron_opts,
     manila.network.neutron.neutron_network_plugin.
+    neutron_network_plugin_opts,
+    manila.network.neutron.neutron_network_plugin.
     neutron_single_network_plugin_opts,
     manila.network.nova_network_plugin.nova_single_network_plugin_opts,
     manila.network.standalone_network_plugin.standalone_network_plugin_opts,
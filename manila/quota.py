@@ -55,6 +55,10 @@ quota_opts = [
     cfg.IntOpt('max_age',
                default=0,
                help='Number of seconds between subsequent usage refreshes.'),
+    cfg.IntOpt('quota_usage_reconcile_interval',
+               default=60,
+               help='Seconds between recounts of the quota usages due for '
+                    'a refresh. A negative value disables the recounts.'),
     cfg.StrOpt('quota_driver',
                default='manila.quota.DbQuotaDriver',
                help='Default driver to use for quota checks.'), ]
@@ -521,7 +525,7 @@ class DbQuotaDriver(object):
 
         Reset the usage records for a particular user on a list of
         resources.  This will force that user's usage records to be
-        refreshed the next time a reservation is made.
+        refreshed by the next reconciliation.
 
         Note: this does not affect the currently outstanding
         reservations the user has; those reservations must be
@@ -583,6 +587,21 @@ class DbQuotaDriver(object):
 
         db.reservation_expire(context)
 
+    def reconcile(self, context, resources):
+        """Recount usages due for a refresh.
+
+        Usages are marked for a refresh by reservations instead of being
+        recounted in the reservation transaction.
+
+        :param context: The request context, for access checks.
+        :param resources: A dictionary of the registered resources.
+        """
+
+        sync_resources = {k: v for k, v in resources.items()
+                          if hasattr(v, 'sync')}
+        return db.quota_usage_reconcile(context, sync_resources,
+                                        CONF.until_refresh)
+
 
 class BaseResource(object):
     """Describe a single resource for quota checking."""
@@ -1022,7 +1041,7 @@ class QuotaEngine(object):
 
         Reset the usage records for a particular user on a list of
         resources.  This will force that user's usage records to be
-        refreshed the next time a reservation is made.
+        refreshed by the next reconciliation.
 
         Note: this does not affect the currently outstanding
         reservations the user has; those reservations must be
@@ -1072,6 +1091,16 @@ class QuotaEngine(object):
 
         self._driver.expire(context)
 
+    def reconcile(self, context):
+        """Recount usages due for a refresh.
+
+        :param context: The request context, for access checks.
+        """
+
+        out_of_sync = self._driver.reconcile(context, self._resources)
+        LOG.debug("Reconciled quota usages, %s were out of sync",
+                  out_of_sync)
+
     @property
     def resources(self):
         return sorted(self._resources.keys())
@@ -26,11 +26,15 @@ __all__ = [
     'TRANSPORT_ALIASES',
 ]
 
+import functools
+import inspect
+
 from oslo_config import cfg
 import oslo_messaging as messaging
 from oslo_serialization import jsonutils
 
 import manila.context
+from manila.db import instrumentation
 import manila.exception
 
 CONF = cfg.CONF
@@ -135,9 +139,31 @@ def get_client(target, version_cap=None, serializer=None):
                                serializer=serializer)
 
 
+class _InstrumentedEndpoint(object):
+    """Accounts the DB statements of the RPC methods of an endpoint."""
+
+    def __init__(self, endpoint):
+        self._endpoint = endpoint
+
+    def __getattr__(self, name):
+        attr = getattr(self._endpoint, name)
+        if name.startswith('_') or not inspect.ismethod(attr):
+            return attr
+        scope_name = '%s.%s' % (type(self._endpoint).__name__, name)
+
+        @functools.wraps(attr)
+        def method(*args, **kwargs):
+            with instrumentation.scope(instrumentation.SCOPE_RPC, scope_name):
+                return attr(*args, **kwargs)
+        return method
+
+
 def get_server(target, endpoints, serializer=None):
     assert TRANSPORT is not None
     serializer = RequestContextSerializer(serializer)
+    if instrumentation.enabled():
+        endpoints = [_InstrumentedEndpoint(endpoint)
+                     for endpoint in endpoints]
     return messaging.get_rpc_server(TRANSPORT,
                                     target,
                                     endpoints,
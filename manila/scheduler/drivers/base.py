@@ -19,6 +19,8 @@
 Scheduler base class that all Schedulers should inherit from
 """
 
+import copy
+
 from oslo_config import cfg
 from oslo_utils import importutils
 from oslo_utils import timeutils
@@ -35,6 +37,15 @@ scheduler_driver_opts = [
     cfg.IntOpt('scheduler_max_attempts',
                default=3,
                help='Maximum number of attempts to schedule a share.'),
+    cfg.IntOpt('scheduler_decision_cache_size',
+               default=128,
+               help='Maximum number of filtered host lists the filter '
+                    'scheduler keeps for reuse by identical requests. '
+                    'Set to 0 to disable the cache.'),
+    cfg.IntOpt('scheduler_decision_cache_ttl',
+               default=10,
+               help='Number of seconds a filtered host list is reused by '
+                    'the filter scheduler.'),
 ]
 
 CONF = cfg.CONF
@@ -87,11 +98,22 @@ class Scheduler(object):
         """Get the normalized set of capabilities for the services."""
         return self.host_manager.get_service_capabilities()
 
-    def update_service_capabilities(self, service_name, host, capabilities):
+    def update_service_capabilities(self, service_name, host, capabilities,
+                                    sequence=None):
         """Process a capability update from a service node."""
         self.host_manager.update_service_capabilities(service_name,
                                                       host,
-                                                      capabilities)
+                                                      capabilities,
+                                                      sequence=sequence)
+
+    def update_service_capabilities_delta(self, service_name, host,
+                                          capabilities_delta, sequence):
+        """Process a capability changes update from a service node.
+
+        :returns: False if the changes could not be applied.
+        """
+        return self.host_manager.update_service_capabilities_delta(
+            service_name, host, capabilities_delta, sequence)
 
     def hosts_up(self, context, topic):
         """Return the list of hosts that have a running service for topic."""
@@ -109,6 +131,25 @@ class Scheduler(object):
         """Must override schedule method for scheduler to work."""
         raise NotImplementedError(_("Must implement schedule_create_share"))
 
+    def schedule_create_shares(self, context, request_specs,
+                               filter_properties):
+        """Schedule a batch of shares.
+
+        Schedulers able to place several shares in a single pass should
+        override this method, by default every share is scheduled on its own.
+
+        :returns: list of (request_spec, exception) tuples for the shares
+            that could not be scheduled.
+        """
+        failures = []
+        for request_spec in request_specs:
+            try:
+                self.schedule_create_share(context, request_spec,
+                                           copy.deepcopy(filter_properties))
+            except Exception as e:
+                failures.append((request_spec, e))
+        return failures
+
     def schedule_create_consistency_group(self, context, group_id,
                                           request_spec,
                                           filter_properties):
@@ -120,6 +161,13 @@ class Scheduler(object):
         """Must override schedule method for scheduler to work."""
         raise NotImplementedError(_("Must implement get_pools"))
 
+    def get_decision_cache_stats(self):
+        """Returns the statistics of the decision cache or None.
+
+        None is returned by schedulers not caching their decisions.
+        """
+        return None
+
     def host_passes_filters(self, context, host, request_spec,
                             filter_properties):
         """Must override schedule method for migration to work."""
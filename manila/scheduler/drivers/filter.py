@@ -20,8 +20,13 @@ You can customize this scheduler by specifying your own share Filters and
 Weighing Functions.
 """
 
+import collections
+import copy
+
 from oslo_config import cfg
 from oslo_log import log
+from oslo_serialization import jsonutils
+from oslo_utils import timeutils
 
 from manila import exception
 from manila.i18n import _
@@ -29,11 +34,78 @@ from manila.i18n import _LE, _LI
 from manila.scheduler.drivers import base
 from manila.scheduler import scheduler_options
 from manila.share import share_types
+from manila.share import utils as share_utils
 
 CONF = cfg.CONF
 LOG = log.getLogger(__name__)
 
 
+class DecisionCache(object):
+    """Bounded LRU cache of filtered host lists.
+
+    An entry is only reused while it is younger than the configured time to
+    live, and while all of its hosts are still known to the host manager
+    with the capabilities they had when the entry was built.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries = collections.OrderedDict()
+
+    def get(self, key, hosts):
+        """Returns the cached hosts for key or None.
+
+        :param hosts: dict of the current host states keyed by host name.
+        """
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        created_at, candidates = entry
+        if (timeutils.is_older_than(created_at, self.ttl) or
+                not self._is_valid(candidates, hosts)):
+            self.invalidations += 1
+            self.misses += 1
+            return None
+
+        # Re-insert the entry to mark it as the most recently used one.
+        self._entries[key] = entry
+        self.hits += 1
+        return [host_state for host_state, timestamp in candidates]
+
+    def put(self, key, host_states):
+        candidates = [(host_state, self._get_timestamp(host_state))
+                      for host_state in host_states]
+        self._entries.pop(key, None)
+        self._entries[key] = (timeutils.utcnow(), candidates)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def get_stats(self):
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'size': len(self._entries)}
+
+    @staticmethod
+    def _get_timestamp(host_state):
+        return (host_state.capabilities or {}).get('timestamp')
+
+    @classmethod
+    def _is_valid(cls, candidates, hosts):
+        for host_state, timestamp in candidates:
+            if hosts.get(host_state.host) is not host_state:
+                return False
+            if cls._get_timestamp(host_state) != timestamp:
+                return False
+        return True
+
+
 class FilterScheduler(base.Scheduler):
     """Scheduler that can be used for filtering and weighing."""
     def __init__(self, *args, **kwargs):
@@ -41,13 +113,21 @@ class FilterScheduler(base.Scheduler):
         self.cost_function_cache = None
         self.options = scheduler_options.SchedulerOptions()
         self.max_attempts = self._max_attempts()
+        self.decision_cache = None
+        if CONF.scheduler_decision_cache_size > 0:
+            self.decision_cache = DecisionCache(
+                CONF.scheduler_decision_cache_size,
+                CONF.scheduler_decision_cache_ttl)
 
     def _get_configuration_options(self):
         """Fetch options dictionary. Broken out for testing."""
         return self.options.get_configuration()
 
-    def get_pools(self, context, filters):
-        return self.host_manager.get_pools(context, filters)
+    def get_decision_cache_stats(self):
+        """Returns the hit and miss counts of the decision cache or None."""
+        if self.decision_cache is None:
+            return None
+        return self.decision_cache.get_stats()
 
     def _post_select_populate_filter_properties(self, filter_properties,
                                                 host_state):
@@ -105,6 +185,106 @@ class FilterScheduler(base.Scheduler):
             snapshot_id=snapshot_id
         )
 
+    def schedule_create_shares(self, context, request_specs,
+                               filter_properties):
+        """Place a batch of shares in a single scheduling pass.
+
+        Hosts are filtered once per group of shares requesting the same
+        share type and availability zone. The shares of a group are then
+        placed greedily, largest first, each of them virtually consuming the
+        capacity of its host so that the following placements take it into
+        account. Shares placed on the same backend are sent to it in a
+        single cast.
+
+        :returns: list of (request_spec, exception) tuples for the shares
+            that could not be scheduled.
+        """
+        elevated = context.elevated()
+        failures = []
+        groups = collections.OrderedDict()
+        for request_spec in request_specs:
+            try:
+                share_filter_properties, share_properties = (
+                    self._format_filter_properties(
+                        context, copy.deepcopy(filter_properties),
+                        request_spec))
+            except Exception as e:
+                failures.append((request_spec, e))
+                continue
+            groups.setdefault(self._get_batch_key(request_spec), []).append(
+                (request_spec, share_filter_properties, share_properties))
+
+        all_hosts = list(self.host_manager.get_all_host_states_share(elevated))
+        placements = collections.OrderedDict()
+        for group in groups.values():
+            group.sort(key=lambda item: item[2].get('size') or 0,
+                       reverse=True)
+            # The smallest share of the group is the least demanding one,
+            # the hosts it cannot fit on are discarded for the whole group.
+            candidates = self.host_manager.get_filtered_hosts(
+                all_hosts, group[-1][1])
+            for request_spec, share_filter_properties, share_properties in (
+                    group):
+                try:
+                    placement = self._place_share_from_batch(
+                        context, candidates, request_spec,
+                        share_filter_properties, share_properties)
+                except Exception as e:
+                    failures.append((request_spec, e))
+                    continue
+                placements.setdefault(
+                    share_utils.extract_host(placement['host']), []).append(
+                        placement)
+
+        for backend, items in placements.items():
+            self.share_rpcapi.create_share_instances(context, backend, items)
+        return failures
+
+    @staticmethod
+    def _get_batch_key(request_spec):
+        """Key of the shares that can be filtered together in a batch."""
+        share_type = request_spec.get('share_type') or {}
+        share_properties = request_spec.get('share_properties') or {}
+        instance_properties = (
+            request_spec.get('share_instance_properties') or {})
+        consistency_group = request_spec.get('consistency_group') or {}
+        return (share_type.get('id'),
+                share_properties.get('share_proto'),
+                instance_properties.get('availability_zone_id'),
+                consistency_group.get('id'),
+                request_spec.get('active_replica_host'))
+
+    def _place_share_from_batch(self, context, candidates, request_spec,
+                                filter_properties, share_properties):
+        hosts = None
+        if candidates:
+            hosts = self.host_manager.get_filtered_hosts(candidates,
+                                                         filter_properties)
+        if not hosts:
+            raise exception.NoValidHost(reason="")
+
+        best_host = self.host_manager.get_weighed_hosts(
+            hosts, filter_properties)[0]
+        LOG.debug("Choosing for share %(share_id)s: %(best_host)s",
+                  {"share_id": request_spec['share_id'],
+                   "best_host": best_host})
+        best_host.obj.consume_from_share(share_properties)
+
+        host = best_host.obj.host
+        updated_share = base.share_update_db(
+            context, request_spec['share_id'], host)
+        self._post_select_populate_filter_properties(filter_properties,
+                                                     best_host.obj)
+
+        # context is not serializable
+        filter_properties.pop('context', None)
+
+        return {'host': host,
+                'share_instance': updated_share.instance,
+                'request_spec': request_spec,
+                'filter_properties': filter_properties,
+                'snapshot_id': request_spec.get('snapshot_id')}
+
     def schedule_create_replica(self, context, request_spec,
                                 filter_properties):
         share_replica_id = request_spec['share_instance_properties'].get('id')
@@ -230,8 +410,7 @@ class FilterScheduler(base.Scheduler):
         hosts = self.host_manager.get_all_host_states_share(elevated)
 
         # Filter local hosts based on requirements ...
-        hosts = self.host_manager.get_filtered_hosts(hosts,
-                                                     filter_properties)
+        hosts = self._get_filtered_hosts(hosts, filter_properties)
         if not hosts:
             return None
 
@@ -247,6 +426,76 @@ class FilterScheduler(base.Scheduler):
         best_host.obj.consume_from_share(share_properties)
         return best_host
 
+    def _get_filtered_hosts(self, hosts, filter_properties):
+        """Filter hosts, reusing the result of an identical request."""
+        key = self._get_decision_cache_key(filter_properties)
+        if key is None:
+            return self.host_manager.get_filtered_hosts(hosts,
+                                                        filter_properties)
+
+        hosts = list(hosts)
+        cached_hosts = self.decision_cache.get(
+            key, {host.host: host for host in hosts})
+        if cached_hosts is not None:
+            # NOTE: the capacity of the cached hosts is consumed by the
+            # shares placed on them since the entry was built.
+            cached_hosts = self._refilter_capacity(cached_hosts,
+                                                   filter_properties)
+        LOG.debug("Scheduler decision cache stats: %s",
+                  self.decision_cache.get_stats())
+        if cached_hosts:
+            LOG.debug("Reusing filtered hosts of an identical request.")
+            return cached_hosts
+
+        filtered_hosts = self.host_manager.get_filtered_hosts(
+            hosts, filter_properties)
+        if filtered_hosts:
+            self.decision_cache.put(key, filtered_hosts)
+        return filtered_hosts
+
+    def _refilter_capacity(self, hosts, filter_properties):
+        if 'CapacityFilter' not in CONF.scheduler_default_filters:
+            return hosts
+        return self.host_manager.get_filtered_hosts(
+            hosts, filter_properties, filter_class_names=['CapacityFilter'])
+
+    def _get_decision_cache_key(self, filter_properties):
+        """Returns the decision cache key of a request or None.
+
+        Only the properties evaluated by the scheduler filters are part of
+        the key. Requests being rescheduled are never cached, as the hosts
+        already tried have to be filtered out. Neither are requests for
+        share replicas, as the hosts of the other replicas of their share
+        have to be filtered out.
+        """
+        if self.decision_cache is None:
+            return None
+        retry = filter_properties.get('retry') or {}
+        if retry.get('hosts'):
+            return None
+        request_spec = filter_properties.get('request_spec') or {}
+        if request_spec.get('active_replica_host'):
+            return None
+
+        share_type = filter_properties.get('share_type') or {}
+        consistency_group = filter_properties.get('consistency_group') or {}
+        try:
+            key = (share_type.get('id'),
+                   share_type.get('name'),
+                   frozenset((share_type.get('extra_specs') or {}).items()),
+                   request_spec.get('share_proto'),
+                   filter_properties.get('size'),
+                   filter_properties.get('availability_zone_id'),
+                   consistency_group.get('id'),
+                   filter_properties.get('cg_support'),
+                   filter_properties.get('replication_domain'),
+                   jsonutils.dumps(filter_properties.get('scheduler_hints'),
+                                   sort_keys=True))
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
     def _populate_retry_share(self, filter_properties, properties):
         """Populate filter properties with retry history.
 
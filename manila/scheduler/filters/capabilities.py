@@ -24,16 +24,15 @@ LOG = logging.getLogger(__name__)
 class CapabilitiesFilter(base_host.BaseHostFilter):
     """HostFilter to work with resource (instance & volume) type records."""
 
-    def _satisfies_extra_specs(self, capabilities, resource_type):
-        """Compare capabilities against extra specs.
-
-        Check that the capabilities provided by the services satisfy
-        the extra specs associated with the resource type.
-        """
-        extra_specs = resource_type.get('extra_specs', [])
-        if not extra_specs:
-            return True
+    # Compiled extra specs, shared by all filter instances and keyed by the
+    # resource type id and the content of its extra specs, so that updated
+    # extra specs are compiled again.
+    _compiled_extra_specs = {}
+    _compiled_extra_specs_max_size = 256
 
+    def _compile_extra_specs(self, extra_specs):
+        """Parse extra specs into (key, req, scope, matcher) tuples."""
+        compiled = []
         for key, req in extra_specs.items():
 
             # Either not scoped format, or in capabilities scope
@@ -46,16 +45,43 @@ class CapabilitiesFilter(base_host.BaseHostFilter):
             elif scope[0] == "capabilities":
                 del scope[0]
 
+            compiled.append((key, req, tuple(scope),
+                             extra_specs_ops.compile_requirement(req)))
+        return tuple(compiled)
+
+    def _get_compiled_extra_specs(self, resource_type):
+        extra_specs = (resource_type or {}).get('extra_specs')
+        if not extra_specs:
+            return ()
+
+        try:
+            cache_key = (resource_type.get('id'),
+                         frozenset(extra_specs.items()))
+            return self._compiled_extra_specs[cache_key]
+        except TypeError:
+            # Unhashable extra spec values, do not cache them.
+            return self._compile_extra_specs(extra_specs)
+        except KeyError:
+            pass
+
+        cache = self._compiled_extra_specs
+        if len(cache) >= self._compiled_extra_specs_max_size:
+            cache.pop(next(iter(cache)))
+        cache[cache_key] = self._compile_extra_specs(extra_specs)
+        return cache[cache_key]
+
+    def _satisfies_compiled_extra_specs(self, capabilities, compiled):
+        for key, req, scope, matcher in compiled:
             cap = capabilities
-            for index in range(len(scope)):
+            for scope_key in scope:
                 try:
-                    cap = cap.get(scope[index])
+                    cap = cap.get(scope_key)
                 except AttributeError:
                     cap = None
                 if cap is None:
                     LOG.debug("Host doesn't provide capability '%(cap)s' "
                               "listed in the extra specs",
-                              {'cap': scope[index]})
+                              {'cap': scope_key})
                     return False
 
             # Make all capability values a list so we can handle lists
@@ -63,7 +89,7 @@ class CapabilitiesFilter(base_host.BaseHostFilter):
 
             # Loop through capability values looking for any match
             for cap_value in cap_list:
-                if extra_specs_ops.match(cap_value, req):
+                if matcher(cap_value):
                     break
             else:
                 # Nothing matched, so bail out
@@ -74,15 +100,40 @@ class CapabilitiesFilter(base_host.BaseHostFilter):
                 return False
         return True
 
+    def _satisfies_extra_specs(self, capabilities, resource_type):
+        """Compare capabilities against extra specs.
+
+        Check that the capabilities provided by the services satisfy
+        the extra specs associated with the resource type.
+        """
+        return self._satisfies_compiled_extra_specs(
+            capabilities, self._get_compiled_extra_specs(resource_type))
+
+    def _host_passes_compiled(self, host_state, compiled):
+        if not self._satisfies_compiled_extra_specs(host_state.capabilities,
+                                                    compiled):
+            LOG.debug("%(host_state)s fails resource_type extra_specs "
+                      "requirements", {'host_state': host_state})
+            return False
+        return True
+
+    def filter_all(self, filter_obj_list, filter_properties):
+        """Yield hosts whose capabilities satisfy the extra specs.
+
+        The extra specs of the resource type are compiled once and then
+        evaluated against all hosts.
+        """
+        compiled = self._get_compiled_extra_specs(
+            filter_properties.get('resource_type'))
+        for host_state in filter_obj_list:
+            if self._host_passes_compiled(host_state, compiled):
+                yield host_state
+
     def host_passes(self, host_state, filter_properties):
         """Return a list of hosts that can create resource_type."""
         # Note(zhiteng) Currently only Cinder and Nova are using
         # this filter, so the resource type is either instance or
         # volume.
-        resource_type = filter_properties.get('resource_type')
-        if not self._satisfies_extra_specs(host_state.capabilities,
-                                           resource_type):
-            LOG.debug("%(host_state)s fails resource_type extra_specs "
-                      "requirements", {'host_state': host_state})
-            return False
-        return True
+        compiled = self._get_compiled_extra_specs(
+            filter_properties.get('resource_type'))
+        return self._host_passes_compiled(host_state, compiled)
@@ -38,39 +38,73 @@ _op_methods = {'=': lambda x, y: float(x) >= float(y),
                's>=': operator.ge}
 
 
-def match(value, req):
+# Operators whose operand can be converted once, when a requirement is
+# compiled, rather than every time it is matched against a capability.
+_compiled_op_methods = {
+    '=': (float, lambda x, y: float(x) >= y),
+    '<is>': (strutils.bool_from_string,
+             lambda x, y: strutils.bool_from_string(x) is y),
+    '==': (float, lambda x, y: float(x) == y),
+    '!=': (float, lambda x, y: float(x) != y),
+    '>=': (float, lambda x, y: float(x) >= y),
+    '<=': (float, lambda x, y: float(x) <= y),
+}
+
+
+def _never_matches(value):
+    return False
+
+
+def compile_requirement(req):
+    """Parse an extra spec requirement into a reusable matcher.
+
+    Returns a callable that takes a capability value and returns whether
+    it satisfies the requirement, exactly like match(value, req) does, but
+    with the requirement tokenized and its operand converted only once.
+    """
     words = req.split()
 
     op = method = None
     if words:
-        op = words.pop(0)
+        op = words[0]
         method = _op_methods.get(op)
 
     if op != '<or>' and not method:
-        if type(value) is bool:
-            return value == strutils.bool_from_string(
-                req, strict=False, default=req)
-        else:
-            return value == req
+        bool_req = strutils.bool_from_string(req, strict=False, default=req)
 
-    if value is None:
-        return False
+        def _match_plain(value):
+            if type(value) is bool:
+                return value == bool_req
+            return value == req
+        return _match_plain
 
     if op == '<or>':  # Ex: <or> v1 <or> v2 <or> v3
-        while True:
-            if words.pop(0) == value:
-                return True
-            if not words:
-                break
-            op = words.pop(0)  # remove a keyword <or>
-            if not words:
-                break
-        return False
-
-    try:
-        if words and method(value, words[0]):
-            return True
-    except ValueError:
-        pass
+        choices = tuple(words[1::2])
 
-    return False
+        def _match_or(value):
+            return value is not None and value in choices
+        return _match_or
+
+    if len(words) < 2:
+        return _never_matches
+
+    operand = words[1]
+    if op in _compiled_op_methods:
+        converter, method = _compiled_op_methods[op]
+        try:
+            operand = converter(operand)
+        except ValueError:
+            return _never_matches
+
+    def _match_op(value):
+        if value is None:
+            return False
+        try:
+            return bool(method(value, operand))
+        except ValueError:
+            return False
+    return _match_op
+
+
+def match(value, req):
+    return compile_requirement(req)(value)
@@ -34,7 +34,10 @@ import six
 from manila import db
 from manila import exception
 from manila.i18n import _LI, _LW
+from manila.scheduler.filters import availability_zone
 from manila.scheduler.filters import base_host as base_host_filter
+from manila.scheduler.filters import capabilities as capabilities_filter
+from manila.scheduler.filters import extra_specs_ops
 from manila.scheduler.weighers import base_host as base_host_weigher
 from manila.share import utils as share_utils
 from manila import utils
@@ -54,7 +57,24 @@ host_manager_opts = [
                 default=[
                     'CapacityWeigher'
                 ],
-                help='Which weigher class names to use for weighing hosts.')
+                help='Which weigher class names to use for weighing hosts.'),
+    cfg.ListOpt('scheduler_pool_index_capabilities',
+                default=[
+                    'storage_protocol',
+                    'driver_handles_share_servers',
+                    'snapshot_support',
+                    'replication_type',
+                    'consistency_group_support',
+                ],
+                help='Pool capabilities the scheduler keeps an index of, so '
+                     'that pools not matching the share type extra specs '
+                     'for these capabilities or the requested availability '
+                     'zone are discarded before running the filters.'),
+    cfg.BoolOpt('scheduler_log_service_capabilities',
+                default=True,
+                help='Whether the capabilities received from the share '
+                     'services are logged at debug level. Only a summary of '
+                     'each update is logged when disabled.'),
 ]
 
 CONF = cfg.CONF
@@ -214,6 +234,9 @@ class HostState(object):
             # of pools in share capacity
             for pool_cap in pools:
                 pool_name = pool_cap['pool_name']
+                # NOTE: the reported capabilities are kept as they are, the
+                # next capability deltas are applied to them.
+                pool_cap = dict(pool_cap)
                 self._append_backend_info(pool_cap)
                 cur_pool = self.pools.get(pool_name, None)
                 if not cur_pool:
@@ -228,6 +251,7 @@ class HostState(object):
             # information in the capability, we have to prepare
             # a pool from backend level info, or to update the one
             # we created in self.pools.
+            capability = dict(capability)
             pool_name = self.share_backend_name
             if pool_name is None:
                 # To get DEFAULT_POOL_NAME
@@ -386,14 +410,116 @@ class PoolState(HostState):
         pass
 
 
+class PoolIndex(object):
+    """Inverted index of pools by capability values and availability zone.
+
+    Used to narrow down the pools a request is matched against to the ones
+    whose indexed capabilities satisfy the share type extra specs, before
+    running the (per pool) scheduler filters.
+    """
+
+    def __init__(self, capability_keys):
+        self.capability_keys = tuple(capability_keys)
+        # { <capability>: {<value>: set(<pool>)} }
+        self.capabilities = {key: {} for key in self.capability_keys}
+        # { <capability>: set(<pool>) } for values that cannot be indexed
+        self.unindexed = {key: set() for key in self.capability_keys}
+        self.zones = {}  # { <availability_zone_id>: set(<pool>) }
+        self.pools = set()
+        self._entries = {}  # { <host>: [(<bucket>, <pool>)] }
+
+    def _add_entry(self, host, bucket, pool):
+        bucket.add(pool)
+        self._entries[host].append((bucket, pool))
+
+    def add_host(self, host_state):
+        """(Re)index all pools of a host."""
+        self.remove_host(host_state.host)
+        self._entries[host_state.host] = []
+
+        for pool in (host_state.pools or {}).values():
+            self.pools.add(pool)
+            self._entries[host_state.host].append((self.pools, pool))
+
+            for key in self.capability_keys:
+                value = pool.capabilities.get(key)
+                if value is None:
+                    continue
+                values = value if isinstance(value, list) else [value]
+                for value in values:
+                    try:
+                        bucket = self.capabilities[key].setdefault(
+                            value, set())
+                    except TypeError:
+                        bucket = self.unindexed[key]
+                    self._add_entry(host_state.host, bucket, pool)
+
+            zone = (pool.service or {}).get('availability_zone_id')
+            self._add_entry(host_state.host,
+                            self.zones.setdefault(zone, set()), pool)
+
+    def remove_host(self, host):
+        """Remove all pools of a host from the index."""
+        for bucket, pool in self._entries.pop(host, []):
+            bucket.discard(pool)
+
+    def get_candidates(self, extra_specs=None, availability_zone_id=None):
+        """Returns the set of pools matching the indexed requirements.
+
+        Returns None if none of the requirements are indexed, meaning all
+        pools are candidates.
+        """
+        candidates = None
+
+        if availability_zone_id:
+            candidates = set(self.zones.get(availability_zone_id, ()))
+
+        for key, req in (extra_specs or {}).items():
+            scope = key.split(':')
+            if len(scope) == 2 and scope[0] == 'capabilities':
+                del scope[0]
+            if len(scope) > 1 or scope[0] not in self.capabilities:
+                continue
+
+            matcher = extra_specs_ops.compile_requirement(req)
+            matching = set(self.unindexed[scope[0]])
+            for value, pools in self.capabilities[scope[0]].items():
+                if matcher(value):
+                    matching.update(pools)
+
+            if candidates is None:
+                candidates = matching
+            else:
+                candidates &= matching
+
+        return candidates
+
+
 class HostManager(object):
     """Base HostManager class."""
 
     host_state_cls = HostState
 
+    # Service fields that change on every heartbeat and have no influence
+    # on the host state, so they are not compared when deciding whether a
+    # cached host state may be reused.
+    _service_volatile_fields = ('updated_at', 'report_count')
+
     def __init__(self):
         self.service_states = {}  # { <host>: {<service>: {cap k : v}}}
         self.host_state_map = {}
+        # Version of the capabilities received from each host, bumped on
+        # every capability update from that host.
+        self.service_states_version = {}  # { <host>: <int> }
+        # Sequence number of the last capability update from each host.
+        self.service_states_sequence = {}  # { <host>: <int> }
+        # Version of the capabilities and service data each host state in
+        # host_state_map was last built from.
+        self.host_state_version = {}  # { <host>: (<int>, <service>) }
+        # Bumped whenever any host state is (re)built or removed.
+        self.host_state_map_version = 0
+        self.host_state_map_stats = {}
+        self.pool_index = PoolIndex(CONF.scheduler_pool_index_capabilities)
         self.filter_handler = base_host_filter.HostFilterHandler(
             'manila.scheduler.filters')
         self.filter_classes = self.filter_handler.get_all_classes()
@@ -462,10 +588,43 @@ class HostManager(object):
                            filter_class_names=None):
         """Filter hosts and return only ones passing all filters."""
         filter_classes = self._choose_host_filters(filter_class_names)
+        hosts = self._get_indexed_candidates(hosts, filter_properties,
+                                             filter_classes)
         return self.filter_handler.get_filtered_objects(filter_classes,
                                                         hosts,
                                                         filter_properties)
 
+    def _get_indexed_candidates(self, hosts, filter_properties,
+                                filter_classes):
+        """Discard hosts that are known not to pass some of the filters.
+
+        Uses the pool index to find the pools which do not satisfy the
+        indexed extra specs or availability zone of the request, if the
+        filters checking those are going to be run. Hosts which are not
+        in the index are always kept.
+        """
+        extra_specs = None
+        availability_zone_id = None
+        for cls in filter_classes:
+            if issubclass(cls, capabilities_filter.CapabilitiesFilter):
+                extra_specs = (filter_properties.get('resource_type') or
+                               {}).get('extra_specs')
+            elif issubclass(cls, availability_zone.AvailabilityZoneFilter):
+                availability_zone_id = filter_properties.get(
+                    'request_spec', {}).get('resource_properties', {}).get(
+                    'availability_zone_id')
+
+        candidates = self.pool_index.get_candidates(extra_specs,
+                                                    availability_zone_id)
+        if candidates is None:
+            return hosts
+
+        pools = self.pool_index.pools
+        hosts = [host for host in hosts
+                 if host in candidates or host not in pools]
+        LOG.debug("Pool index returned %d host(s)", len(hosts))
+        return hosts
+
     def get_weighed_hosts(self, hosts, weight_properties,
                           weigher_class_names=None):
         """Weigh the hosts."""
@@ -478,7 +637,8 @@ class HostManager(object):
                                                        hosts,
                                                        weight_properties)
 
-    def update_service_capabilities(self, service_name, host, capabilities):
+    def update_service_capabilities(self, service_name, host, capabilities,
+                                    sequence=None):
         """Update the per-service capabilities based on this notification."""
         if service_name not in ('share',):
             LOG.debug('Ignoring %(service_name)s service update '
@@ -487,21 +647,83 @@ class HostManager(object):
             return
 
         # Copy the capabilities, so we don't modify the original dict
-        capability_copy = dict(capabilities)
-        capability_copy["timestamp"] = timeutils.utcnow()  # Reported time
-        self.service_states[host] = capability_copy
+        self._set_service_capabilities(host, dict(capabilities), sequence)
+        self._log_service_capabilities(service_name, host, capabilities,
+                                       sequence)
 
-        LOG.debug("Received %(service_name)s service update from "
-                  "%(host)s: %(cap)s" %
-                  {'service_name': service_name, 'host': host,
-                   'cap': capabilities})
+    def update_service_capabilities_delta(self, service_name, host,
+                                          capabilities_delta, sequence):
+        """Update the per-service capabilities with the changes received.
+
+        :returns: False if the changes were not applied because the last
+            update from the host is missing or was not the previous one.
+        """
+        if service_name not in ('share',):
+            LOG.debug('Ignoring %(service_name)s service update '
+                      'from %(host)s',
+                      {'service_name': service_name, 'host': host})
+            return True
+
+        last_sequence = self.service_states_sequence.get(host)
+        if (host not in self.service_states or last_sequence is None or
+                sequence != last_sequence + 1):
+            LOG.debug("Discarding %(service_name)s service update "
+                      "%(sequence)s from %(host)s, last update applied "
+                      "is %(last_sequence)s.",
+                      {'service_name': service_name, 'host': host,
+                       'sequence': sequence,
+                       'last_sequence': last_sequence})
+            return False
+
+        capabilities = share_utils.apply_capabilities_delta(
+            self.service_states[host], capabilities_delta)
+        self._set_service_capabilities(host, capabilities, sequence)
+        self._log_service_capabilities(service_name, host,
+                                       capabilities_delta, sequence)
+        return True
+
+    def _set_service_capabilities(self, host, capabilities, sequence):
+        capabilities["timestamp"] = timeutils.utcnow()  # Reported time
+        self.service_states[host] = capabilities
+        self.service_states_version[host] = (
+            self.service_states_version.get(host, 0) + 1)
+        if sequence is None:
+            self.service_states_sequence.pop(host, None)
+        else:
+            self.service_states_sequence[host] = sequence
+
+    def _log_service_capabilities(self, service_name, host, capabilities,
+                                  sequence):
+        if CONF.scheduler_log_service_capabilities:
+            LOG.debug("Received %(service_name)s service update "
+                      "%(sequence)s from %(host)s: %(cap)s",
+                      {'service_name': service_name, 'host': host,
+                       'sequence': sequence, 'cap': capabilities})
+        else:
+            LOG.debug("Received %(service_name)s service update "
+                      "%(sequence)s from %(host)s.",
+                      {'service_name': service_name, 'host': host,
+                       'sequence': sequence})
+
+    def _get_service_fingerprint(self, service):
+        return {k: v for k, v in service.items()
+                if k not in self._service_volatile_fields}
 
     def _update_host_state_map(self, context):
+        """Bring host_state_map in line with services and capabilities.
+
+        Host states are only rebuilt from their capabilities when a new
+        capability report was received from the host since the last build,
+        or when the service itself changed (came up, moved to another
+        availability zone, ...). Otherwise the cached host state, including
+        any capacity virtually consumed since the last report, is reused.
+        """
 
         # Get resource usage across the available share nodes:
         topic = CONF.share_topic
         share_services = db.service_get_all_by_topic(context, topic)
 
+        stats = {'reused': 0, 'recomputed': 0, 'removed': 0}
         active_hosts = set()
         for service in share_services:
             host = service['host']
@@ -511,6 +733,11 @@ class HostManager(object):
                 LOG.warning(_LW("Share service is down. (host: %s).") % host)
                 continue
 
+            active_hosts.add(host)
+            service_dict = dict(service.items())
+            version = (self.service_states_version.get(host, 0),
+                       self._get_service_fingerprint(service_dict))
+
             # Create and register host_state if not in host_state_map
             capabilities = self.service_states.get(host, None)
             host_state = self.host_state_map.get(host)
@@ -518,13 +745,18 @@ class HostManager(object):
                 host_state = self.host_state_cls(
                     host,
                     capabilities=capabilities,
-                    service=dict(service.items()))
+                    service=service_dict)
                 self.host_state_map[host] = host_state
+            elif self.host_state_version.get(host) == version:
+                stats['reused'] += 1
+                continue
 
             # Update capabilities and attributes in host_state
             host_state.update_from_share_capability(
-                capabilities, service=dict(service.items()))
-            active_hosts.add(host)
+                capabilities, service=service_dict)
+            self.pool_index.add_host(host_state)
+            self.host_state_version[host] = version
+            stats['recomputed'] += 1
 
         # remove non-active hosts from host_state_map
         nonactive_hosts = set(self.host_state_map.keys()) - active_hosts
@@ -532,6 +764,18 @@ class HostManager(object):
             LOG.info(_LI("Removing non-active host: %(host)s from"
                          "scheduler cache."), {'host': host})
             self.host_state_map.pop(host, None)
+            self.host_state_version.pop(host, None)
+            self.pool_index.remove_host(host)
+            stats['removed'] += 1
+
+        if stats['recomputed'] or stats['removed']:
+            self.host_state_map_version += 1
+        stats['version'] = self.host_state_map_version
+        self.host_state_map_stats = stats
+
+        LOG.debug("Updated scheduler host state cache: reused "
+                  "%(reused)d, recomputed %(recomputed)d and removed "
+                  "%(removed)d host states (version %(version)d).", stats)
 
     def get_all_host_states_share(self, context):
         """Returns a dict of all the hosts the HostManager knows about.
@@ -21,6 +21,7 @@ Scheduler Service
 
 from oslo_config import cfg
 from oslo_log import log
+from oslo_service import periodic_task
 from oslo_utils import excutils
 from oslo_utils import importutils
 import six
@@ -31,6 +32,7 @@ from manila import db
 from manila import exception
 from manila.i18n import _LE, _LW
 from manila import manager
+from manila import quota
 from manila import rpc
 from manila.share import rpcapi as share_rpcapi
 
@@ -59,7 +61,7 @@ MAPPING = {
 class SchedulerManager(manager.Manager):
     """Chooses a host to create shares."""
 
-    RPC_API_VERSION = '1.6'
+    RPC_API_VERSION = '1.9'
 
     def __init__(self, scheduler_driver=None, service_name=None,
                  *args, **kwargs):
@@ -92,13 +94,28 @@ class SchedulerManager(manager.Manager):
         return self.driver.get_service_capabilities()
 
     def update_service_capabilities(self, context, service_name=None,
-                                    host=None, capabilities=None, **kwargs):
+                                    host=None, capabilities=None,
+                                    sequence=None, **kwargs):
         """Process a capability update from a service node."""
         if capabilities is None:
             capabilities = {}
         self.driver.update_service_capabilities(service_name,
                                                 host,
-                                                capabilities)
+                                                capabilities,
+                                                sequence=sequence)
+
+    def update_service_capabilities_delta(self, context, service_name=None,
+                                          host=None, capabilities_delta=None,
+                                          sequence=None):
+        """Process a capability changes update from a service node.
+
+        Asks the service node for all of its capabilities when the changes
+        cannot be applied, e.g. when a previous update was missed.
+        """
+        if not self.driver.update_service_capabilities_delta(
+                service_name, host, capabilities_delta or {}, sequence):
+            share_rpcapi.ShareAPI().publish_service_capabilities(
+                context, host=host)
 
     def create_share_instance(self, context, request_spec=None,
                               filter_properties=None):
@@ -117,10 +134,32 @@ class SchedulerManager(manager.Manager):
                                                   constants.STATUS_ERROR},
                                                  context, ex, request_spec)
 
+    def create_share_instances(self, context, request_specs=None,
+                               filter_properties=None):
+        """Schedule a batch of share instances in a single pass."""
+        try:
+            failures = self.driver.schedule_create_shares(
+                context, request_specs or [], filter_properties)
+        except Exception as ex:
+            with excutils.save_and_reraise_exception():
+                for request_spec in request_specs or []:
+                    self._set_share_state_and_notify(
+                        'create_share', {'status': constants.STATUS_ERROR},
+                        context, ex, request_spec)
+
+        for request_spec, ex in failures:
+            self._set_share_state_and_notify(
+                'create_share', {'status': constants.STATUS_ERROR},
+                context, ex, request_spec)
+
     def get_pools(self, context, filters=None):
         """Get active pools from the scheduler's cache."""
         return self.driver.get_pools(context, filters)
 
+    def get_decision_cache_stats(self, context):
+        """Get the hit and miss counts of the scheduler decision cache."""
+        return self.driver.get_decision_cache_stats()
+
     def manage_share(self, context, share_id, driver_options, request_spec,
                      filter_properties=None):
         """Ensure that the host exists and can accept the share."""
@@ -200,6 +239,11 @@ class SchedulerManager(manager.Manager):
     def request_service_capabilities(self, context):
         share_rpcapi.ShareAPI().publish_service_capabilities(context)
 
+    @periodic_task.periodic_task(spacing=CONF.quota_usage_reconcile_interval)
+    def _reconcile_quota_usages(self, context):
+        """Recount the quota usages marked for a refresh by reservations."""
+        quota.QUOTAS.reconcile(context)
+
     def _set_cg_error_state(self, method, context, ex, request_spec):
         LOG.warning(_LW("Failed to schedule_%(method)s: %(ex)s"),
                     {"method": method, "ex": ex})
@@ -38,15 +38,19 @@ class SchedulerAPI(object):
         1.4 - Add migrate_share_to_host method
         1.5 - Add create_share_replica
         1.6 - Add manage_share
+        1.7 - Add create_share_instances
+        1.8 - Add sequence to update_service_capabilities and add
+            update_service_capabilities_delta
+        1.9 - Add get_decision_cache_stats
     """
 
-    RPC_API_VERSION = '1.6'
+    RPC_API_VERSION = '1.9'
 
     def __init__(self):
         super(SchedulerAPI, self).__init__()
         target = messaging.Target(topic=CONF.scheduler_topic,
                                   version=self.RPC_API_VERSION)
-        self.client = rpc.get_client(target, version_cap='1.6')
+        self.client = rpc.get_client(target, version_cap='1.9')
 
     def create_share_instance(self, context, request_spec=None,
                               filter_properties=None):
@@ -57,20 +61,52 @@ class SchedulerAPI(object):
                                  request_spec=request_spec_p,
                                  filter_properties=filter_properties)
 
+    def create_share_instances(self, context, request_specs=None,
+                               filter_properties=None):
+        request_specs_p = jsonutils.to_primitive(request_specs)
+        call_context = self.client.prepare(version='1.7')
+        return call_context.cast(context,
+                                 'create_share_instances',
+                                 request_specs=request_specs_p,
+                                 filter_properties=filter_properties)
+
     def update_service_capabilities(self, context,
                                     service_name, host,
-                                    capabilities):
-        call_context = self.client.prepare(fanout=True, version='1.0')
+                                    capabilities, sequence=None):
+        if sequence is None:
+            call_context = self.client.prepare(fanout=True, version='1.0')
+            call_context.cast(context,
+                              'update_service_capabilities',
+                              service_name=service_name,
+                              host=host,
+                              capabilities=capabilities)
+        else:
+            call_context = self.client.prepare(fanout=True, version='1.8')
+            call_context.cast(context,
+                              'update_service_capabilities',
+                              service_name=service_name,
+                              host=host,
+                              capabilities=capabilities,
+                              sequence=sequence)
+
+    def update_service_capabilities_delta(self, context, service_name, host,
+                                          capabilities_delta, sequence):
+        call_context = self.client.prepare(fanout=True, version='1.8')
         call_context.cast(context,
-                          'update_service_capabilities',
+                          'update_service_capabilities_delta',
                           service_name=service_name,
                           host=host,
-                          capabilities=capabilities)
+                          capabilities_delta=capabilities_delta,
+                          sequence=sequence)
 
     def get_pools(self, context, filters=None):
         call_context = self.client.prepare(version='1.1')
         return call_context.call(context, 'get_pools', filters=filters)
 
+    def get_decision_cache_stats(self, context):
+        call_context = self.client.prepare(version='1.9')
+        return call_context.call(context, 'get_decision_cache_stats')
+
     def create_consistency_group(self, context, cg_id, request_spec=None,
                                  filter_properties=None):
         request_spec_p = jsonutils.to_primitive(request_spec)
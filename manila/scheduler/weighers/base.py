@@ -19,10 +19,13 @@ Pluggable Weighing support
 
 import abc
 
+from oslo_utils import importutils
 import six
 
 from manila.scheduler import base_handler
 
+numpy = importutils.try_import('numpy')
+
 
 def normalize(weight_list, minval=None, maxval=None):
     """Normalize the values in a list between 0 and 1.0.
@@ -32,9 +35,12 @@ def normalize(weight_list, minval=None, maxval=None):
     will be used instead of the minimum and maximum from the list.
 
     If all the values are equal, they are normalized to 0.
+
+    weight_list may also be a NumPy array, in which case all of its values
+    are normalized at once.
     """
 
-    if not weight_list:
+    if not len(weight_list):
         return ()
 
     if maxval is None:
@@ -50,6 +56,8 @@ def normalize(weight_list, minval=None, maxval=None):
         return [0] * len(weight_list)
 
     range_ = maxval - minval
+    if numpy is not None and isinstance(weight_list, numpy.ndarray):
+        return ((weight_list - minval) / range_).tolist()
     return ((i - minval) / range_ for i in weight_list)
 
 
@@ -138,8 +146,8 @@ class BaseWeightHandler(base_handler.BaseHandler):
                                 minval=weigher.minval,
                                 maxval=weigher.maxval)
 
-            for i, weight in enumerate(weights):
-                obj = weighed_objs[i]
-                obj.weight += weigher.weight_multiplier() * weight
+            multiplier = weigher.weight_multiplier()
+            for obj, weight in zip(weighed_objs, weights):
+                obj.weight += multiplier * weight
 
         return sorted(weighed_objs, key=lambda x: x.weight, reverse=True)
@@ -25,15 +25,22 @@ free capacity, taking into account the reserved space.
 The default is to spread shares across all hosts evenly.  If you prefer
 stacking, you can set the 'capacity_weight_multiplier' option to a negative
 number and the weighing has the opposite effect of the default.
+
+If NumPy is available, the weights of all hosts are calculated at once with
+array operations instead of one host at a time.
 """
 
 import math
+import operator
 
 from oslo_config import cfg
-
+from oslo_utils import importutils
+import six
 
 from manila.scheduler.weighers import base_host
 
+numpy = importutils.try_import('numpy')
+
 capacity_weight_opts = [
     cfg.FloatOpt('capacity_weight_multiplier',
                  default=1.0,
@@ -76,7 +83,88 @@ class CapacityWeigher(base_host.BaseHostWeigher):
                 free = math.floor(free_space - total * reserved)
         return free
 
+    def _weigh_objects_vectorized(self, weighed_obj_list):
+        """Weigh all hosts at once, same as _weigh_object does for one.
+
+        Returns a NumPy array of weights, or None if the capacities reported
+        by the hosts cannot be laid out as arrays of numbers.
+        """
+        host_states = [weighed_obj.obj for weighed_obj in weighed_obj_list]
+        count = len(host_states)
+
+        def _array(values, dtype=float):
+            return numpy.fromiter(values, dtype, count)
+
+        def _attr_array(attr):
+            return _array(six.moves.map(operator.attrgetter(attr),
+                                        host_states))
+
+        try:
+            try:
+                total = _attr_array('total_capacity_gb')
+                free_space = _attr_array('free_capacity_gb')
+                unknown = numpy.zeros(count, dtype=bool)
+            except ValueError:
+                # NOTE: Some hosts report "unknown" capacity.
+                unknown = _array(
+                    ('unknown' in (host_state.total_capacity_gb,
+                                   host_state.free_capacity_gb)
+                     for host_state in host_states), dtype=bool)
+                total = _array(
+                    0 if is_unknown else host_state.total_capacity_gb
+                    for host_state, is_unknown in zip(host_states, unknown))
+                free_space = _array(
+                    0 if is_unknown else host_state.free_capacity_gb
+                    for host_state, is_unknown in zip(host_states, unknown))
+            thin = _array((bool(host_state.thin_provisioning)
+                           for host_state in host_states), dtype=bool)
+            provisioned = _attr_array('provisioned_capacity_gb')
+            max_over_subscription_ratio = _attr_array(
+                'max_over_subscription_ratio')
+            reserved_percentage = _attr_array('reserved_percentage')
+        except (TypeError, ValueError):
+            return None
+
+        reserved = reserved_percentage / 100
+        weights = numpy.where(
+            thin,
+            numpy.floor(total * max_over_subscription_ratio -
+                        provisioned - total * reserved),
+            numpy.floor(free_space - total * reserved))
+        # NOTE(u_glide): "unknown" capacity always sorts to the bottom
+        if CONF.capacity_weight_multiplier > 0:
+            weights[unknown] = float('-inf')
+        else:
+            weights[unknown] = float('inf')
+        if numpy.isnan(weights).any():
+            return None
+
+        minval = float(weights.min())
+        maxval = float(weights.max())
+        self.minval = minval if self.minval is None else min(self.minval,
+                                                             minval)
+        self.maxval = maxval if self.maxval is None else max(self.maxval,
+                                                             maxval)
+
+        # NOTE(u_glide): Replace -inf with (minimum - 1) and
+        # inf with (maximum + 1), see weigh_objects.
+        finite = weights[numpy.isfinite(weights)]
+        if self.minval == float('-inf'):
+            self.minval = (float(finite.min()) if finite.size
+                           else self.maxval) - 1
+            weights[weights == float('-inf')] = self.minval
+        elif self.maxval == float('inf'):
+            self.maxval = (float(finite.max()) if finite.size
+                           else self.minval) + 1
+            weights[weights == float('inf')] = self.maxval
+        return weights
+
     def weigh_objects(self, weighed_obj_list, weight_properties):
+        if numpy is not None and weighed_obj_list:
+            weights = self._weigh_objects_vectorized(weighed_obj_list)
+            if weights is not None:
+                return weights
+
         weights = super(CapacityWeigher, self).weigh_objects(weighed_obj_list,
                                                              weight_properties)
         # NOTE(u_glide): Replace -inf with (minimum - 1) and
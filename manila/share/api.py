@@ -73,6 +73,68 @@ class API(base.Base):
                share_network_id=None, share_type=None, is_public=False,
                consistency_group_id=None, cgsnapshot_member=None):
         """Create new share."""
+        share, instance_kwargs = self._create_share(
+            context, share_proto, size, name, description,
+            snapshot_id=snapshot_id, availability_zone=availability_zone,
+            metadata=metadata, share_network_id=share_network_id,
+            share_type=share_type, is_public=is_public,
+            consistency_group_id=consistency_group_id,
+            cgsnapshot_member=cgsnapshot_member)
+
+        self.create_instance(context, share, **instance_kwargs)
+
+        # Retrieve the share with instance details
+        share = self.db.share_get(context, share['id'])
+
+        return share
+
+    def create_many(self, context, share_requests):
+        """Create several shares, scheduling them in a single pass.
+
+        :param share_requests: list of dicts with the arguments of create()
+            for each of the shares.
+        :returns: list of the created shares.
+        """
+        shares = []
+        request_specs = []
+        try:
+            for share_request in share_requests:
+                share, instance_kwargs = self._create_share(
+                    context, **share_request)
+                if (instance_kwargs['host'] or
+                        instance_kwargs['cgsnapshot_member']):
+                    self.create_instance(context, share, **instance_kwargs)
+                else:
+                    request_spec, __ = (
+                        self._create_share_instance_and_get_request_spec(
+                            context, share,
+                            availability_zone=instance_kwargs[
+                                'availability_zone'],
+                            consistency_group=instance_kwargs[
+                                'consistency_group'],
+                            share_network_id=instance_kwargs[
+                                'share_network_id']))
+                    request_specs.append(request_spec)
+                shares.append(share)
+        finally:
+            # NOTE: shares created before a failure are scheduled anyway,
+            # they would otherwise be stuck in 'creating' state.
+            if request_specs:
+                self.scheduler_rpcapi.create_share_instances(
+                    context, request_specs=request_specs,
+                    filter_properties={})
+
+        return [self.db.share_get(context, share['id']) for share in shares]
+
+    def _create_share(self, context, share_proto, size, name, description,
+                      snapshot_id=None, availability_zone=None,
+                      metadata=None, share_network_id=None, share_type=None,
+                      is_public=False, consistency_group_id=None,
+                      cgsnapshot_member=None):
+        """Validate a share request and create the share in the database.
+
+        :returns: the share and the arguments of create_instance() for it.
+        """
         policy.check_policy(context, 'share', 'create')
 
         self._check_metadata_properties(context, metadata)
@@ -255,15 +317,11 @@ class API(base.Base):
             # It is common situation for different types of backends.
             host = snapshot['share']['instance']['host']
 
-        self.create_instance(context, share, share_network_id=share_network_id,
-                             host=host, availability_zone=availability_zone,
-                             consistency_group=consistency_group,
-                             cgsnapshot_member=cgsnapshot_member)
-
-        # Retrieve the share with instance details
-        share = self.db.share_get(context, share['id'])
-
-        return share
+        return share, {'share_network_id': share_network_id,
+                       'host': host,
+                       'availability_zone': availability_zone,
+                       'consistency_group': consistency_group,
+                       'cgsnapshot_member': cgsnapshot_member}
 
     def create_instance(self, context, share, share_network_id=None,
                         host=None, availability_zone=None,
@@ -984,7 +1042,8 @@ class API(base.Base):
             data_rpc = data_rpcapi.DataAPI()
             LOG.info(_LI("Sending request to get share migration information"
                      " of share %s.") % share['id'])
-            return data_rpc.data_copy_get_progress(context, share['id'])
+            return data_rpc.data_copy_get_progress(
+                context, share['id'], host=share['data_copy_host'])
 
         else:
             msg = _("Migration of share %s data copy progress cannot be "
@@ -1000,13 +1059,15 @@ class API(base.Base):
             share_rpc = share_rpcapi.ShareAPI()
             share_rpc.migration_cancel(context, share)
 
-        elif share['task_state'] == (
+        elif share['task_state'] in (
+                constants.TASK_STATE_DATA_COPYING_STARTING,
                 constants.TASK_STATE_DATA_COPYING_IN_PROGRESS):
 
             data_rpc = data_rpcapi.DataAPI()
             LOG.info(_LI("Sending request to cancel migration of "
                          "share %s.") % share['id'])
-            data_rpc.data_copy_cancel(context, share['id'])
+            data_rpc.data_copy_cancel(
+                context, share['id'], host=share['data_copy_host'])
 
         else:
             msg = _("Data copy for migration of share %s cannot be cancelled"
@@ -1063,7 +1124,8 @@ class API(base.Base):
         return rv
 
     def get_all(self, context, search_opts=None, sort_key='created_at',
-                sort_dir='desc'):
+                sort_dir='desc', limit=None, offset=None, marker=None,
+                view=constants.SHARE_VIEW_DETAIL):
         policy.check_policy(context, 'share', 'get_all')
 
         if search_opts is None:
@@ -1098,33 +1160,38 @@ class API(base.Base):
             raise exception.InvalidInput(reason=msg)
 
         is_public = search_opts.pop('is_public', False)
-        is_public = strutils.bool_from_string(is_public, strict=True)
+        try:
+            is_public = strutils.bool_from_string(is_public, strict=True)
+        except ValueError:
+            msg = _("Invalid value '%s' for the 'is_public' filter, a "
+                    "boolean is expected.") % is_public
+            raise exception.InvalidInput(reason=msg)
+        all_tenants = 'all_tenants' in search_opts
+        search_opts.pop('all_tenants', None)
+        share_server_id = search_opts.pop('share_server_id', None)
+
+        # NOTE: the rest of search options are share attributes, let the DB
+        # filter and paginate on them.
+        filters.update(search_opts)
+        query_args = {'limit': limit, 'offset': offset, 'marker': marker,
+                      'view': view}
 
         # Get filtered list of shares
-        if 'share_server_id' in search_opts:
+        if share_server_id is not None:
             # NOTE(vponomaryov): this is project_id independent
             policy.check_policy(context, 'share', 'list_by_share_server_id')
             shares = self.db.share_get_all_by_share_server(
-                context, search_opts.pop('share_server_id'), filters=filters,
-                sort_key=sort_key, sort_dir=sort_dir)
-        elif (context.is_admin and 'all_tenants' in search_opts):
+                context, share_server_id, filters=filters,
+                sort_key=sort_key, sort_dir=sort_dir, **query_args)
+        elif (context.is_admin and all_tenants):
             shares = self.db.share_get_all(
-                context, filters=filters, sort_key=sort_key, sort_dir=sort_dir)
+                context, filters=filters, sort_key=sort_key, sort_dir=sort_dir,
+                **query_args)
         else:
             shares = self.db.share_get_all_by_project(
                 context, project_id=context.project_id, filters=filters,
-                is_public=is_public, sort_key=sort_key, sort_dir=sort_dir)
-
-        # NOTE(vponomaryov): we do not need 'all_tenants' opt anymore
-        search_opts.pop('all_tenants', None)
-
-        if search_opts:
-            results = []
-            for s in shares:
-                # values in search_opts can be only strings
-                if all(s.get(k, None) == v for k, v in search_opts.items()):
-                    results.append(s)
-            shares = results
+                is_public=is_public, sort_key=sort_key, sort_dir=sort_dir,
+                **query_args)
         return shares
 
     def get_snapshot(self, context, snapshot_id):
@@ -20,9 +20,12 @@ Drivers for shares.
 
 import time
 
+import eventlet
 from oslo_config import cfg
 from oslo_log import log
+import six
 
+from manila.common import constants
 from manila import exception
 from manila.i18n import _, _LE
 from manila import network
@@ -97,6 +100,14 @@ share_opts = [
         deprecated_name='migration_readonly_support',
         help="Specify whether read only access rule mode is supported in this "
              "backend."),
+    cfg.BoolOpt(
+        'migration_two_phase_copy',
+        default=False,
+        help="Specify whether host-assisted migration of shares of this "
+             "backend copies their data in two phases: a bulk copy while "
+             "the share is still writable, then a copy of the files changed "
+             "in the meantime once the share is made read-only. This "
+             "shortens the time the share is read-only during migration."),
     cfg.StrOpt(
         "admin_network_config_group",
         help="If share driver requires to setup admin network for share, then "
@@ -478,6 +489,52 @@ class ShareDriver(object):
         """
         raise NotImplementedError()
 
+    def ensure_shares(self, context, share_instances, share_servers=None):
+        """Invoked to ensure that several shares are exported.
+
+        Called by the share manager on startup with all share instances of
+        the host that should be exported. This implementation calls
+        ensure_share for each of them, concurrently up to
+        'ensure_share_concurrency' shares at a time. Drivers able to check
+        many shares at once should override it.
+
+        :param context: Current context
+        :param share_instances: list of share instance models.
+        :param share_servers: dict mapping share instance IDs to the share
+            server models of the share instances, if any.
+        :return dict mapping share instance IDs to dicts with the keys
+            'export_locations' (None or list with export locations) and
+            'status' (STATUS_AVAILABLE if the share is exported,
+            STATUS_ERROR otherwise).
+        """
+        share_servers = share_servers or {}
+
+        def ensure_share(share_instance):
+            try:
+                export_locations = self.ensure_share(
+                    context, share_instance,
+                    share_server=share_servers.get(share_instance['id']))
+            except Exception as e:
+                LOG.error(
+                    _LE("Caught exception trying ensure share '%(s_id)s'. "
+                        "Exception: \n%(e)s."),
+                    {'s_id': share_instance['id'], 'e': six.text_type(e)})
+                return share_instance['id'], {
+                    'export_locations': None,
+                    'status': constants.STATUS_ERROR,
+                }
+            return share_instance['id'], {
+                'export_locations': export_locations,
+                'status': constants.STATUS_AVAILABLE,
+            }
+
+        concurrency = None
+        if self.configuration:
+            concurrency = self.configuration.safe_get(
+                'ensure_share_concurrency')
+        pool = eventlet.GreenPool(concurrency or 1)
+        return dict(pool.imap(ensure_share, share_instances))
+
     def allow_access(self, context, share, access, share_server=None):
         """Allow access to the share."""
         raise NotImplementedError()
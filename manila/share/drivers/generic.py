@@ -15,6 +15,7 @@
 
 """Generic Driver for shares."""
 
+import collections
 import os
 import time
 
@@ -851,6 +852,81 @@ class GenericShareDriver(driver.ExecuteMixin, driver.ShareDriver):
             helper.create_export(
                 share_server['backend_details'], share['name'], recreate=True)
 
+    def ensure_shares(self, context, share_instances, share_servers=None):
+        """Ensure that storage of several shares are mounted and exported.
+
+        Shares are grouped by share server, so that each service instance is
+        checked and its attached volumes are listed only once.
+        """
+        share_servers = share_servers or {}
+        groups = collections.OrderedDict()
+        for share in share_instances:
+            share_server = share_servers.get(share['id'])
+            key = share_server.get('id') if share_server else None
+            groups.setdefault(key, (share_server, []))[1].append(share)
+
+        results = {}
+        for share_server, shares in groups.values():
+            try:
+                results.update(self._ensure_shares_on_server(
+                    context, shares, share_server=share_server))
+            except Exception as e:
+                LOG.error(
+                    _LE("Failed to ensure shares of share server "
+                        "'%(server)s'. Exception: \n%(e)s."),
+                    {'server': share_server and share_server.get('id'),
+                     'e': six.text_type(e)})
+                for share in shares:
+                    results[share['id']] = {
+                        'export_locations': None,
+                        'status': const.STATUS_ERROR,
+                    }
+        return results
+
+    @ensure_server
+    def _ensure_shares_on_server(self, context, share_instances,
+                                 share_server=None):
+        """Ensure that shares of a single share server are exported."""
+        server_details = share_server['backend_details']
+        instance_id = server_details['instance_id']
+        attached_volumes = None
+        results = {}
+        for share in share_instances:
+            try:
+                helper = self._get_helper(share)
+                volume = self._get_volume(context, share['id'])
+
+                # NOTE(vponomaryov): volume can be None for managed shares
+                if volume:
+                    if (volume['status'] == 'in-use' and
+                            attached_volumes is None):
+                        attached_volumes = [
+                            vol.id for vol in
+                            self.compute_api.instance_volumes_list(
+                                self.admin_context, instance_id)]
+                    if (volume['status'] != 'in-use' or
+                            volume['id'] not in attached_volumes):
+                        volume = self._attach_volume(
+                            context, share, instance_id, volume)
+                    self._mount_device(share, server_details, volume)
+                    helper.create_export(
+                        server_details, share['name'], recreate=True)
+            except Exception as e:
+                LOG.error(
+                    _LE("Caught exception trying ensure share '%(s_id)s'. "
+                        "Exception: \n%(e)s."),
+                    {'s_id': share['id'], 'e': six.text_type(e)})
+                results[share['id']] = {
+                    'export_locations': None,
+                    'status': const.STATUS_ERROR,
+                }
+            else:
+                results[share['id']] = {
+                    'export_locations': None,
+                    'status': const.STATUS_AVAILABLE,
+                }
+        return results
+
     @ensure_server
     def update_access(self, context, share, access_rules, add_rules,
                       delete_rules, share_server=None):
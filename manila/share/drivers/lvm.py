@@ -27,6 +27,7 @@ from oslo_log import log
 from oslo_utils import importutils
 import six
 
+from manila.common import constants
 from manila import exception
 from manila.i18n import _
 from manila.i18n import _LE
@@ -256,6 +257,63 @@ class LVMShareDriver(LVMMixin, driver.ShareDriver):
         self._get_helper(share).create_export(self.share_server, share['name'],
                                               recreate=True)
 
+    def ensure_shares(self, context, share_instances, share_servers=None):
+        """Ensure that storage of several shares are mounted and exported.
+
+        Logical volumes and mounted devices are listed once for all shares
+        instead of being checked for each share. If they cannot be listed,
+        shares are ensured one by one.
+        """
+        try:
+            out, err = self._execute(
+                'lvs', '--noheadings', '-o', 'lv_name',
+                self.configuration.lvm_share_volume_group, run_as_root=True)
+            logical_volumes = set(out.split())
+            out, err = self._execute('mount', '-l', run_as_root=True)
+            mounted_devices = set(
+                line.split(' ')[0] for line in out.splitlines() if line)
+        except exception.ProcessExecutionError as e:
+            LOG.warning(_LW("Could not list logical volumes and mounted "
+                            "devices, ensuring shares one by one: %s"),
+                        six.text_type(e))
+            logical_volumes = mounted_devices = None
+
+        results = {}
+        for share in share_instances:
+            results[share['id']] = {
+                'export_locations': None,
+                'status': constants.STATUS_ERROR,
+            }
+            if logical_volumes is None:
+                try:
+                    self.ensure_share(context, share)
+                except Exception as e:
+                    LOG.error(
+                        _LE("Caught exception trying ensure share "
+                            "'%(s_id)s'. Exception: \n%(e)s."),
+                        {'s_id': share['id'], 'e': six.text_type(e)})
+                    continue
+                results[share['id']]['status'] = constants.STATUS_AVAILABLE
+                continue
+            if share['name'] not in logical_volumes:
+                LOG.error(_LE("Logical volume of share %s does not exist."),
+                          share['id'])
+                continue
+            device_name = self._get_local_path(share)
+            try:
+                if device_name not in mounted_devices:
+                    self._mount_device(share, device_name)
+                self._get_helper(share).create_export(
+                    self.share_server, share['name'], recreate=True)
+            except Exception as e:
+                LOG.error(
+                    _LE("Caught exception trying ensure share '%(s_id)s'. "
+                        "Exception: \n%(e)s."),
+                    {'s_id': share['id'], 'e': six.text_type(e)})
+                continue
+            results[share['id']]['status'] = constants.STATUS_AVAILABLE
+        return results
+
     def _delete_share(self, ctx, share):
         """Delete a share."""
         try:
@@ -596,6 +596,63 @@ class ZFSonLinuxShareDriver(zfs_utils.ExecuteMixin, driver.ShareDriver):
         else:
             raise exception.ShareResourceNotFound(share_id=share['id'])
 
+    def ensure_shares(self, context, share_instances, share_servers=None):
+        """Invoked to ensure that given shares are exported.
+
+        Datasets of a pool and their 'sharenfs' option are listed with a
+        single 'zfs list' command for all shares of that pool.
+        """
+        pool_datasets = {}
+        results = {}
+        for share in share_instances:
+            try:
+                export_locations = self._ensure_share_exported(
+                    share, pool_datasets)
+            except Exception as e:
+                LOG.warning(
+                    _LW("Failed to ensure share %(id)s. %(e)s"),
+                    {'id': share['id'], 'e': e})
+                results[share['id']] = {
+                    'export_locations': None,
+                    'status': constants.STATUS_ERROR,
+                }
+            else:
+                results[share['id']] = {
+                    'export_locations': export_locations,
+                    'status': constants.STATUS_AVAILABLE,
+                }
+        return results
+
+    def _ensure_share_exported(self, share, pool_datasets):
+        """Exports share using datasets listed once per pool.
+
+        :param pool_datasets: dict mapping pool names to dicts of the
+            'sharenfs' option values of their datasets, filled on demand.
+        """
+        dataset_name = self.private_storage.get(share['id'], 'dataset_name')
+        if not dataset_name:
+            dataset_name = self._get_dataset_name(share)
+
+        pool_name = share_utils.extract_host(share['host'], level='pool')
+        if pool_name not in pool_datasets:
+            out, err = self.zfs('list', '-r', '-o', 'name,sharenfs',
+                                pool_name)
+            pool_datasets[pool_name] = {
+                datum['NAME']: datum.get('SHARENFS')
+                for datum in self.parse_zfs_answer(out)}
+        if dataset_name not in pool_datasets[pool_name]:
+            raise exception.ShareResourceNotFound(share_id=share['id'])
+
+        ssh_cmd = '%(username)s@%(host)s' % {
+            'username': self.configuration.zfs_ssh_username,
+            'host': self.service_ip,
+        }
+        self.private_storage.update(share['id'], {'ssh_cmd': ssh_cmd})
+        if pool_datasets[pool_name][dataset_name] != 'off':
+            self.zfs('share', dataset_name)
+        return self._get_share_helper(
+            share['share_proto']).get_exports(dataset_name)
+
     def get_network_allocations_number(self):
         """ZFS does not handle networking. Return 0."""
         return 0
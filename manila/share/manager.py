@@ -19,9 +19,11 @@
 :share_driver: Used by :class:`ShareManager`.
 """
 
+import collections
 import copy
 import datetime
 
+import eventlet
 from oslo_config import cfg
 from oslo_log import log
 from oslo_serialization import jsonutils
@@ -95,6 +97,11 @@ share_manager_opts = [
                help='This value, specified in seconds, determines how often '
                     'the share manager will poll for the health '
                     '(replica_state) of each replica instance.'),
+    cfg.IntOpt('ensure_share_concurrency',
+               default=4,
+               min=1,
+               help='Maximum number of shares the share service re-exports '
+                    'concurrently on startup.'),
 ]
 
 CONF = cfg.CONF
@@ -115,6 +122,10 @@ MAPPING = {
 
 QUOTAS = quota.QUOTAS
 
+# Number of share instances whose export locations are written together
+# when re-exporting shares on startup.
+ENSURE_SHARE_EXPORT_LOCATIONS_BATCH_SIZE = 100
+
 
 def locked_share_replica_operation(operation):
     """Lock decorator for share replica operations.
@@ -169,7 +180,7 @@ def add_hooks(f):
 class ShareManager(manager.SchedulerDependentManager):
     """Manages NAS storages."""
 
-    RPC_API_VERSION = '1.11'
+    RPC_API_VERSION = '1.13'
 
     def __init__(self, share_driver=None, service_name=None, *args, **kwargs):
         """Load the driver from args, or from flags."""
@@ -267,67 +278,195 @@ class ShareManager(manager.SchedulerDependentManager):
         else:
             self.driver.initialized = True
 
+        # Let the schedulers place new shares on this backend while the
+        # existing ones are being re-exported.
+        self.publish_service_capabilities(ctxt)
+        self._ensure_share_instances(ctxt)
+
+        LOG.info(_LI("Finished initialization of driver: '%(driver)s"
+                     "@%(host)s'"),
+                 {"driver": self.driver.__class__.__name__,
+                  "host": self.host})
+
+    def _ensure_share_instances(self, ctxt):
+        """Re-export the share instances of this host.
+
+        Shares and share servers are fetched in bulk and the share instances
+        that should be exported are passed to the driver at once. The export
+        locations it returns are written in batches and access rules that
+        are out of sync are updated concurrently.
+        """
         share_instances = self.db.share_instances_get_all_by_host(ctxt,
                                                                   self.host)
         LOG.debug("Re-exporting %s shares", len(share_instances))
+        if not share_instances:
+            return
+
+        shares = {share['id']: share for share in
+                  self.db.share_get_all_by_host(ctxt, self.host)}
+        share_servers = {
+            share_server['id']: share_server for share_server in
+            self.db.share_server_get_all_by_host(ctxt, self.host)}
+
+        instances_to_ensure = []
+        instances_share_servers = {}
         for share_instance in share_instances:
-            share_ref = self.db.share_get(ctxt, share_instance['share_id'])
-            if share_ref.is_busy:
-                LOG.info(
-                    _LI("Share instance %(id)s: skipping export, "
-                        "because it is busy with an active task: %(task)s."),
-                    {'id': share_instance['id'],
-                     'task': share_ref['task_state']},
-                )
+            share_instance = self._get_share_instance_to_ensure(
+                ctxt, share_instance, shares)
+            if share_instance is None:
                 continue
+            share_server = share_servers.get(
+                share_instance['share_server_id'])
+            if share_server is None:
+                share_server = self._get_share_server(ctxt, share_instance)
+            instances_to_ensure.append(share_instance)
+            instances_share_servers[share_instance['id']] = share_server
+
+        if not instances_to_ensure:
+            return
 
-            if share_instance['status'] != constants.STATUS_AVAILABLE:
-                LOG.info(
-                    _LI("Share instance %(id)s: skipping export, "
-                        "because it has '%(status)s' status."),
-                    {'id': share_instance['id'],
-                     'status': share_instance['status']},
-                )
+        try:
+            results = self.driver.ensure_shares(
+                ctxt, instances_to_ensure,
+                share_servers=instances_share_servers)
+        except Exception as e:
+            LOG.warning(
+                _LW("Caught exception trying ensure shares, ensuring them "
+                    "one by one. Exception: \n%s."), six.text_type(e))
+            results = self._ensure_shares_one_by_one(
+                ctxt, instances_to_ensure, instances_share_servers)
+
+        export_locations = {}
+        instances_out_of_sync = []
+        for share_instance in instances_to_ensure:
+            result = results.get(share_instance['id']) or {}
+            if result.get('status') != constants.STATUS_AVAILABLE:
                 continue
+            if result.get('export_locations'):
+                export_locations[share_instance['id']] = (
+                    result['export_locations'])
+                if (len(export_locations) >=
+                        ENSURE_SHARE_EXPORT_LOCATIONS_BATCH_SIZE):
+                    self._update_export_locations(ctxt, export_locations)
+                    export_locations = {}
+            if share_instance['access_rules_status'] == (
+                    constants.STATUS_OUT_OF_SYNC):
+                instances_out_of_sync.append(share_instance)
+        self._update_export_locations(ctxt, export_locations)
 
-            self._ensure_share_instance_has_pool(ctxt, share_instance)
-            share_server = self._get_share_server(ctxt, share_instance)
-            share_instance = self.db.share_instance_get(
-                ctxt, share_instance['id'], with_share_data=True)
+        if not instances_out_of_sync:
+            return
+
+        def update_access_rules(share_instance):
+            try:
+                self.access_helper.update_access_rules(
+                    ctxt, share_instance['id'],
+                    share_server=instances_share_servers[share_instance['id']])
+            except Exception as e:
+                LOG.error(
+                    _LE("Unexpected error occurred while updating access "
+                        "rules for share instance %(s_id)s. "
+                        "Exception: \n%(e)s."),
+                    {'s_id': share_instance['id'], 'e': six.text_type(e)},
+                )
+
+        pool = eventlet.GreenPool(
+            self.configuration.safe_get('ensure_share_concurrency') or 1)
+        for share_instance in instances_out_of_sync:
+            pool.spawn_n(update_access_rules, share_instance)
+        pool.waitall()
+
+    def _ensure_shares_one_by_one(self, ctxt, share_instances,
+                                  share_servers):
+        """Ensure share instances with the driver's ensure_share.
+
+        :returns: the results of the share instances, as returned by the
+            driver's ensure_shares.
+        """
+        def ensure_share(share_instance):
             try:
                 export_locations = self.driver.ensure_share(
-                    ctxt, share_instance, share_server=share_server)
+                    ctxt, share_instance,
+                    share_server=share_servers[share_instance['id']])
             except Exception as e:
                 LOG.error(
                     _LE("Caught exception trying ensure share '%(s_id)s'. "
                         "Exception: \n%(e)s."),
                     {'s_id': share_instance['id'], 'e': six.text_type(e)},
                 )
-                continue
+                return share_instance['id'], {
+                    'export_locations': None,
+                    'status': constants.STATUS_ERROR,
+                }
+            return share_instance['id'], {
+                'export_locations': export_locations,
+                'status': constants.STATUS_AVAILABLE,
+            }
 
-            if export_locations:
+        pool = eventlet.GreenPool(
+            self.configuration.safe_get('ensure_share_concurrency') or 1)
+        return dict(pool.imap(ensure_share, share_instances))
+
+    def _update_export_locations(self, ctxt, export_locations):
+        """Write the export locations of several share instances."""
+        if not export_locations:
+            return
+        try:
+            self.db.share_export_locations_update_many(ctxt, export_locations)
+            return
+        except Exception as e:
+            LOG.warning(
+                _LW("Failed to update export locations of share instances "
+                    "at once, updating them one by one. Exception: \n%s."),
+                six.text_type(e))
+
+        for share_instance_id, instance_export_locations in (
+                export_locations.items()):
+            try:
                 self.db.share_export_locations_update(
-                    ctxt, share_instance['id'], export_locations)
+                    ctxt, share_instance_id, instance_export_locations)
+            except Exception as e:
+                LOG.error(
+                    _LE("Failed to update export locations of share "
+                        "instance %(s_id)s. Exception: \n%(e)s."),
+                    {'s_id': share_instance_id, 'e': six.text_type(e)},
+                )
 
-            if share_instance['access_rules_status'] == (
-                    constants.STATUS_OUT_OF_SYNC):
+    def _get_share_instance_to_ensure(self, ctxt, share_instance, shares):
+        """Prepare a share instance to be re-exported on startup.
 
-                try:
-                    self.access_helper.update_access_rules(
-                        ctxt, share_instance['id'], share_server=share_server)
-                except Exception as e:
-                    LOG.error(
-                        _LE("Unexpected error occurred while updating access "
-                            "rules for share instance %(s_id)s. "
-                            "Exception: \n%(e)s."),
-                        {'s_id': share_instance['id'], 'e': six.text_type(e)},
-                    )
+        :param shares: dict of the prefetched shares of this host.
+        :returns: the share instance with its share data, or None if it
+            should not be exported.
+        """
+        share_ref = shares.get(share_instance['share_id'])
+        if share_ref is None:
+            share_ref = self.db.share_get(ctxt, share_instance['share_id'])
+        if share_ref.is_busy:
+            LOG.info(
+                _LI("Share instance %(id)s: skipping export, "
+                    "because it is busy with an active task: %(task)s."),
+                {'id': share_instance['id'],
+                 'task': share_ref['task_state']},
+            )
+            return None
 
-        self.publish_service_capabilities(ctxt)
-        LOG.info(_LI("Finished initialization of driver: '%(driver)s"
-                     "@%(host)s'"),
-                 {"driver": self.driver.__class__.__name__,
-                  "host": self.host})
+        if share_instance['status'] != constants.STATUS_AVAILABLE:
+            LOG.info(
+                _LI("Share instance %(id)s: skipping export, "
+                    "because it has '%(status)s' status."),
+                {'id': share_instance['id'],
+                 'status': share_instance['status']},
+            )
+            return None
+
+        if share_utils.extract_host(share_instance['host'], 'pool') is None:
+            self._ensure_share_instance_has_pool(ctxt, share_instance)
+            share_instance = self.db.share_instance_get(
+                ctxt, share_instance['id'], with_share_data=True)
+        else:
+            share_instance.set_share_data(share_ref)
+        return share_instance
 
     def _provide_share_server_for_share(self, context, share_network_id,
                                         share_instance, snapshot=None,
@@ -580,6 +719,30 @@ class ShareManager(manager.SchedulerDependentManager):
         return self.driver.migration_get_info(context, share_instance,
                                               share_server)
 
+    @utils.require_driver_initialized
+    def migration_change_to_read_only(self, context, share_instance_id):
+        """Makes a share instance read-only for its data to be copied.
+
+        Called by the data service once the bulk copy of a two phase
+        host-assisted migration is done, before the changed files are
+        copied.
+        """
+        share_instance = self.db.share_instance_get(
+            context, share_instance_id, with_share_data=True)
+
+        share_ref = self.db.share_get(context, share_instance['share_id'])
+
+        share_server = self._get_share_server(context.elevated(),
+                                              share_instance)
+
+        helper = migration.ShareMigrationHelper(context, self.db, share_ref)
+
+        readonly_support = self.driver.configuration.safe_get(
+            'migration_readonly_rules_support')
+
+        helper.change_to_read_only(share_instance, share_server,
+                                   readonly_support, self.driver)
+
     @utils.require_driver_initialized
     def migration_get_driver_info(self, context, share_instance_id):
         share_instance = self.db.share_instance_get(
@@ -684,8 +847,14 @@ class ShareManager(manager.SchedulerDependentManager):
         readonly_support = self.driver.configuration.safe_get(
             'migration_readonly_rules_support')
 
-        helper.change_to_read_only(share_instance, share_server,
-                                   readonly_support, self.driver)
+        # NOTE: with two phase copies, the data service makes the share
+        # read-only itself once the bulk of its data is copied.
+        two_phase = self.driver.configuration.safe_get(
+            'migration_two_phase_copy')
+
+        if not two_phase:
+            helper.change_to_read_only(share_instance, share_server,
+                                       readonly_support, self.driver)
 
         try:
             new_share_instance = helper.create_instance_and_wait(
@@ -721,7 +890,7 @@ class ShareManager(manager.SchedulerDependentManager):
             data_rpc.migration_start(
                 context, share['id'], ignore_list, share_instance['id'],
                 new_share_instance['id'], src_migration_info,
-                dest_migration_info, notify)
+                dest_migration_info, notify, two_phase=bool(two_phase))
 
         except Exception:
             msg = _("Failed to obtain migration info from backends or"
@@ -1034,6 +1203,24 @@ class ShareManager(manager.SchedulerDependentManager):
 
             self.db.share_instance_update(context, share_instance_id, updates)
 
+    def create_share_instances(self, context, share_instances):
+        """Creates several share instances scheduled to this host.
+
+        Failure to create one of the share instances does not prevent the
+        creation of the remaining ones, each of them is put in error state
+        by create_share_instance().
+        """
+        for item in share_instances:
+            try:
+                self.create_share_instance(
+                    context, item['share_instance_id'],
+                    request_spec=item.get('request_spec'),
+                    filter_properties=item.get('filter_properties'),
+                    snapshot_id=item.get('snapshot_id'))
+            except Exception:
+                LOG.exception(_LE("Failed to create share instance %s."),
+                              item['share_instance_id'])
+
     def _update_share_replica_access_rules_state(self, context,
                                                  share_replica_id, state):
         """Update the access_rules_status for the share replica."""
@@ -1422,15 +1609,10 @@ class ShareManager(manager.SchedulerDependentManager):
     @utils.require_driver_initialized
     def periodic_share_replica_update(self, context):
         LOG.debug("Updating status of share replica instances.")
-        replicas = self.db.share_replicas_get_all(context,
-                                                  with_share_data=True)
+        replicas = self.db.share_replicas_get_all_by_host(
+            context, share_utils.extract_host(self.host),
+            with_share_data=True)
 
-        # Filter only non-active replicas belonging to this backend
-        def qualified_replica(r):
-            return (share_utils.extract_host(r['host']) ==
-                    share_utils.extract_host(self.host))
-
-        replicas = list(filter(lambda x: qualified_replica(x), replicas))
         for replica in replicas:
             self._share_replica_update(
                 context, replica, share_id=replica['share_id'])
@@ -2097,38 +2279,29 @@ class ShareManager(manager.SchedulerDependentManager):
         LOG.debug("Updating status of share replica snapshots.")
         transitional_statuses = (constants.STATUS_CREATING,
                                  constants.STATUS_DELETING)
-        replicas = self.db.share_replicas_get_all(context,
-                                                  with_share_data=True)
-
-        def qualified_replica(r):
-            # Filter non-active replicas belonging to this backend
-            return (share_utils.extract_host(r['host']) ==
-                    share_utils.extract_host(self.host) and
-                    r['replica_state'] != constants.REPLICA_STATE_ACTIVE)
-
-        host_replicas = list(filter(
-            lambda x: qualified_replica(x), replicas))
-        transitional_replica_snapshots = []
-
-        # Get snapshot instances for each replica that are in 'creating' or
-        # 'deleting' states.
-        for replica in host_replicas:
-            filters = {
-                'share_instance_ids': replica['id'],
-                'statuses': transitional_statuses,
-            }
-            replica_snapshots = (
+        # Get snapshot instances of non-active replicas belonging to this
+        # backend that are in 'creating' or 'deleting' states.
+        transitional_replica_snapshots = (
+            self.db.share_replica_snapshot_instances_get_all_by_host(
+                context, share_utils.extract_host(self.host),
+                statuses=transitional_statuses, with_share_data=True)
+        )
+        if not transitional_replica_snapshots:
+            return
+
+        # Get the instances of all these snapshots at once.
+        snapshot_ids = set(replica_snapshot['snapshot_id'] for
+                           replica_snapshot in transitional_replica_snapshots)
+        snapshot_instances = collections.defaultdict(list)
+        for snapshot_instance in (
                 self.db.share_snapshot_instance_get_all_with_filters(
-                    context, filters, with_share_data=True)
-            )
-            transitional_replica_snapshots.extend(replica_snapshots)
+                    context, {'snapshot_ids': list(snapshot_ids)})):
+            snapshot_instances[snapshot_instance['snapshot_id']].append(
+                snapshot_instance)
 
         for replica_snapshot in transitional_replica_snapshots:
-            replica_snapshots = (
-                self.db.share_snapshot_instance_get_all_with_filters(
-                    context,
-                    {'snapshot_ids': replica_snapshot['snapshot_id']})
-            )
+            replica_snapshots = snapshot_instances[
+                replica_snapshot['snapshot_id']]
             share_id = replica_snapshot['share']['share_id']
             self._update_replica_snapshot(
                 context, replica_snapshot,
@@ -2294,8 +2467,9 @@ class ShareManager(manager.SchedulerDependentManager):
     @add_hooks
     @utils.require_driver_initialized
     def publish_service_capabilities(self, context):
-        """Collect driver status and then publish it."""
+        """Collect driver status and then publish all of it."""
         self._report_driver_status(context)
+        self.reset_published_capabilities()
         self._publish_service_capabilities(context)
 
     def _form_server_setup_info(self, context, share_server, share_network):
@@ -59,6 +59,8 @@ class ShareAPI(object):
             migration_get_driver_info()
         1.11 - Add create_replicated_snapshot() and
             delete_replicated_snapshot() methods
+        1.12 - Add create_share_instances()
+        1.13 - Add migration_change_to_read_only()
     """
 
     BASE_RPC_API_VERSION = '1.0'
@@ -67,7 +69,7 @@ class ShareAPI(object):
         super(ShareAPI, self).__init__()
         target = messaging.Target(topic=CONF.share_topic,
                                   version=self.BASE_RPC_API_VERSION)
-        self.client = rpc.get_client(target, version_cap='1.11')
+        self.client = rpc.get_client(target, version_cap='1.13')
 
     def create_share_instance(self, context, share_instance, host,
                               request_spec, filter_properties,
@@ -82,6 +84,28 @@ class ShareAPI(object):
                           filter_properties=filter_properties,
                           snapshot_id=snapshot_id)
 
+    def create_share_instances(self, context, host, share_instances):
+        """Create several share instances scheduled to the same host.
+
+        :param share_instances: list of dicts with the share instance,
+            request_spec, filter_properties and snapshot_id of each share
+            instance to create.
+        """
+        new_host = utils.extract_host(host)
+        call_context = self.client.prepare(server=new_host, version='1.12')
+        share_instances_p = [
+            {
+                'share_instance_id': item['share_instance']['id'],
+                'request_spec': jsonutils.to_primitive(
+                    item['request_spec']),
+                'filter_properties': item['filter_properties'],
+                'snapshot_id': item.get('snapshot_id'),
+            } for item in share_instances
+        ]
+        call_context.cast(context,
+                          'create_share_instances',
+                          share_instances=share_instances_p)
+
     def manage_share(self, context, share, driver_options=None):
         host = utils.extract_host(share['instance']['host'])
         call_context = self.client.prepare(server=host, version='1.1')
@@ -139,6 +163,13 @@ class ShareAPI(object):
                                  'migration_get_info',
                                  share_instance_id=share_instance['id'])
 
+    def migration_change_to_read_only(self, context, share_instance):
+        new_host = utils.extract_host(share_instance['host'])
+        call_context = self.client.prepare(server=new_host, version='1.13')
+        call_context.call(context,
+                          'migration_change_to_read_only',
+                          share_instance_id=share_instance['id'])
+
     def migration_get_driver_info(self, context, share_instance):
         new_host = utils.extract_host(share_instance['host'])
         call_context = self.client.prepare(server=new_host, version='1.6')
@@ -210,8 +241,12 @@ class ShareAPI(object):
                           share_instance_id=share_instance['id'],
                           access_rules=self._get_access_rules(access))
 
-    def publish_service_capabilities(self, context):
-        call_context = self.client.prepare(fanout=True, version='1.0')
+    def publish_service_capabilities(self, context, host=None):
+        if host:
+            call_context = self.client.prepare(
+                server=utils.extract_host(host), version='1.0')
+        else:
+            call_context = self.client.prepare(fanout=True, version='1.0')
         call_context.cast(context, 'publish_service_capabilities')
 
     def extend_share(self, context, share, new_size, reservations):
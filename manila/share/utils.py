@@ -76,3 +76,85 @@ def append_host(host, pool):
 
     new_host = "#".join([host, pool])
     return new_host
+
+
+def _get_dict_delta(old, new):
+    delta = {}
+    updated = {key: value for key, value in new.items()
+               if key not in old or old[key] != value}
+    if updated:
+        delta['updated'] = updated
+    removed = sorted(key for key in old if key not in new)
+    if removed:
+        delta['removed'] = removed
+    return delta
+
+
+def _apply_dict_delta(old, delta):
+    new = dict(old)
+    for key in delta.get('removed', []):
+        new.pop(key, None)
+    new.update(delta.get('updated', {}))
+    return new
+
+
+def _is_pool_list(pools):
+    return (isinstance(pools, list) and
+            all(isinstance(pool, dict) and 'pool_name' in pool
+                for pool in pools))
+
+
+def get_capabilities_delta(old, new):
+    """Returns the changes between two capability reports of a backend.
+
+    Pools are compared one by one, by pool name, so that only the fields of
+    the pools that changed are part of the delta. The delta is empty when
+    nothing changed.
+    """
+    old_pools = old.get('pools')
+    new_pools = new.get('pools')
+    if not (_is_pool_list(old_pools) and _is_pool_list(new_pools)):
+        return _get_dict_delta(old, new)
+
+    delta = _get_dict_delta(
+        {k: v for k, v in old.items() if k != 'pools'},
+        {k: v for k, v in new.items() if k != 'pools'})
+
+    old_pools = {pool['pool_name']: pool for pool in old_pools}
+    pools_delta = {}
+    for pool in new_pools:
+        pool_delta = _get_dict_delta(
+            old_pools.pop(pool['pool_name'], {}), pool)
+        if pool_delta:
+            pools_delta[pool['pool_name']] = pool_delta
+    if pools_delta:
+        delta['pools'] = pools_delta
+    if old_pools:
+        delta['removed_pools'] = sorted(old_pools)
+    return delta
+
+
+def apply_capabilities_delta(capabilities, delta):
+    """Returns the capabilities updated with a delta.
+
+    :param capabilities: capabilities the delta was computed against.
+    :param delta: delta returned by get_capabilities_delta().
+    """
+    new = _apply_dict_delta(capabilities, delta)
+    if 'pools' not in delta and 'removed_pools' not in delta:
+        return new
+
+    removed_pools = set(delta.get('removed_pools', []))
+    pools_delta = dict(delta.get('pools', {}))
+    pools = []
+    for pool in capabilities.get('pools') or []:
+        pool_name = pool['pool_name']
+        if pool_name in removed_pools:
+            continue
+        pool_delta = pools_delta.pop(pool_name, None)
+        pools.append(_apply_dict_delta(pool, pool_delta)
+                     if pool_delta else pool)
+    for pool_name in sorted(pools_delta):
+        pools.append(_apply_dict_delta({}, pools_delta[pool_name]))
+    new['pools'] = pools
+    return new
@@ -21,6 +21,7 @@ inline callbacks.
 
 """
 
+import contextlib
 import os
 import shutil
 import uuid
@@ -34,6 +35,7 @@ import oslo_i18n
 from oslo_messaging import conffixture as messaging_conffixture
 import oslotest.base as base_test
 
+from manila.db import instrumentation
 from manila.db import migration
 from manila.db.sqlalchemy import api as db_api
 from manila.db.sqlalchemy import models as db_models
@@ -303,6 +305,17 @@ class TestCase(base_test.BaseTestCase):
             else:
                 self.assertEqual(sub_value, super_value)
 
+    @contextlib.contextmanager
+    def assertMaxStatements(self, budget):
+        """Assert the block runs at most 'budget' SQL statements."""
+        with instrumentation.collect() as statistics:
+            yield statistics
+        if statistics.statements > budget:
+            self.fail('%(statements)s SQL statements run, the budget is '
+                      '%(budget)s: %(statistics)s' % {
+                          'statements': statistics.statements,
+                          'budget': budget, 'statistics': statistics})
+
     def assertIn(self, a, b, *args, **kwargs):
         """Python < v2.7 compatibility.  Assert 'a' in 'b'."""
         try:
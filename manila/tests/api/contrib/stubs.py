@@ -138,7 +138,8 @@ def stub_snapshot_update(self, context, *args, **param):
 
 
 def stub_share_get_all_by_project(self, context, sort_key=None, sort_dir=None,
-                                  search_opts={}):
+                                  search_opts={}, limit=None, offset=None,
+                                  marker=None, view=None):
     return [stub_share_get(self, context, '1')]
 
 
@@ -19,6 +19,7 @@ import inspect
 
 from manila.api.openstack import wsgi
 from manila import context
+from manila.db import instrumentation
 from manila import exception
 from manila import policy
 from manila import test
@@ -220,6 +221,23 @@ class ResourceTest(test.TestCase):
         self.assertEqual(six.b('off'), response.body)
         self.assertEqual(200, response.status_int)
 
+    def test_resource_call_db_instrumentation_scope(self):
+        class Controller(object):
+            def index(self, req):
+                return 'off'
+
+        mock_scope = self.mock_object(instrumentation, 'scope',
+                                      mock.MagicMock())
+        req = webob.Request.blank('/tests')
+        app = fakes.TestRouter(Controller())
+        response = req.get_response(app)
+
+        self.assertEqual(six.b('off'), response.body)
+        mock_scope.assert_called_once_with(
+            instrumentation.SCOPE_API, 'GET Controller.index')
+        self.assertEqual(1, mock_scope.return_value.__enter__.call_count)
+        self.assertEqual(1, mock_scope.return_value.__exit__.call_count)
+
     def test_resource_not_authorized(self):
         class Controller(object):
             def index(self, req):
@@ -539,7 +539,7 @@ class ShareAPITest(test.TestCase):
             {'id': 'id3', 'display_name': 'n3'},
         ]
         self.mock_object(share_api.API, 'get_all',
-                         mock.Mock(return_value=shares))
+                         mock.Mock(return_value=[shares[1]]))
 
         result = self.controller.index(req)
 
@@ -562,6 +562,10 @@ class ShareAPITest(test.TestCase):
             sort_key=search_opts['sort_key'],
             sort_dir=search_opts['sort_dir'],
             search_opts=search_opts_expected,
+            limit=1,
+            offset=1,
+            marker=None,
+            view=constants.SHARE_VIEW_SUMMARY,
         )
         self.assertEqual(1, len(result['shares']))
         self.assertEqual(shares[1]['id'], result['shares'][0]['id'])
@@ -574,6 +578,54 @@ class ShareAPITest(test.TestCase):
     def test_share_list_summary_with_search_opts_by_admin(self):
         self._share_list_summary_with_search_opts(use_admin_context=True)
 
+    def test_share_list_summary_with_limit_and_marker(self):
+        req = fakes.HTTPRequest.blank(
+            '/shares?limit=1&offset=2&marker=fake_marker')
+        shares = [{'id': 'id1', 'display_name': 'n1'}]
+        self.mock_object(share_api.API, 'get_all',
+                         mock.Mock(return_value=shares))
+
+        result = self.controller.index(req)
+
+        share_api.API.get_all.assert_called_once_with(
+            req.environ['manila.context'], search_opts={},
+            sort_key='created_at', sort_dir='desc', limit=1, offset=2,
+            marker='fake_marker', view=constants.SHARE_VIEW_SUMMARY)
+        self.assertEqual(['id1'], [s['id'] for s in result['shares']])
+        next_link = result['shares_links'][0]
+        self.assertEqual('next', next_link['rel'])
+        self.assertIn('marker=id1', next_link['href'])
+        self.assertIn('limit=1', next_link['href'])
+        self.assertNotIn('offset', next_link['href'])
+
+    def test_share_list_summary_with_limit_over_max(self):
+        self.flags(osapi_max_limit=2)
+        req = fakes.HTTPRequest.blank('/shares?limit=5')
+        self.mock_object(share_api.API, 'get_all',
+                         mock.Mock(return_value=[]))
+
+        result = self.controller.index(req)
+
+        share_api.API.get_all.assert_called_once_with(
+            req.environ['manila.context'], search_opts={},
+            sort_key='created_at', sort_dir='desc', limit=2, offset=None,
+            marker=None, view=constants.SHARE_VIEW_SUMMARY)
+        self.assertNotIn('shares_links', result)
+
+    def test_share_list_summary_with_invalid_filter_value(self):
+        req = fakes.HTTPRequest.blank('/shares?is_public=fake')
+        self.mock_object(share_api.API, 'get_all', mock.Mock(
+            side_effect=exception.InvalidInput(reason='fake')))
+
+        self.assertRaises(webob.exc.HTTPBadRequest,
+                          self.controller.index, req)
+
+    def test_share_list_summary_with_invalid_offset(self):
+        req = fakes.HTTPRequest.blank('/shares?offset=-1')
+
+        self.assertRaises(webob.exc.HTTPBadRequest,
+                          self.controller.index, req)
+
     def test_share_list_summary(self):
         self.mock_object(share_api.API, 'get_all',
                          stubs.stub_share_get_all_by_project)
@@ -636,7 +688,7 @@ class ShareAPITest(test.TestCase):
             {'id': 'id3', 'display_name': 'n3'},
         ]
         self.mock_object(share_api.API, 'get_all',
-                         mock.Mock(return_value=shares))
+                         mock.Mock(return_value=[shares[1]]))
 
         result = self.controller.detail(req)
 
@@ -659,6 +711,10 @@ class ShareAPITest(test.TestCase):
             sort_key=search_opts['sort_key'],
             sort_dir=search_opts['sort_dir'],
             search_opts=search_opts_expected,
+            limit=1,
+            offset=1,
+            marker=None,
+            view=constants.SHARE_VIEW_DETAIL,
         )
         self.assertEqual(1, len(result['shares']))
         self.assertEqual(shares[1]['id'], result['shares'][0]['id'])
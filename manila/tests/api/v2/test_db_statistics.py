@@ -0,0 +1,100 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import ddt
+import mock
+import webob
+
+from manila.api.v2 import db_statistics
+from manila import context
+from manila.db import instrumentation
+from manila import exception
+from manila import policy
+from manila import test
+from manila.tests.api import fakes
+
+
+@ddt.ddt
+class DBStatisticsAPITest(test.TestCase):
+
+    def setUp(self):
+        super(DBStatisticsAPITest, self).setUp()
+        self.controller = db_statistics.DBStatisticsController()
+        self.ctxt = context.RequestContext('admin', 'fake', True)
+
+    def _get_request(self, version='2.16'):
+        req = fakes.HTTPRequest.blank('/db-statistics', version=version)
+        req.environ['manila.context'] = self.ctxt
+        return req
+
+    @ddt.data(True, False)
+    def test_index(self, enabled):
+        self.flags(db_instrumentation=enabled)
+        mock_policy_check = self.mock_object(policy, 'check_policy')
+        self.mock_object(instrumentation, 'get_statistics', mock.Mock(
+            return_value={
+                'api': {
+                    'GET ShareController.index': {
+                        'calls': 2, 'statements': 4, 'rows': 6, 'time': 0.1,
+                        'functions': {
+                            'share_get_all_by_project': {
+                                'statements': 4, 'rows': 6, 'time': 0.1},
+                        },
+                    },
+                },
+                'rpc': {},
+            }))
+
+        result = self.controller.index(self._get_request())
+
+        self.assertEqual(
+            {'db_statistics': {
+                'enabled': enabled,
+                'api': [{
+                    'name': 'GET ShareController.index',
+                    'calls': 2, 'statements': 4, 'rows': 6, 'time': 0.1,
+                    'functions': [{
+                        'name': 'share_get_all_by_project',
+                        'statements': 4, 'rows': 6, 'time': 0.1,
+                    }],
+                }],
+                'rpc': [],
+            }},
+            result)
+        mock_policy_check.assert_called_once_with(
+            self.ctxt, 'db_statistics', 'index')
+
+    def test_reset(self):
+        mock_policy_check = self.mock_object(policy, 'check_policy')
+        mock_reset = self.mock_object(instrumentation, 'reset_statistics')
+
+        result = self.controller.reset(self._get_request())
+
+        self.assertEqual(202, result.status_int)
+        mock_reset.assert_called_once_with()
+        mock_policy_check.assert_called_once_with(
+            self.ctxt, 'db_statistics', 'reset')
+
+    @ddt.data('index', 'reset')
+    def test_unsupported_version(self, method):
+        self.assertRaises(exception.VersionNotFoundForAPIMethod,
+                          getattr(self.controller, method),
+                          self._get_request(version='2.15'))
+
+    @ddt.data('index', 'reset')
+    def test_not_admin(self, method):
+        req = self._get_request()
+        req.environ['manila.context'] = context.RequestContext(
+            'fake', 'fake', is_admin=False)
+
+        self.assertRaises(webob.exc.HTTPForbidden,
+                          getattr(self.controller, method), req)
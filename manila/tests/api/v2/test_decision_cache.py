@@ -0,0 +1,72 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import ddt
+import mock
+import webob
+
+from manila.api.v2 import decision_cache
+from manila import context
+from manila import exception
+from manila import policy
+from manila.scheduler import rpcapi
+from manila import test
+from manila.tests.api import fakes
+
+
+@ddt.ddt
+class DecisionCacheAPITest(test.TestCase):
+
+    def setUp(self):
+        super(DecisionCacheAPITest, self).setUp()
+        self.controller = decision_cache.DecisionCacheController()
+        self.ctxt = context.RequestContext('admin', 'fake', True)
+
+    def _get_request(self, version='2.19'):
+        req = fakes.HTTPRequest.blank('/scheduler-stats/decision-cache',
+                                      version=version)
+        req.environ['manila.context'] = self.ctxt
+        return req
+
+    @ddt.data(
+        ({'hits': 2, 'misses': 1, 'invalidations': 1, 'size': 1},
+         {'enabled': True, 'hits': 2, 'misses': 1, 'invalidations': 1,
+          'size': 1}),
+        (None,
+         {'enabled': False, 'hits': 0, 'misses': 0, 'invalidations': 0,
+          'size': 0}),
+    )
+    @ddt.unpack
+    def test_index(self, stats, expected):
+        mock_policy_check = self.mock_object(policy, 'check_policy')
+        self.mock_object(rpcapi.SchedulerAPI, 'get_decision_cache_stats',
+                         mock.Mock(return_value=stats))
+
+        result = self.controller.index(self._get_request())
+
+        self.assertEqual({'decision_cache': expected}, result)
+        rpcapi.SchedulerAPI.get_decision_cache_stats.assert_called_once_with(
+            self.ctxt)
+        mock_policy_check.assert_called_once_with(
+            self.ctxt, 'scheduler_stats:decision_cache', 'index')
+
+    def test_index_unsupported_version(self):
+        self.assertRaises(exception.VersionNotFoundForAPIMethod,
+                          self.controller.index,
+                          self._get_request(version='2.18'))
+
+    def test_index_not_admin(self):
+        req = self._get_request()
+        req.environ['manila.context'] = context.RequestContext(
+            'fake', 'fake', is_admin=False)
+
+        self.assertRaises(webob.exc.HTTPForbidden, self.controller.index, req)
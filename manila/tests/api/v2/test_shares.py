@@ -179,6 +179,41 @@ class ShareAPITest(test.TestCase):
             expected['share'].pop('task_state')
         self.assertEqual(expected, res_dict)
 
+    def test_share_create_many(self):
+        self.mock_object(share_api.API, 'create_many', mock.Mock(
+            return_value=[self.create_mock.return_value] * 2))
+        share = copy.deepcopy(self.share)
+        share.pop('availability_zone')
+        body = {"shares": [copy.deepcopy(share), copy.deepcopy(share)]}
+        req = fakes.HTTPRequest.blank('/shares', version='2.18')
+
+        res_dict = self.controller.create(req, body)
+
+        expected_request = {
+            'share_proto': 'FAKEPROTO', 'size': 100,
+            'name': 'Share Test Name', 'description': 'Share Test Desc',
+            'availability_zone': None, 'metadata': None, 'is_public': False,
+            'consistency_group_id': None, 'snapshot_id': None,
+        }
+        share_api.API.create_many.assert_called_once_with(
+            req.environ['manila.context'],
+            [expected_request, expected_request])
+        self.assertEqual(2, len(res_dict['shares']))
+        self.assertEqual('1', res_dict['shares'][0]['id'])
+
+    @ddt.data({'version': '2.18', 'body': {'shares': []}},
+              {'version': '2.18', 'body': {'shares': {'size': 1}}},
+              {'version': '2.18', 'body': {'shares': ['fake']}},
+              {'version': '2.17', 'body': {'shares': [{'size': 1}]}})
+    @ddt.unpack
+    def test_share_create_many_invalid(self, version, body):
+        self.mock_object(share_api.API, 'create_many')
+        req = fakes.HTTPRequest.blank('/shares', version=version)
+
+        self.assertRaises(webob.exc.HTTPUnprocessableEntity,
+                          self.controller.create, req, body)
+        self.assertFalse(share_api.API.create_many.called)
+
     def test_share_create_with_valid_default_share_type(self):
         self.mock_object(share_types, 'get_share_type_by_name',
                          mock.Mock(return_value=self.vt))
@@ -564,25 +599,34 @@ class ShareAPITest(test.TestCase):
                           self.controller.migration_cancel, req, share['id'],
                           body)
 
-    def test_migration_get_progress(self):
+    @ddt.data('2.15', '2.17')
+    def test_migration_get_progress(self, version):
         share = db_utils.create_share()
         req = fakes.HTTPRequest.blank('/shares/%s/action' % share['id'],
-                                      use_admin_context=True, version='2.15')
+                                      use_admin_context=True, version=version)
         req.method = 'POST'
         req.headers['content-type'] = 'application/json'
         req.api_version_request.experimental = True
 
         body = {'migration_get_progress': None}
-        expected = {'total_progress': 'fake',
+        progress = {'total_progress': 'fake',
                     'current_file_progress': 'fake',
                     'current_file_path': 'fake',
+                    'throughput': 'fake',
+                    'eta': 'fake',
+                    'phase': 'fake',
                     }
+        expected = dict(progress)
+        del expected['phase']
+        if version == '2.15':
+            del expected['throughput']
+            del expected['eta']
 
         self.mock_object(share_api.API, 'get',
                          mock.Mock(return_value=share))
 
         self.mock_object(share_api.API, 'migration_get_progress',
-                         mock.Mock(return_value=expected))
+                         mock.Mock(return_value=progress))
 
         response = self.controller.migration_get_progress(req, share['id'],
                                                           body)
@@ -937,7 +981,7 @@ class ShareAPITest(test.TestCase):
             {'id': 'id3', 'display_name': 'n3'},
         ]
         self.mock_object(share_api.API, 'get_all',
-                         mock.Mock(return_value=shares))
+                         mock.Mock(return_value=[shares[1]]))
 
         result = self.controller.index(req)
 
@@ -960,6 +1004,10 @@ class ShareAPITest(test.TestCase):
             sort_key=search_opts['sort_key'],
             sort_dir=search_opts['sort_dir'],
             search_opts=search_opts_expected,
+            limit=1,
+            offset=1,
+            marker=None,
+            view=constants.SHARE_VIEW_SUMMARY,
         )
         self.assertEqual(1, len(result['shares']))
         self.assertEqual(shares[1]['id'], result['shares'][0]['id'])
@@ -1036,7 +1084,7 @@ class ShareAPITest(test.TestCase):
             {'id': 'id3', 'display_name': 'n3'},
         ]
         self.mock_object(share_api.API, 'get_all',
-                         mock.Mock(return_value=shares))
+                         mock.Mock(return_value=[shares[1]]))
 
         result = self.controller.detail(req)
 
@@ -1059,6 +1107,10 @@ class ShareAPITest(test.TestCase):
             sort_key=search_opts['sort_key'],
             sort_dir=search_opts['sort_dir'],
             search_opts=search_opts_expected,
+            limit=1,
+            offset=1,
+            marker=None,
+            view=constants.SHARE_VIEW_DETAIL,
         )
         self.assertEqual(1, len(result['shares']))
         self.assertEqual(shares[1]['id'], result['shares'][0]['id'])
@@ -1918,3 +1970,29 @@ class ShareManageTest(test.TestCase):
                           self.controller.manage,
                           req,
                           share_id)
+
+
+@ddt.ddt
+class ShareListStatementBudgetTest(test.TestCase):
+    """Share lists must run a fixed number of statements."""
+
+    def setUp(self):
+        super(ShareListStatementBudgetTest, self).setUp()
+        self.controller = shares.ShareController()
+        ctxt = context.get_admin_context()
+        for i in range(3):
+            share = db_utils.create_share(project_id='fake')
+            db.share_export_locations_update(
+                ctxt, share.instance['id'],
+                [{'path': 'fake_host:/share%s' % i,
+                  'metadata': {'preferred': 'True'}}], False)
+
+    @ddt.data(('/shares', 'index', 2), ('/shares/detail', 'detail', 8))
+    @ddt.unpack
+    def test_list(self, path, method, budget):
+        req = fakes.HTTPRequest.blank(path, version='2.15')
+
+        with self.assertMaxStatements(budget):
+            result = getattr(self.controller, method)(req)
+
+        self.assertEqual(3, len(result['shares']))
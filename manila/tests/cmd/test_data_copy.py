@@ -0,0 +1,71 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import ddt
+import mock
+from oslo_serialization import jsonutils
+import six
+
+from manila.cmd import data_copy
+from manila import test
+
+
+@ddt.ddt
+class ManilaCmdDataCopyTestCase(test.TestCase):
+
+    def setUp(self):
+        super(ManilaCmdDataCopyTestCase, self).setUp()
+        self.stdout = six.StringIO()
+        self.mock_object(data_copy.sys, 'stdout', self.stdout)
+        self.mock_object(data_copy.sys, 'stderr', six.StringIO())
+        self.mock_object(data_copy.sys, 'stdin', six.StringIO())
+        self.mock_object(data_copy.logging, 'basicConfig')
+        self.engine = mock.Mock()
+        self.engine.get_progress.return_value = {'total_progress': 50}
+        self.mock_object(data_copy.copy_engine, 'CopyEngine',
+                         mock.Mock(return_value=self.engine))
+
+    @ddt.data(True, False)
+    def test_main(self, completed):
+        self.engine.run.return_value = completed
+
+        result = data_copy.main(['--workers', '8', '--ignore', 'lost+found',
+                                 '--ignore', '.snapshot', '--resume',
+                                 '--manifest', 'manifest', '--delta',
+                                 '--bwlimit', '1024', 'src', 'dest'])
+
+        self.assertEqual(0, result)
+        data_copy.copy_engine.CopyEngine.assert_called_once_with(
+            'src', 'dest', ['lost+found', '.snapshot'], 8, True, 'manifest',
+            True, 1024)
+        self.assertEqual(
+            {'total_progress': 50, 'cancelled': not completed},
+            jsonutils.loads(self.stdout.getvalue().splitlines()[-1]))
+
+    def test_main_error(self):
+        self.engine.run.side_effect = OSError('fake')
+
+        result = data_copy.main(['src', 'dest'])
+
+        self.assertEqual(1, result)
+        self.assertEqual('fake\n', data_copy.sys.stderr.getvalue())
+        self.assertEqual('', self.stdout.getvalue())
+
+    def test_main_delta_without_manifest(self):
+        self.assertRaises(SystemExit, data_copy.main,
+                          ['--delta', 'src', 'dest'])
+        self.assertFalse(data_copy.copy_engine.CopyEngine.called)
+
+    def test_cancel_on_eof(self):
+        data_copy._cancel_on_eof(self.engine)
+
+        self.engine.cancel.assert_called_once_with()
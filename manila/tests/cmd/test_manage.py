@@ -24,6 +24,7 @@ import six
 
 from manila.cmd import manage as manila_manage
 from manila import context
+from manila.data import rpcapi as data_rpcapi
 from manila import db
 from manila.db import migration
 from manila import test
@@ -45,6 +46,7 @@ class ManilaCmdManageTestCase(test.TestCase):
         self.config_commands = manila_manage.ConfigCommands()
         self.get_log_cmds = manila_manage.GetLogCommands()
         self.service_cmds = manila_manage.ServiceCommands()
+        self.data_cmds = manila_manage.DataCommands()
 
     def test_param2id_is_uuid_like(self):
         obj_id = '12345678123456781234567812345678'
@@ -318,6 +320,47 @@ class ManilaCmdManageTestCase(test.TestCase):
             service_get_all.assert_called_with(ctxt)
             service_is_up.assert_called_with(service)
 
+    @mock.patch.object(data_rpcapi.DataAPI, 'get_jobs')
+    @mock.patch('manila.rpc.initialized', mock.Mock(return_value=True))
+    @mock.patch.object(context, 'get_admin_context')
+    def test_data_commands_jobs(self, get_admin_context, get_jobs):
+        ctxt = context.RequestContext('fake-user', 'fake-project')
+        get_admin_context.return_value = ctxt
+        get_jobs.return_value = {
+            'host2': [{'share_id': 'share3', 'state': 'queued',
+                       'queued_at': '2016-06-30T11:22:35',
+                       'started_at': None, 'progress': None}],
+            'host1': [{'share_id': 'share1', 'state': 'running',
+                       'queued_at': '2016-06-30T11:22:33',
+                       'started_at': '2016-06-30T11:22:34',
+                       'progress': {'total_progress': 42}}],
+        }
+        with mock.patch('sys.stdout', new=six.StringIO()) as fake_out:
+            format = "%-36s %-36s %-8s %-26s %-26s %-8s"
+            expected_out = '\n'.join([
+                format % ('Host', 'Share ID', 'State', 'Queued At',
+                          'Started At', 'Progress'),
+                format % ('host1', 'share1', 'running', '2016-06-30T11:22:33',
+                          '2016-06-30T11:22:34', 42),
+                format % ('host2', 'share3', 'queued', '2016-06-30T11:22:35',
+                          '-', '-'),
+            ]) + '\n'
+
+            self.data_cmds.jobs()
+
+            self.assertEqual(expected_out, fake_out.getvalue())
+            get_jobs.assert_called_once_with(ctxt)
+
+    @mock.patch.object(data_rpcapi.DataAPI, 'get_jobs',
+                       mock.Mock(return_value={}))
+    @mock.patch('manila.rpc.init')
+    @mock.patch('manila.rpc.initialized', mock.Mock(return_value=False))
+    def test_data_commands_jobs_rpc_init(self, rpc_init):
+        with mock.patch('sys.stdout', new=six.StringIO()):
+            self.data_cmds.jobs()
+
+        rpc_init.assert_called_once_with(CONF)
+
     def test_methods_of(self):
         obj = type('Fake', (object,),
                    {name: lambda: 'fake_' for name in ('_a', 'b', 'c')})
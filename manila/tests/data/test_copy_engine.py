@@ -0,0 +1,315 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import errno
+import itertools
+import os
+
+import ddt
+import fixtures
+import mock
+
+from manila.data import copy_engine
+from manila import test
+
+
+@ddt.ddt
+class CopyEngineTestCase(test.TestCase):
+
+    def setUp(self):
+        super(CopyEngineTestCase, self).setUp()
+        tmp = self.useFixture(fixtures.TempDir()).path
+        self.src = os.path.join(tmp, 'src')
+        self.dest = os.path.join(tmp, 'dest')
+        os.makedirs(os.path.join(self.src, 'dir1', 'dir2'))
+        os.mkdir(os.path.join(self.src, 'lost+found'))
+        self._write('file1', b'a' * 10)
+        self._write(os.path.join('dir1', 'file2'), b'b' * 20)
+        self._write(os.path.join('dir1', 'dir2', 'file3'), b'')
+        self._write(os.path.join('lost+found', 'file4'), b'c' * 30)
+        os.link(os.path.join(self.src, 'file1'),
+                os.path.join(self.src, 'dir1', 'link1'))
+        os.symlink('../file1', os.path.join(self.src, 'dir1', 'symlink1'))
+        os.chmod(os.path.join(self.src, 'dir1', 'file2'), 0o640)
+        os.chmod(os.path.join(self.src, 'dir1'), 0o750)
+        os.utime(os.path.join(self.src, 'dir1', 'file2'), (1000, 2000))
+        os.utime(os.path.join(self.src, 'dir1'), (3000, 4000))
+
+    def _write(self, path, data):
+        with open(os.path.join(self.src, path), 'wb') as f:
+            f.write(data)
+
+    def _read(self, path):
+        with open(os.path.join(self.dest, path), 'rb') as f:
+            return f.read()
+
+    @ddt.data(1, 4)
+    def test_run(self, workers):
+        engine = copy_engine.CopyEngine(self.src, self.dest, ['lost+found'],
+                                        workers)
+
+        self.assertTrue(engine.run())
+
+        self.assertEqual(b'a' * 10, self._read('file1'))
+        self.assertEqual(b'b' * 20, self._read(os.path.join('dir1', 'file2')))
+        self.assertEqual(b'', self._read(os.path.join('dir1', 'dir2',
+                                                      'file3')))
+        self.assertFalse(os.path.exists(os.path.join(self.dest,
+                                                     'lost+found')))
+        self.assertEqual(
+            os.stat(os.path.join(self.dest, 'file1')).st_ino,
+            os.stat(os.path.join(self.dest, 'dir1', 'link1')).st_ino)
+        self.assertEqual(
+            '../file1', os.readlink(os.path.join(self.dest, 'dir1',
+                                                 'symlink1')))
+        file_stat = os.stat(os.path.join(self.dest, 'dir1', 'file2'))
+        self.assertEqual(0o640, file_stat.st_mode & 0o777)
+        self.assertEqual(2000, file_stat.st_mtime)
+        dir_stat = os.stat(os.path.join(self.dest, 'dir1'))
+        self.assertEqual(0o750, dir_stat.st_mode & 0o777)
+        self.assertEqual(4000, dir_stat.st_mtime)
+        progress = engine.get_progress()
+        self.assertIsNotNone(progress.pop('last_path'))
+        self.assertIsNotNone(progress.pop('current_file_path'))
+        self.assertGreater(progress.pop('throughput'), 0)
+        self.assertEqual(
+            {'total_progress': 100, 'total_size': 30, 'current_size': 30,
+             'total_files': 5, 'copied_files': 5,
+             'current_file_progress': 100, 'eta': 0},
+            progress)
+
+    def test_run_resume(self):
+        copy_engine.CopyEngine(self.src, self.dest).run()
+        # NOTE: a partial copy, as left by an interrupted copy.
+        with open(os.path.join(self.dest, 'dir1', 'file2'), 'wb') as f:
+            f.write(b'b' * 5)
+        self.mock_object(copy_engine, 'copy_file_data',
+                         mock.Mock(side_effect=copy_engine.copy_file_data))
+        engine = copy_engine.CopyEngine(self.src, self.dest, resume=True)
+
+        self.assertTrue(engine.run())
+
+        copy_engine.copy_file_data.assert_called_once_with(
+            os.path.join(self.src, 'dir1', 'file2'),
+            os.path.join(self.dest, 'dir1', 'file2'), mock.ANY, mock.ANY)
+        self.assertEqual(b'b' * 20, self._read(os.path.join('dir1', 'file2')))
+        self.assertEqual(60, engine.current_size)
+        self.assertEqual(100, engine.get_progress()['total_progress'])
+
+    def test_run_delta(self):
+        manifest = os.path.join(self.src, '..', 'manifest')
+        copy_engine.CopyEngine(self.src, self.dest, ['lost+found'],
+                               manifest=manifest).run()
+        src_stat = os.stat(os.path.join(self.src, 'dir1', 'file2'))
+        # NOTE: replaced by a file of the same size and modification time.
+        self._write(os.path.join('dir1', 'new'), b'd' * 20)
+        os.utime(os.path.join(self.src, 'dir1', 'new'),
+                 (src_stat.st_atime, src_stat.st_mtime))
+        os.rename(os.path.join(self.src, 'dir1', 'new'),
+                  os.path.join(self.src, 'dir1', 'file2'))
+        os.unlink(os.path.join(self.src, 'dir1', 'dir2', 'file3'))
+        os.rmdir(os.path.join(self.src, 'dir1', 'dir2'))
+        self._write('file5', b'e' * 5)
+        self.mock_object(copy_engine, 'copy_file_data',
+                         mock.Mock(side_effect=copy_engine.copy_file_data))
+        engine = copy_engine.CopyEngine(self.src, self.dest, ['lost+found'],
+                                        manifest=manifest, delta=True)
+
+        self.assertTrue(engine.run())
+
+        self.assertEqual(
+            sorted([os.path.join(self.src, 'dir1', 'file2'),
+                    os.path.join(self.src, 'file5')]),
+            sorted(call[0][0] for call in
+                   copy_engine.copy_file_data.call_args_list))
+        self.assertEqual(b'd' * 20, self._read(os.path.join('dir1', 'file2')))
+        self.assertEqual(b'e' * 5, self._read('file5'))
+        self.assertFalse(os.path.exists(os.path.join(self.dest, 'dir1',
+                                                     'dir2')))
+        self.assertEqual(
+            os.stat(os.path.join(self.dest, 'file1')).st_ino,
+            os.stat(os.path.join(self.dest, 'dir1', 'link1')).st_ino)
+
+    def test_prune(self):
+        os.makedirs(os.path.join(self.dest, 'dir1', 'file2'))
+        os.makedirs(os.path.join(self.dest, 'lost+found'))
+        with open(os.path.join(self.dest, 'dir1', 'old'), 'wb') as f:
+            f.write(b'old')
+        os.symlink('file1', os.path.join(self.dest, 'file1'))
+        engine = copy_engine.CopyEngine(self.src, self.dest, ['lost+found'])
+        dirs, files = engine.walk()
+
+        engine.prune(dirs + files)
+
+        self.assertEqual(['dir1', 'lost+found'],
+                         sorted(os.listdir(self.dest)))
+        self.assertEqual([], os.listdir(os.path.join(self.dest, 'dir1')))
+
+    def test_run_removed_file(self):
+        def copy_file_data(src, *args):
+            os.unlink(src)
+            raise IOError(errno.ENOENT, 'fake')
+
+        self.mock_object(copy_engine, 'copy_file_data',
+                         mock.Mock(side_effect=copy_file_data))
+        engine = copy_engine.CopyEngine(self.src, self.dest, ['lost+found'])
+
+        self.assertTrue(engine.run())
+
+        self.assertFalse(os.path.exists(os.path.join(self.dest, 'file1')))
+        self.assertEqual(5, engine.copied_files)
+
+    def test_run_missing_src(self):
+        engine = copy_engine.CopyEngine(os.path.join(self.src, 'fake'),
+                                        self.dest)
+
+        self.assertRaises(OSError, engine.run)
+
+    def test_write_file_planted_link(self):
+        victim = os.path.join(self.src, 'file1')
+        path = os.path.join(self.dest, 'manifest')
+        os.mkdir(self.dest)
+        os.symlink(victim, path + '.tmp')
+
+        copy_engine.write_file(path, 'data')
+
+        with open(path) as f:
+            self.assertEqual('data', f.read())
+        self.assertFalse(os.path.islink(path))
+        self.assertFalse(os.path.lexists(path + '.tmp'))
+        with open(victim, 'rb') as f:
+            self.assertEqual(b'a' * 10, f.read())
+
+    def test_load_manifest(self):
+        manifest = os.path.join(self.src, 'manifest')
+        self.mock_object(copy_engine.LOG, 'warning')
+
+        self.assertEqual({}, copy_engine.load_manifest(manifest))
+
+        with open(manifest, 'w') as f:
+            f.write('{"file1": ')
+
+        self.assertEqual({}, copy_engine.load_manifest(manifest))
+        self.assertTrue(copy_engine.LOG.warning.called)
+
+    def test_get_progress_current_file(self):
+        def copy_file_data(src, dest, callback, cancelled):
+            open(dest, 'wb').close()
+            callback(5)
+            progress.append(engine.get_progress())
+
+        progress = []
+        self.mock_object(copy_engine, 'copy_file_data',
+                         mock.Mock(side_effect=copy_file_data))
+        self.mock_object(copy_engine.timeutils, 'now',
+                         mock.Mock(side_effect=itertools.count(100, 10)))
+        engine = copy_engine.CopyEngine(
+            os.path.join(self.src, 'dir1'), self.dest, workers=1)
+
+        engine.run()
+
+        self.assertEqual('file2', progress[0]['current_file_path'])
+        self.assertEqual(25, progress[0]['current_file_progress'])
+        self.assertEqual(5, progress[0]['current_size'])
+        self.assertEqual(0, progress[0]['throughput'])
+        self.assertIsNone(progress[0]['eta'])
+
+    def test_run_bwlimit(self):
+        self.mock_object(copy_engine.time, 'sleep')
+        self.mock_object(copy_engine.timeutils, 'now',
+                         mock.Mock(return_value=100))
+        engine = copy_engine.CopyEngine(self.src, self.dest, ['lost+found'],
+                                        1, bwlimit=10)
+
+        self.assertTrue(engine.run())
+
+        self.assertEqual([mock.call(1.0), mock.call(3.0)],
+                         copy_engine.time.sleep.call_args_list)
+
+    @ddt.data((0, 10, 5, (None, None)), (100, 0, 5, (20, 0)),
+              (100, 300, 5, (20, 15)), (100, 300, None, (None, None)))
+    @ddt.unpack
+    def test_estimate(self, written, remaining, elapsed, expected):
+        self.assertEqual(expected,
+                         copy_engine.estimate(written, remaining, elapsed))
+
+    def test_run_existing_dest(self):
+        os.makedirs(os.path.join(self.dest, 'dir1'))
+        with open(os.path.join(self.dest, 'target'), 'wb') as f:
+            f.write(b'target')
+        os.symlink(os.path.join(self.dest, 'target'),
+                   os.path.join(self.dest, 'file1'))
+        engine = copy_engine.CopyEngine(self.src, self.dest)
+
+        self.assertTrue(engine.run())
+
+        self.assertFalse(os.path.islink(os.path.join(self.dest, 'file1')))
+        self.assertEqual(b'a' * 10, self._read('file1'))
+        self.assertEqual(b'target', self._read('target'))
+
+    def test_run_cancelled(self):
+        engine = copy_engine.CopyEngine(self.src, self.dest)
+        engine.cancel()
+
+        self.assertFalse(engine.run())
+        self.assertFalse(os.path.exists(self.dest))
+        self.assertEqual(0, engine.get_progress()['total_progress'])
+
+    def test_run_error(self):
+        self.mock_object(copy_engine, 'copy_metadata',
+                         mock.Mock(side_effect=OSError(errno.EPERM, 'fake')))
+        self.mock_object(copy_engine.LOG, 'error')
+        engine = copy_engine.CopyEngine(self.src, self.dest, workers=2)
+
+        self.assertRaises(OSError, engine.run)
+        self.assertTrue(engine.cancelled)
+        self.assertTrue(copy_engine.LOG.error.called)
+
+    @ddt.data('copy_file_range', 'sendfile')
+    def test_copy_file_data_unsupported(self, method):
+        self.mock_object(copy_engine.os, method, mock.Mock(
+            side_effect=OSError(errno.EXDEV, 'fake')), create=True)
+        callback = mock.Mock()
+        dest = os.path.join(self.src, 'copy')
+
+        copy_engine.copy_file_data(os.path.join(self.src, 'file1'), dest,
+                                   callback)
+
+        with open(dest, 'rb') as f:
+            self.assertEqual(b'a' * 10, f.read())
+        callback.assert_called_once_with(10)
+
+    def test_copy_file_data_error(self):
+        self.mock_object(copy_engine.os, 'copy_file_range', mock.Mock(
+            side_effect=[5, OSError(errno.EIO, 'fake')]), create=True)
+
+        self.assertRaises(OSError, copy_engine.copy_file_data,
+                          os.path.join(self.src, 'file1'),
+                          os.path.join(self.src, 'copy'))
+
+    def test_copy_xattrs(self):
+        self.mock_object(copy_engine, '_XATTR_SUPPORTED', True)
+        self.mock_object(copy_engine.os, 'listxattr', mock.Mock(
+            return_value=['user.a', 'security.b']), create=True)
+        self.mock_object(copy_engine.os, 'getxattr', mock.Mock(
+            side_effect=lambda path, name, follow_symlinks: name.encode()),
+            create=True)
+        self.mock_object(copy_engine.os, 'setxattr', mock.Mock(
+            side_effect=[None, OSError(errno.ENOTSUP, 'fake')]), create=True)
+
+        copy_engine.copy_xattrs('src', 'dest', is_link=True)
+
+        copy_engine.os.setxattr.assert_has_calls([
+            mock.call('dest', 'user.a', b'user.a', follow_symlinks=False),
+            mock.call('dest', 'security.b', b'security.b',
+                      follow_symlinks=False),
+        ])
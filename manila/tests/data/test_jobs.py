@@ -0,0 +1,85 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import datetime
+
+import mock
+
+from manila.data import jobs
+from manila import exception
+from manila import test
+
+
+class JobQueueTestCase(test.TestCase):
+
+    def setUp(self):
+        super(JobQueueTestCase, self).setUp()
+        self.queue = jobs.JobQueue(2)
+        self.mock_object(jobs.eventlet, 'spawn_n')
+        self.mock_object(jobs.timeutils, 'utcnow', mock.Mock(
+            return_value=datetime.datetime(2016, 7, 1, 12, 0)))
+
+    def _finish(self, index):
+        func, share_id, job = jobs.eventlet.spawn_n.call_args_list[index][0]
+        func(share_id, job)
+
+    def test_submit(self):
+        func = mock.Mock()
+        for share_id in ('id1', 'id2', 'id3'):
+            self.queue.submit(share_id, func, 'arg', kwarg=share_id)
+
+        self.assertEqual(2, jobs.eventlet.spawn_n.call_count)
+        self.assertEqual(
+            [{'share_id': 'id1', 'state': 'running',
+              'queued_at': '2016-07-01T12:00:00',
+              'started_at': '2016-07-01T12:00:00'},
+             {'share_id': 'id2', 'state': 'running',
+              'queued_at': '2016-07-01T12:00:00',
+              'started_at': '2016-07-01T12:00:00'},
+             {'share_id': 'id3', 'state': 'queued',
+              'queued_at': '2016-07-01T12:00:00',
+              'started_at': None}],
+            self.queue.list_jobs())
+
+        self._finish(0)
+
+        func.assert_called_once_with('arg', kwarg='id1')
+        self.assertEqual(3, jobs.eventlet.spawn_n.call_count)
+        self.assertEqual(['id2', 'id3'],
+                         [job['share_id'] for job in self.queue.list_jobs()])
+
+    def test_submit_existing(self):
+        self.queue.submit('id1', mock.Mock())
+
+        self.assertRaises(exception.InvalidShare, self.queue.submit, 'id1',
+                          mock.Mock())
+
+    def test_run_error(self):
+        self.mock_object(jobs.LOG, 'exception')
+        self.queue.submit('id1', mock.Mock(side_effect=Exception('fake')))
+
+        self._finish(0)
+
+        self.assertTrue(jobs.LOG.exception.called)
+        self.assertEqual([], self.queue.list_jobs())
+
+    def test_remove(self):
+        for share_id in ('id1', 'id2', 'id3'):
+            self.queue.submit(share_id, mock.Mock())
+
+        self.assertFalse(self.queue.remove('id1'))
+        self.assertTrue(self.queue.remove('id3'))
+        self.assertFalse(self.queue.remove('id3'))
+
+        self._finish(0)
+
+        self.assertEqual(2, jobs.eventlet.spawn_n.call_count)
@@ -22,6 +22,7 @@ from manila.common import constants
 from manila import context
 from manila.data import helper
 from manila.data import manager
+from manila.data import rpcapi as data_rpc
 from manila.data import utils as data_utils
 from manila import db
 from manila import exception
@@ -43,6 +44,13 @@ class DataManagerTestCase(test.TestCase):
         self.share = db_utils.create_share()
         manager.CONF.set_default('migration_tmp_location', '/tmp/')
 
+    def _run_jobs(self):
+        # NOTE: jobs are run when submitted, instead of in green threads.
+        self.mock_object(
+            self.manager.jobs, 'submit',
+            mock.Mock(side_effect=lambda share_id, func, *args, **kwargs:
+                      func(*args, **kwargs)))
+
     def test_init(self):
         manager = self.manager
         self.assertIsNotNone(manager)
@@ -71,6 +79,46 @@ class DataManagerTestCase(test.TestCase):
             utils.IsAMatcher(context.RequestContext), share['id'],
             {'task_state': constants.TASK_STATE_DATA_COPYING_ERROR})
 
+    def test_init_host_other_hosts(self):
+        self.manager.host = 'host1'
+        shares = [
+            db_utils.create_share(
+                task_state=constants.TASK_STATE_DATA_COPYING_IN_PROGRESS,
+                data_copy_host=host)
+            for host in ('host1', 'host2', None)]
+        self.mock_object(db, 'share_get_all', mock.Mock(return_value=shares))
+        self.mock_object(db, 'share_update')
+        self.mock_object(data_utils.Checkpoint, 'load',
+                         mock.Mock(return_value=None))
+        self.mock_object(data_rpc.DataAPI, 'migration_resume')
+
+        self.manager.init_host()
+
+        # NOTE: the copy of shares[1] is still running on host2.
+        db.share_update.assert_has_calls([
+            mock.call(utils.IsAMatcher(context.RequestContext), share['id'],
+                      {'task_state': constants.TASK_STATE_DATA_COPYING_ERROR})
+            for share in (shares[0], shares[2])])
+        self.assertEqual(2, db.share_update.call_count)
+        self.assertFalse(data_rpc.DataAPI.migration_resume.called)
+
+    def test_init_host_checkpoint(self):
+        share = db_utils.create_share(
+            task_state=constants.TASK_STATE_DATA_COPYING_IN_PROGRESS)
+        self.mock_object(db, 'share_get_all', mock.Mock(
+            return_value=[share, self.share]))
+        self.mock_object(db, 'share_update')
+        self.mock_object(data_utils.Checkpoint, 'load',
+                         mock.Mock(return_value={'notify': True}))
+        self.mock_object(data_rpc.DataAPI, 'migration_resume')
+
+        self.manager.init_host()
+
+        data_rpc.DataAPI.migration_resume.assert_called_once_with(
+            utils.IsAMatcher(context.RequestContext), share['id'],
+            self.manager.host)
+        self.assertFalse(db.share_update.called)
+
     @ddt.data({'notify': True, 'exc': None},
               {'notify': False, 'exc': None},
               {'notify': 'fake',
@@ -85,6 +133,9 @@ class DataManagerTestCase(test.TestCase):
 
         self.mock_object(data_utils, 'Copy',
                          mock.Mock(return_value='fake_copy'))
+        checkpoint = mock.Mock()
+        self.mock_object(data_utils, 'Checkpoint',
+                         mock.Mock(return_value=checkpoint))
 
         if exc is None:
             self.manager.busy_tasks_shares[self.share['id']] = 'fake_copy'
@@ -93,10 +144,8 @@ class DataManagerTestCase(test.TestCase):
                          mock.Mock(side_effect=exc))
 
         self.mock_object(share_rpc.ShareAPI, 'migration_complete')
-
-        if exc is not None and not isinstance(
-                exc, exception.ShareDataCopyCancelled):
-            self.mock_object(db, 'share_update')
+        self.mock_object(db, 'share_update')
+        self._run_jobs()
 
         # run
         if exc is None or isinstance(exc, exception.ShareDataCopyCancelled):
@@ -109,11 +158,21 @@ class DataManagerTestCase(test.TestCase):
                 self.context, [], self.share['id'], 'ins1_id', 'ins2_id',
                 'info_src', 'info_dest', notify)
 
-            db.share_update.assert_called_once_with(
+            db.share_update.assert_called_with(
                 self.context, self.share['id'],
                 {'task_state': constants.TASK_STATE_DATA_COPYING_ERROR})
 
         # asserts
+        self.manager.jobs.submit.assert_called_once_with(
+            self.share['id'], self.manager._migration_start, self.context,
+            checkpoint, [], self.share['id'], 'ins1_id', 'ins2_id',
+            'info_src', 'info_dest', notify, two_phase=False)
+        self.assertEqual(
+            mock.call(self.context, self.share['id'],
+                      {'task_state':
+                       constants.TASK_STATE_DATA_COPYING_STARTING,
+                       'data_copy_host': self.manager.host}),
+            db.share_update.call_args_list[0])
         self.assertFalse(self.manager.busy_tasks_shares.get(self.share['id']))
 
         self.manager._copy_share_data.assert_called_once_with(
@@ -124,11 +183,167 @@ class DataManagerTestCase(test.TestCase):
             share_rpc.ShareAPI.migration_complete.assert_called_once_with(
                 self.context, self.share, 'ins1_id', 'ins2_id')
 
-    @ddt.data({'cancelled': False, 'exc': None},
-              {'cancelled': False, 'exc': Exception('fake')},
-              {'cancelled': True, 'exc': None})
+        data_utils.Checkpoint.assert_called_once_with(
+            manager.CONF.data_copy_state_path, self.share['id'])
+        checkpoint.save.assert_called_once_with(
+            ignore_list=[], share_instance_id='ins1_id',
+            dest_share_instance_id='ins2_id', migration_info_src='info_src',
+            migration_info_dest='info_dest', notify=notify, two_phase=False)
+        data_utils.Copy.assert_called_once_with(
+            '/tmp/ins1_id', '/tmp/ins2_id', [], resume=False,
+            checkpoint=checkpoint, manifest=None)
+        checkpoint.delete.assert_called_once_with()
+
+    @ddt.data(None, 2)
+    def test_migration_start_two_phase(self, phase):
+        checkpoint = mock.Mock(data={'phase': phase},
+                               manifest_path='/tmp/fake.manifest')
+        fake_copy = mock.Mock()
+        self.mock_object(data_utils, 'Copy',
+                         mock.Mock(return_value=fake_copy))
+        self.mock_object(self.manager, '_copy_share_data')
+        self.mock_object(db, 'share_instance_get',
+                         mock.Mock(return_value='fake_instance'))
+        self.mock_object(share_rpc.ShareAPI, 'migration_change_to_read_only')
+        self.mock_object(share_rpc.ShareAPI, 'migration_complete')
+
+        self.manager._migration_start(
+            self.context, checkpoint, [], self.share['id'], 'ins1_id',
+            'ins2_id', 'info_src', 'info_dest', True, two_phase=True,
+            resume=phase is not None)
+
+        data_utils.Copy.assert_called_once_with(
+            '/tmp/ins1_id', '/tmp/ins2_id', [], resume=phase is not None,
+            checkpoint=checkpoint, manifest='/tmp/fake.manifest')
+        copy_calls = [
+            mock.call(self.context, fake_copy, mock.ANY, 'ins1_id',
+                      'ins2_id', 'info_src', 'info_dest')]
+        if phase is None:
+            copy_calls.insert(0, mock.call(
+                self.context, fake_copy, mock.ANY, 'ins1_id', 'ins2_id',
+                'info_src', 'info_dest', final=False))
+            share_rpc.ShareAPI.migration_change_to_read_only.\
+                assert_called_once_with(self.context, 'fake_instance')
+            checkpoint.save.assert_called_once_with(phase=2)
+        else:
+            self.assertFalse(
+                share_rpc.ShareAPI.migration_change_to_read_only.called)
+        self.assertEqual(copy_calls,
+                         self.manager._copy_share_data.call_args_list)
+        fake_copy.start_delta.assert_called_once_with()
+        checkpoint.delete.assert_called_once_with()
+        checkpoint.delete_manifest.assert_called_once_with()
+
+    def test_migration_start_two_phase_shell(self):
+        self.flags(data_copy_method='shell')
+        checkpoint = mock.Mock()
+        self.mock_object(data_utils, 'Copy',
+                         mock.Mock(return_value='fake_copy'))
+        self.mock_object(self.manager, '_copy_share_data')
+        self.mock_object(db, 'share_instance_get',
+                         mock.Mock(return_value='fake_instance'))
+        self.mock_object(share_rpc.ShareAPI, 'migration_change_to_read_only')
+        self.mock_object(share_rpc.ShareAPI, 'migration_complete')
+        self.mock_object(manager.LOG, 'warning')
+
+        self.manager._migration_start(
+            self.context, checkpoint, [], self.share['id'], 'ins1_id',
+            'ins2_id', 'info_src', 'info_dest', True, two_phase=True)
+
+        self.assertTrue(manager.LOG.warning.called)
+        share_rpc.ShareAPI.migration_change_to_read_only.\
+            assert_called_once_with(self.context, 'fake_instance')
+        db.share_instance_get.assert_called_once_with(
+            self.context, 'ins1_id', with_share_data=True)
+        data_utils.Copy.assert_called_once_with(
+            '/tmp/ins1_id', '/tmp/ins2_id', [], resume=False,
+            checkpoint=checkpoint, manifest=None)
+        self.manager._copy_share_data.assert_called_once_with(
+            self.context, 'fake_copy', mock.ANY, 'ins1_id', 'ins2_id',
+            'info_src', 'info_dest')
+        self.assertFalse(checkpoint.delete_manifest.called)
+
+    def test_migration_start_interrupted(self):
+        checkpoint = mock.Mock()
+        self.mock_object(data_utils, 'Checkpoint',
+                         mock.Mock(return_value=checkpoint))
+        self.mock_object(data_utils, 'Copy')
+        self.mock_object(self.manager, '_copy_share_data',
+                         mock.Mock(side_effect=KeyboardInterrupt))
+        self._run_jobs()
+
+        self.assertRaises(KeyboardInterrupt, self.manager.migration_start,
+                          self.context, [], self.share['id'], 'ins1_id',
+                          'ins2_id', 'info_src', 'info_dest', True)
+
+        self.assertFalse(checkpoint.delete.called)
+        self.assertNotIn(self.share['id'], self.manager.busy_tasks_shares)
+
+    def test_migration_resume(self):
+        share = db_utils.create_share(
+            task_state=constants.TASK_STATE_DATA_COPYING_IN_PROGRESS)
+        job = {
+            'ignore_list': ['lost+found'],
+            'share_instance_id': 'ins1_id',
+            'dest_share_instance_id': 'ins2_id',
+            'migration_info_src': {'unmount': 'unmount_src'},
+            'migration_info_dest': {'unmount': 'unmount_dest'},
+            'notify': True,
+        }
+        checkpoint = mock.Mock()
+        checkpoint.load.return_value = job
+        self.mock_object(data_utils, 'Checkpoint',
+                         mock.Mock(return_value=checkpoint))
+        self.mock_object(data_utils, 'Copy',
+                         mock.Mock(return_value='fake_copy'))
+        self.mock_object(helper.DataServiceHelper,
+                         'cleanup_unmount_temp_folder')
+        self.mock_object(self.manager, '_copy_share_data')
+        self.mock_object(share_rpc.ShareAPI, 'migration_complete')
+        self._run_jobs()
+
+        self.manager.migration_resume(self.context, share['id'])
+
+        helper.DataServiceHelper.cleanup_unmount_temp_folder.assert_has_calls(
+            [mock.call('unmount_src', '/tmp/', 'ins1_id'),
+             mock.call('unmount_dest', '/tmp/', 'ins2_id')])
+        data_utils.Copy.assert_called_once_with(
+            '/tmp/ins1_id', '/tmp/ins2_id', ['lost+found'], resume=True,
+            checkpoint=checkpoint, manifest=None)
+        self.manager._copy_share_data.assert_called_once_with(
+            self.context, 'fake_copy', mock.ANY, 'ins1_id',
+            'ins2_id', {'unmount': 'unmount_src'},
+            {'unmount': 'unmount_dest'})
+        share_rpc.ShareAPI.migration_complete.assert_called_once_with(
+            self.context, mock.ANY, 'ins1_id', 'ins2_id')
+        checkpoint.delete.assert_called_once_with()
+
+    @ddt.data({'job': None,
+               'task_state': constants.TASK_STATE_DATA_COPYING_IN_PROGRESS},
+              {'job': {'notify': True},
+               'task_state': constants.TASK_STATE_DATA_COPYING_ERROR})
+    @ddt.unpack
+    def test_migration_resume_invalid(self, job, task_state):
+        share = db_utils.create_share(task_state=task_state)
+        checkpoint = mock.Mock()
+        checkpoint.load.return_value = job
+        self.mock_object(data_utils, 'Checkpoint',
+                         mock.Mock(return_value=checkpoint))
+        self.mock_object(self.manager, '_migration_start')
+
+        self.assertRaises(exception.InvalidShare,
+                          self.manager.migration_resume,
+                          self.context, share['id'])
+
+        self.assertFalse(self.manager._migration_start.called)
+        self.assertEqual(job is not None, checkpoint.delete.called)
+
+    @ddt.data({'cancelled': False, 'exc': None, 'final': True},
+              {'cancelled': False, 'exc': None, 'final': False},
+              {'cancelled': False, 'exc': Exception('fake'), 'final': True},
+              {'cancelled': True, 'exc': None, 'final': True})
     @ddt.unpack
-    def test__copy_share_data(self, cancelled, exc):
+    def test__copy_share_data(self, cancelled, exc, final):
 
         access = db_utils.create_access(share_id=self.share['id'])
 
@@ -191,17 +406,25 @@ class DataManagerTestCase(test.TestCase):
         else:
             self.manager._copy_share_data(
                 self.context, fake_copy, self.share, 'ins1_id',
-                'ins2_id', migration_info_src, migration_info_dest)
+                'ins2_id', migration_info_src, migration_info_dest,
+                final=final)
             extra_updates = [
                 mock.call(
                     self.context, self.share['id'],
                     {'task_state':
                      constants.TASK_STATE_DATA_COPYING_COMPLETING}),
-                mock.call(
+            ]
+            if final:
+                extra_updates.append(mock.call(
                     self.context, self.share['id'],
                     {'task_state':
-                     constants.TASK_STATE_DATA_COPYING_COMPLETED})
-            ]
+                     constants.TASK_STATE_DATA_COPYING_COMPLETED}))
+            else:
+                self.assertNotIn(
+                    mock.call(self.context, self.share['id'],
+                              {'task_state':
+                               constants.TASK_STATE_DATA_COPYING_COMPLETED}),
+                    db.share_update.call_args_list)
 
         # asserts
         self.assertEqual(
@@ -387,12 +610,54 @@ class DataManagerTestCase(test.TestCase):
         # asserts
         data_utils.Copy.cancel.assert_called_once_with()
 
+    @ddt.data(True, False)
+    def test_data_copy_cancel_queued(self, two_phase):
+        checkpoint = mock.Mock()
+        checkpoint.load.return_value = {
+            'share_instance_id': 'ins1_id',
+            'dest_share_instance_id': 'ins2_id',
+            'two_phase': two_phase,
+        }
+        self.mock_object(data_utils, 'Checkpoint',
+                         mock.Mock(return_value=checkpoint))
+        self.mock_object(self.manager.jobs, 'remove',
+                         mock.Mock(return_value=True))
+        self.mock_object(db, 'share_update')
+        self.mock_object(share_rpc.ShareAPI, 'migration_complete')
+
+        self.manager.data_copy_cancel(self.context, self.share['id'])
+
+        self.manager.jobs.remove.assert_called_once_with(self.share['id'])
+        checkpoint.delete.assert_called_once_with()
+        self.assertEqual(two_phase, checkpoint.delete_manifest.called)
+        db.share_update.assert_called_once_with(
+            self.context, self.share['id'],
+            {'task_state': constants.TASK_STATE_DATA_COPYING_CANCELLED})
+        share_rpc.ShareAPI.migration_complete.assert_called_once_with(
+            self.context, mock.ANY, 'ins1_id', 'ins2_id')
+
     def test_data_copy_cancel_not_copying(self):
 
         self.assertRaises(exception.InvalidShare,
                           self.manager.data_copy_cancel, self.context,
                           'fake_id')
 
+    def test_data_copy_get_jobs(self):
+        copy = mock.Mock()
+        copy.get_progress.return_value = {'total_progress': 50}
+        self.manager.busy_tasks_shares['fake_id'] = copy
+        self.mock_object(self.manager.jobs, 'list_jobs', mock.Mock(
+            return_value=[{'share_id': 'fake_id', 'state': 'running'},
+                          {'share_id': 'fake_id2', 'state': 'queued'}]))
+
+        result = self.manager.data_copy_get_jobs(self.context)
+
+        self.assertEqual(
+            [{'share_id': 'fake_id', 'state': 'running',
+              'progress': {'total_progress': 50}},
+             {'share_id': 'fake_id2', 'state': 'queued', 'progress': None}],
+            result)
+
     def test_data_copy_get_progress(self):
 
         share = db_utils.create_share()
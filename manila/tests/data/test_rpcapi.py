@@ -25,8 +25,10 @@ from oslo_serialization import jsonutils
 from manila.common import constants
 from manila import context
 from manila.data import rpcapi as data_rpcapi
+from manila import db
 from manila import test
 from manila.tests import db_utils
+from manila import utils
 
 CONF = cfg.CONF
 
@@ -53,6 +55,8 @@ class DataRpcAPITestCase(test.TestCase):
         target = {
             "fanout": fanout,
             "version": kwargs.pop('version', '1.0'),
+            "server": kwargs.get('host'),
+            "timeout": kwargs.get('timeout'),
         }
         expected_msg = copy.deepcopy(kwargs)
 
@@ -84,23 +88,72 @@ class DataRpcAPITestCase(test.TestCase):
     def test_migration_start(self):
         self._test_data_api('migration_start',
                             rpc_method='cast',
-                            version='1.0',
+                            version='1.2',
                             share_id=self.fake_share['id'],
                             ignore_list=[],
                             share_instance_id='fake_ins_id',
                             dest_share_instance_id='dest_fake_ins_id',
                             migration_info_src={},
                             migration_info_dest={},
-                            notify=True)
+                            notify=True,
+                            two_phase=True)
+
+    def test_data_copy_get_jobs(self):
+        self._test_data_api('data_copy_get_jobs',
+                            rpc_method='call',
+                            version='1.3',
+                            host='fake_host',
+                            timeout=5)
+
+    def test_migration_resume(self):
+        self._test_data_api('migration_resume',
+                            rpc_method='cast',
+                            version='1.1',
+                            share_id=self.fake_share['id'],
+                            host='fake_host')
 
     def test_data_copy_cancel(self):
         self._test_data_api('data_copy_cancel',
                             rpc_method='call',
                             version='1.0',
-                            share_id=self.fake_share['id'])
+                            share_id=self.fake_share['id'],
+                            host='fake_host')
 
     def test_data_copy_get_progress(self):
         self._test_data_api('data_copy_get_progress',
                             rpc_method='call',
                             version='1.0',
-                            share_id=self.fake_share['id'])
+                            share_id=self.fake_share['id'],
+                            host='fake_host')
+
+    def _mock_hosts(self, hosts):
+        self.mock_object(db, 'service_get_all_by_topic', mock.Mock(
+            return_value=[{'host': host} for host in hosts]))
+        self.mock_object(utils, 'service_is_up',
+                         mock.Mock(return_value=True))
+
+    def test_select_host(self):
+        self._mock_hosts(['host1', 'host2', 'host3'])
+        rpcapi = data_rpcapi.DataAPI()
+        jobs = {'host1': [{'share_id': 'id1'}, {'share_id': 'id2'}],
+                'host3': [{'share_id': 'id3'}]}
+        self.mock_object(
+            rpcapi, 'data_copy_get_jobs',
+            mock.Mock(side_effect=lambda context, host, timeout: jobs[host]))
+
+        self.assertEqual('host3', rpcapi.select_host(self.context))
+
+        db.service_get_all_by_topic.assert_called_once_with(
+            mock.ANY, CONF.data_topic)
+        rpcapi.data_copy_get_jobs.assert_has_calls([
+            mock.call(self.context, host,
+                      timeout=CONF.data_host_selection_timeout)
+            for host in ('host1', 'host2', 'host3')])
+
+    def test_select_host_single(self):
+        self._mock_hosts(['host1'])
+        rpcapi = data_rpcapi.DataAPI()
+        self.mock_object(rpcapi, 'data_copy_get_jobs')
+
+        self.assertIsNone(rpcapi.select_host(self.context))
+        self.assertFalse(rpcapi.data_copy_get_jobs.called)
@@ -14,7 +14,10 @@
 #    under the License.
 
 import os
+import stat
 
+import ddt
+import fixtures
 import mock
 
 from manila.data import utils as data_utils
@@ -22,6 +25,7 @@ from manila import test
 from manila import utils
 
 
+@ddt.ddt
 class CopyClassTestCase(test.TestCase):
     def setUp(self):
         super(CopyClassTestCase, self).setUp()
@@ -31,47 +35,41 @@ class CopyClassTestCase(test.TestCase):
         self._copy = data_utils.Copy(src, dest, ignore_list)
         self._copy.total_size = 10000
         self._copy.current_size = 100
-        self._copy.current_copy = {'file_path': '/fake/path', 'size': 100}
+        self._copy.current_copy = {'file_path': '/fake/path', 'size': 100,
+                                   'copied': 50}
 
         self.mock_log = self.mock_object(data_utils, 'LOG')
 
     def test_get_progress(self):
         expected = {'total_progress': 1,
                     'current_file_path': '/fake/path',
-                    'current_file_progress': 100}
+                    'current_file_progress': 50,
+                    'throughput': None,
+                    'eta': None}
 
         # mocks
-        self.mock_object(utils, 'execute',
-                         mock.Mock(return_value=("100", "")))
+        self.mock_object(utils, 'execute')
 
         # run
         out = self._copy.get_progress()
 
         # asserts
         self.assertEqual(expected, out)
+        self.assertFalse(utils.execute.called)
 
-        utils.execute.assert_called_once_with("stat", "-c", "%s", "/fake/path",
-                                              run_as_root=True)
+    def test_get_progress_throughput(self):
+        self._copy.started_at = 1000
+        self.mock_object(data_utils.timeutils, 'now',
+                         mock.Mock(return_value=1010))
 
-    def test_get_progress_current_copy_none(self):
-        self._copy.current_copy = None
-        expected = {'total_progress': 100}
-
-        # run
         out = self._copy.get_progress()
 
-        # asserts
-        self.assertEqual(expected, out)
+        self.assertEqual(10, out['throughput'])
+        self.assertEqual(990, out['eta'])
 
-    def test_get_progress_exception(self):
-        expected = {'total_progress': 1,
-                    'current_file_path': '/fake/path',
-                    'current_file_progress': 0}
-
-        # mocks
-        self.mock_object(
-            utils, 'execute',
-            mock.Mock(side_effect=utils.processutils.ProcessExecutionError()))
+    def test_get_progress_current_copy_none(self):
+        self._copy.current_copy = None
+        expected = {'total_progress': 100}
 
         # run
         out = self._copy.get_progress()
@@ -79,9 +77,6 @@ class CopyClassTestCase(test.TestCase):
         # asserts
         self.assertEqual(expected, out)
 
-        utils.execute.assert_called_once_with("stat", "-c", "%s", "/fake/path",
-                                              run_as_root=True)
-
     def test_cancel(self):
         self._copy.cancelled = False
 
@@ -94,6 +89,108 @@ class CopyClassTestCase(test.TestCase):
         # reset
         self._copy.cancelled = False
 
+    def test_cancel_native(self):
+        process = mock.Mock()
+        self._copy.process = process
+
+        self._copy.cancel()
+
+        self.assertTrue(self._copy.cancelled)
+        process.stdin.close.assert_called_once_with()
+
+    def test_get_progress_native(self):
+        self._copy.progress = {'total_progress': 42, 'total_size': 100,
+                               'current_size': 42, 'last_path': 'a/b',
+                               'current_file_path': 'a/c',
+                               'current_file_progress': 10,
+                               'throughput': 21, 'eta': 2}
+
+        self.assertEqual({'total_progress': 42, 'current_file_path': 'a/c',
+                          'current_file_progress': 10, 'throughput': 21,
+                          'eta': 2},
+                         self._copy.get_progress())
+
+    def _mock_popen(self, lines, exit_code=0, stderr=b''):
+        process = mock.Mock()
+        process.stdout.readline.side_effect = lines + [b'']
+        process.stderr.read.return_value = stderr
+        process.wait.return_value = exit_code
+        process.stdin.closed = False
+        self.mock_object(data_utils.subprocess, 'Popen',
+                         mock.Mock(return_value=process))
+        self.mock_object(utils, '_get_root_helper',
+                         mock.Mock(return_value='sudo manila-rootwrap conf'))
+        return process
+
+    def test_copy_tree(self):
+        self.flags(data_copy_workers=8, data_copy_bandwidth_limit=1024)
+        process = self._mock_popen([
+            b'{"total_progress": 50, "total_size": 10, "current_size": 5}\n',
+            b'{"total_progress": 100, "total_size": 10, "current_size": 10,'
+            b' "cancelled": false}\n',
+        ])
+
+        self._copy.copy_tree()
+
+        data_utils.subprocess.Popen.assert_called_once_with(
+            ['sudo', 'manila-rootwrap', 'conf', 'manila-data-copy',
+             '--workers', '8', '--ignore', 'item', '--bwlimit', '1024',
+             self._copy.src, self._copy.dest],
+            stdin=data_utils.subprocess.PIPE,
+            stdout=data_utils.subprocess.PIPE,
+            stderr=data_utils.subprocess.PIPE, close_fds=True)
+        self.assertEqual(100, self._copy.get_progress()['total_progress'])
+        self.assertEqual(10, self._copy.total_size)
+        self.assertEqual(10, self._copy.current_size)
+        self.assertIsNone(self._copy.process)
+        process.stdin.close.assert_called_once_with()
+
+    def test_copy_tree_resume(self):
+        self._copy.resume = True
+        self._copy.checkpoint = mock.Mock()
+        self._mock_popen([
+            b'{"total_progress": 50, "total_size": 10, "current_size": 5}\n',
+        ])
+
+        self._copy.copy_tree()
+
+        self.assertEqual(
+            '--resume', data_utils.subprocess.Popen.call_args[0][0][-3])
+        self._copy.checkpoint.save_progress.assert_called_once_with(
+            {'total_progress': 50, 'total_size': 10, 'current_size': 5})
+
+    def test_copy_tree_delta(self):
+        self._copy.manifest = '/tmp/fake.manifest'
+        self._copy.start_delta()
+        self._mock_popen([
+            b'{"total_progress": 50, "total_size": 10, "current_size": 5}\n',
+        ])
+
+        self._copy.copy_tree()
+
+        self.assertEqual(
+            ['--manifest', '/tmp/fake.manifest', '--delta'],
+            data_utils.subprocess.Popen.call_args[0][0][-5:-2])
+        self.assertEqual(50, self._copy.get_progress()['total_progress'])
+        self.assertEqual(2, self._copy.get_progress()['phase'])
+
+    def test_copy_tree_error(self):
+        self._mock_popen([], exit_code=1, stderr=b'fake error')
+
+        self.assertRaises(utils.processutils.ProcessExecutionError,
+                          self._copy.copy_tree)
+        self.assertIsNone(self._copy.process)
+
+    def test_copy_tree_cancelled(self):
+        self._copy.cancelled = True
+        process = self._mock_popen([])
+        process.stdin.close.side_effect = lambda: setattr(
+            process.stdin, 'closed', True)
+
+        self._copy.copy_tree()
+
+        process.stdin.close.assert_called_once_with()
+
     def test_get_total_size(self):
         self._copy.total_size = 0
 
@@ -306,9 +403,12 @@ class CopyClassTestCase(test.TestCase):
         # reset
         self._copy.cancelled = False
 
-    def test_run(self):
+    @ddt.data('native', 'shell')
+    def test_run(self, method):
+        self.flags(data_copy_method=method)
 
         # mocks
+        self.mock_object(self._copy, 'copy_tree')
         self.mock_object(self._copy, 'get_total_size')
         self.mock_object(self._copy, 'copy_data')
         self.mock_object(self._copy, 'copy_stats')
@@ -319,7 +419,81 @@ class CopyClassTestCase(test.TestCase):
 
         # asserts
         self.assertTrue(data_utils.LOG.info.called)
-        self._copy.get_total_size.assert_called_once_with(self._copy.src)
-        self._copy.copy_data.assert_called_once_with(self._copy.src)
-        self._copy.copy_stats.assert_called_once_with(self._copy.src)
+        if method == 'native':
+            self._copy.copy_tree.assert_called_once_with()
+            self.assertFalse(self._copy.get_total_size.called)
+        else:
+            self.assertFalse(self._copy.copy_tree.called)
+            self._copy.get_total_size.assert_called_once_with(self._copy.src)
+            self._copy.copy_data.assert_called_once_with(self._copy.src)
+            self._copy.copy_stats.assert_called_once_with(self._copy.src)
         self._copy.get_progress.assert_called_once_with()
+
+
+class CheckpointTestCase(test.TestCase):
+
+    def setUp(self):
+        super(CheckpointTestCase, self).setUp()
+        self.path = self.useFixture(fixtures.TempDir()).path
+        self.checkpoint = data_utils.Checkpoint(self.path, 'fake_share_id')
+
+    def test_save_load_delete(self):
+        self.assertIsNone(self.checkpoint.load())
+
+        self.checkpoint.save(notify=True)
+        self.checkpoint.save(ignore_list=['lost+found'])
+
+        self.assertEqual(
+            os.path.join(self.path, 'fake_share_id.checkpoint'),
+            self.checkpoint.path)
+        self.assertEqual(
+            {'notify': True, 'ignore_list': ['lost+found']},
+            data_utils.Checkpoint(self.path, 'fake_share_id').load())
+        self.assertEqual(['fake_share_id.checkpoint'], os.listdir(self.path))
+
+        self.checkpoint.delete()
+        self.checkpoint.delete()
+
+        self.assertIsNone(self.checkpoint.load())
+
+    def test_save_creates_directory(self):
+        directory = os.path.join(self.path, 'data_copy')
+        checkpoint = data_utils.Checkpoint(directory, 'fake_share_id')
+
+        checkpoint.save(notify=True)
+
+        self.assertEqual(0o700, stat.S_IMODE(os.stat(directory).st_mode))
+        self.assertEqual({'notify': True}, checkpoint.load())
+
+    def test_delete_manifest(self):
+        self.mock_object(data_utils.utils, 'execute')
+
+        self.checkpoint.delete_manifest()
+
+        data_utils.utils.execute.assert_called_once_with(
+            'rm', '-f', os.path.join(self.path, 'fake_share_id.manifest'),
+            run_as_root=True)
+
+    def test_load_corrupted(self):
+        with open(self.checkpoint.path, 'w') as f:
+            f.write('{"notify": ')
+        self.mock_object(data_utils.LOG, 'warning')
+
+        self.assertIsNone(self.checkpoint.load())
+        self.assertTrue(data_utils.LOG.warning.called)
+
+    def test_save_progress(self):
+        self.flags(data_copy_checkpoint_interval=60)
+        self.mock_object(data_utils.timeutils, 'now',
+                         mock.Mock(side_effect=[100, 130, 160, 160]))
+        self.mock_object(self.checkpoint, 'save',
+                         mock.Mock(wraps=self.checkpoint.save))
+
+        for progress in ({'current_size': 1}, {'current_size': 2},
+                         {'current_size': 3}):
+            self.checkpoint.save_progress(progress)
+
+        self.assertEqual(
+            [mock.call(progress={'current_size': 1}),
+             mock.call(progress={'current_size': 3})],
+            self.checkpoint.save.call_args_list)
@@ -38,6 +38,7 @@ import datetime
 
 from oslo_utils import uuidutils
 import six
+import sqlalchemy as sa
 from sqlalchemy import exc as sa_exc
 
 from manila.db.migrations import utils
@@ -606,3 +607,73 @@ class ShareSnapshotInstanceNewProviderLocationColumnChecks(
             self.test_case.assertFalse(hasattr(ss, 'provider_location'))
             self.test_case.assertEqual('new_snapshot_instance_id', ss.id)
             self.test_case.assertEqual('new_snapshot_id', ss.snapshot_id)
+
+
+@map_to_migration('bc8b11ff1109')
+class HotQueriesIndexesChecks(BaseMigrationChecks):
+    indexes = {
+        'services': ['services_topic_idx'],
+        'reservations': ['reservations_deleted_expire_idx'],
+        'share_instances': [
+            'share_instances_host_idx',
+            'share_instances_share_server_id_deleted_idx',
+        ],
+        'share_instance_export_locations': [
+            'share_instance_export_locations_share_instance_id_deleted_idx',
+        ],
+        'share_instance_access_map': [
+            'share_instance_access_map_share_instance_id_deleted_idx',
+            'share_instance_access_map_access_id_deleted_idx',
+        ],
+        'share_instance_export_locations_metadata': [
+            'share_instance_export_locations_metadata_el_id_deleted_idx',
+        ],
+        'share_servers': ['share_servers_host_idx'],
+        'network_allocations': [
+            'network_allocations_ip_address_deleted_idx',
+            'network_allocations_share_server_id_deleted_idx',
+        ],
+    }
+
+    def _get_index_names(self, engine, table_name):
+        return [index['name'] for index in
+                sa.inspect(engine).get_indexes(table_name)]
+
+    def setup_upgrade_data(self, engine):
+        pass
+
+    def check_upgrade(self, engine, data):
+        for table_name, index_names in self.indexes.items():
+            existing = self._get_index_names(engine, table_name)
+            for index_name in index_names:
+                self.test_case.assertIn(index_name, existing)
+
+    def check_downgrade(self, engine):
+        for table_name, index_names in self.indexes.items():
+            existing = self._get_index_names(engine, table_name)
+            for index_name in index_names:
+                self.test_case.assertNotIn(index_name, existing)
+
+
+@map_to_migration('a77e2ad5012d')
+class ShareDataCopyHostColumnChecks(BaseMigrationChecks):
+    table_name = 'shares'
+    share_id = 'fake_data_copy_host_share_id'
+
+    def setup_upgrade_data(self, engine):
+        share_table = utils.load_table(self.table_name, engine)
+        engine.execute(share_table.insert({'id': self.share_id}))
+
+    def check_upgrade(self, engine, data):
+        share_table = utils.load_table(self.table_name, engine)
+        engine.execute(share_table.update().where(
+            share_table.c.id == self.share_id).values(
+                data_copy_host='fake_data_host'))
+        share = engine.execute(share_table.select().where(
+            share_table.c.id == self.share_id)).first()
+        self.test_case.assertEqual('fake_data_host', share.data_copy_host)
+
+    def check_downgrade(self, engine):
+        share_table = utils.load_table(self.table_name, engine)
+        for share in engine.execute(share_table.select()):
+            self.test_case.assertFalse(hasattr(share, 'data_copy_host'))
@@ -17,10 +17,13 @@
 
 """Testing of SQLAlchemy backend."""
 
+import datetime
+
 import ddt
 from oslo_db import exception as db_exception
 from oslo_utils import uuidutils
 import six
+from sqlalchemy import event
 
 from manila.common import constants
 from manila import context
@@ -44,6 +47,21 @@ security_service_dict = {
 }
 
 
+def _count_statements(func):
+    statements = []
+
+    def _before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    engine = db_api.get_engine()
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    try:
+        result = func()
+    finally:
+        event.remove(engine, 'before_cursor_execute', _before_cursor_execute)
+    return len(statements), result
+
+
 class BaseDatabaseAPITestCase(test.TestCase):
     def _check_fields(self, expected, actual):
         for key in expected:
@@ -155,6 +173,15 @@ class ShareDatabaseAPITestCase(test.TestCase):
                                                       'share_type_id',
                                                       'export_locations'])
 
+    def test_share_get_all_by_host(self):
+        shares = [db_utils.create_share(host=value)
+                  for value in ('foo', 'foo#pool0', 'foobar', 'bar#pool0')]
+
+        result = db_api.share_get_all_by_host(self.ctxt, 'foo')
+
+        self.assertEqual(sorted([shares[0]['id'], shares[1]['id']]),
+                         sorted([share['id'] for share in result]))
+
     def test_share_filter_all_by_share_server(self):
         share_network = db_utils.create_share_network()
         share_server = db_utils.create_share_server(
@@ -193,6 +220,29 @@ class ShareDatabaseAPITestCase(test.TestCase):
 
         self.assertEqual('share-%s' % instance['id'], instance['name'])
 
+    def test_share_instances_get_all(self):
+        share = db_utils.create_share(availability_zone='fake_az')
+        db_api.share_export_locations_update(
+            self.ctxt, share.instance['id'], ['fake_path_1', 'fake_path_2'],
+            False)
+        other_share = db_utils.create_share()
+        deleted_share = db_utils.create_share()
+        db_api.share_instance_delete(self.ctxt, deleted_share.instance['id'])
+
+        instances = db_api.share_instances_get_all(self.ctxt)
+
+        self.assertEqual([share.instance['id'], other_share.instance['id']],
+                         [instance['id'] for instance in instances])
+        self.assertIsInstance(instances[0], db_api.ShareInstanceRecord)
+        self.assertEqual('fake_az', instances[0]['availability_zone'])
+        self.assertEqual(share['id'], instances[0]['share_id'])
+        self.assertEqual(share.instance['host'], instances[0]['host'])
+        self.assertEqual('fake_path_1', instances[0]['export_location'])
+        self.assertEqual([{'path': 'fake_path_1'}, {'path': 'fake_path_2'}],
+                         instances[0].export_locations)
+        self.assertIsNone(instances[1]['export_location'])
+        self.assertEqual([], instances[1]['export_locations'])
+
     def test_share_instance_get_all_by_consistency_group(self):
         cg = db_utils.create_consistency_group()
         db_utils.create_share(consistency_group_id=cg['id'])
@@ -217,6 +267,179 @@ class ShareDatabaseAPITestCase(test.TestCase):
         self.assertEqual(2, len(actual_result))
         self.assertEqual(shares[0]['id'], actual_result[1]['id'])
 
+    @ddt.data(('created_at', 'asc'), ('created_at', 'desc'),
+              ('host', 'asc'), ('host', 'desc'),
+              ('share_network_id', 'asc'), ('share_network_id', 'desc'))
+    @ddt.unpack
+    def test_share_get_all_with_limit_and_marker(self, sort_key, sort_dir):
+        values = ('c', None, 'a', 'b', None, 'a')
+        shares = []
+        for i, value in enumerate(values):
+            shares.append(db_utils.create_share(
+                host='host_%s' % value,
+                share_network_id=value,
+                created_at=datetime.datetime(2016, 1, 1, 0, 0, i)))
+        expected = [share['id'] for share in db_api.share_get_all(
+            self.ctxt, sort_key=sort_key, sort_dir=sort_dir)]
+
+        pages = []
+        marker = None
+        while True:
+            page = db_api.share_get_all(
+                self.ctxt, sort_key=sort_key, sort_dir=sort_dir, limit=4,
+                marker=marker)
+            pages.append([share['id'] for share in page])
+            if len(page) < 4:
+                break
+            marker = page[-1]['id']
+
+        self.assertEqual(6, len(expected))
+        self.assertEqual([expected[:4], expected[4:]], pages)
+
+    def test_share_get_all_with_offset(self):
+        shares = [db_utils.create_share(
+            created_at=datetime.datetime(2016, 1, 1, 0, 0, i))
+            for i in range(4)]
+
+        result = db_api.share_get_all(
+            self.ctxt, sort_key='created_at', sort_dir='asc', limit=2,
+            offset=1)
+
+        self.assertEqual([shares[1]['id'], shares[2]['id']],
+                         [share['id'] for share in result])
+
+    def test_share_get_all_with_invalid_boolean_filter(self):
+        exc = self.assertRaises(exception.InvalidInput, db_api.share_get_all,
+                                self.ctxt,
+                                filters={'snapshot_support': 'fake'})
+
+        self.assertIn('snapshot_support', six.text_type(exc))
+
+    def test_share_get_all_with_unknown_marker(self):
+        self.assertRaises(exception.InvalidInput, db_api.share_get_all,
+                          self.ctxt, marker='fake_marker')
+
+    def test_share_get_all_with_replicated_share_and_limit(self):
+        shares = [db_utils.create_share(
+            created_at=datetime.datetime(2016, 1, 1, 0, 0, i))
+            for i in range(3)]
+        db_utils.create_share_replica(share_id=shares[1]['id'],
+                                      host='fake_host')
+
+        result = db_api.share_get_all(
+            self.ctxt, sort_key='host', sort_dir='asc', limit=3)
+
+        self.assertEqual(3, len(result))
+        self.assertEqual(sorted(share['id'] for share in shares),
+                         sorted(share['id'] for share in result))
+
+    @ddt.data(({'display_name': 'foo'}, [0]),
+              ({'status': constants.STATUS_AVAILABLE}, [1, 2]),
+              ({'host': 'host2', 'status': constants.STATUS_AVAILABLE}, [2]),
+              ({'availability_zone': 'fake_az_1'}, [1]),
+              ({'snapshot_support': 'false'}, [2]),
+              ({'fake_key': 'fake_value'}, []))
+    @ddt.unpack
+    def test_share_get_all_with_search_filters(self, filters, indexes):
+        shares = [
+            db_utils.create_share(display_name='foo', host='host1',
+                                  status=constants.STATUS_ERROR),
+            db_utils.create_share(display_name='bar', host='host1',
+                                  availability_zone='fake_az_1',
+                                  status=constants.STATUS_AVAILABLE),
+            db_utils.create_share(display_name='bar', host='host2',
+                                  snapshot_support=False,
+                                  status=constants.STATUS_AVAILABLE),
+        ]
+
+        result = db_api.share_get_all(self.ctxt, filters=filters)
+
+        self.assertEqual(sorted(shares[i]['id'] for i in indexes),
+                         sorted(share['id'] for share in result))
+
+    def _create_shares_with_export_locations(self, count):
+        for i in range(count):
+            share = db_utils.create_share(availability_zone='fake_az')
+            db_api.share_export_locations_update(
+                self.ctxt, share.instance['id'],
+                [{'path': 'fake_path_%s' % i, 'is_admin_only': False,
+                  'metadata': {'foo': 'bar'}}], False)
+            db_utils.create_snapshot(share_id=share['id'])
+
+    @ddt.data(constants.SHARE_VIEW_SUMMARY, constants.SHARE_VIEW_DETAIL)
+    def test_share_get_all_statements_do_not_depend_on_shares(self, view):
+        self._create_shares_with_export_locations(1)
+        one_share_count, result = _count_statements(
+            lambda: db_api.share_get_all(self.ctxt, view=view))
+        self.assertEqual(1, len(result))
+
+        self._create_shares_with_export_locations(4)
+        count, result = _count_statements(
+            lambda: db_api.share_get_all(self.ctxt, view=view))
+
+        self.assertEqual(5, len(result))
+        self.assertEqual(one_share_count, count)
+
+    def test_share_get_all_loads_related_data(self):
+        self._create_shares_with_export_locations(2)
+        shares = db_api.share_get_all(self.ctxt)
+
+        count, result = _count_statements(
+            lambda: [(share.instance.availability_zone,
+                      [el['el_metadata'] for el in
+                       share.instance.export_locations])
+                     for share in shares])
+
+        self.assertEqual(0, count)
+        self.assertEqual([('fake_az', [{'foo': 'bar'}])] * 2, result)
+
+    def test_share_get_all_summary_returns_records(self):
+        shares = [db_utils.create_share(
+            display_name='fake_name_%s' % i,
+            created_at=datetime.datetime(2016, 1, 1, 0, 0, i))
+            for i in range(3)]
+
+        result = db_api.share_get_all(
+            self.ctxt, sort_key='created_at', sort_dir='asc', limit=2,
+            view=constants.SHARE_VIEW_SUMMARY)
+
+        self.assertEqual(2, len(result))
+        for share, record in zip(shares, result):
+            self.assertIsInstance(record, db_api.ShareSummaryRecord)
+            self.assertEqual(share['id'], record['id'])
+            self.assertEqual(share['display_name'], record.get('display_name'))
+            self.assertIn('id', record)
+            self.assertNotIn('host', record)
+            self.assertIsNone(record.get('host'))
+            self.assertRaises(KeyError, lambda: record['host'])
+
+    def test_share_get_all_summary_with_extra_specs_filter(self):
+        share_type = db_api.share_type_create(
+            self.ctxt, {'name': 'fake_type',
+                        'extra_specs': {'foo': 'bar', 'fake_key': 'bar'}})
+        share = db_utils.create_share(share_type_id=share_type['id'])
+        db_utils.create_share()
+
+        result = db_api.share_get_all(
+            self.ctxt, filters={'extra_specs': {'foo': 'bar'}},
+            view=constants.SHARE_VIEW_SUMMARY)
+
+        self.assertEqual([share['id']], [record['id'] for record in result])
+
+    def test_share_snapshot_get_all_statements_do_not_depend_on_snapshots(
+            self):
+        self._create_shares_with_export_locations(1)
+        one_snapshot_count, result = _count_statements(
+            lambda: db_api.share_snapshot_get_all(self.ctxt))
+        self.assertEqual(1, len(result))
+
+        self._create_shares_with_export_locations(4)
+        count, result = _count_statements(
+            lambda: db_api.share_snapshot_get_all(self.ctxt))
+
+        self.assertEqual(5, len(result))
+        self.assertEqual(one_snapshot_count, count)
+
     @ddt.data(None, 'writable')
     def test_share_get_has_replicas_field(self, replication_type):
         share = db_utils.create_share(replication_type=replication_type)
@@ -275,6 +498,25 @@ class ShareDatabaseAPITestCase(test.TestCase):
                         with_share_data,
                         expected_share_keys.issubset(replica.keys()))
 
+    def test_share_replicas_get_all_by_host(self):
+        share = db_utils.create_share()
+        replicas = [
+            db_utils.create_share_replica(
+                host=host, share_id=share['id'],
+                replica_state=constants.REPLICA_STATE_IN_SYNC)
+            for host in ('foo@bar', 'foo@bar#pool0', 'foo@barbaz#pool0',
+                         'foo@baz#pool0')]
+        db_utils.create_share_instance(host='foo@bar#pool1',
+                                       share_id=share['id'])
+
+        result = db_api.share_replicas_get_all_by_host(
+            self.ctxt, 'foo@bar', with_share_data=True)
+
+        self.assertEqual(sorted([replicas[0]['id'], replicas[1]['id']]),
+                         sorted([replica['id'] for replica in result]))
+        for replica in result:
+            self.assertEqual(share['display_name'], replica['display_name'])
+
     @ddt.data({'with_share_data': False, 'with_share_server': False},
               {'with_share_data': False, 'with_share_server': True},
               {'with_share_data': True, 'with_share_server': False},
@@ -487,6 +729,15 @@ class ShareDatabaseAPITestCase(test.TestCase):
         self.assertEqual(share['id'], share_replica['share_id'])
         self.assertTrue(expected_extra_keys.issubset(share_replica.keys()))
 
+    def test__set_replica_share_data_share_not_found(self):
+        replica = {'id': 'fake_replica_id', 'share_id': 'fake_share_id'}
+
+        exc = self.assertRaises(
+            exception.ShareNotFound, db_api._set_replica_share_data,
+            self.ctxt, replica, db_api.get_session())
+
+        self.assertIn('fake_share_id', six.text_type(exc))
+
     def test_share_replica_get_with_share_server(self):
         session = db_api.get_session()
         share_server = db_utils.create_share_server()
@@ -976,6 +1227,48 @@ class ShareSnapshotDatabaseAPITestCase(test.TestCase):
         self.assertEqual(
             self.share_2['id'], instances[0]['share_instance']['share_id'])
 
+    def test_share_replica_snapshot_instances_get_all_by_host(self):
+        share = db_utils.create_share()
+        replicas = [
+            db_utils.create_share_replica(
+                host='foo@bar#pool0', share_id=share['id'],
+                replica_state=replica_state)
+            for replica_state in (constants.REPLICA_STATE_ACTIVE,
+                                  constants.REPLICA_STATE_IN_SYNC,
+                                  constants.REPLICA_STATE_OUT_OF_SYNC)]
+        other_replica = db_utils.create_share_replica(
+            host='foo@baz#pool0', share_id=share['id'],
+            replica_state=constants.REPLICA_STATE_IN_SYNC)
+        snapshot = db_utils.create_snapshot(share_id=share['id'])
+        snapshot_instances = [
+            db_utils.create_snapshot_instance(
+                snapshot['id'], status=status,
+                share_instance_id=share_instance['id'])
+            for share_instance, status in (
+                (replicas[0], constants.STATUS_CREATING),
+                (replicas[1], constants.STATUS_CREATING),
+                (replicas[2], constants.STATUS_AVAILABLE),
+                (other_replica, constants.STATUS_DELETING))]
+
+        result = db_api.share_replica_snapshot_instances_get_all_by_host(
+            self.ctxt, 'foo@bar')
+        result_with_statuses = (
+            db_api.share_replica_snapshot_instances_get_all_by_host(
+                self.ctxt, 'foo@bar',
+                statuses=(constants.STATUS_CREATING,
+                          constants.STATUS_DELETING),
+                with_share_data=True))
+
+        self.assertEqual(
+            sorted([snapshot_instances[1]['id'],
+                    snapshot_instances[2]['id']]),
+            sorted([instance['id'] for instance in result]))
+        self.assertEqual(1, len(result_with_statuses))
+        self.assertEqual(snapshot_instances[1]['id'],
+                         result_with_statuses[0]['id'])
+        self.assertEqual(share['id'],
+                         result_with_statuses[0]['share']['share_id'])
+
     def test_share_snapshot_instance_get_all_with_filters_wrong_filters(self):
         filters = {
             'some_key': 'some_value',
@@ -1087,6 +1380,88 @@ class ShareExportLocationsDatabaseAPITestCase(test.TestCase):
 
         self.assertTrue(actual_result == [initial_location])
 
+    def test_update_many(self):
+        shares = [db_utils.create_share() for i in range(3)]
+        db_api.share_export_locations_update(
+            self.ctxt, shares[0].instance['id'], ['fake1/1', 'fake1/2'],
+            False)
+        db_api.share_export_locations_update(
+            self.ctxt, shares[1].instance['id'], ['fake2/1'], False)
+        export_locations = {
+            shares[0].instance['id']: ['fake1/3', 'fake1/1'],
+            shares[1].instance['id']: [],
+            shares[2].instance['id']: 'fake3/1',
+        }
+
+        result = db_api.share_export_locations_update_many(
+            self.ctxt, export_locations, True)
+
+        self.assertEqual({shares[0].instance['id']: {'fake1/3', 'fake1/1'},
+                          shares[1].instance['id']: set(),
+                          shares[2].instance['id']: {'fake3/1'}}, result)
+        self.assertEqual(
+            ['fake1/3', 'fake1/1'],
+            db_api.share_export_locations_get(self.ctxt, shares[0]['id']))
+        self.assertEqual(
+            [], db_api.share_export_locations_get(self.ctxt, shares[1]['id']))
+        self.assertEqual(
+            ['fake3/1'],
+            db_api.share_export_locations_get(self.ctxt, shares[2]['id']))
+
+    def test_update_many_statements_do_not_depend_on_instances(self):
+        def update_many(count):
+            export_locations = {}
+            for i in range(count):
+                share = db_utils.create_share()
+                db_api.share_export_locations_update(
+                    self.ctxt, share.instance['id'], ['fake/old', 'fake/1'],
+                    False)
+                export_locations[share.instance['id']] = [
+                    {'path': 'fake/1', 'metadata': {'foo': 'bar'}},
+                    {'path': 'fake/2', 'metadata': {'foo': 'quuz'}},
+                ]
+            return _count_statements(
+                lambda: db_api.share_export_locations_update_many(
+                    self.ctxt, export_locations, True))[0]
+
+        self.assertEqual(update_many(1), update_many(10))
+
+    def test_update_metadata_of_existing_location(self):
+        share = db_utils.create_share()
+        db_api.share_export_locations_update(
+            self.ctxt, share.instance['id'],
+            [{'path': 'fake/1', 'metadata': {'foo': 'bar', 'bar': 'baz'}}],
+            False)
+
+        db_api.share_export_locations_update(
+            self.ctxt, share.instance['id'],
+            [{'path': 'fake/1', 'metadata': {'foo': 'quuz', 'quuz': 'foo'}}],
+            True)
+
+        els = db_api.share_export_locations_get_by_share_instance_id(
+            self.ctxt, share.instance['id'])
+        self.assertEqual(1, len(els))
+        self.assertEqual({'foo': 'quuz', 'bar': 'baz', 'quuz': 'foo'},
+                         els[0].el_metadata)
+
+    def test_update_deletes_metadata_of_removed_location(self):
+        share = db_utils.create_share()
+        db_api.share_export_locations_update(
+            self.ctxt, share.instance['id'],
+            [{'path': 'fake/1', 'metadata': {'foo': 'bar'}}], False)
+        el_uuid = db_api.share_export_locations_get_by_share_instance_id(
+            self.ctxt, share.instance['id'])[0]['uuid']
+
+        db_api.share_export_locations_update(
+            self.ctxt, share.instance['id'], ['fake/2'], True)
+
+        self.assertRaises(exception.ExportLocationNotFound,
+                          db_api.export_location_metadata_get,
+                          self.ctxt, el_uuid)
+        self.assertEqual(0, db_api.model_query(
+            self.ctxt, models.ShareInstanceExportLocationsMetadata,
+            read_deleted="no").count())
+
     def test_get_admin_export_locations(self):
         ctxt_user = context.RequestContext(
             user_id='fake user', project_id='fake project', is_admin=False)
@@ -2218,3 +2593,20 @@ class NetworkAllocationsDatabaseAPITestCase(test.TestCase):
         )
         for na in result:
             self.assertIn(na.label, ('admin', 'user', None))
+
+    def test_network_allocations_get_ip_addresses(self):
+        self._setup_network_allocations_get_for_share_server()
+        db_api.network_allocation_create(
+            self.ctxt, {'share_server_id': self.share_server_id,
+                        'ip_address': None})
+        deleted = db_api.network_allocation_create(
+            self.ctxt, {'share_server_id': self.share_server_id,
+                        'ip_address': '5.5.5.5'})
+        db_api.network_allocation_delete(self.ctxt, deleted['id'])
+
+        # One query, after the connection check of oslo.db
+        with self.assertMaxStatements(2):
+            result = db_api.network_allocations_get_ip_addresses(self.ctxt)
+
+        self.assertEqual({'1.1.1.1', '2.2.2.2', '3.3.3.3', '4.4.4.4'},
+                         result)
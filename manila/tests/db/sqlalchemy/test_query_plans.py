@@ -0,0 +1,236 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Query plan checks for hot database API calls.
+
+Each checked call is run against a populated database, and every SELECT,
+UPDATE and DELETE it executes is explained. The check fails if a large
+table is read with a full table scan, so that a query losing its index
+does not go unnoticed. Plans are read with EXPLAIN QUERY PLAN on SQLite
+and with EXPLAIN on MySQL.
+"""
+
+import datetime
+import re
+
+import ddt
+from oslo_utils import timeutils
+import six
+from sqlalchemy import event
+
+from manila.common import constants
+from manila import context
+from manila.db.sqlalchemy import api as db_api
+from manila import test
+from manila.tests import db_utils
+
+# Tables growing with the number of shares, servers or reservations
+LARGE_TABLES = (
+    'network_allocations',
+    'quota_usages',
+    'reservations',
+    'share_access_map',
+    'share_instance_access_map',
+    'share_instance_export_locations',
+    'share_instance_export_locations_metadata',
+    'share_instances',
+    'share_servers',
+    'share_snapshot_instances',
+    'share_snapshots',
+    'shares',
+)
+
+SQLITE_PLAN_TABLE = re.compile(
+    r'^(?:SCAN|SEARCH) (?:TABLE )?(?P<table>\w+?)(?:_\d+)?\b')
+
+
+def _sqlite_literal(value):
+    if value is None:
+        return 'NULL'
+    if isinstance(value, bool):
+        return six.text_type(int(value))
+    if isinstance(value, six.integer_types + (float, )):
+        return six.text_type(value)
+    return "'%s'" % six.text_type(value).replace("'", "''")
+
+
+def _sqlite_full_scans(cursor, statement, parameters):
+    # NOTE: SQLite plans LIKE with a bound pattern as a scan, while MySQL
+    # uses a range of the index, so parameters are inlined and LIKE is
+    # made case sensitive for the plan to match the one of MySQL.
+    parts = statement.split('?')
+    statement = parts[0] + ''.join(
+        _sqlite_literal(value) + part
+        for value, part in zip(parameters, parts[1:]))
+    cursor.execute('PRAGMA case_sensitive_like = ON')
+    try:
+        cursor.execute('EXPLAIN QUERY PLAN ' + statement)
+        plan = [row[3] for row in cursor.fetchall()]
+    finally:
+        cursor.execute('PRAGMA case_sensitive_like = OFF')
+
+    scans = []
+    for detail in plan:
+        match = SQLITE_PLAN_TABLE.match(detail)
+        if match and (detail.startswith('SCAN') or 'AUTOMATIC' in detail):
+            scans.append(match.group('table'))
+    return scans
+
+
+def _mysql_full_scans(cursor, statement, parameters):
+    cursor.execute('EXPLAIN ' + statement, parameters)
+    columns = [column[0] for column in cursor.description]
+    scans = []
+    for row in cursor.fetchall():
+        row = dict(zip(columns, row))
+        if row['type'] in ('ALL', 'index'):
+            scans.append(row['table'])
+    return scans
+
+
+def get_full_scans(func):
+    """Runs func and returns the large tables scanned by its statements."""
+    statements = []
+
+    def _before_cursor_execute(conn, cursor, statement, parameters,
+                               context, executemany):
+        if statement.lstrip().upper().startswith(
+                ('SELECT', 'UPDATE', 'DELETE')):
+            statements.append((statement, parameters))
+
+    engine = db_api.get_engine()
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    try:
+        func()
+    finally:
+        event.remove(engine, 'before_cursor_execute', _before_cursor_execute)
+
+    explain = {
+        'sqlite': _sqlite_full_scans,
+        'mysql': _mysql_full_scans,
+    }[engine.name]
+    connection = engine.raw_connection()
+    try:
+        scans = []
+        for statement, parameters in statements:
+            cursor = connection.cursor()
+            try:
+                scans.extend(
+                    (table, statement) for table in
+                    explain(cursor, statement, parameters)
+                    if table in LARGE_TABLES)
+            finally:
+                cursor.close()
+        return scans
+    finally:
+        connection.close()
+
+
+@ddt.ddt
+class QueryPlanTestCase(test.TestCase):
+
+    def setUp(self):
+        super(QueryPlanTestCase, self).setUp()
+        self.ctxt = context.get_admin_context()
+        self._populate()
+
+    def _populate(self):
+        for host in ('host1', 'host2'):
+            db_api.service_create(self.ctxt, {
+                'host': host,
+                'binary': 'manila-share',
+                'topic': 'manila-share',
+                'availability_zone': 'fake_az',
+            })
+            share_network = db_utils.create_share_network(
+                id='%s_net' % host)
+            share_server = db_utils.create_share_server(
+                id='%s_server' % host, host='%s@backend' % host,
+                share_network_id=share_network['id'])
+            db_api.network_allocation_create(self.ctxt, {
+                'share_server_id': share_server['id'],
+                'ip_address': '10.0.0.%s' % host[-1],
+            })
+            for i in range(3):
+                share = db_utils.create_share(
+                    host='%s@backend#pool' % host,
+                    share_server_id=share_server['id'],
+                    status=constants.STATUS_AVAILABLE)
+                db_api.share_export_locations_update(
+                    self.ctxt, share.instance['id'],
+                    [{'path': '%s:/share%s' % (host, i),
+                      'metadata': {'preferred': 'True'}}], False)
+                db_utils.create_access(share_id=share['id'])
+                db_utils.create_snapshot(share_id=share['id'])
+        db_api.quota_usage_create(
+            self.ctxt, 'fake', 'fake', 'shares', 1, 0, None)
+        usage = db_api.quota_usage_get(self.ctxt, 'fake', 'shares', 'fake')
+        expire = timeutils.utcnow() + datetime.timedelta(days=1)
+        db_api._reservation_create(
+            self.ctxt, 'fake_reservation', usage, 'fake', 'fake', 'shares',
+            1, expire, session=db_api.get_session())
+
+    def _get_share_instance_id(self):
+        return db_api.share_instances_get_all_by_host(
+            self.ctxt, 'host1@backend')[0]['id']
+
+    def _calls(self):
+        share_instance_id = self._get_share_instance_id()
+        return {
+            'service_get_all_by_topic': lambda: (
+                db_api.service_get_all_by_topic(self.ctxt, 'manila-share')),
+            'reservation_expire': lambda: (
+                db_api.reservation_expire(self.ctxt)),
+            'share_instances_get_all_by_host': lambda: (
+                db_api.share_instances_get_all_by_host(
+                    self.ctxt, 'host1@backend')),
+            'share_instances_get_all_by_share_server': lambda: (
+                db_api.share_instances_get_all_by_share_server(
+                    self.ctxt, 'host1_server')),
+            'share_access_get_all_for_instance': lambda: (
+                db_api.share_access_get_all_for_instance(
+                    self.ctxt, share_instance_id)),
+            'share_export_locations_get_by_share_instance_id': lambda: (
+                db_api.share_export_locations_get_by_share_instance_id(
+                    self.ctxt, share_instance_id)),
+            'share_server_get_all_by_host': lambda: (
+                db_api.share_server_get_all_by_host(
+                    self.ctxt, 'host1@backend')),
+            'network_allocations_get_by_ip_address': lambda: (
+                db_api.network_allocations_get_by_ip_address(
+                    self.ctxt, '10.0.0.1')),
+            'network_allocations_get_for_share_server': lambda: (
+                db_api.network_allocations_get_for_share_server(
+                    self.ctxt, 'host1_server')),
+        }
+
+    @ddt.data('service_get_all_by_topic',
+              'reservation_expire',
+              'share_instances_get_all_by_host',
+              'share_instances_get_all_by_share_server',
+              'share_access_get_all_for_instance',
+              'share_export_locations_get_by_share_instance_id',
+              'share_server_get_all_by_host',
+              'network_allocations_get_by_ip_address',
+              'network_allocations_get_for_share_server')
+    def test_no_full_scans(self, name):
+        scans = get_full_scans(self._calls()[name])
+
+        self.assertEqual([], scans)
+
+    def test_full_scans_are_found(self):
+        scans = get_full_scans(
+            lambda: db_api.share_instances_get_all_by_share_network(
+                self.ctxt, 'host1_net'))
+
+        self.assertEqual(['share_instances'],
+                         [table for table, statement in scans])
@@ -0,0 +1,165 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Tests for the DB statement instrumentation."""
+
+from manila import context
+from manila import db
+from manila.db import instrumentation
+from manila.db.sqlalchemy import api as db_api
+from manila.db.sqlalchemy import models
+from manila import test
+from manila.tests import db_utils
+
+
+class StatisticsTestCase(test.TestCase):
+
+    def test_record(self):
+        statistics = instrumentation.Statistics()
+
+        statistics.record('share_get', 1, 0.5)
+        statistics.record('share_get', 2, 0.25)
+        statistics.record('share_update', 0, 1)
+
+        self.assertEqual(
+            {'calls': 0, 'statements': 3, 'rows': 3, 'time': 1.75,
+             'functions': {
+                 'share_get': {'statements': 2, 'rows': 3, 'time': 0.75},
+                 'share_update': {'statements': 1, 'rows': 0, 'time': 1},
+             }},
+            statistics.to_dict())
+
+    def test_merge(self):
+        statistics = instrumentation.Statistics()
+        other = instrumentation.Statistics()
+        other.calls = 1
+        other.record('share_get', 1, 0.5)
+
+        statistics.merge(other)
+        statistics.merge(other)
+
+        self.assertEqual(
+            {'calls': 2, 'statements': 2, 'rows': 2, 'time': 1.0,
+             'functions': {
+                 'share_get': {'statements': 2, 'rows': 2, 'time': 1.0},
+             }},
+            statistics.to_dict())
+
+    def test_str(self):
+        statistics = instrumentation.Statistics()
+        statistics.record('share_update', 0, 0.002)
+        statistics.record('share_get', 1, 0.001)
+
+        self.assertEqual(
+            '2 statements, 1 rows, 3.0 ms (share_get: 1 statements, 1 rows, '
+            '1.0 ms; share_update: 1 statements, 0 rows, 2.0 ms)',
+            str(statistics))
+
+
+class InstrumentationTestCase(test.TestCase):
+
+    def setUp(self):
+        super(InstrumentationTestCase, self).setUp()
+        self.ctxt = context.get_admin_context()
+        instrumentation.reset_statistics()
+        self.addCleanup(instrumentation.reset_statistics)
+
+    def test_record_statement_without_collection(self):
+        self.assertFalse(instrumentation.is_collecting())
+
+        instrumentation.record_statement(1, 0.1)
+
+    def test_collect_nested(self):
+        with instrumentation.collect() as outer:
+            instrumentation.record_statement(1, 0.1)
+            with instrumentation.collect() as inner:
+                self.assertTrue(instrumentation.is_collecting())
+                instrumentation.record_statement(-1, 0.1)
+
+        self.assertFalse(instrumentation.is_collecting())
+        self.assertEqual(2, outer.statements)
+        self.assertEqual(1, outer.rows)
+        self.assertEqual(1, inner.statements)
+        self.assertEqual(0, inner.rows)
+
+    def test_collect_db_api_function(self):
+        share = db_utils.create_share()
+
+        with instrumentation.collect() as statistics:
+            db.share_get(self.ctxt, share['id'])
+
+        self.assertEqual(['share_get'], list(statistics.functions))
+        self.assertTrue(statistics.statements > 0)
+
+    def test_collect_outside_db_api(self):
+        share = db_utils.create_share()
+
+        def query_shares():
+            return db_api.get_session().query(models.Share).all()
+
+        with instrumentation.collect() as statistics:
+            db.share_get(self.ctxt, share['id'])
+            query_shares()
+
+        self.assertEqual(
+            {'share_get', 'manila.tests.db.test_instrumentation:query_shares'},
+            set(statistics.functions))
+
+    def test_scope_disabled(self):
+        self.flags(db_instrumentation=False)
+
+        with instrumentation.scope(instrumentation.SCOPE_API, 'fake'):
+            self.assertFalse(instrumentation.is_collecting())
+
+        self.assertEqual({'api': {}, 'rpc': {}},
+                         instrumentation.get_statistics())
+
+    def test_scope(self):
+        self.flags(db_instrumentation=True)
+        mock_log = self.mock_object(instrumentation.LOG, 'info')
+
+        for __ in range(2):
+            with instrumentation.scope(instrumentation.SCOPE_RPC, 'fake'):
+                instrumentation.record_statement(2, 0.5)
+
+        self.assertEqual(2, mock_log.call_count)
+        self.assertEqual(
+            {'api': {},
+             'rpc': {'fake': {
+                 'calls': 2, 'statements': 2, 'rows': 4, 'time': 1.0,
+                 'functions': {
+                     'manila.tests.db.test_instrumentation:test_scope': {
+                         'statements': 2, 'rows': 4, 'time': 1.0}}}}},
+            instrumentation.get_statistics())
+
+    def test_scope_failure(self):
+        self.flags(db_instrumentation=True)
+
+        def fail():
+            with instrumentation.scope(instrumentation.SCOPE_API, 'fake'):
+                instrumentation.record_statement(1, 0.5)
+                raise ValueError()
+
+        self.assertRaises(ValueError, fail)
+        self.assertFalse(instrumentation.is_collecting())
+        self.assertEqual(
+            1, instrumentation.get_statistics()['api']['fake']['calls'])
+
+    def test_reset_statistics(self):
+        self.flags(db_instrumentation=True)
+        with instrumentation.scope(instrumentation.SCOPE_API, 'fake'):
+            pass
+
+        instrumentation.reset_statistics()
+
+        self.assertEqual({'api': {}, 'rpc': {}},
+                         instrumentation.get_statistics())
@@ -209,6 +209,51 @@ class NeutronApiTest(test.TestCase):
         self.assertTrue(clientv20.Client.called)
         self.assertTrue(self.neutron_api.client.create_port.called)
 
+    def test_create_ports(self):
+        self.mock_object(
+            self.neutron_api.client, 'create_port',
+            mock.Mock(return_value={'ports': ['port1', 'port2']}))
+
+        ports = self.neutron_api.create_ports(
+            'test tenant', 'test net', 2, subnet_id='test subnet',
+            device_owner='test owner')
+
+        self.assertEqual(['port1', 'port2'], ports)
+        port = {
+            'network_id': 'test net',
+            'admin_state_up': True,
+            'tenant_id': 'test tenant',
+            'fixed_ips': [{'subnet_id': 'test subnet'}],
+            'device_owner': 'test owner',
+        }
+        self.neutron_api.client.create_port.assert_called_once_with(
+            {'ports': [port, port]})
+
+    @mock.patch.object(neutron_api.LOG, 'exception', mock.Mock())
+    def test_create_ports_exception(self):
+        self.mock_object(
+            self.neutron_api.client, 'create_port',
+            mock.Mock(side_effect=neutron_client_exc.NeutronClientException(
+                status_code=400)))
+
+        exc = self.assertRaises(exception.NetworkException,
+                                self.neutron_api.create_ports,
+                                'test tenant', 'test net', 2)
+
+        self.assertEqual(400, exc.kwargs['code'])
+        self.assertTrue(neutron_api.LOG.exception.called)
+
+    @mock.patch.object(neutron_api.LOG, 'exception', mock.Mock())
+    def test_create_ports_exception_status_409(self):
+        self.mock_object(
+            self.neutron_api.client, 'create_port',
+            mock.Mock(side_effect=neutron_client_exc.NeutronClientException(
+                status_code=409)))
+
+        self.assertRaises(exception.PortLimitExceeded,
+                          self.neutron_api.create_ports,
+                          'test tenant', 'test net', 2)
+
     def test_delete_port(self):
         # Set up test data
         self.mock_object(self.neutron_api.client, 'delete_port')
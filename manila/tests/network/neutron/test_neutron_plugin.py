@@ -14,7 +14,10 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import copy
+
 import ddt
+import eventlet
 import mock
 from oslo_config import cfg
 
@@ -85,6 +88,7 @@ fake_network_allocation = {
 }
 
 
+@ddt.ddt
 class NeutronNetworkPluginTest(test.TestCase):
 
     def setUp(self):
@@ -95,6 +99,27 @@ class NeutronNetworkPluginTest(test.TestCase):
                                                    project_id='fake project',
                                                    is_admin=False)
 
+    def _set_plugin_flags(self, **kwargs):
+        group = self.plugin.neutron_api.config_group_name
+        for name, value in kwargs.items():
+            CONF.set_override(name, value, group=group)
+            self.addCleanup(CONF.clear_override, name, group=group)
+
+    def _mock_network_data(self):
+        self.mock_object(self.plugin, '_has_provider_network_extension',
+                         mock.Mock(return_value=True))
+        self.mock_object(self.plugin, '_save_neutron_network_data')
+        self.mock_object(self.plugin, '_save_neutron_subnet_data')
+
+    def _get_fake_ports(self, count):
+        ports = []
+        for i in range(count):
+            port = copy.deepcopy(fake_neutron_port)
+            port['id'] = 'port_id_%s' % i
+            port['fixed_ips'][0]['ip_address'] = '10.0.0.%s' % i
+            ports.append(port)
+        return ports
+
     @mock.patch.object(db_api, 'network_allocation_create',
                        mock.Mock(return_values=fake_network_allocation))
     @mock.patch.object(db_api, 'share_network_get',
@@ -153,6 +178,8 @@ class NeutronNetworkPluginTest(test.TestCase):
             self.plugin,
             '_save_neutron_subnet_data').start()
 
+        self._set_plugin_flags(neutron_port_bulk_create=False)
+
         with mock.patch.object(self.plugin.neutron_api, 'create_port',
                                mock.Mock(return_value=fake_neutron_port)):
             self.plugin.allocate_network(
@@ -208,6 +235,133 @@ class NeutronNetworkPluginTest(test.TestCase):
         save_subnet_data.stop()
         create_port.stop()
 
+    def test_allocate_network_bulk(self):
+        self._mock_network_data()
+        ports = self._get_fake_ports(3)
+        self.mock_object(self.plugin.neutron_api, 'create_ports',
+                         mock.Mock(return_value=ports))
+        self.mock_object(self.plugin.neutron_api, 'create_port')
+        self.mock_object(db_api, 'network_allocation_create',
+                         mock.Mock(side_effect=lambda context, values: values))
+
+        result = self.plugin.allocate_network(
+            self.fake_context, fake_share_server, fake_share_network,
+            count=3)
+
+        self.assertEqual([port['id'] for port in ports],
+                         [allocation['id'] for allocation in result])
+        self.assertEqual('10.0.0.2', result[2]['ip_address'])
+        self.plugin.neutron_api.create_ports.assert_called_once_with(
+            fake_share_network['project_id'],
+            network_id=fake_share_network['neutron_net_id'],
+            count=3,
+            subnet_id=fake_share_network['neutron_subnet_id'],
+            device_owner='manila:share')
+        self.assertFalse(self.plugin.neutron_api.create_port.called)
+        self.assertEqual(3, db_api.network_allocation_create.call_count)
+
+    @ddt.data(400, 501)
+    def test_allocate_network_bulk_error(self, code):
+        self._mock_network_data()
+        self.mock_object(self.plugin.neutron_api, 'create_ports',
+                         mock.Mock(side_effect=exception.NetworkException(
+                             code=code)))
+        self.mock_object(self.plugin.neutron_api, 'create_port',
+                         mock.Mock(side_effect=self._get_fake_ports(2)))
+        self.mock_object(db_api, 'network_allocation_create',
+                         mock.Mock(side_effect=lambda context, values: values))
+        self.mock_object(plugin.LOG, 'warning')
+
+        if code == 400:
+            result = self.plugin.allocate_network(
+                self.fake_context, fake_share_server, fake_share_network,
+                count=2)
+
+            self.assertEqual(['port_id_0', 'port_id_1'],
+                             sorted(allocation['id'] for allocation in result))
+            self.assertEqual(2,
+                             self.plugin.neutron_api.create_port.call_count)
+            self.assertEqual(1, plugin.LOG.warning.call_count)
+        else:
+            self.assertRaises(exception.NetworkException,
+                              self.plugin.allocate_network,
+                              self.fake_context, fake_share_server,
+                              fake_share_network, count=2)
+
+            self.assertFalse(self.plugin.neutron_api.create_port.called)
+            self.assertFalse(db_api.network_allocation_create.called)
+
+    def test_allocate_network_bulk_db_error(self):
+        self._mock_network_data()
+        ports = self._get_fake_ports(3)
+        self.mock_object(self.plugin.neutron_api, 'create_ports',
+                         mock.Mock(return_value=ports))
+        self.mock_object(self.plugin.neutron_api, 'delete_port')
+        self.mock_object(db_api, 'network_allocation_create', mock.Mock(
+            side_effect=[fake_network_allocation, exception.ManilaException]))
+        self.mock_object(db_api, 'network_allocation_delete')
+
+        self.assertRaises(exception.ManilaException,
+                          self.plugin.allocate_network,
+                          self.fake_context, fake_share_server,
+                          fake_share_network, count=3)
+
+        self.plugin.neutron_api.delete_port.assert_has_calls(
+            [mock.call('port_id_1'), mock.call('port_id_2'),
+             mock.call(fake_network_allocation['id'])])
+        db_api.network_allocation_delete.assert_called_once_with(
+            self.fake_context, fake_network_allocation['id'])
+
+    def test_allocate_network_concurrent_error(self):
+        self._set_plugin_flags(neutron_port_bulk_create=False)
+        self._mock_network_data()
+        ports = self._get_fake_ports(3)
+        self.mock_object(self.plugin.neutron_api, 'create_port', mock.Mock(
+            side_effect=[ports[0], exception.PortLimitExceeded, ports[2]]))
+        self.mock_object(self.plugin.neutron_api, 'delete_port')
+        self.mock_object(db_api, 'network_allocation_create',
+                         mock.Mock(side_effect=lambda context, values: values))
+        self.mock_object(db_api, 'network_allocation_delete')
+
+        self.assertRaises(exception.PortLimitExceeded,
+                          self.plugin.allocate_network,
+                          self.fake_context, fake_share_server,
+                          fake_share_network, count=3)
+
+        self.assertEqual(3, self.plugin.neutron_api.create_port.call_count)
+        self.assertEqual(
+            ['port_id_0', 'port_id_2'],
+            sorted(call[0][0] for call in
+                   self.plugin.neutron_api.delete_port.call_args_list))
+        self.assertEqual(2, db_api.network_allocation_delete.call_count)
+
+    def test_allocate_network_concurrency(self):
+        self._set_plugin_flags(neutron_port_bulk_create=False,
+                               neutron_port_concurrency=2)
+        self._mock_network_data()
+        ports = iter(self._get_fake_ports(5))
+        running = []
+        max_running = []
+
+        def create_port(*args, **kwargs):
+            running.append(1)
+            max_running.append(len(running))
+            eventlet.sleep(0)
+            running.pop()
+            return next(ports)
+
+        self.mock_object(self.plugin.neutron_api, 'create_port',
+                         mock.Mock(side_effect=create_port))
+        self.mock_object(db_api, 'network_allocation_create',
+                         mock.Mock(side_effect=lambda context, values: values))
+
+        result = self.plugin.allocate_network(
+            self.fake_context, fake_share_server, fake_share_network,
+            count=5)
+
+        self.assertEqual(5, len(result))
+        self.assertEqual(2, max(max_running))
+
     @mock.patch.object(db_api, 'network_allocation_delete', mock.Mock())
     @mock.patch.object(db_api, 'share_network_update', mock.Mock())
     @mock.patch.object(db_api, 'network_allocations_get_for_share_server',
@@ -248,6 +402,23 @@ class NeutronNetworkPluginTest(test.TestCase):
             {'status': constants.STATUS_ERROR})
         delete_port.stop()
 
+    def test_deallocate_network_deletes_all_ports(self):
+        allocations = [{'id': 'port_id_%s' % i} for i in range(3)]
+        self.mock_object(db_api, 'network_allocations_get_for_share_server',
+                         mock.Mock(return_value=allocations))
+        self.mock_object(self.plugin.neutron_api, 'delete_port', mock.Mock(
+            side_effect=[None, exception.NetworkException, None]))
+        self.mock_object(db_api, 'network_allocation_delete')
+        self.mock_object(db_api, 'network_allocation_update')
+
+        self.assertRaises(exception.NetworkException,
+                          self.plugin.deallocate_network,
+                          self.fake_context, fake_share_server['id'])
+
+        self.assertEqual(3, self.plugin.neutron_api.delete_port.call_count)
+        self.assertEqual(2, db_api.network_allocation_delete.call_count)
+        self.assertEqual(1, db_api.network_allocation_update.call_count)
+
     @mock.patch.object(db_api, 'share_network_update', mock.Mock())
     def test_save_neutron_network_data(self):
         neutron_nw_info = {'provider:network_type': 'vlan',
@@ -345,8 +345,8 @@ class StandaloneNetworkPluginTest(test.TestCase):
         self.mock_object(instance.db, 'share_network_update')
         self.mock_object(instance.db, 'network_allocation_create')
         self.mock_object(
-            instance.db, 'network_allocations_get_by_ip_address',
-            mock.Mock(return_value=[]))
+            instance.db, 'network_allocations_get_ip_addresses',
+            mock.Mock(return_value=set()))
 
         allocations = instance.allocate_network(
             fake_context, fake_share_server, fake_share_network)
@@ -360,8 +360,8 @@ class StandaloneNetworkPluginTest(test.TestCase):
         }
         instance.db.share_network_update.assert_called_once_with(
             fake_context, fake_share_network['id'], na_data)
-        instance.db.network_allocations_get_by_ip_address.assert_has_calls(
-            [mock.call(fake_context, '10.0.0.2')])
+        instance.db.network_allocations_get_ip_addresses.\
+            assert_called_once_with(fake_context)
         instance.db.network_allocation_create.assert_called_once_with(
             fake_context,
             dict(share_server_id=fake_share_server['id'],
@@ -369,15 +369,7 @@ class StandaloneNetworkPluginTest(test.TestCase):
                  label='user', **na_data))
 
     def test_allocate_network_two_ip_addresses_ipv4_two_usages_exist(self):
-        ctxt = type('FakeCtxt', (object,), {'fake': ['10.0.0.2', '10.0.0.4']})
-
-        def fake_get_allocations_by_ip_address(context, ip_address):
-            if ip_address not in context.fake:
-                context.fake.append(ip_address)
-                return []
-            else:
-                return context.fake
-
+        ctxt = 'fake_context'
         data = {
             'DEFAULT': {
                 'standalone_network_plugin_gateway': '10.0.0.1',
@@ -389,8 +381,8 @@ class StandaloneNetworkPluginTest(test.TestCase):
         self.mock_object(instance.db, 'share_network_update')
         self.mock_object(instance.db, 'network_allocation_create')
         self.mock_object(
-            instance.db, 'network_allocations_get_by_ip_address',
-            mock.Mock(side_effect=fake_get_allocations_by_ip_address))
+            instance.db, 'network_allocations_get_ip_addresses',
+            mock.Mock(return_value={'10.0.0.2', '10.0.0.4', '10.1.0.3'}))
 
         allocations = instance.allocate_network(
             ctxt, fake_share_server, fake_share_network, count=2)
@@ -404,9 +396,8 @@ class StandaloneNetworkPluginTest(test.TestCase):
         }
         instance.db.share_network_update.assert_called_once_with(
             ctxt, fake_share_network['id'], dict(**na_data))
-        instance.db.network_allocations_get_by_ip_address.assert_has_calls(
-            [mock.call(ctxt, '10.0.0.2'), mock.call(ctxt, '10.0.0.3'),
-             mock.call(ctxt, '10.0.0.4'), mock.call(ctxt, '10.0.0.5')])
+        instance.db.network_allocations_get_ip_addresses.\
+            assert_called_once_with(ctxt)
         instance.db.network_allocation_create.assert_has_calls([
             mock.call(
                 ctxt,
@@ -432,8 +423,8 @@ class StandaloneNetworkPluginTest(test.TestCase):
         self.mock_object(instance.db, 'share_network_update')
         self.mock_object(instance.db, 'network_allocation_create')
         self.mock_object(
-            instance.db, 'network_allocations_get_by_ip_address',
-            mock.Mock(return_value=['not empty list']))
+            instance.db, 'network_allocations_get_ip_addresses',
+            mock.Mock(return_value={'10.0.0.2'}))
 
         self.assertRaises(
             exception.NetworkBadConfigurationException,
@@ -444,5 +435,5 @@ class StandaloneNetworkPluginTest(test.TestCase):
             fake_context, fake_share_network['id'],
             dict(network_type=None, segmentation_id=None,
                  cidr=six.text_type(instance.net.cidr), ip_version=4))
-        instance.db.network_allocations_get_by_ip_address.assert_has_calls(
-            [mock.call(fake_context, '10.0.0.2')])
+        instance.db.network_allocations_get_ip_addresses.\
+            assert_called_once_with(fake_context)
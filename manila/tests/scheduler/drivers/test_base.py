@@ -51,7 +51,21 @@ class SchedulerTestCase(test.TestCase):
             self.driver.update_service_capabilities(
                 service_name, host, capabilities)
             self.driver.host_manager.update_service_capabilities.\
-                assert_called_once_with(service_name, host, capabilities)
+                assert_called_once_with(service_name, host, capabilities,
+                                        sequence=None)
+
+    def test_update_service_capabilities_delta(self):
+        self.mock_object(self.driver.host_manager,
+                         'update_service_capabilities_delta',
+                         mock.Mock(return_value=False))
+
+        result = self.driver.update_service_capabilities_delta(
+            'fake_service', 'fake_host', {'removed': ['foo']}, 2)
+
+        self.assertFalse(result)
+        (self.driver.host_manager.update_service_capabilities_delta.
+            assert_called_once_with('fake_service', 'fake_host',
+                                    {'removed': ['foo']}, 2))
 
     def test_hosts_up(self):
         service1 = {'host': 'host1'}
@@ -87,6 +101,27 @@ class SchedulerDriverBaseTestCase(SchedulerTestCase):
                           self.context, self.topic, 'schedule_something',
                           *fake_args, **fake_kwargs)
 
+    def test_schedule_create_shares(self):
+        request_specs = [{'share_id': 1}, {'share_id': 2}]
+        filter_properties = {'fake': 'props'}
+        ex = NotImplementedError()
+        self.mock_object(self.driver, 'schedule_create_share',
+                         mock.Mock(side_effect=[None, ex]))
+
+        failures = self.driver.schedule_create_shares(
+            self.context, request_specs, filter_properties)
+
+        self.assertEqual([(request_specs[1], ex)], failures)
+        self.driver.schedule_create_share.assert_has_calls([
+            mock.call(self.context, request_specs[0], filter_properties),
+            mock.call(self.context, request_specs[1], filter_properties),
+        ])
+        for call in self.driver.schedule_create_share.call_args_list:
+            self.assertIsNot(filter_properties, call[0][2])
+
+    def test_get_decision_cache_stats(self):
+        self.assertIsNone(self.driver.get_decision_cache_stats())
+
 
 class SchedulerDriverModuleTestCase(test.TestCase):
     """Test case for scheduler driver module methods."""
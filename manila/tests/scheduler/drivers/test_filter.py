@@ -26,6 +26,7 @@ from manila import exception
 from manila.scheduler.drivers import base
 from manila.scheduler.drivers import filter
 from manila.scheduler import host_manager
+from manila import test
 from manila.tests.scheduler.drivers import test_base
 from manila.tests.scheduler import fakes
 
@@ -308,6 +309,249 @@ class FilterSchedulerTestCase(test_base.SchedulerTestCase):
         self.assertIsNone(weighed_host)
         self.assertTrue(_mock_service_get_all_by_topic.called)
 
+    def _get_batch_request_spec(self, share_id, size, share_type=None):
+        return {
+            'share_id': share_id,
+            'snapshot_id': None,
+            'share_type': share_type or {'id': 'fake_type', 'name': 'foo'},
+            'share_properties': {'project_id': 1, 'size': size},
+            'share_instance_properties': {},
+        }
+
+    @mock.patch('manila.db.service_get_all_by_topic')
+    def test_schedule_create_shares(self, _mock_service_get_all_by_topic):
+        sched = fakes.FakeFilterScheduler()
+        sched.host_manager = fakes.FakeHostManager()
+        fake_context = context.RequestContext('user', 'project',
+                                              is_admin=True)
+        fakes.mock_host_manager_db_calls(_mock_service_get_all_by_topic)
+        request_specs = [
+            self._get_batch_request_spec('share%s' % i, size)
+            for i, size in enumerate((1, 300, 2, 1))
+        ]
+        request_specs[3]['share_instance_properties'] = {
+            'availability_zone_id': 'fake_az'}
+        mock_update_db = self.mock_object(
+            base, 'share_update_db',
+            mock.Mock(side_effect=lambda ctxt, share_id, host: mock.Mock(
+                instance={'id': share_id + '_instance'})))
+        mock_get_filtered_hosts = self.mock_object(
+            sched.host_manager, 'get_filtered_hosts',
+            mock.Mock(side_effect=sched.host_manager.get_filtered_hosts))
+        self.mock_object(sched.share_rpcapi, 'create_share_instances')
+
+        failures = sched.schedule_create_shares(
+            fake_context, request_specs, {})
+
+        self.assertEqual(1, len(failures))
+        self.assertIs(request_specs[3], failures[0][0])
+        self.assertIsInstance(failures[0][1], exception.NoValidHost)
+        # One pass per group plus one per share of the non empty group.
+        self.assertEqual(5, mock_get_filtered_hosts.call_count)
+        self.assertEqual(['share1', 'share2', 'share0'],
+                         [c[0][1] for c in mock_update_db.call_args_list])
+        placed = {}
+        for call in sched.share_rpcapi.create_share_instances.call_args_list:
+            ctxt, backend, items = call[0]
+            self.assertEqual(fake_context, ctxt)
+            for item in items:
+                self.assertEqual(backend, item['host'].split('#')[0])
+                self.assertNotIn('context', item['filter_properties'])
+                placed[item['share_instance']['id']] = item['host']
+        self.assertEqual(
+            {'share0_instance', 'share1_instance', 'share2_instance'},
+            set(placed))
+        # Every backend receives a single cast.
+        self.assertEqual(
+            len(set(host.split('#')[0] for host in placed.values())),
+            sched.share_rpcapi.create_share_instances.call_count)
+
+    @mock.patch('manila.db.service_get_all_by_topic')
+    def test_schedule_create_shares_consumes_capacity(
+            self, _mock_service_get_all_by_topic):
+        sched = fakes.FakeFilterScheduler()
+        sched.host_manager = fakes.FakeHostManager()
+        fake_context = context.RequestContext('user', 'project',
+                                              is_admin=True)
+        fakes.mock_host_manager_db_calls(_mock_service_get_all_by_topic)
+        request_specs = [self._get_batch_request_spec('share%s' % i, 500)
+                         for i in range(3)]
+        self.mock_object(
+            base, 'share_update_db',
+            mock.Mock(side_effect=lambda ctxt, share_id, host: mock.Mock(
+                instance={'id': share_id})))
+        self.mock_object(sched.share_rpcapi, 'create_share_instances')
+
+        failures = sched.schedule_create_shares(
+            fake_context, request_specs, {})
+
+        self.assertEqual([], failures)
+        hosts = [item['host'] for call in
+                 sched.share_rpcapi.create_share_instances.call_args_list
+                 for item in call[0][2]]
+        # A single host cannot hold all the shares of the batch.
+        self.assertEqual(3, len(hosts))
+        self.assertGreater(len(set(hosts)), 1)
+
+    def test_schedule_create_shares_invalid_request_spec(self):
+        sched = fakes.FakeFilterScheduler()
+        request_spec = self._get_batch_request_spec('share0', 1)
+        request_spec['share_type'] = None
+        self.mock_object(sched.host_manager, 'get_all_host_states_share',
+                         mock.Mock(return_value=[]))
+        self.mock_object(sched.share_rpcapi, 'create_share_instances')
+
+        failures = sched.schedule_create_shares(
+            self.context, [request_spec], {})
+
+        self.assertEqual(1, len(failures))
+        self.assertIsInstance(failures[0][1],
+                              exception.InvalidParameterValue)
+        self.assertFalse(sched.share_rpcapi.create_share_instances.called)
+
+    @mock.patch('manila.db.service_get_all_by_topic')
+    def test__schedule_share_reuses_filtered_hosts(
+            self, _mock_service_get_all_by_topic):
+        sched = fakes.FakeFilterScheduler()
+        sched.host_manager = fakes.FakeHostManager()
+        fake_context = context.RequestContext('user', 'project',
+                                              is_admin=True)
+        fakes.mock_host_manager_db_calls(_mock_service_get_all_by_topic)
+        mock_get_filtered_hosts = self.mock_object(
+            sched.host_manager, 'get_filtered_hosts',
+            mock.Mock(side_effect=sched.host_manager.get_filtered_hosts))
+
+        for i in range(3):
+            request_spec = self._get_batch_request_spec('share%s' % i, 1)
+            weighed_host = sched._schedule_share(
+                fake_context, request_spec, {})
+            self.assertIsNotNone(weighed_host)
+
+        # NOTE: only the capacity of the cached hosts is checked again.
+        self.assertEqual(
+            [mock.call(mock.ANY, mock.ANY)] +
+            [mock.call(mock.ANY, mock.ANY,
+                       filter_class_names=['CapacityFilter'])] * 2,
+            mock_get_filtered_hosts.call_args_list)
+        self.assertEqual(
+            {'hits': 2, 'misses': 1, 'invalidations': 0, 'size': 1},
+            sched.decision_cache.get_stats())
+
+    @mock.patch('manila.db.service_get_all_by_topic')
+    def test__schedule_share_decision_cache_disabled(
+            self, _mock_service_get_all_by_topic):
+        self.flags(scheduler_decision_cache_size=0)
+        sched = fakes.FakeFilterScheduler()
+        sched.host_manager = fakes.FakeHostManager()
+        fake_context = context.RequestContext('user', 'project',
+                                              is_admin=True)
+        fakes.mock_host_manager_db_calls(_mock_service_get_all_by_topic)
+        mock_get_filtered_hosts = self.mock_object(
+            sched.host_manager, 'get_filtered_hosts',
+            mock.Mock(side_effect=sched.host_manager.get_filtered_hosts))
+
+        for i in range(2):
+            request_spec = self._get_batch_request_spec('share%s' % i, 1)
+            sched._schedule_share(fake_context, request_spec, {})
+
+        self.assertIsNone(sched.decision_cache)
+        self.assertEqual(2, mock_get_filtered_hosts.call_count)
+
+    @ddt.data({'retry': {'num_attempts': 2, 'hosts': ['fake_host']}},
+              {'share_type': {'extra_specs': {'fake': ['unhashable']}}},
+              {'request_spec': {'active_replica_host': 'fake_host',
+                                'all_replica_hosts': 'fake_host'}})
+    def test__get_decision_cache_key_none(self, filter_properties):
+        sched = fakes.FakeFilterScheduler()
+
+        self.assertIsNone(sched._get_decision_cache_key(filter_properties))
+
+    def test__get_filtered_hosts_replica_not_cached(self):
+        sched = fakes.FakeFilterScheduler()
+        host_states = [fakes.FakeHostState('host%s' % i, {})
+                       for i in range(3)]
+        mock_get_filtered_hosts = self.mock_object(
+            sched.host_manager, 'get_filtered_hosts',
+            mock.Mock(side_effect=[host_states[1:], host_states[2:]]))
+        filter_properties = {
+            'share_type': {'id': 'fake_type'},
+            'size': 1,
+            'request_spec': {'active_replica_host': 'host0',
+                             'all_replica_hosts': 'host0'},
+        }
+        other_filter_properties = {
+            'share_type': {'id': 'fake_type'},
+            'size': 1,
+            'request_spec': {'active_replica_host': 'host0',
+                             'all_replica_hosts': 'host0,host1'},
+        }
+
+        self.assertEqual(host_states[1:], sched._get_filtered_hosts(
+            host_states, filter_properties))
+        self.assertEqual(host_states[2:], sched._get_filtered_hosts(
+            host_states, other_filter_properties))
+
+        mock_get_filtered_hosts.assert_has_calls([
+            mock.call(host_states, filter_properties),
+            mock.call(host_states, other_filter_properties)])
+        self.assertEqual(
+            {'hits': 0, 'misses': 0, 'invalidations': 0, 'size': 0},
+            sched.decision_cache.get_stats())
+
+    def test__get_decision_cache_key(self):
+        sched = fakes.FakeFilterScheduler()
+        filter_properties = {
+            'share_type': {'id': 'fake_type', 'extra_specs': {'a': 'b'}},
+            'request_spec': {'share_proto': 'NFS'},
+            'size': 1,
+            'retry': {'num_attempts': 1, 'hosts': []},
+        }
+        other_filter_properties = dict(filter_properties, size=2)
+
+        key = sched._get_decision_cache_key(filter_properties)
+
+        self.assertEqual(key, sched._get_decision_cache_key(
+            dict(filter_properties, metadata={'fake': 'fake'})))
+        self.assertNotEqual(
+            key, sched._get_decision_cache_key(other_filter_properties))
+
+    def test_get_decision_cache_stats(self):
+        sched = fakes.FakeFilterScheduler()
+
+        self.assertEqual(
+            {'hits': 0, 'misses': 0, 'invalidations': 0, 'size': 0},
+            sched.get_decision_cache_stats())
+
+    def test_get_decision_cache_stats_disabled(self):
+        self.flags(scheduler_decision_cache_size=0)
+        sched = fakes.FakeFilterScheduler()
+
+        self.assertIsNone(sched.get_decision_cache_stats())
+
+    @mock.patch('manila.db.service_get_all_by_topic')
+    def test__schedule_share_cached_hosts_refiltered(
+            self, _mock_service_get_all_by_topic):
+        sched = fakes.FakeFilterScheduler()
+        sched.host_manager = fakes.FakeHostManager()
+        fake_context = context.RequestContext('user', 'project',
+                                              is_admin=True)
+        fakes.mock_host_manager_db_calls(_mock_service_get_all_by_topic)
+        request_spec = self._get_batch_request_spec('share0', 1)
+        first_host = sched._schedule_share(fake_context, request_spec, {})
+        # NOTE: the chosen pool is left with less than the reserved space.
+        first_host.obj.free_capacity_gb = 0
+        mock_get_filtered_hosts = self.mock_object(
+            sched.host_manager, 'get_filtered_hosts',
+            mock.Mock(side_effect=sched.host_manager.get_filtered_hosts))
+
+        request_spec = self._get_batch_request_spec('share1', 1)
+        weighed_host = sched._schedule_share(fake_context, request_spec, {})
+
+        self.assertIsNotNone(weighed_host)
+        self.assertNotEqual(first_host.obj.host, weighed_host.obj.host)
+        mock_get_filtered_hosts.assert_called_once_with(
+            mock.ANY, mock.ANY, filter_class_names=['CapacityFilter'])
+
     def test_max_attempts(self):
         self.flags(scheduler_max_attempts=4)
         sched = fakes.FakeFilterScheduler()
@@ -560,3 +804,57 @@ class FilterSchedulerTestCase(test_base.SchedulerTestCase):
         mock_share_rpcapi_call.assert_called_once_with(
             self.context, 'replica', host, request_spec=request_spec,
             filter_properties={})
+
+
+@ddt.ddt
+class DecisionCacheTestCase(test.TestCase):
+
+    def setUp(self):
+        super(DecisionCacheTestCase, self).setUp()
+        self.cache = filter.DecisionCache(2, 10)
+        self.host_states = [
+            fakes.FakeHostState('host%s' % i,
+                                {'free_capacity_gb': 100,
+                                 'capabilities': {'timestamp': 'fake_ts'}})
+            for i in range(3)]
+        self.hosts = {host_state.host: host_state
+                      for host_state in self.host_states}
+
+    def test_get(self):
+        self.cache.put('key', self.host_states[:2])
+
+        self.assertEqual(self.host_states[:2],
+                         self.cache.get('key', self.hosts))
+        self.assertIsNone(self.cache.get('other_key', self.hosts))
+        self.assertEqual(
+            {'hits': 1, 'misses': 1, 'invalidations': 0, 'size': 1},
+            self.cache.get_stats())
+
+    @ddt.data('expired', 'capabilities', 'removed', 'replaced')
+    def test_get_invalidated(self, reason):
+        self.cache.put('key', self.host_states[:2])
+        if reason == 'expired':
+            self.mock_object(filter.timeutils, 'is_older_than',
+                             mock.Mock(return_value=True))
+        elif reason == 'capabilities':
+            self.host_states[1].capabilities = {'timestamp': 'new_ts'}
+        elif reason == 'removed':
+            self.hosts.pop('host1')
+        else:
+            self.hosts['host1'] = fakes.FakeHostState('host1', {})
+
+        self.assertIsNone(self.cache.get('key', self.hosts))
+        self.assertEqual(
+            {'hits': 0, 'misses': 1, 'invalidations': 1, 'size': 0},
+            self.cache.get_stats())
+
+    def test_put_evicts_least_recently_used(self):
+        self.cache.put('key1', self.host_states[:1])
+        self.cache.put('key2', self.host_states[1:2])
+        self.cache.get('key1', self.hosts)
+
+        self.cache.put('key3', self.host_states[2:])
+
+        self.assertIsNone(self.cache.get('key2', self.hosts))
+        self.assertIsNotNone(self.cache.get('key1', self.hosts))
+        self.assertIsNotNone(self.cache.get('key3', self.hosts))
@@ -18,9 +18,11 @@ Tests For CapabilitiesFilter.
 """
 
 import ddt
+import mock
 from oslo_context import context
 
 from manila.scheduler.filters import capabilities
+from manila.scheduler.filters import extra_specs_ops
 from manila import test
 from manila.tests.scheduler import fakes
 
@@ -33,6 +35,10 @@ class HostFiltersTestCase(test.TestCase):
         super(HostFiltersTestCase, self).setUp()
         self.context = context.RequestContext('fake', 'fake')
         self.filter = capabilities.CapabilitiesFilter()
+        patcher = mock.patch.dict(
+            capabilities.CapabilitiesFilter._compiled_extra_specs, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
 
     def _do_test_type_filter_extra_specs(self, ecaps, especs, passes):
         capabilities = {'enabled': True}
@@ -166,3 +172,47 @@ class HostFiltersTestCase(test.TestCase):
             ecaps={'scope_lv0': {'opt1': [True, False]}},
             especs={'capabilities:scope_lv1:opt1': '<is> True'},
             passes=False)
+
+    def test_filter_all_compiles_extra_specs_once(self):
+        self.mock_object(extra_specs_ops, 'compile_requirement',
+                         mock.Mock(side_effect=(
+                             extra_specs_ops.compile_requirement)))
+        filter_properties = {'resource_type': {'id': 'fake_type_id',
+                                               'extra_specs': {
+                                                   'opt1': '>= 2',
+                                                   'opt2': '<is> True',
+                                               }}}
+        hosts = [fakes.FakeHostState('host%s' % i,
+                                     {'capabilities': {'opt1': i,
+                                                       'opt2': True}})
+                 for i in range(4)]
+
+        result = list(self.filter.filter_all(hosts, filter_properties))
+        result += list(self.filter.filter_all(hosts, filter_properties))
+
+        self.assertEqual(hosts[2:] * 2, result)
+        self.assertEqual(2, extra_specs_ops.compile_requirement.call_count)
+
+    def test_compiled_extra_specs_recompiled_on_change(self):
+        resource_type = {'id': 'fake_type_id', 'extra_specs': {'opt1': '1'}}
+        host = fakes.FakeHostState('host1', {'capabilities': {'opt1': '1'}})
+        filter_properties = {'resource_type': resource_type}
+
+        self.assertTrue(self.filter.host_passes(host, filter_properties))
+
+        resource_type['extra_specs']['opt1'] = '2'
+
+        self.assertFalse(self.filter.host_passes(host, filter_properties))
+        self.assertEqual(2, len(self.filter._compiled_extra_specs))
+
+    def test_compiled_extra_specs_cache_is_bounded(self):
+        self.mock_object(capabilities.CapabilitiesFilter,
+                         '_compiled_extra_specs_max_size', 2)
+        host = fakes.FakeHostState('host1', {'capabilities': {'opt1': '1'}})
+
+        for i in range(5):
+            self.filter.host_passes(
+                host, {'resource_type': {'id': i,
+                                         'extra_specs': {'opt1': '1'}}})
+
+        self.assertEqual(2, len(self.filter._compiled_extra_specs))
@@ -73,3 +73,24 @@ class ExtraSpecsOpsTestCase(test.TestCase):
     def test_extra_specs_matches_simple(self, value, req, matches):
         self._do_extra_specs_ops_test(
             value, req, matches)
+
+    @ddt.unpack
+    @ddt.data(
+        ('>= 2', ('3', '2', 2.5), ('1', 'nonsense', None)),
+        ('<is> True', (True, 'True', 'yes'), (False, 'nonsense', None)),
+        ('<or> 11 <or> 12', ('11', '12'), ('13', '<or>', None)),
+        ('<in> abc', ('abc', 'xabcx'), ('ab', None)),
+        ('s== abc', ('abc', ), ('abcd', None)),
+        ('>= nonsense', (), ('1', 'nonsense', None)),
+        ('<=', (), ('1', None)),
+        ('fake', ('fake', ), ('other', False, None)),
+    )
+    def test_compile_requirement(self, req, matching, not_matching):
+        matcher = extra_specs_ops.compile_requirement(req)
+
+        for value in matching:
+            self.assertTrue(matcher(value))
+            self.assertTrue(extra_specs_ops.match(value, req))
+        for value in not_matching:
+            self.assertFalse(matcher(value))
+            self.assertFalse(extra_specs_ops.match(value, req))
@@ -19,6 +19,8 @@ Tests For HostManager
 """
 
 import copy
+import datetime
+
 import ddt
 import mock
 from oslo_config import cfg
@@ -27,8 +29,11 @@ from six import moves
 
 from manila import db
 from manila import exception
+from manila.scheduler.filters import availability_zone
 from manila.scheduler.filters import base_host
+from manila.scheduler.filters import capabilities as capabilities_filter
 from manila.scheduler import host_manager
+from manila.share import utils as share_utils
 from manila import test
 from manila.tests.scheduler import fakes
 from manila import utils
@@ -142,6 +147,110 @@ class HostManagerTestCase(test.TestCase):
         }
         self.assertDictMatch(service_states, expected)
 
+    def test_update_service_capabilities_delta(self):
+        capabilities = {
+            'share_backend_name': 'AAA',
+            'pools': [dict(pool_name='pool1', free_capacity_gb=41),
+                      dict(pool_name='pool2', free_capacity_gb=42)],
+        }
+        self.host_manager.update_service_capabilities(
+            'share', 'host1', capabilities, sequence=1)
+        new_capabilities = {
+            'share_backend_name': 'AAA',
+            'pools': [dict(pool_name='pool1', free_capacity_gb=40),
+                      dict(pool_name='pool3', free_capacity_gb=43)],
+        }
+        delta = share_utils.get_capabilities_delta(capabilities,
+                                                   new_capabilities)
+
+        with mock.patch.object(timeutils, 'utcnow',
+                               mock.Mock(return_value=31337)):
+            result = self.host_manager.update_service_capabilities_delta(
+                'share', 'host1', delta, 2)
+
+        self.assertTrue(result)
+        self.assertEqual(dict(new_capabilities, timestamp=31337),
+                         self.host_manager.service_states['host1'])
+        self.assertEqual(2, self.host_manager.service_states_version['host1'])
+        self.assertEqual(2,
+                         self.host_manager.service_states_sequence['host1'])
+
+    def test_update_service_capabilities_delta_after_consume(self):
+        self.mock_object(utils, 'service_is_up', mock.Mock(return_value=True))
+        self.mock_object(
+            db, 'service_get_all_by_topic',
+            mock.Mock(return_value=fakes.SHARE_SERVICES_WITH_POOLS[:1]))
+        capabilities = {
+            'share_backend_name': 'AAA',
+            'pools': [dict(pool_name='pool1', total_capacity_gb=51,
+                           free_capacity_gb=41, reserved_percentage=0)],
+        }
+        new_capabilities = {
+            'share_backend_name': 'AAA',
+            'pools': [dict(pool_name='pool1', total_capacity_gb=51,
+                           free_capacity_gb=30, reserved_percentage=0)],
+        }
+        delta = share_utils.get_capabilities_delta(capabilities,
+                                                   new_capabilities)
+
+        def get_pool():
+            return [pool for pool in
+                    self.host_manager.get_all_host_states_share('fake')
+                    if pool.host == 'host1@AAA#pool1'][0]
+
+        with mock.patch.object(timeutils, 'utcnow', mock.Mock(
+                return_value=datetime.datetime(2016, 1, 1, 0, 0, 1))):
+            self.host_manager.update_service_capabilities(
+                'share', 'host1@AAA', capabilities, sequence=1)
+            get_pool()
+        with mock.patch.object(timeutils, 'utcnow', mock.Mock(
+                return_value=datetime.datetime(2016, 1, 1, 0, 0, 2))):
+            get_pool().consume_from_share({'size': 1})
+        with mock.patch.object(timeutils, 'utcnow', mock.Mock(
+                return_value=datetime.datetime(2016, 1, 1, 0, 0, 3))):
+            self.host_manager.update_service_capabilities_delta(
+                'share', 'host1@AAA', delta, 2)
+            pool = get_pool()
+
+        self.assertEqual(30, pool.free_capacity_gb)
+        self.assertEqual(datetime.datetime(2016, 1, 1, 0, 0, 3),
+                         pool.updated)
+        self.assertNotIn(
+            'timestamp',
+            self.host_manager.service_states['host1@AAA']['pools'][0])
+
+    @ddt.data((None, 2), (1, 3), (1, 1))
+    @ddt.unpack
+    def test_update_service_capabilities_delta_out_of_sequence(
+            self, last_sequence, sequence):
+        capabilities = {'share_backend_name': 'AAA', 'timestamp': 31337}
+        self.host_manager.update_service_capabilities(
+            'share', 'host1', capabilities, sequence=last_sequence)
+        service_states = copy.deepcopy(self.host_manager.service_states)
+
+        result = self.host_manager.update_service_capabilities_delta(
+            'share', 'host1', {'updated': {'share_backend_name': 'BBB'}},
+            sequence)
+
+        self.assertFalse(result)
+        self.assertEqual(service_states, self.host_manager.service_states)
+
+    def test_update_service_capabilities_delta_unknown_host(self):
+        self.assertFalse(self.host_manager.update_service_capabilities_delta(
+            'share', 'host1', {}, 1))
+
+    @ddt.data(True, False)
+    def test_update_service_capabilities_log(self, log_capabilities):
+        self.flags(scheduler_log_service_capabilities=log_capabilities)
+        self.mock_object(host_manager.LOG, 'debug')
+
+        self.host_manager.update_service_capabilities(
+            'share', 'host1', {'pools': ['fake_pool']}, sequence=1)
+
+        host_manager.LOG.debug.assert_called_once_with(mock.ANY, mock.ANY)
+        self.assertEqual(log_capabilities,
+                         'cap' in host_manager.LOG.debug.call_args[0][1])
+
     def test_get_all_host_states_share(self):
         context = 'fake_context'
         topic = CONF.share_topic
@@ -175,6 +284,177 @@ class HostManagerTestCase(test.TestCase):
                 self.assertEqual(share_node, host_state_map[host].service)
             db.service_get_all_by_topic.assert_called_once_with(context, topic)
 
+    def test_update_host_state_map_reuses_unchanged_hosts(self):
+        context = 'fake_context'
+        services = copy.deepcopy(fakes.SHARE_SERVICES_NO_POOLS)
+        self.mock_object(db, 'service_get_all_by_topic',
+                         mock.Mock(return_value=services))
+        self.mock_object(utils, 'service_is_up', mock.Mock(return_value=True))
+        self.mock_object(host_manager.HostState,
+                         'update_from_share_capability')
+
+        for host, capabilities in fakes.SERVICE_STATES_NO_POOLS.items():
+            self.host_manager.update_service_capabilities(
+                'share', host, capabilities)
+
+        self.host_manager._update_host_state_map(context)
+
+        self.assertEqual(3, host_manager.HostState.
+                         update_from_share_capability.call_count)
+        self.assertEqual({'reused': 0, 'recomputed': 3, 'removed': 0,
+                          'version': 1},
+                         self.host_manager.host_state_map_stats)
+
+        # Heartbeats alone must not cause a rebuild
+        for service in services:
+            service['updated_at'] = timeutils.utcnow()
+        self.host_manager._update_host_state_map(context)
+
+        self.assertEqual(3, host_manager.HostState.
+                         update_from_share_capability.call_count)
+        self.assertEqual({'reused': 3, 'recomputed': 0, 'removed': 0,
+                          'version': 1},
+                         self.host_manager.host_state_map_stats)
+
+        # A new capability report only rebuilds the reporting host
+        self.host_manager.update_service_capabilities(
+            'share', 'host1', fakes.SERVICE_STATES_NO_POOLS['host1'])
+        self.host_manager._update_host_state_map(context)
+
+        self.assertEqual(4, host_manager.HostState.
+                         update_from_share_capability.call_count)
+        self.assertEqual({'reused': 2, 'recomputed': 1, 'removed': 0,
+                          'version': 2},
+                         self.host_manager.host_state_map_stats)
+
+    def test_update_host_state_map_service_down_and_up(self):
+        context = 'fake_context'
+        services = copy.deepcopy(fakes.SHARE_SERVICES_NO_POOLS)
+        self.mock_object(db, 'service_get_all_by_topic',
+                         mock.Mock(return_value=services))
+        mock_service_is_up = self.mock_object(utils, 'service_is_up')
+        mock_service_is_up.side_effect = [True, True, True,
+                                          True, True, False,
+                                          True, True, True]
+
+        with mock.patch.dict(self.host_manager.service_states,
+                             fakes.SERVICE_STATES_NO_POOLS):
+            self.host_manager._update_host_state_map(context)
+            self.host_manager._update_host_state_map(context)
+
+            self.assertEqual({'reused': 2, 'recomputed': 0, 'removed': 1,
+                              'version': 2},
+                             self.host_manager.host_state_map_stats)
+            self.assertNotIn('host2@back2', self.host_manager.host_state_map)
+
+            self.host_manager._update_host_state_map(context)
+
+            self.assertEqual({'reused': 2, 'recomputed': 1, 'removed': 0,
+                              'version': 3},
+                             self.host_manager.host_state_map_stats)
+            self.assertIn('host2@back2', self.host_manager.host_state_map)
+
+    def test_update_host_state_map_keeps_consumed_capacity(self):
+        context = 'fake_context'
+        self.mock_object(
+            db, 'service_get_all_by_topic',
+            mock.Mock(return_value=fakes.SHARE_SERVICES_NO_POOLS))
+        self.mock_object(utils, 'service_is_up', mock.Mock(return_value=True))
+
+        with mock.patch.dict(self.host_manager.service_states,
+                             fakes.SERVICE_STATES_NO_POOLS):
+            pools = list(self.host_manager.get_all_host_states_share(context))
+            pool = [p for p in pools if p.host == 'host1#AAA'][0]
+            pool.consume_from_share({'size': 10})
+
+            pools = list(self.host_manager.get_all_host_states_share(context))
+            pool = [p for p in pools if p.host == 'host1#AAA'][0]
+
+            self.assertEqual(190, pool.free_capacity_gb)
+
+    def _get_indexed_pools(self):
+        context = 'fake_context'
+        self.mock_object(utils, 'service_is_up', mock.Mock(return_value=True))
+        self.mock_object(
+            db, 'service_get_all_by_topic',
+            mock.Mock(return_value=fakes.SHARE_SERVICES_NO_POOLS))
+
+        with mock.patch.dict(self.host_manager.service_states,
+                             fakes.SERVICE_STATES_NO_POOLS):
+            pools = self.host_manager.get_all_host_states_share(context)
+        return {pool.host: pool for pool in pools}
+
+    @ddt.data(
+        ({'snapshot_support': '<is> True'}, None,
+         ['host2@back1#BBB', 'host2@back2#CCC']),
+        ({'capabilities:snapshot_support': '<is> False'}, None,
+         ['host1#AAA']),
+        ({'snapshot_support': '<is> True'}, 'zone2_id', ['host2@back2#CCC']),
+        ({'storage_protocol': 'NFS'}, None, []),
+        ({'fake_capability': 'fake_value'}, None,
+         ['host1#AAA', 'host2@back1#BBB', 'host2@back2#CCC']),
+        ({}, 'zone1_id', ['host1#AAA', 'host2@back1#BBB']),
+    )
+    @ddt.unpack
+    def test_get_filtered_hosts_with_pool_index(self, extra_specs, zone,
+                                                expected):
+        services = copy.deepcopy(fakes.SHARE_SERVICES_NO_POOLS)
+        for service in services:
+            service['availability_zone_id'] = (
+                service['availability_zone'] + '_id')
+        self.mock_object(fakes, 'SHARE_SERVICES_NO_POOLS', services)
+        pools = self._get_indexed_pools()
+        filter_classes = [availability_zone.AvailabilityZoneFilter,
+                          capabilities_filter.CapabilitiesFilter]
+        self.mock_object(self.host_manager, '_choose_host_filters',
+                         mock.Mock(return_value=filter_classes))
+        self.mock_object(self.host_manager.filter_handler,
+                         'get_filtered_objects',
+                         mock.Mock(side_effect=lambda c, h, p: h))
+        filter_properties = {
+            'resource_type': {'extra_specs': extra_specs},
+            'request_spec': {
+                'resource_properties': {'availability_zone_id': zone},
+            },
+        }
+        unindexed_host = host_manager.HostState('fake_host')
+
+        result = self.host_manager.get_filtered_hosts(
+            list(pools.values()) + [unindexed_host], filter_properties)
+
+        self.assertEqual(
+            sorted(expected + ['fake_host']),
+            sorted(host.host for host in result))
+
+    def test_get_filtered_hosts_pool_index_not_used_without_filters(self):
+        pools = self._get_indexed_pools()
+        self.mock_object(self.host_manager, '_choose_host_filters',
+                         mock.Mock(return_value=[FakeFilterClass1]))
+        self.mock_object(FakeFilterClass1, '_filter_one',
+                         mock.Mock(return_value=True))
+        filter_properties = {
+            'resource_type': {'extra_specs': {'storage_protocol': 'NFS'}},
+        }
+
+        result = self.host_manager.get_filtered_hosts(
+            list(pools.values()), filter_properties)
+
+        self.assertEqual(3, len(result))
+
+    def test_pool_index_updated_with_host_states(self):
+        pools = self._get_indexed_pools()
+        pool_index = self.host_manager.pool_index
+
+        self.assertEqual(set(pools.values()), pool_index.pools)
+        self.assertEqual({pools['host1#AAA']},
+                         pool_index.capabilities['snapshot_support'][False])
+
+        pool_index.remove_host('host1')
+
+        self.assertEqual(2, len(pool_index.pools))
+        self.assertEqual(set(),
+                         pool_index.capabilities['snapshot_support'][False])
+
     def test_get_pools_no_pools(self):
         context = 'fake_context'
         self.mock_object(utils, 'service_is_up', mock.Mock(return_value=True))
@@ -25,6 +25,7 @@ from manila.common import constants
 from manila import context
 from manila import db
 from manila import exception
+from manila import quota
 from manila.scheduler.drivers import base
 from manila.scheduler.drivers import filter
 from manila.scheduler import manager
@@ -105,15 +106,38 @@ class SchedulerManagerTestCase(test.TestCase):
             self.manager.update_service_capabilities(
                 self.context, service_name=service_name, host=host)
             (self.manager.driver.update_service_capabilities.
-                assert_called_once_with(service_name, host, {}))
+                assert_called_once_with(service_name, host, {},
+                                        sequence=None))
         with mock.patch.object(self.manager.driver,
                                'update_service_capabilities', mock.Mock()):
             capabilities = {'fake_capability': 'fake_value'}
             self.manager.update_service_capabilities(
                 self.context, service_name=service_name, host=host,
-                capabilities=capabilities)
+                capabilities=capabilities, sequence=3)
             (self.manager.driver.update_service_capabilities.
-                assert_called_once_with(service_name, host, capabilities))
+                assert_called_once_with(service_name, host, capabilities,
+                                        sequence=3))
+
+    @ddt.data(True, False)
+    def test_update_service_capabilities_delta(self, applied):
+        self.mock_object(self.manager.driver,
+                         'update_service_capabilities_delta',
+                         mock.Mock(return_value=applied))
+        mock_publish = self.mock_object(
+            manager.share_rpcapi.ShareAPI, 'publish_service_capabilities')
+
+        self.manager.update_service_capabilities_delta(
+            self.context, service_name='fake_service', host='fake_host',
+            capabilities_delta={'updated': {'foo': 'bar'}}, sequence=2)
+
+        (self.manager.driver.update_service_capabilities_delta.
+            assert_called_once_with('fake_service', 'fake_host',
+                                    {'updated': {'foo': 'bar'}}, 2))
+        if applied:
+            self.assertFalse(mock_publish.called)
+        else:
+            mock_publish.assert_called_once_with(self.context,
+                                                 host='fake_host')
 
     @mock.patch.object(db, 'share_update', mock.Mock())
     def test_create_share_exception_puts_share_in_error_state(self):
@@ -164,6 +188,41 @@ class SchedulerManagerTestCase(test.TestCase):
                 assert_called_once_with(self.context, request_spec, {}))
             manager.LOG.error.assert_called_once_with(mock.ANY, mock.ANY)
 
+    @mock.patch.object(db, 'share_update', mock.Mock())
+    def test_create_share_instances(self):
+        request_specs = [{'share_id': 1}, {'share_id': 2}]
+        ex = exception.NoValidHost(reason='')
+        self.mock_object(self.manager.driver, 'schedule_create_shares',
+                         mock.Mock(return_value=[(request_specs[1], ex)]))
+        self.mock_object(manager.LOG, 'error')
+
+        self.manager.create_share_instances(
+            self.context, request_specs=request_specs, filter_properties={})
+
+        (self.manager.driver.schedule_create_shares.
+            assert_called_once_with(self.context, request_specs, {}))
+        db.share_update.assert_called_once_with(
+            self.context, 2, {'status': 'error'})
+        manager.LOG.error.assert_called_once_with(mock.ANY, mock.ANY)
+
+    @mock.patch.object(db, 'share_update', mock.Mock())
+    def test_create_share_instances_exception(self):
+        request_specs = [{'share_id': 1}, {'share_id': 2}]
+        self.mock_object(self.manager.driver, 'schedule_create_shares',
+                         mock.Mock(side_effect=exception.QuotaError))
+        self.mock_object(manager.LOG, 'error')
+
+        self.assertRaises(exception.QuotaError,
+                          self.manager.create_share_instances,
+                          self.context,
+                          request_specs=request_specs,
+                          filter_properties={})
+
+        db.share_update.assert_has_calls([
+            mock.call(self.context, 1, {'status': 'error'}),
+            mock.call(self.context, 2, {'status': 'error'}),
+        ])
+
     def test_get_pools(self):
         """Ensure get_pools exists and calls base_scheduler.get_pools."""
         mock_get_pools = self.mock_object(self.manager.driver,
@@ -175,6 +234,22 @@ class SchedulerManagerTestCase(test.TestCase):
         mock_get_pools.assert_called_once_with(self.context, 'fake_filters')
         self.assertEqual('fake_pools', result)
 
+    def test_get_decision_cache_stats(self):
+        self.mock_object(self.manager.driver, 'get_decision_cache_stats',
+                         mock.Mock(return_value='fake_stats'))
+
+        result = self.manager.get_decision_cache_stats(self.context)
+
+        self.manager.driver.get_decision_cache_stats.assert_called_once_with()
+        self.assertEqual('fake_stats', result)
+
+    def test_reconcile_quota_usages(self):
+        self.mock_object(quota.QUOTAS, 'reconcile')
+
+        self.manager._reconcile_quota_usages(self.context)
+
+        quota.QUOTAS.reconcile.assert_called_once_with(self.context)
+
     @mock.patch.object(db, 'consistency_group_update', mock.Mock())
     def test_create_cg_no_valid_host_puts_cg_in_error_state(self):
         """Test that NoValidHost is raised for create_consistency_group.
@@ -80,6 +80,26 @@ class SchedulerRpcAPITestCase(test.TestCase):
                                  capabilities='fake_capabilities',
                                  fanout=True)
 
+    def test_update_service_capabilities_with_sequence(self):
+        self._test_scheduler_api('update_service_capabilities',
+                                 rpc_method='cast',
+                                 service_name='fake_name',
+                                 host='fake_host',
+                                 capabilities='fake_capabilities',
+                                 sequence=1,
+                                 fanout=True,
+                                 version='1.8')
+
+    def test_update_service_capabilities_delta(self):
+        self._test_scheduler_api('update_service_capabilities_delta',
+                                 rpc_method='cast',
+                                 service_name='fake_name',
+                                 host='fake_host',
+                                 capabilities_delta='fake_delta',
+                                 sequence=2,
+                                 fanout=True,
+                                 version='1.8')
+
     def test_create_share_instance(self):
         self._test_scheduler_api('create_share_instance',
                                  rpc_method='cast',
@@ -87,12 +107,24 @@ class SchedulerRpcAPITestCase(test.TestCase):
                                  filter_properties='filter_properties',
                                  version='1.2')
 
+    def test_create_share_instances(self):
+        self._test_scheduler_api('create_share_instances',
+                                 rpc_method='cast',
+                                 request_specs=['fake_request_spec'],
+                                 filter_properties='filter_properties',
+                                 version='1.7')
+
     def test_get_pools(self):
         self._test_scheduler_api('get_pools',
                                  rpc_method='call',
                                  filters=None,
                                  version='1.1')
 
+    def test_get_decision_cache_stats(self):
+        self._test_scheduler_api('get_decision_cache_stats',
+                                 rpc_method='call',
+                                 version='1.9')
+
     def test_create_consistency_group(self):
         self._test_scheduler_api('create_consistency_group',
                                  rpc_method='cast',
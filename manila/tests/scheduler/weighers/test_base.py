@@ -17,6 +17,8 @@
 Tests For Scheduler weighers.
 """
 
+import testtools
+
 from manila.scheduler.weighers import base
 from manila import test
 from manila.tests.scheduler import fakes
@@ -62,3 +64,17 @@ class TestWeightHandler(test.TestCase):
         for seq, result, minval, maxval in map_:
             ret = base.normalize(seq, minval=minval, maxval=maxval)
             self.assertEqual(result, tuple(ret))
+
+    @testtools.skipIf(base.numpy is None, 'NumPy is not available')
+    def test_normalization_of_arrays(self):
+        # weight_list, expected_result, minval, maxval
+        map_ = (
+            ((), (), None, None),
+            ((1.0, 1.0), (0.0, 0.0), None, None),
+            ((20.0, 50.0), (0.0, 1.0), None, None),
+            ((20.0, 50.0), (0.2, 0.5), 0.0, 100.0),
+        )
+        for seq, result, minval, maxval in map_:
+            ret = base.normalize(base.numpy.array(seq),
+                                 minval=minval, maxval=maxval)
+            self.assertEqual(result, tuple(ret))
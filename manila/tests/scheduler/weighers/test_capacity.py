@@ -16,8 +16,10 @@
 Tests For Capacity Weigher.
 """
 
+import ddt
 import mock
 from oslo_config import cfg
+import testtools
 
 from manila import context
 from manila.scheduler.weighers import base_host
@@ -29,6 +31,7 @@ from manila.tests.scheduler import fakes
 CONF = cfg.CONF
 
 
+@ddt.ddt
 class CapacityWeigherTestCase(test.TestCase):
     def setUp(self):
         super(CapacityWeigherTestCase, self).setUp()
@@ -189,3 +192,62 @@ class CapacityWeigherTestCase(test.TestCase):
         self.assertEqual(2.0, weighed_host.weight)
         self.assertEqual(
             'host2', utils.extract_host(weighed_host.obj.host))
+
+    def _get_weights(self, hosts, vectorized):
+        numpy = capacity.numpy if vectorized else None
+        with mock.patch.object(capacity, 'numpy', numpy):
+            weighed_hosts = self.weight_handler.get_weighed_objects(
+                [capacity.CapacityWeigher], hosts, {'size': 1})
+        return {weighed_host.obj.host: weighed_host.weight
+                for weighed_host in weighed_hosts}
+
+    @testtools.skipIf(capacity.numpy is None, 'NumPy is not available')
+    @ddt.data(1.0, -1.0, 2.0)
+    def test_vectorized_weights_match_scalar_weights(self, multiplier):
+        self.flags(capacity_weight_multiplier=multiplier)
+        hosts = list(self._get_all_hosts())
+        hosts += [
+            fakes.FakeHostState('thin%s' % i, {
+                'total_capacity_gb': 100 * i + 7,
+                'free_capacity_gb': 3 * i,
+                'provisioned_capacity_gb': 37 * i,
+                'reserved_percentage': i % 7,
+                'max_over_subscription_ratio': 1.0 + i / 10.0,
+                'thin_provisioning': True,
+            }) for i in range(1, 50)]
+        hosts += [
+            fakes.FakeHostState('thick%s' % i, {
+                'total_capacity_gb': 50 * i,
+                'free_capacity_gb': 11 * i,
+                'reserved_percentage': i % 5,
+                'thin_provisioning': False,
+            }) for i in range(1, 50)]
+
+        vectorized_weights = self._get_weights(hosts, True)
+        scalar_weights = self._get_weights(hosts, False)
+
+        self.assertEqual(scalar_weights, vectorized_weights)
+
+    @testtools.skipIf(capacity.numpy is None, 'NumPy is not available')
+    def test_vectorized_weights_all_unknown(self):
+        hosts = [fakes.FakeHostState('host%s' % i, {
+            'total_capacity_gb': 'unknown',
+            'free_capacity_gb': 'unknown',
+        }) for i in range(3)]
+
+        weights = self._get_weights(hosts, True)
+
+        self.assertEqual({'host0': 0, 'host1': 0, 'host2': 0}, weights)
+
+    @testtools.skipIf(capacity.numpy is None, 'NumPy is not available')
+    def test_vectorized_weights_fall_back_to_scalar(self):
+        self.mock_object(capacity.CapacityWeigher, '_weigh_object',
+                         mock.Mock(return_value=1))
+        hosts = [fakes.FakeHostState('host%s' % i, {
+            'total_capacity_gb': 10,
+            'free_capacity_gb': 'invalid',
+        }) for i in range(3)]
+
+        self._get_weights(hosts, True)
+
+        self.assertEqual(3, capacity.CapacityWeigher._weigh_object.call_count)
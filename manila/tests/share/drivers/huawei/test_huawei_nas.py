@@ -1905,6 +1905,7 @@ class HuaweiShareDriverTestCase(test.TestCase):
         self.assertEqual("100.115.10.68:/share_fake_uuid", location)
 
     def test_create_cifsshare_from_nfssnapshot_success(self):
+        self.flags(data_copy_method='shell')
         share_type = self.fake_type_not_extra['test_with_extra']
 
         self.mock_object(db,
@@ -1219,6 +1219,84 @@ class GenericShareDriverTestCase(test.TestCase):
         self.assertRaises(exception.InvalidShare, self._driver.ensure_share,
                           self._context, self.share, share_server=self.server)
 
+    def test_ensure_shares(self):
+        shares = [fake_share.fake_share(id='fake_id_%s' % i,
+                                        name='fake_name_%s' % i,
+                                        share_proto='NFS')
+                  for i in range(4)]
+        other_server = {'id': 'other_server_id', 'backend_details': {}}
+        volumes = [
+            {'id': 'fake_vol_0', 'status': 'in-use'},
+            {'id': 'fake_vol_1', 'status': 'available'},
+            None,
+        ]
+        attached_volume = {'id': 'fake_vol_1', 'status': 'in-use'}
+        self.mock_object(self._driver, '_get_volume',
+                         mock.Mock(side_effect=volumes))
+        self.mock_object(self._driver, '_attach_volume',
+                         mock.Mock(return_value=attached_volume))
+        self.mock_object(self._driver, '_mount_device')
+        self.mock_object(self._driver.compute_api, 'instance_volumes_list',
+                         mock.Mock(return_value=[fake_volume.FakeVolume(
+                             id='fake_vol_0')]))
+
+        result = self._driver.ensure_shares(
+            self._context, shares,
+            share_servers={'fake_id_0': self.server,
+                           'fake_id_1': self.server,
+                           'fake_id_2': self.server,
+                           'fake_id_3': other_server})
+
+        self.assertEqual({
+            'fake_id_0': {'export_locations': None,
+                          'status': const.STATUS_AVAILABLE},
+            'fake_id_1': {'export_locations': None,
+                          'status': const.STATUS_AVAILABLE},
+            'fake_id_2': {'export_locations': None,
+                          'status': const.STATUS_AVAILABLE},
+            'fake_id_3': {'export_locations': None,
+                          'status': const.STATUS_ERROR},
+        }, result)
+        self._driver.compute_api.instance_volumes_list.\
+            assert_called_once_with(
+                self._context, self.server['backend_details']['instance_id'])
+        self._driver._attach_volume.assert_called_once_with(
+            self._context, shares[1],
+            self.server['backend_details']['instance_id'], volumes[1])
+        self._driver._mount_device.assert_has_calls([
+            mock.call(shares[0], self.server['backend_details'], volumes[0]),
+            mock.call(shares[1], self.server['backend_details'],
+                      attached_volume),
+        ])
+        self._helper_nfs.create_export.assert_has_calls([
+            mock.call(self.server['backend_details'], shares[0]['name'],
+                      recreate=True),
+            mock.call(self.server['backend_details'], shares[1]['name'],
+                      recreate=True),
+        ])
+        self.assertEqual(2, self._helper_nfs.create_export.call_count)
+        self.assertEqual(1, self.mock_error_log.call_count)
+
+    def test_ensure_shares_with_error(self):
+        shares = [fake_share.fake_share(id='fake_id_%s' % i,
+                                        share_proto='NFS')
+                  for i in range(2)]
+        self.mock_object(self._driver, '_get_volume', mock.Mock(
+            side_effect=[exception.ManilaException, None]))
+
+        result = self._driver.ensure_shares(
+            self._context, shares,
+            share_servers={'fake_id_0': self.server,
+                           'fake_id_1': self.server})
+
+        self.assertEqual({
+            'fake_id_0': {'export_locations': None,
+                          'status': const.STATUS_ERROR},
+            'fake_id_1': {'export_locations': None,
+                          'status': const.STATUS_AVAILABLE},
+        }, result)
+        self.assertEqual(1, self.mock_error_log.call_count)
+
     @ddt.data(const.ACCESS_LEVEL_RW, const.ACCESS_LEVEL_RO)
     def test_update_access(self, access_level):
 
@@ -336,6 +336,74 @@ class LVMShareDriverTestCase(test.TestCase):
             self._helper_nfs.create_export.assert_called_once_with(
                 self.server, self.share['name'], recreate=True)
 
+    def test_ensure_shares(self):
+        shares = [
+            fake_share(id='fakeid1', name='fakename1'),
+            fake_share(id='fakeid2', name='fakename2'),
+            fake_share(id='fakeid3', name='fakename3'),
+            fake_share(id='fakeid4', name='fakename4'),
+        ]
+
+        def lvs_runner(*ignore_args, **ignore_kwargs):
+            return '  fakename1\n  fakename2\n  fakename4\n', ''
+
+        def mount_runner(*ignore_args, **ignore_kwargs):
+            return ('/dev/mapper/fakevg-fakename1 on /mnt/fakename1 type '
+                    'ext4 (rw)\n', '')
+
+        fake_utils.fake_execute_set_repliers([('lvs', lvs_runner),
+                                              ('mount -l', mount_runner)])
+        self.mock_object(self._driver, '_mount_device')
+        self._helper_nfs.create_export.side_effect = [
+            None, None, exception.ProcessExecutionError]
+
+        result = self._driver.ensure_shares(self._context, shares)
+
+        self.assertEqual({
+            'fakeid1': {'export_locations': None,
+                        'status': const.STATUS_AVAILABLE},
+            'fakeid2': {'export_locations': None,
+                        'status': const.STATUS_AVAILABLE},
+            'fakeid3': {'export_locations': None,
+                        'status': const.STATUS_ERROR},
+            'fakeid4': {'export_locations': None,
+                        'status': const.STATUS_ERROR},
+        }, result)
+        self.assertEqual(['lvs --noheadings -o lv_name fakevg', 'mount -l'],
+                         fake_utils.fake_execute_get_log())
+        self._driver._mount_device.assert_has_calls([
+            mock.call(shares[1], '/dev/mapper/fakevg-fakename2'),
+            mock.call(shares[3], '/dev/mapper/fakevg-fakename4'),
+        ])
+        self.assertEqual(2, self._driver._mount_device.call_count)
+        self._helper_nfs.create_export.assert_has_calls([
+            mock.call(self.server, share['name'], recreate=True)
+            for share in (shares[0], shares[1], shares[3])])
+
+    def test_ensure_shares_listing_error(self):
+        shares = [
+            fake_share(id='fakeid1', name='fakename1'),
+            fake_share(id='fakeid2', name='fakename2'),
+        ]
+
+        def lvs_runner(*ignore_args, **ignore_kwargs):
+            raise exception.ProcessExecutionError(exit_code=99)
+
+        fake_utils.fake_execute_set_repliers([('lvs', lvs_runner)])
+        self.mock_object(self._driver, 'ensure_share', mock.Mock(
+            side_effect=[exception.ProcessExecutionError, None]))
+
+        result = self._driver.ensure_shares(self._context, shares)
+
+        self.assertEqual({
+            'fakeid1': {'export_locations': None,
+                        'status': const.STATUS_ERROR},
+            'fakeid2': {'export_locations': None,
+                        'status': const.STATUS_AVAILABLE},
+        }, result)
+        self._driver.ensure_share.assert_has_calls([
+            mock.call(self._context, share) for share in shares])
+
     def test_delete_share(self):
         mount_path = self._get_mount_path(self.share)
         self._helper_nfs.remove_export(mount_path, self.share['name'])
@@ -17,6 +17,7 @@ import ddt
 import mock
 from oslo_config import cfg
 
+from manila.common import constants
 from manila import context
 from manila import exception
 from manila.share.drivers.ganesha import utils as ganesha_utils
@@ -867,6 +868,51 @@ class ZFSonLinuxShareDriverTestCase(test.TestCase):
                 result,
             )
 
+    def test_ensure_shares(self):
+        shares = [
+            {'id': 'fake_id_%s' % i, 'host': 'hostname@backend_name#%s' % pool,
+             'share_proto': 'NFS'}
+            for i, pool in enumerate(('bar', 'bar', 'quuz', 'bar'))]
+        for i in range(4):
+            self.driver.private_storage.update(
+                shares[i]['id'], {'dataset_name': 'fake_dataset_%s' % i})
+        mock_helper = self.mock_object(self.driver, '_get_share_helper')
+        mock_helper.return_value.get_exports.side_effect = [
+            'fake_exports_0', exception.ProcessExecutionError]
+        self.mock_object(
+            self.driver, 'zfs', mock.Mock(side_effect=[
+                ('bar_list', ''), ('', ''), ('quuz_list', '')]))
+        self.mock_object(
+            self.driver, 'parse_zfs_answer',
+            mock.Mock(side_effect=[
+                [{'NAME': 'fake_dataset_0', 'SHARENFS': 'on'},
+                 {'NAME': 'fake_dataset_1', 'SHARENFS': 'off'}],
+                [],
+            ]))
+        self.mock_object(zfs_driver.LOG, 'warning')
+
+        result = self.driver.ensure_shares('fake_context', shares)
+
+        self.assertEqual({
+            'fake_id_0': {'export_locations': 'fake_exports_0',
+                          'status': constants.STATUS_AVAILABLE},
+            'fake_id_1': {'export_locations': None,
+                          'status': constants.STATUS_ERROR},
+            'fake_id_2': {'export_locations': None,
+                          'status': constants.STATUS_ERROR},
+            'fake_id_3': {'export_locations': None,
+                          'status': constants.STATUS_ERROR},
+        }, result)
+        self.driver.zfs.assert_has_calls([
+            mock.call('list', '-r', '-o', 'name,sharenfs', 'bar'),
+            mock.call('share', 'fake_dataset_0'),
+            mock.call('list', '-r', '-o', 'name,sharenfs', 'quuz'),
+        ])
+        self.assertEqual(3, self.driver.zfs.call_count)
+        self.driver.parse_zfs_answer.assert_has_calls([
+            mock.call('bar_list'), mock.call('quuz_list')])
+        self.assertEqual(3, zfs_driver.LOG.warning.call_count)
+
     def test_ensure_share_absent(self):
         share = {'id': 'fake_share_id', 'host': 'hostname@backend_name#bar'}
         dataset_name = 'foo_zpool/foo_fs'
@@ -302,8 +302,9 @@ class ShareAPITestCase(test.TestCase):
             ctx, 'share', 'get_all')
         db_api.share_get_all_by_project.assert_called_once_with(
             ctx, sort_dir='desc', sort_key='created_at',
-            project_id='fake_pid_1', filters={}, is_public=False
-        )
+            project_id='fake_pid_1', filters={}, is_public=False,
+            limit=None, offset=None, marker=None,
+            view=constants.SHARE_VIEW_DETAIL)
         self.assertEqual(_FAKE_LIST_OF_ALL_SHARES[0], shares)
 
     def test_get_all_admin_filter_by_all_tenants(self):
@@ -314,7 +315,9 @@ class ShareAPITestCase(test.TestCase):
         share_api.policy.check_policy.assert_called_once_with(
             ctx, 'share', 'get_all')
         db_api.share_get_all.assert_called_once_with(
-            ctx, sort_dir='desc', sort_key='created_at', filters={})
+            ctx, sort_dir='desc', sort_key='created_at', filters={},
+            limit=None, offset=None, marker=None,
+            view=constants.SHARE_VIEW_DETAIL)
         self.assertEqual(_FAKE_LIST_OF_ALL_SHARES, shares)
 
     def test_get_all_non_admin_filter_by_share_server(self):
@@ -353,8 +356,8 @@ class ShareAPITestCase(test.TestCase):
         ])
         db_api.share_get_all_by_share_server.assert_called_once_with(
             ctx, 'fake_server_3', sort_dir='desc', sort_key='created_at',
-            filters={},
-        )
+            filters={}, limit=None, offset=None, marker=None,
+            view=constants.SHARE_VIEW_DETAIL)
         db_api.share_get_all_by_project.assert_has_calls([])
         db_api.share_get_all.assert_has_calls([])
         self.assertEqual(_FAKE_LIST_OF_ALL_SHARES[2:], shares)
@@ -362,54 +365,66 @@ class ShareAPITestCase(test.TestCase):
     def test_get_all_admin_filter_by_name(self):
         ctx = context.RequestContext('fake_uid', 'fake_pid_2', is_admin=True)
         self.mock_object(db_api, 'share_get_all_by_project',
-                         mock.Mock(return_value=_FAKE_LIST_OF_ALL_SHARES[1:]))
+                         mock.Mock(
+                             return_value=_FAKE_LIST_OF_ALL_SHARES[1::2]))
         shares = self.api.get_all(ctx, {'name': 'bar'})
         share_api.policy.check_policy.assert_has_calls([
             mock.call(ctx, 'share', 'get_all'),
         ])
         db_api.share_get_all_by_project.assert_called_once_with(
             ctx, sort_dir='desc', sort_key='created_at',
-            project_id='fake_pid_2', filters={}, is_public=False
-        )
+            project_id='fake_pid_2', filters={'name': 'bar'},
+            is_public=False, limit=None, offset=None, marker=None,
+            view=constants.SHARE_VIEW_DETAIL)
         self.assertEqual(_FAKE_LIST_OF_ALL_SHARES[1::2], shares)
 
     def test_get_all_admin_filter_by_name_and_all_tenants(self):
         ctx = context.RequestContext('fake_uid', 'fake_pid_2', is_admin=True)
         self.mock_object(db_api, 'share_get_all',
-                         mock.Mock(return_value=_FAKE_LIST_OF_ALL_SHARES))
+                         mock.Mock(
+                             return_value=_FAKE_LIST_OF_ALL_SHARES[::2]))
         shares = self.api.get_all(ctx, {'name': 'foo', 'all_tenants': 1})
         share_api.policy.check_policy.assert_has_calls([
             mock.call(ctx, 'share', 'get_all'),
         ])
         db_api.share_get_all.assert_called_once_with(
-            ctx, sort_dir='desc', sort_key='created_at', filters={})
+            ctx, sort_dir='desc', sort_key='created_at',
+            filters={'name': 'foo'}, limit=None, offset=None, marker=None,
+            view=constants.SHARE_VIEW_DETAIL)
         self.assertEqual(_FAKE_LIST_OF_ALL_SHARES[::2], shares)
 
     def test_get_all_admin_filter_by_status(self):
         ctx = context.RequestContext('fake_uid', 'fake_pid_2', is_admin=True)
         self.mock_object(db_api, 'share_get_all_by_project',
-                         mock.Mock(return_value=_FAKE_LIST_OF_ALL_SHARES[1:]))
+                         mock.Mock(
+                             return_value=_FAKE_LIST_OF_ALL_SHARES[2::4]))
         shares = self.api.get_all(ctx, {'status': constants.STATUS_AVAILABLE})
         share_api.policy.check_policy.assert_has_calls([
             mock.call(ctx, 'share', 'get_all'),
         ])
         db_api.share_get_all_by_project.assert_called_once_with(
             ctx, sort_dir='desc', sort_key='created_at',
-            project_id='fake_pid_2', filters={}, is_public=False
-        )
+            project_id='fake_pid_2',
+            filters={'status': constants.STATUS_AVAILABLE}, is_public=False,
+            limit=None, offset=None, marker=None,
+            view=constants.SHARE_VIEW_DETAIL)
         self.assertEqual(_FAKE_LIST_OF_ALL_SHARES[2::4], shares)
 
     def test_get_all_admin_filter_by_status_and_all_tenants(self):
         ctx = context.RequestContext('fake_uid', 'fake_pid_2', is_admin=True)
         self.mock_object(db_api, 'share_get_all',
-                         mock.Mock(return_value=_FAKE_LIST_OF_ALL_SHARES))
+                         mock.Mock(
+                             return_value=_FAKE_LIST_OF_ALL_SHARES[1::2]))
         shares = self.api.get_all(
             ctx, {'status': constants.STATUS_ERROR, 'all_tenants': 1})
         share_api.policy.check_policy.assert_has_calls([
             mock.call(ctx, 'share', 'get_all'),
         ])
         db_api.share_get_all.assert_called_once_with(
-            ctx, sort_dir='desc', sort_key='created_at', filters={})
+            ctx, sort_dir='desc', sort_key='created_at',
+            filters={'status': constants.STATUS_ERROR}, limit=None,
+            offset=None, marker=None,
+            view=constants.SHARE_VIEW_DETAIL)
         self.assertEqual(_FAKE_LIST_OF_ALL_SHARES[1::2], shares)
 
     def test_get_all_non_admin_filter_by_all_tenants(self):
@@ -423,41 +438,30 @@ class ShareAPITestCase(test.TestCase):
         ])
         db_api.share_get_all_by_project.assert_called_once_with(
             ctx, sort_dir='desc', sort_key='created_at',
-            project_id='fake_pid_2', filters={}, is_public=False
-        )
+            project_id='fake_pid_2', filters={}, is_public=False,
+            limit=None, offset=None, marker=None,
+            view=constants.SHARE_VIEW_DETAIL)
         self.assertEqual(_FAKE_LIST_OF_ALL_SHARES[1:], shares)
 
     def test_get_all_non_admin_with_name_and_status_filters(self):
         ctx = context.RequestContext('fake_uid', 'fake_pid_2', is_admin=False)
         self.mock_object(db_api, 'share_get_all_by_project',
-                         mock.Mock(return_value=_FAKE_LIST_OF_ALL_SHARES[1:]))
+                         mock.Mock(
+                             return_value=_FAKE_LIST_OF_ALL_SHARES[2::4]))
         shares = self.api.get_all(
-            ctx, {'name': 'bar', 'status': constants.STATUS_ERROR})
+            ctx, {'name': 'foo', 'status': constants.STATUS_AVAILABLE},
+            limit=10, offset=1, marker='fake_marker',
+            view=constants.SHARE_VIEW_SUMMARY)
         share_api.policy.check_policy.assert_has_calls([
             mock.call(ctx, 'share', 'get_all'),
         ])
         db_api.share_get_all_by_project.assert_called_once_with(
             ctx, sort_dir='desc', sort_key='created_at',
-            project_id='fake_pid_2', filters={}, is_public=False
-        )
-
-        # two items expected, one filtered
-        self.assertEqual(_FAKE_LIST_OF_ALL_SHARES[1::2], shares)
-
-        # one item expected, two filtered
-        shares = self.api.get_all(
-            ctx, {'name': 'foo', 'status': constants.STATUS_AVAILABLE})
+            project_id='fake_pid_2',
+            filters={'name': 'foo', 'status': constants.STATUS_AVAILABLE},
+            is_public=False, limit=10, offset=1, marker='fake_marker',
+            view=constants.SHARE_VIEW_SUMMARY)
         self.assertEqual(_FAKE_LIST_OF_ALL_SHARES[2::4], shares)
-        share_api.policy.check_policy.assert_has_calls([
-            mock.call(ctx, 'share', 'get_all'),
-            mock.call(ctx, 'share', 'get_all'),
-        ])
-        db_api.share_get_all_by_project.assert_has_calls([
-            mock.call(ctx, sort_dir='desc', sort_key='created_at',
-                      project_id='fake_pid_2', filters={}, is_public=False),
-            mock.call(ctx, sort_dir='desc', sort_key='created_at',
-                      project_id='fake_pid_2', filters={}, is_public=False),
-        ])
 
     @ddt.data('True', 'true', '1', 'yes', 'y', 'on', 't', True)
     def test_get_all_non_admin_public(self, is_public):
@@ -471,8 +475,9 @@ class ShareAPITestCase(test.TestCase):
         ])
         db_api.share_get_all_by_project.assert_called_once_with(
             ctx, sort_dir='desc', sort_key='created_at',
-            project_id='fake_pid_2', filters={}, is_public=True
-        )
+            project_id='fake_pid_2', filters={}, is_public=True,
+            limit=None, offset=None, marker=None,
+            view=constants.SHARE_VIEW_DETAIL)
         self.assertEqual(_FAKE_LIST_OF_ALL_SHARES[1:], shares)
 
     @ddt.data('False', 'false', '0', 'no', 'n', 'off', 'f', False)
@@ -487,15 +492,16 @@ class ShareAPITestCase(test.TestCase):
         ])
         db_api.share_get_all_by_project.assert_called_once_with(
             ctx, sort_dir='desc', sort_key='created_at',
-            project_id='fake_pid_2', filters={}, is_public=False
-        )
+            project_id='fake_pid_2', filters={}, is_public=False,
+            limit=None, offset=None, marker=None,
+            view=constants.SHARE_VIEW_DETAIL)
         self.assertEqual(_FAKE_LIST_OF_ALL_SHARES[1:], shares)
 
     @ddt.data('truefoo', 'bartrue')
     def test_get_all_invalid_public_value(self, is_public):
         ctx = context.RequestContext('fake_uid', 'fake_pid_2',
                                      is_admin=False)
-        self.assertRaises(ValueError, self.api.get_all,
+        self.assertRaises(exception.InvalidInput, self.api.get_all,
                           ctx, {'is_public': is_public})
         share_api.policy.check_policy.assert_has_calls([
             mock.call(ctx, 'share', 'get_all'),
@@ -510,8 +516,9 @@ class ShareAPITestCase(test.TestCase):
             ctx, 'share', 'get_all')
         db_api.share_get_all_by_project.assert_called_once_with(
             ctx, sort_dir='asc', sort_key='status',
-            project_id='fake_pid_1', filters={}, is_public=False
-        )
+            project_id='fake_pid_1', filters={}, is_public=False,
+            limit=None, offset=None, marker=None,
+            view=constants.SHARE_VIEW_DETAIL)
         self.assertEqual(_FAKE_LIST_OF_ALL_SHARES[0], shares)
 
     def test_get_all_sort_key_invalid(self):
@@ -550,7 +557,9 @@ class ShareAPITestCase(test.TestCase):
             ctx, 'share', 'get_all')
         db_api.share_get_all_by_project.assert_called_once_with(
             ctx, sort_dir='desc', sort_key='created_at',
-            project_id='fake_pid_1', filters=search_opts, is_public=False)
+            project_id='fake_pid_1', filters=search_opts, is_public=False,
+            limit=None, offset=None, marker=None,
+            view=constants.SHARE_VIEW_DETAIL)
         self.assertEqual(_FAKE_LIST_OF_ALL_SHARES[0], shares)
 
     def test_get_all_filter_by_metadata(self):
@@ -622,6 +631,79 @@ class ShareAPITestCase(test.TestCase):
         self.assertSubDictMatch(share_data,
                                 db_api.share_create.call_args[0][1])
 
+    def _setup_create_many_mocks(self, side_effect):
+        self.mock_object(self.api, '_create_share',
+                         mock.Mock(side_effect=side_effect))
+        self.mock_object(self.api, 'create_instance')
+        self.mock_object(
+            self.api, '_create_share_instance_and_get_request_spec',
+            mock.Mock(side_effect=lambda ctxt, share, **kwargs: (
+                {'share_id': share['id']}, 'fake_instance')))
+        self.mock_object(self.api.scheduler_rpcapi, 'create_share_instances')
+        self.mock_object(db_api, 'share_get',
+                         mock.Mock(side_effect=lambda ctxt, share_id: {
+                             'id': share_id, 'instance': 'fake'}))
+
+    def test_create_many(self):
+        instance_kwargs = {'share_network_id': None,
+                           'host': None,
+                           'availability_zone': 'fakeaz',
+                           'consistency_group': None,
+                           'cgsnapshot_member': None}
+        host_instance_kwargs = dict(instance_kwargs, host='fake_host')
+        self._setup_create_many_mocks([
+            ({'id': 'fake_1'}, instance_kwargs),
+            ({'id': 'fake_2'}, host_instance_kwargs),
+            ({'id': 'fake_3'}, instance_kwargs),
+        ])
+        share_requests = [
+            {'share_proto': 'nfs', 'size': i, 'name': 'fakename',
+             'description': 'fakedesc'} for i in range(1, 4)]
+
+        result = self.api.create_many(self.context, share_requests)
+
+        self.assertEqual(['fake_1', 'fake_2', 'fake_3'],
+                         [share['id'] for share in result])
+        self.api._create_share.assert_has_calls([
+            mock.call(self.context, **share_request)
+            for share_request in share_requests])
+        self.api.create_instance.assert_called_once_with(
+            self.context, {'id': 'fake_2'}, **host_instance_kwargs)
+        (self.api._create_share_instance_and_get_request_spec.
+            assert_has_calls([
+                mock.call(self.context, {'id': share_id},
+                          availability_zone='fakeaz',
+                          consistency_group=None, share_network_id=None)
+                for share_id in ('fake_1', 'fake_3')]))
+        (self.api.scheduler_rpcapi.create_share_instances.
+            assert_called_once_with(
+                self.context,
+                request_specs=[{'share_id': 'fake_1'},
+                               {'share_id': 'fake_3'}],
+                filter_properties={}))
+
+    def test_create_many_schedules_created_shares_on_error(self):
+        instance_kwargs = {'share_network_id': None,
+                           'host': None,
+                           'availability_zone': None,
+                           'consistency_group': None,
+                           'cgsnapshot_member': None}
+        self._setup_create_many_mocks([
+            ({'id': 'fake_1'}, instance_kwargs),
+            exception.ShareLimitExceeded(allowed=1),
+        ])
+        share_requests = [
+            {'share_proto': 'nfs', 'size': 1, 'name': 'fakename',
+             'description': 'fakedesc'}] * 2
+
+        self.assertRaises(exception.ShareLimitExceeded,
+                          self.api.create_many, self.context, share_requests)
+
+        (self.api.scheduler_rpcapi.create_share_instances.
+            assert_called_once_with(
+                self.context, request_specs=[{'share_id': 'fake_1'}],
+                filter_properties={}))
+
     @ddt.data(
         None, '', 'fake', 'nfsfake', 'cifsfake', 'glusterfsfake', 'hdfsfake')
     def test_create_share_invalid_protocol(self, proto):
@@ -2318,18 +2400,20 @@ class ShareAPITestCase(test.TestCase):
                           self.api.migration_complete, self.context,
                           share)
 
-    def test_migration_cancel(self):
+    @ddt.data(constants.TASK_STATE_DATA_COPYING_STARTING,
+              constants.TASK_STATE_DATA_COPYING_IN_PROGRESS)
+    def test_migration_cancel(self, task_state):
 
         share = db_utils.create_share(
-            id='fake_id',
-            task_state=constants.TASK_STATE_DATA_COPYING_IN_PROGRESS)
+            id='fake_id', task_state=task_state,
+            data_copy_host='fake_data_host')
 
         self.mock_object(data_rpc.DataAPI, 'data_copy_cancel')
 
         self.api.migration_cancel(self.context, share)
 
         data_rpc.DataAPI.data_copy_cancel.assert_called_once_with(
-            self.context, share['id'])
+            self.context, share['id'], host='fake_data_host')
 
     def test_migration_cancel_driver(self):
 
@@ -2348,7 +2432,7 @@ class ShareAPITestCase(test.TestCase):
 
         share = db_utils.create_share(
             id='fake_id',
-            task_state=constants.TASK_STATE_DATA_COPYING_STARTING)
+            task_state=constants.TASK_STATE_DATA_COPYING_COMPLETING)
 
         self.assertRaises(exception.InvalidShare, self.api.migration_cancel,
                           self.context, share)
@@ -2357,7 +2441,8 @@ class ShareAPITestCase(test.TestCase):
 
         share = db_utils.create_share(
             id='fake_id',
-            task_state=constants.TASK_STATE_DATA_COPYING_IN_PROGRESS)
+            task_state=constants.TASK_STATE_DATA_COPYING_IN_PROGRESS,
+            data_copy_host='fake_data_host')
 
         expected = 'fake_progress'
 
@@ -2369,7 +2454,7 @@ class ShareAPITestCase(test.TestCase):
         self.assertEqual(expected, result)
 
         data_rpc.DataAPI.data_copy_get_progress.assert_called_once_with(
-            self.context, share['id'])
+            self.context, share['id'], host='fake_data_host')
 
     def test_migration_get_progress_driver(self):
 
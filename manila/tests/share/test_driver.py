@@ -18,8 +18,10 @@
 import time
 
 import ddt
+import eventlet
 import mock
 
+from manila.common import constants
 from manila import exception
 from manila import network
 from manila.share import configuration
@@ -522,6 +524,58 @@ class ShareDriverTestCase(test.TestCase):
 
         self.assertEqual(expected, migration_info)
 
+    def test_ensure_shares(self):
+        share_driver = driver.ShareDriver(True, configuration=None)
+        share_instances = [{'id': 'fake_id_1'}, {'id': 'fake_id_2'}]
+        self.mock_object(share_driver, 'ensure_share', mock.Mock(
+            side_effect=[['fake/path'], exception.ManilaException]))
+        self.mock_object(eventlet, 'GreenPool',
+                         mock.Mock(side_effect=eventlet.GreenPool))
+        self.mock_object(driver.LOG, 'error')
+
+        result = share_driver.ensure_shares(
+            'fake_context', share_instances,
+            share_servers={'fake_id_1': 'fake_server'})
+
+        expected = {
+            'fake_id_1': {
+                'export_locations': ['fake/path'],
+                'status': constants.STATUS_AVAILABLE,
+            },
+            'fake_id_2': {
+                'export_locations': None,
+                'status': constants.STATUS_ERROR,
+            },
+        }
+        self.assertEqual(expected, result)
+        share_driver.ensure_share.assert_has_calls([
+            mock.call('fake_context', share_instances[0],
+                      share_server='fake_server'),
+            mock.call('fake_context', share_instances[1],
+                      share_server=None),
+        ])
+        eventlet.GreenPool.assert_called_once_with(1)
+        self.assertEqual(1, driver.LOG.error.call_count)
+
+    def test_ensure_shares_with_concurrency(self):
+        conf = configuration.Configuration(None)
+        share_driver = driver.ShareDriver(True, configuration=conf)
+        self.mock_object(conf, 'safe_get', mock.Mock(return_value=8))
+        self.mock_object(share_driver, 'ensure_share',
+                         mock.Mock(return_value=None))
+        self.mock_object(eventlet, 'GreenPool',
+                         mock.Mock(side_effect=eventlet.GreenPool))
+
+        result = share_driver.ensure_shares(
+            'fake_context', [{'id': 'fake_id'}])
+
+        self.assertEqual(
+            {'fake_id': {'export_locations': None,
+                         'status': constants.STATUS_AVAILABLE}},
+            result)
+        conf.safe_get.assert_called_once_with('ensure_share_concurrency')
+        eventlet.GreenPool.assert_called_once_with(8)
+
     def test_update_access(self):
         share_driver = driver.ShareDriver(True, configuration=None)
         self.assertRaises(
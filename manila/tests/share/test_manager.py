@@ -14,10 +14,12 @@
 #    under the License.
 
 """Test of Share Manager for Manila."""
+import collections
 import datetime
 import random
 
 import ddt
+import eventlet
 import mock
 from oslo_concurrency import lockutils
 from oslo_serialization import jsonutils
@@ -290,7 +292,7 @@ class ShareManagerTestCase(test.TestCase):
                          mock.Mock(side_effect=[instances[0], instances[2],
                                                 instances[4]]))
         self.mock_object(self.share_manager.db,
-                         'share_export_locations_update')
+                         'share_export_locations_update_many')
         self.mock_object(self.share_manager.driver, 'ensure_share',
                          mock.Mock(return_value=fake_export_locations))
         self.mock_object(self.share_manager, '_ensure_share_instance_has_pool')
@@ -314,11 +316,12 @@ class ShareManagerTestCase(test.TestCase):
         self.share_manager.db.share_instances_get_all_by_host.\
             assert_called_once_with(utils.IsAMatcher(context.RequestContext),
                                     self.share_manager.host)
-        exports_update = self.share_manager.db.share_export_locations_update
-        exports_update.assert_has_calls([
-            mock.call(mock.ANY, instances[0]['id'], fake_export_locations),
-            mock.call(mock.ANY, instances[2]['id'], fake_export_locations)
-        ])
+        exports_update = (
+            self.share_manager.db.share_export_locations_update_many)
+        exports_update.assert_called_once_with(
+            mock.ANY, {instances[0]['id']: fake_export_locations,
+                       instances[2]['id']: fake_export_locations,
+                       instances[4]['id']: fake_export_locations})
         self.share_manager.driver.do_setup.assert_called_once_with(
             utils.IsAMatcher(context.RequestContext))
         self.share_manager.driver.check_for_setup_error.\
@@ -471,6 +474,187 @@ class ShareManagerTestCase(test.TestCase):
             mock.call(mock.ANY, mock.ANY),
         ])
 
+    def test_init_host_with_prefetched_shares_and_servers(self):
+        share_server = db_utils.create_share_server()
+        shares = [
+            db_utils.create_share(host='fake_host@backend#pool',
+                                  status=constants.STATUS_AVAILABLE,
+                                  share_server_id=share_server['id'])
+            for i in range(3)]
+        instances = [share.instance for share in shares]
+        fake_export_locations = ['fake/path']
+        smanager = self.share_manager
+        self.mock_object(smanager.db, 'share_instances_get_all_by_host',
+                         mock.Mock(return_value=instances))
+        self.mock_object(smanager.db, 'share_get_all_by_host',
+                         mock.Mock(return_value=shares))
+        self.mock_object(smanager.db, 'share_server_get_all_by_host',
+                         mock.Mock(return_value=[share_server]))
+        self.mock_object(smanager.db, 'share_get')
+        self.mock_object(smanager.db, 'share_instance_get')
+        self.mock_object(smanager, '_get_share_server')
+        self.mock_object(smanager, '_update_export_locations')
+        self.mock_object(smanager.driver, 'ensure_share',
+                         mock.Mock(return_value=fake_export_locations))
+        self.mock_object(smanager, 'publish_service_capabilities')
+        self.mock_object(manager, 'ENSURE_SHARE_EXPORT_LOCATIONS_BATCH_SIZE',
+                         2)
+        self.mock_object(eventlet, 'GreenPool',
+                         mock.Mock(side_effect=eventlet.GreenPool))
+
+        smanager.init_host()
+
+        smanager.db.share_get_all_by_host.assert_called_once_with(
+            utils.IsAMatcher(context.RequestContext), smanager.host)
+        smanager.db.share_server_get_all_by_host.assert_called_once_with(
+            utils.IsAMatcher(context.RequestContext), smanager.host)
+        eventlet.GreenPool.assert_called_once_with(4)
+        self.assertFalse(smanager.db.share_get.called)
+        self.assertFalse(smanager.db.share_instance_get.called)
+        self.assertFalse(smanager._get_share_server.called)
+        smanager.driver.ensure_share.assert_has_calls([
+            mock.call(utils.IsAMatcher(context.RequestContext), instance,
+                      share_server=share_server)
+            for instance in instances])
+        smanager._update_export_locations.assert_has_calls([
+            mock.call(utils.IsAMatcher(context.RequestContext),
+                      {instances[0]['id']: fake_export_locations,
+                       instances[1]['id']: fake_export_locations}),
+            mock.call(utils.IsAMatcher(context.RequestContext),
+                      {instances[2]['id']: fake_export_locations}),
+        ])
+        smanager.publish_service_capabilities.assert_called_once_with(
+            utils.IsAMatcher(context.RequestContext))
+
+    def test_init_host_with_ensure_shares_results(self):
+        instances = [
+            db_utils.create_share(host='fake_host@backend#pool',
+                                  status=constants.STATUS_AVAILABLE).instance
+            for i in range(3)]
+        for instance in instances:
+            instance['access_rules_status'] = constants.STATUS_OUT_OF_SYNC
+        smanager = self.share_manager
+        self.mock_object(smanager.db, 'share_instances_get_all_by_host',
+                         mock.Mock(return_value=instances))
+        self.mock_object(smanager.db, 'share_export_locations_update_many')
+        self.mock_object(smanager.driver, 'ensure_shares', mock.Mock(
+            return_value={
+                instances[0]['id']: {
+                    'export_locations': ['fake/path/1'],
+                    'status': constants.STATUS_AVAILABLE,
+                },
+                instances[1]['id']: {
+                    'export_locations': None,
+                    'status': constants.STATUS_ERROR,
+                },
+                instances[2]['id']: {
+                    'export_locations': None,
+                    'status': constants.STATUS_AVAILABLE,
+                },
+            }))
+        self.mock_object(smanager.driver, 'ensure_share')
+        self.mock_object(smanager.access_helper, 'update_access_rules')
+        self.mock_object(smanager, 'publish_service_capabilities')
+
+        smanager.init_host()
+
+        smanager.driver.ensure_shares.assert_called_once_with(
+            utils.IsAMatcher(context.RequestContext), instances,
+            share_servers={instance['id']: None
+                           for instance in instances})
+        self.assertFalse(smanager.driver.ensure_share.called)
+        smanager.db.share_export_locations_update_many.\
+            assert_called_once_with(
+                utils.IsAMatcher(context.RequestContext),
+                {instances[0]['id']: ['fake/path/1']})
+        smanager.access_helper.update_access_rules.assert_has_calls([
+            mock.call(utils.IsAMatcher(context.RequestContext),
+                      instances[0]['id'], share_server=None),
+            mock.call(utils.IsAMatcher(context.RequestContext),
+                      instances[2]['id'], share_server=None),
+        ])
+        self.assertEqual(
+            2, smanager.access_helper.update_access_rules.call_count)
+
+    def test_init_host_with_exception_on_ensure_shares(self):
+        instances = self._setup_init_mocks(setup_access_rules=False)
+        smanager = self.share_manager
+        self.mock_object(smanager.db, 'share_instances_get_all_by_host',
+                         mock.Mock(return_value=instances))
+        self.mock_object(smanager.db, 'share_instance_get',
+                         mock.Mock(side_effect=[instances[0], instances[2],
+                                                instances[4]]))
+        self.mock_object(smanager, '_ensure_share_instance_has_pool')
+        self.mock_object(smanager.driver, 'ensure_shares',
+                         mock.Mock(side_effect=exception.ManilaException))
+        self.mock_object(smanager.driver, 'ensure_share',
+                         mock.Mock(side_effect=[exception.ManilaException,
+                                                ['fake/path/2'],
+                                                ['fake/path/4']]))
+        self.mock_object(smanager, '_update_export_locations')
+        self.mock_object(smanager.access_helper, 'update_access_rules')
+        self.mock_object(smanager, 'publish_service_capabilities')
+        self.mock_object(manager.LOG, 'warning')
+        self.mock_object(manager.LOG, 'error')
+
+        smanager.init_host()
+
+        smanager.driver.ensure_shares.assert_called_once_with(
+            utils.IsAMatcher(context.RequestContext),
+            [instances[0], instances[2], instances[4]],
+            share_servers=mock.ANY)
+        smanager.driver.ensure_share.assert_has_calls([
+            mock.call(utils.IsAMatcher(context.RequestContext), instance,
+                      share_server=mock.ANY)
+            for instance in (instances[0], instances[2], instances[4])])
+        smanager._update_export_locations.assert_called_once_with(
+            utils.IsAMatcher(context.RequestContext),
+            {instances[2]['id']: ['fake/path/2'],
+             instances[4]['id']: ['fake/path/4']})
+        smanager.access_helper.update_access_rules.assert_called_once_with(
+            utils.IsAMatcher(context.RequestContext), instances[4]['id'],
+            share_server=mock.ANY)
+        self.assertEqual(1, manager.LOG.warning.call_count)
+        self.assertEqual(1, manager.LOG.error.call_count)
+
+    def test__update_export_locations(self):
+        self.mock_object(self.share_manager.db,
+                         'share_export_locations_update_many')
+        self.mock_object(self.share_manager.db,
+                         'share_export_locations_update')
+        export_locations = {'fake_id_1': ['fake/path/1']}
+
+        self.share_manager._update_export_locations(
+            self.context, export_locations)
+
+        self.share_manager.db.share_export_locations_update_many.\
+            assert_called_once_with(self.context, export_locations)
+        self.assertFalse(
+            self.share_manager.db.share_export_locations_update.called)
+
+    def test__update_export_locations_one_by_one(self):
+        self.mock_object(self.share_manager.db,
+                         'share_export_locations_update_many',
+                         mock.Mock(side_effect=exception.ManilaException))
+        self.mock_object(self.share_manager.db,
+                         'share_export_locations_update',
+                         mock.Mock(side_effect=[exception.ManilaException,
+                                                None]))
+        self.mock_object(manager.LOG, 'warning')
+        self.mock_object(manager.LOG, 'error')
+        export_locations = collections.OrderedDict(
+            [('fake_id_1', ['fake/path/1']), ('fake_id_2', ['fake/path/2'])])
+
+        self.share_manager._update_export_locations(
+            self.context, export_locations)
+
+        self.share_manager.db.share_export_locations_update.assert_has_calls([
+            mock.call(self.context, 'fake_id_1', ['fake/path/1']),
+            mock.call(self.context, 'fake_id_2', ['fake/path/2']),
+        ])
+        self.assertEqual(1, manager.LOG.warning.call_count)
+        self.assertEqual(1, manager.LOG.error.call_count)
+
     def test_create_share_instance_from_snapshot_with_server(self):
         """Test share can be created from snapshot if server exists."""
         network = db_utils.create_share_network()
@@ -529,6 +713,44 @@ class ShareManagerTestCase(test.TestCase):
         self.assertTrue(len(shr['export_location']) > 0)
         self.assertEqual(2, len(shr['export_locations']))
 
+    def test_publish_service_capabilities(self):
+        self.share_manager.published_capabilities = {'foo': 'bar'}
+        self.mock_object(self.share_manager, '_report_driver_status')
+        self.mock_object(
+            self.share_manager, '_publish_service_capabilities',
+            mock.Mock(side_effect=lambda ctxt: self.assertIsNone(
+                self.share_manager.published_capabilities)))
+
+        self.share_manager.publish_service_capabilities(self.context)
+
+        self.share_manager._report_driver_status.assert_called_once_with(
+            self.context)
+        (self.share_manager._publish_service_capabilities.
+            assert_called_once_with(self.context))
+
+    def test_create_share_instances(self):
+        share_instances = [
+            {'share_instance_id': 'fake_id_1', 'request_spec': 'spec_1',
+             'filter_properties': {}, 'snapshot_id': None},
+            {'share_instance_id': 'fake_id_2', 'request_spec': 'spec_2',
+             'filter_properties': {}, 'snapshot_id': 'fake_snapshot_id'},
+        ]
+        self.mock_object(self.share_manager, 'create_share_instance',
+                         mock.Mock(side_effect=[exception.ManilaException,
+                                                None]))
+        self.mock_object(manager.LOG, 'exception')
+
+        self.share_manager.create_share_instances(
+            self.context, share_instances)
+
+        self.share_manager.create_share_instance.assert_has_calls([
+            mock.call(self.context, 'fake_id_1', request_spec='spec_1',
+                      filter_properties={}, snapshot_id=None),
+            mock.call(self.context, 'fake_id_2', request_spec='spec_2',
+                      filter_properties={}, snapshot_id='fake_snapshot_id'),
+        ])
+        manager.LOG.exception.assert_called_once_with(mock.ANY, 'fake_id_1')
+
     def test_create_share_instance_for_share_with_replication_support(self):
         """Test update call is made to update replica_state."""
         share = db_utils.create_share(replication_type='writable')
@@ -1174,17 +1396,17 @@ class ShareManagerTestCase(test.TestCase):
         self.assertTrue(mock_info_log.called)
         self.assertFalse(mock_snap_instance_update.called)
 
-    @ddt.data('openstack1@watson#_pool0', 'openstack1@newton#_pool0')
-    def test_periodic_share_replica_update(self, host):
+    @ddt.data(('openstack1@watson#_pool0', 'openstack1@watson'),
+              ('openstack1@newton', 'openstack1@newton'))
+    @ddt.unpack
+    def test_periodic_share_replica_update(self, host, backend):
         mock_debug_log = self.mock_object(manager.LOG, 'debug')
         replicas = [
-            fake_replica(host='openstack1@watson#pool4'),
-            fake_replica(host='openstack1@watson#pool5'),
-            fake_replica(host='openstack1@newton#pool5'),
-            fake_replica(host='openstack1@newton#pool5'),
-
+            fake_replica(host='%s#pool4' % backend),
+            fake_replica(host='%s#pool5' % backend),
         ]
-        self.mock_object(self.share_manager.db, 'share_replicas_get_all',
+        self.mock_object(self.share_manager.db,
+                         'share_replicas_get_all_by_host',
                          mock.Mock(return_value=replicas))
         mock_update_method = self.mock_object(
             self.share_manager, '_share_replica_update')
@@ -1193,6 +1415,12 @@ class ShareManagerTestCase(test.TestCase):
 
         self.share_manager.periodic_share_replica_update(self.context)
 
+        self.share_manager.db.share_replicas_get_all_by_host.\
+            assert_called_once_with(self.context, backend,
+                                    with_share_data=True)
+        mock_update_method.assert_has_calls([
+            mock.call(self.context, replica, share_id=replica['share_id'])
+            for replica in replicas])
         self.assertEqual(2, mock_update_method.call_count)
         self.assertEqual(1, mock_debug_log.call_count)
 
@@ -3840,10 +4068,78 @@ class ShareManagerTestCase(test.TestCase):
             data_rpc.DataAPI.migration_start.assert_called_once_with(
                 self.context, share['id'], ['lost+found'], instance['id'],
                 new_instance['id'], src_migration_info, dest_migration_info,
-                False)
+                False, two_phase=False)
             migration_api.ShareMigrationHelper.\
                 cleanup_new_instance.assert_called_once_with(new_instance)
 
+    def test__migration_start_generic_two_phase(self):
+        instance = db_utils.create_share_instance(
+            share_id='fake_id',
+            status=constants.STATUS_AVAILABLE)
+        new_instance = db_utils.create_share_instance(
+            share_id='new_fake_id',
+            status=constants.STATUS_AVAILABLE)
+        share = db_utils.create_share(id='fake_id', instances=[instance])
+        opts = {'migration_two_phase_copy': True,
+                'migration_ignore_files': ['lost+found']}
+
+        # mocks
+        self.mock_object(self.share_manager.driver.configuration, 'safe_get',
+                         mock.Mock(side_effect=opts.get))
+        self.mock_object(self.share_manager.db, 'share_instance_update')
+        self.mock_object(migration_api.ShareMigrationHelper,
+                         'change_to_read_only')
+        self.mock_object(migration_api.ShareMigrationHelper,
+                         'create_instance_and_wait',
+                         mock.Mock(return_value=new_instance))
+        self.mock_object(self.share_manager.driver, 'migration_get_info',
+                         mock.Mock(return_value='src_fake_info'))
+        self.mock_object(rpcapi.ShareAPI, 'migration_get_info',
+                         mock.Mock(return_value='dest_fake_info'))
+        self.mock_object(data_rpc.DataAPI, 'migration_start')
+
+        # run
+        self.share_manager._migration_start_generic(
+            self.context, share, instance, 'fake_host', True)
+
+        # asserts
+        self.assertFalse(
+            migration_api.ShareMigrationHelper.change_to_read_only.called)
+        data_rpc.DataAPI.migration_start.assert_called_once_with(
+            self.context, share['id'], ['lost+found'], instance['id'],
+            new_instance['id'], 'src_fake_info', 'dest_fake_info', True,
+            two_phase=True)
+
+    def test_migration_change_to_read_only(self):
+        instance = db_utils.create_share_instance(
+            share_id='fake_id',
+            status=constants.STATUS_MIGRATING,
+            share_server_id='fake_server_id')
+        share = db_utils.create_share(id='fake_id', instances=[instance])
+
+        # mocks
+        self.mock_object(self.share_manager.db, 'share_instance_get',
+                         mock.Mock(return_value=instance))
+        self.mock_object(self.share_manager.db, 'share_get',
+                         mock.Mock(return_value=share))
+        self.mock_object(self.share_manager.db, 'share_server_get',
+                         mock.Mock(return_value='fake_server'))
+        self.mock_object(migration_api.ShareMigrationHelper,
+                         'change_to_read_only')
+
+        # run
+        self.share_manager.migration_change_to_read_only(
+            self.context, instance['id'])
+
+        # asserts
+        self.share_manager.db.share_instance_get.assert_called_once_with(
+            self.context, instance['id'], with_share_data=True)
+        self.share_manager.db.share_get.assert_called_once_with(
+            self.context, 'fake_id')
+        migration_api.ShareMigrationHelper.change_to_read_only.\
+            assert_called_once_with(instance, 'fake_server', True,
+                                    self.share_manager.driver)
+
     @ddt.data('fake_model_update', Exception('fake'))
     def test_migration_complete_driver(self, exc):
         server = 'fake_server'
@@ -4621,20 +4917,29 @@ class ShareManagerTestCase(test.TestCase):
 
     def test_periodic_share_replica_snapshot_update(self):
         mock_debug_log = self.mock_object(manager.LOG, 'debug')
-        replicas = 3 * [
-            fake_replica(host='malfoy@manor#_pool0',
-                         replica_state=constants.REPLICA_STATE_IN_SYNC)
-        ]
-        replicas.append(fake_replica(replica_state=constants.STATUS_ACTIVE))
-        snapshot = fakes.fake_snapshot(create_instance=True,
-                                       status=constants.STATUS_DELETING)
-        snapshot_instances = 3 * [
-            fakes.fake_snapshot_instance(base_snapshot=snapshot)
-        ]
+        self.share_manager.host = 'malfoy@manor'
+        snapshots = [
+            fakes.fake_snapshot(id='fake_snapshot_id_%s' % i,
+                                create_instance=True,
+                                status=constants.STATUS_DELETING)
+            for i in range(2)]
+        transitional_instances = [
+            fakes.fake_snapshot_instance(
+                base_snapshot=snapshot, id='%s_instance' % snapshot['id'],
+                status=constants.STATUS_DELETING,
+                share={'share_id': 'fake_share_id'})
+            for snapshot in snapshots]
+        other_instances = [
+            fakes.fake_snapshot_instance(
+                base_snapshot=snapshot, id='%s_other' % snapshot['id'],
+                status=constants.STATUS_AVAILABLE)
+            for snapshot in snapshots]
         self.mock_object(
-            db, 'share_replicas_get_all', mock.Mock(return_value=replicas))
+            db, 'share_replica_snapshot_instances_get_all_by_host',
+            mock.Mock(return_value=transitional_instances))
         self.mock_object(db, 'share_snapshot_instance_get_all_with_filters',
-                         mock.Mock(return_value=snapshot_instances))
+                         mock.Mock(return_value=(transitional_instances +
+                                                 other_instances)))
         mock_snapshot_update_call = self.mock_object(
             self.share_manager, '_update_replica_snapshot')
 
@@ -4643,26 +4948,31 @@ class ShareManagerTestCase(test.TestCase):
 
         self.assertIsNone(retval)
         self.assertEqual(1, mock_debug_log.call_count)
-        self.assertEqual(0, mock_snapshot_update_call.call_count)
-
-    @ddt.data(True, False)
-    def test_periodic_share_replica_snapshot_update_nothing_to_update(
-            self, has_instances):
+        db.share_replica_snapshot_instances_get_all_by_host.\
+            assert_called_once_with(
+                self.context, 'malfoy@manor',
+                statuses=(constants.STATUS_CREATING,
+                          constants.STATUS_DELETING),
+                with_share_data=True)
+        db.share_snapshot_instance_get_all_with_filters.\
+            assert_called_once_with(self.context, {'snapshot_ids': mock.ANY})
+        self.assertEqual(
+            sorted(snapshot['id'] for snapshot in snapshots),
+            sorted(db.share_snapshot_instance_get_all_with_filters.
+                   call_args[0][1]['snapshot_ids']))
+        mock_snapshot_update_call.assert_has_calls([
+            mock.call(self.context, transitional_instances[i],
+                      replica_snapshots=[transitional_instances[i],
+                                         other_instances[i]],
+                      share_id='fake_share_id')
+            for i in range(2)])
+
+    def test_periodic_share_replica_snapshot_update_nothing_to_update(self):
         mock_debug_log = self.mock_object(manager.LOG, 'debug')
-        replicas = 3 * [
-            fake_replica(host='malfoy@manor#_pool0',
-                         replica_state=constants.REPLICA_STATE_IN_SYNC)
-        ]
-        replicas.append(fake_replica(replica_state=constants.STATUS_ACTIVE))
-        snapshot = fakes.fake_snapshot(create_instance=True,
-                                       status=constants.STATUS_DELETING)
-        snapshot_instances = 3 * [
-            fakes.fake_snapshot_instance(base_snapshot=snapshot)
-        ]
-        self.mock_object(db, 'share_replicas_get_all',
-                         mock.Mock(side_effect=[[], replicas]))
-        self.mock_object(db, 'share_snapshot_instance_get_all_with_filters',
-                         mock.Mock(side_effect=[snapshot_instances, []]))
+        self.mock_object(
+            db, 'share_replica_snapshot_instances_get_all_by_host',
+            mock.Mock(return_value=[]))
+        self.mock_object(db, 'share_snapshot_instance_get_all_with_filters')
         mock_snapshot_update_call = self.mock_object(
             self.share_manager, '_update_replica_snapshot')
 
@@ -4671,6 +4981,8 @@ class ShareManagerTestCase(test.TestCase):
 
         self.assertIsNone(retval)
         self.assertEqual(1, mock_debug_log.call_count)
+        self.assertFalse(
+            db.share_snapshot_instance_get_all_with_filters.called)
         self.assertEqual(0, mock_snapshot_update_call.call_count)
 
     def test__update_replica_snapshot_replica_deleted_from_database(self):
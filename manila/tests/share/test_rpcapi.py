@@ -18,6 +18,7 @@ Unit Tests for manila.share.rpcapi.
 
 import copy
 
+import mock
 from oslo_config import cfg
 from oslo_serialization import jsonutils
 
@@ -165,6 +166,47 @@ class ShareRpcAPITestCase(test.TestCase):
                              filter_properties=None,
                              request_spec=None)
 
+    def test_create_share_instances(self):
+        share_instances = [{
+            'share_instance': self.fake_share['instance'],
+            'request_spec': {'share_id': self.fake_share['id']},
+            'filter_properties': {'retry': None},
+            'snapshot_id': 'fake_snapshot_id',
+        }]
+        mock_prepare = self.mock_object(self.rpcapi.client, 'prepare',
+                                        mock.Mock(return_value=mock.Mock()))
+
+        self.rpcapi.create_share_instances(
+            self.ctxt, 'fake_host1@backend#pool', share_instances)
+
+        mock_prepare.assert_called_once_with(server='fake_host1@backend',
+                                             version='1.12')
+        mock_prepare.return_value.cast.assert_called_once_with(
+            self.ctxt, 'create_share_instances',
+            share_instances=[{
+                'share_instance_id': self.fake_share['instance']['id'],
+                'request_spec': {'share_id': self.fake_share['id']},
+                'filter_properties': {'retry': None},
+                'snapshot_id': 'fake_snapshot_id',
+            }])
+
+    def test_publish_service_capabilities(self):
+        mock_prepare = self.mock_object(self.rpcapi.client, 'prepare',
+                                        mock.Mock(return_value=mock.Mock()))
+
+        self.rpcapi.publish_service_capabilities(self.ctxt)
+        self.rpcapi.publish_service_capabilities(
+            self.ctxt, host='fake_host1@backend')
+
+        mock_prepare.assert_has_calls([
+            mock.call(fanout=True, version='1.0'),
+            mock.call(server='fake_host1@backend', version='1.0'),
+        ])
+        mock_prepare.return_value.cast.assert_has_calls([
+            mock.call(self.ctxt, 'publish_service_capabilities'),
+            mock.call(self.ctxt, 'publish_service_capabilities'),
+        ])
+
     def test_delete_share_instance(self):
         self._test_share_api('delete_share_instance',
                              rpc_method='cast',
@@ -262,6 +304,12 @@ class ShareRpcAPITestCase(test.TestCase):
                              version='1.6',
                              share_instance=self.fake_share)
 
+    def test_migration_change_to_read_only(self):
+        self._test_share_api('migration_change_to_read_only',
+                             rpc_method='call',
+                             version='1.13',
+                             share_instance=self.fake_share)
+
     def test_migration_get_driver_info(self):
         self._test_share_api('migration_get_driver_info',
                              rpc_method='call',
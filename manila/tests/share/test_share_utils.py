@@ -16,10 +16,13 @@
 
 """Tests For miscellaneous util methods used with share."""
 
+import ddt
+
 from manila.share import utils as share_utils
 from manila import test
 
 
+@ddt.ddt
 class ShareUtilsTestCase(test.TestCase):
     def test_extract_host_without_pool(self):
         host = 'Host@Backend'
@@ -140,3 +143,30 @@ class ShareUtilsTestCase(test.TestCase):
         expected = None
         self.assertEqual(expected,
                          share_utils.append_host(host, pool))
+
+    @ddt.data(
+        ({'a': 1, 'b': 2}, {'a': 1, 'b': 2}, {}),
+        ({'a': 1, 'b': 2}, {'a': 3, 'c': 4},
+         {'updated': {'a': 3, 'c': 4}, 'removed': ['b']}),
+        ({'pools': None}, {'pools': [{'pool_name': 'p1'}]},
+         {'updated': {'pools': [{'pool_name': 'p1'}]}}),
+        ({'a': 1,
+          'pools': [{'pool_name': 'p1', 'free': 1, 'x': 1},
+                    {'pool_name': 'p2', 'free': 2},
+                    {'pool_name': 'p3', 'free': 3}]},
+         {'a': 2,
+          'pools': [{'pool_name': 'p1', 'free': 0},
+                    {'pool_name': 'p3', 'free': 3},
+                    {'pool_name': 'p4', 'free': 4}]},
+         {'updated': {'a': 2},
+          'pools': {'p1': {'updated': {'free': 0}, 'removed': ['x']},
+                    'p4': {'updated': {'pool_name': 'p4', 'free': 4}}},
+          'removed_pools': ['p2']}),
+    )
+    @ddt.unpack
+    def test_capabilities_delta(self, old, new, expected_delta):
+        delta = share_utils.get_capabilities_delta(old, new)
+
+        self.assertEqual(expected_delta, delta)
+        self.assertEqual(new,
+                         share_utils.apply_capabilities_delta(old, delta))
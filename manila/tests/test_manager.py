@@ -112,8 +112,44 @@ class SchedulerDependentManagerTestCase(test.TestCase):
 
         self.sched_manager.scheduler_rpcapi.update_service_capabilities.\
             assert_called_once_with(
-                self.context, self.service_name, self.host, last_capabilities)
+                self.context, self.service_name, self.host, last_capabilities,
+                sequence=1)
         manager.LOG.debug.assert_called_once_with(mock.ANY)
+        self.assertEqual(last_capabilities,
+                         self.sched_manager.published_capabilities)
+
+    def test__publish_service_capabilities_delta(self):
+        capabilities = {'foo': 'bar', 'pools': [
+            {'pool_name': 'pool1', 'free_capacity_gb': 10},
+            {'pool_name': 'pool2', 'free_capacity_gb': 20},
+        ]}
+        self.mock_object(
+            self.sched_manager.scheduler_rpcapi, 'update_service_capabilities')
+        self.mock_object(
+            self.sched_manager.scheduler_rpcapi,
+            'update_service_capabilities_delta')
+        self.sched_manager.update_service_capabilities(capabilities)
+        self.sched_manager._publish_service_capabilities(self.context)
+        capabilities['pools'][1]['free_capacity_gb'] = 15
+
+        self.sched_manager._publish_service_capabilities(self.context)
+        self.sched_manager._publish_service_capabilities(self.context)
+        self.sched_manager.reset_published_capabilities()
+        self.sched_manager._publish_service_capabilities(self.context)
+
+        rpcapi = self.sched_manager.scheduler_rpcapi
+        rpcapi.update_service_capabilities.assert_has_calls([
+            mock.call(self.context, self.service_name, self.host,
+                      capabilities, sequence=1),
+            mock.call(self.context, self.service_name, self.host,
+                      capabilities, sequence=4),
+        ])
+        rpcapi.update_service_capabilities_delta.assert_has_calls([
+            mock.call(self.context, self.service_name, self.host,
+                      {'pools': {'pool2': {
+                          'updated': {'free_capacity_gb': 15}}}}, 2),
+            mock.call(self.context, self.service_name, self.host, {}, 3),
+        ])
 
     @ddt.data(None, '', [], {}, {'foo': 'bar'})
     def test_update_service_capabilities(self, capabilities):
@@ -19,6 +19,7 @@ import datetime
 import mock
 from oslo_config import cfg
 from oslo_utils import timeutils
+from oslo_utils import uuidutils
 import testtools
 
 from manila.common import constants
@@ -53,6 +54,50 @@ class QuotaIntegrationTestCase(test.TestCase):
                                               self.project_id,
                                               is_admin=True)
 
+    def test_reserve_for_several_shares(self):
+        self.flags(quota_shares=10, quota_gigabytes=100)
+        self.create_share(size=10)
+
+        reservations = quota.QUOTAS.reserve(
+            self.context, shares=3, gigabytes=30)
+
+        self.assertEqual(2, len(reservations))
+        usages = db.quota_usage_get_all_by_project_and_user(
+            self.context, self.project_id, self.user_id)
+        self.assertEqual({'in_use': 0, 'reserved': 3}, usages['shares'])
+        self.assertEqual({'in_use': 0, 'reserved': 30}, usages['gigabytes'])
+
+        quota.QUOTAS.reconcile(self.context)
+
+        usages = db.quota_usage_get_all_by_project_and_user(
+            self.context, self.project_id, self.user_id)
+        self.assertEqual({'in_use': 1, 'reserved': 3}, usages['shares'])
+        self.assertEqual({'in_use': 10, 'reserved': 30}, usages['gigabytes'])
+        self.assertNotIn('snapshots', usages)
+
+        quota.QUOTAS.commit(self.context, reservations)
+
+        usages = db.quota_usage_get_all_by_project_and_user(
+            self.context, self.project_id, self.user_id)
+        self.assertEqual({'in_use': 4, 'reserved': 0}, usages['shares'])
+        self.assertEqual({'in_use': 40, 'reserved': 0}, usages['gigabytes'])
+        self.assertRaises(exception.OverQuota, quota.QUOTAS.reserve,
+                          self.context, shares=7, gigabytes=7)
+
+    def test_reconcile_usages_due(self):
+        self.create_share(size=10)
+        db.quota_usage_create(self.context, self.project_id, self.user_id,
+                              'shares', -1)
+        db.quota_usage_create(self.context, self.project_id, self.user_id,
+                              'gigabytes', 5)
+
+        quota.QUOTAS.reconcile(self.context)
+
+        usages = db.quota_usage_get_all_by_project_and_user(
+            self.context, self.project_id, self.user_id)
+        self.assertEqual({'in_use': 1, 'reserved': 0}, usages['shares'])
+        self.assertEqual({'in_use': 5, 'reserved': 0}, usages['gigabytes'])
+
     @testtools.skip("SQLAlchemy sqlite insert bug")
     def test_too_many_shares(self):
         share_ids = []
@@ -159,6 +204,10 @@ class FakeDriver(object):
     def expire(self, context):
         self.called.append(('expire', context))
 
+    def reconcile(self, context, resources):
+        self.called.append(('reconcile', context, resources))
+        return 0
+
 
 class BaseResourceTestCase(test.TestCase):
     def test_no_flag(self):
@@ -591,6 +640,15 @@ class QuotaEngineTestCase(test.TestCase):
 
         self.assertEqual([('expire', context), ], driver.called)
 
+    def test_reconcile(self):
+        context = FakeContext(None, None)
+        driver = FakeDriver()
+        quota_obj = self._make_quota_obj(driver)
+        quota_obj.reconcile(context)
+
+        self.assertEqual([('reconcile', context, quota_obj._resources), ],
+                         driver.called)
+
     def test_resources(self):
         quota_obj = self._make_quota_obj(None)
 
@@ -1110,6 +1168,22 @@ class DbQuotaDriverTestCase(test.TestCase):
         self.assertEqual([('quota_destroy_all_by_project',
                            ('test_project')), ], self.calls)
 
+    def test_reconcile(self):
+        self.flags(until_refresh=5)
+        ctxt = FakeContext('test_project', 'test_class')
+        self.mock_object(db, 'quota_usage_reconcile',
+                         mock.Mock(return_value=1))
+        resources = {
+            'shares': quota.ReservableResource('shares', '_sync_shares'),
+            'quota_fake': quota.AbsoluteResource('quota_fake'),
+        }
+
+        result = self.driver.reconcile(ctxt, resources)
+
+        self.assertEqual(1, result)
+        db.quota_usage_reconcile.assert_called_once_with(
+            ctxt, {'shares': resources['shares']}, 5)
+
 
 class FakeSession(object):
     def begin(self):
@@ -1167,43 +1241,53 @@ class QuotaReserveSqlAlchemyTestCase(test.TestCase):
         def fake_get_session():
             return FakeSession()
 
-        def fake_get_project_quota_usages(context, session, project_id):
-            return self.usages.copy()
+        def fake_get_usages(resources):
+            return {res: usage for res, usage in self.usages.items()
+                    if resources is None or res in resources}
+
+        def fake_get_project_quota_usages(context, session, project_id,
+                                          resources=None):
+            return fake_get_usages(resources)
 
-        def fake_get_user_quota_usages(context, session, project_id, user_id):
-            return self.usages.copy()
+        def fake_get_user_quota_usages(context, session, project_id, user_id,
+                                       resources=None):
+            return fake_get_usages(resources)
 
-        def fake_quota_usage_create(context, project_id, user_id, resource,
-                                    in_use, reserved, until_refresh,
-                                    session=None, save=True):
-            quota_usage_ref = self._make_quota_usage(
-                project_id, user_id, resource, in_use, reserved, until_refresh,
-                timeutils.utcnow(), timeutils.utcnow())
+        def fake_quota_usages_create(context, project_id, user_id, resources,
+                                     until_refresh, session=None):
+            usages = {}
+            for resource in resources:
+                usages[resource] = self._make_quota_usage(
+                    project_id, user_id, resource, 0, 0, until_refresh,
+                    timeutils.utcnow(), timeutils.utcnow())
 
-            self.usages_created[resource] = quota_usage_ref
+            self.usages_created.update(usages)
 
-            return quota_usage_ref
+            return usages
 
-        def fake_reservation_create(context, uuid, usage_id, project_id,
-                                    user_id, resource, delta, expire,
-                                    session=None):
-            reservation_ref = self._make_reservation(
-                uuid, usage_id, project_id, user_id, resource, delta, expire,
-                timeutils.utcnow(), timeutils.utcnow())
+        def fake_reservations_create(context, usages, project_id, user_id,
+                                     deltas, expire, session=None):
+            reservations = []
+            for resource in sorted(deltas):
+                reservation_ref = self._make_reservation(
+                    uuidutils.generate_uuid(), usages[resource], project_id,
+                    user_id, resource, deltas[resource], expire,
+                    timeutils.utcnow(), timeutils.utcnow())
 
-            self.reservations_created[resource] = reservation_ref
+                self.reservations_created[resource] = reservation_ref
+                reservations.append(reservation_ref.uuid)
 
-            return reservation_ref
+            return reservations
 
         self.mock_object(sqa_api, 'get_session', fake_get_session)
         self.mock_object(sqa_api, '_get_project_quota_usages',
                          fake_get_project_quota_usages)
         self.mock_object(sqa_api, '_get_user_quota_usages',
                          fake_get_user_quota_usages)
-        self.mock_object(sqa_api, '_quota_usage_create',
-                         fake_quota_usage_create)
-        self.mock_object(sqa_api, '_reservation_create',
-                         fake_reservation_create)
+        self.mock_object(sqa_api, '_quota_usages_create',
+                         fake_quota_usages_create)
+        self.mock_object(sqa_api, '_reservations_create',
+                         fake_reservations_create)
 
         self.patcher = mock.patch.object(timeutils, 'utcnow')
         self.mock_utcnow = self.patcher.start()
@@ -1295,18 +1379,18 @@ class QuotaReserveSqlAlchemyTestCase(test.TestCase):
         result = sqa_api.quota_reserve(context, self.resources, quotas,
                                        quotas, deltas, self.expire, 0, 0)
 
-        self.assertEqual(set(['shares', 'gigabytes']), self.sync_called)
+        self.assertEqual(set([]), self.sync_called)
         self.compare_usage(self.usages_created,
                            [dict(resource='shares',
                                  project_id='test_project',
                                  in_use=0,
                                  reserved=2,
-                                 until_refresh=None),
+                                 until_refresh=0),
                             dict(resource='gigabytes',
                                  project_id='test_project',
                                  in_use=0,
                                  reserved=2 * 1024,
-                                 until_refresh=None), ])
+                                 until_refresh=0), ])
         self.compare_reservation(
             result,
             [dict(resource='shares',
@@ -1330,17 +1414,17 @@ class QuotaReserveSqlAlchemyTestCase(test.TestCase):
         result = sqa_api.quota_reserve(context, self.resources, quotas,
                                        quotas, deltas, self.expire, 5, 0)
 
-        self.assertEqual(set(['shares', 'gigabytes']), self.sync_called)
+        self.assertEqual(set([]), self.sync_called)
         self.compare_usage(self.usages, [dict(resource='shares',
                                               project_id='test_project',
-                                              in_use=2,
+                                              in_use=-1,
                                               reserved=2,
-                                              until_refresh=5),
+                                              until_refresh=0),
                                          dict(resource='gigabytes',
                                               project_id='test_project',
-                                              in_use=2,
+                                              in_use=-1,
                                               reserved=2 * 1024,
-                                              until_refresh=5), ])
+                                              until_refresh=0), ])
         self.assertEqual({}, self.usages_created)
         self.compare_reservation(result,
                                  [dict(resource='shares',
@@ -1362,17 +1446,17 @@ class QuotaReserveSqlAlchemyTestCase(test.TestCase):
         result = sqa_api.quota_reserve(context, self.resources, quotas,
                                        quotas, deltas, self.expire, 5, 0)
 
-        self.assertEqual(set(['shares', 'gigabytes']), self.sync_called)
+        self.assertEqual(set([]), self.sync_called)
         self.compare_usage(self.usages, [dict(resource='shares',
                                               project_id='test_project',
-                                              in_use=2,
+                                              in_use=3,
                                               reserved=2,
-                                              until_refresh=5),
+                                              until_refresh=0),
                                          dict(resource='gigabytes',
                                               project_id='test_project',
-                                              in_use=2,
+                                              in_use=3,
                                               reserved=2 * 1024,
-                                              until_refresh=5), ])
+                                              until_refresh=0), ])
         self.assertEqual({}, self.usages_created)
         self.compare_reservation(result,
                                  [dict(resource='shares',
@@ -1398,17 +1482,17 @@ class QuotaReserveSqlAlchemyTestCase(test.TestCase):
                                        quotas, deltas, self.expire, 0,
                                        max_age)
 
-        self.assertEqual(set(['shares', 'gigabytes']), self.sync_called)
+        self.assertEqual(set([]), self.sync_called)
         self.compare_usage(self.usages, [dict(resource='shares',
                                               project_id='test_project',
-                                              in_use=2,
+                                              in_use=3,
                                               reserved=2,
-                                              until_refresh=None),
+                                              until_refresh=0),
                                          dict(resource='gigabytes',
                                               project_id='test_project',
-                                              in_use=2,
+                                              in_use=3,
                                               reserved=2 * 1024,
-                                              until_refresh=None), ])
+                                              until_refresh=0), ])
         self.assertEqual({}, self.usages_created)
         self.compare_reservation(result,
                                  [dict(resource='shares',
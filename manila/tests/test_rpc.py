@@ -0,0 +1,61 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import ddt
+import mock
+import oslo_messaging as messaging
+
+from manila.db import instrumentation
+from manila import rpc
+from manila import test
+
+
+class FakeEndpoint(object):
+    target = messaging.Target(version='1.0')
+
+    def create_share(self, context, share_id):
+        return share_id
+
+
+@ddt.ddt
+class RPCTestCase(test.TestCase):
+
+    @ddt.data(True, False)
+    def test_get_server(self, enabled):
+        self.flags(db_instrumentation=enabled)
+        mock_get_server = self.mock_object(messaging, 'get_rpc_server')
+        endpoint = FakeEndpoint()
+        target = messaging.Target(topic='fake_topic')
+
+        server = rpc.get_server(target, [endpoint])
+
+        self.assertEqual(mock_get_server.return_value, server)
+        endpoints = mock_get_server.call_args[0][2]
+        self.assertEqual(1, len(endpoints))
+        if enabled:
+            self.assertIsInstance(endpoints[0], rpc._InstrumentedEndpoint)
+        else:
+            self.assertIs(endpoint, endpoints[0])
+
+    def test_instrumented_endpoint(self):
+        mock_scope = self.mock_object(instrumentation, 'scope',
+                                      mock.MagicMock())
+        endpoint = rpc._InstrumentedEndpoint(FakeEndpoint())
+
+        self.assertIs(FakeEndpoint.target, endpoint.target)
+        self.assertFalse(mock_scope.called)
+        self.assertEqual('fake_id',
+                         endpoint.create_share('fake_context', 'fake_id'))
+        mock_scope.assert_called_once_with(
+            instrumentation.SCOPE_RPC, 'FakeEndpoint.create_share')
+        self.assertEqual(1, mock_scope.return_value.__enter__.call_count)
+        self.assertFalse(hasattr(endpoint, 'delete_share'))
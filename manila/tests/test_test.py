@@ -19,6 +19,8 @@
 from oslo_config import cfg
 import oslo_messaging as messaging
 
+from manila import context
+from manila import db
 from manila import rpc
 from manila import test
 
@@ -42,3 +44,19 @@ class IsolationTestCase(test.TestCase):
         target = messaging.Target(topic='share', server=cfg.CONF.host)
         server = rpc.get_server(target=target, endpoints=[NeverCalled()])
         server.start()
+
+
+class AssertMaxStatementsTestCase(test.TestCase):
+
+    def test_within_budget(self):
+        with self.assertMaxStatements(10) as statistics:
+            db.share_get_all(context.get_admin_context())
+
+        self.assertTrue(statistics.statements > 0)
+
+    def test_over_budget(self):
+        def run():
+            with self.assertMaxStatements(0):
+                db.share_get_all(context.get_admin_context())
+
+        self.assertRaises(self.failureException, run)
@@ -0,0 +1,79 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Micro-benchmark for the scheduler CapacityWeigher.
+
+Weighs a set of synthetic pools with the NumPy based (vectorized) and the
+per pool (scalar) implementations of the CapacityWeigher and prints the
+time taken by each of them.
+
+Usage: python tools/benchmarks/capacity_weigher.py [pools] [repeat]
+"""
+
+from __future__ import print_function
+
+import random
+import sys
+import timeit
+
+from oslo_config import cfg
+
+from manila.scheduler import host_manager
+from manila.scheduler.weighers import base_host
+from manila.scheduler.weighers import capacity
+
+
+def _make_pools(count):
+    pools = []
+    for i in range(count):
+        pool = host_manager.PoolState('host%d@backend' % (i // 10), None,
+                                      'pool%d' % i)
+        pool.total_capacity_gb = random.randint(1024, 102400)
+        pool.free_capacity_gb = random.randint(0, pool.total_capacity_gb)
+        pool.provisioned_capacity_gb = random.randint(
+            0, 2 * pool.total_capacity_gb)
+        pool.reserved_percentage = random.choice((0, 5, 10))
+        pool.max_over_subscription_ratio = random.choice((1.0, 1.5, 20.0))
+        pool.thin_provisioning = random.choice((True, False))
+        pools.append(pool)
+    return pools
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    cfg.CONF([], project='manila', default_config_files=[])
+    pools = _make_pools(count)
+    handler = base_host.HostWeightHandler('manila.scheduler.weighers')
+
+    def weigh():
+        handler.get_weighed_objects([capacity.CapacityWeigher], pools, {})
+
+    numpy = capacity.numpy
+    if numpy is None:
+        print('NumPy is not available, only the scalar path is measured.')
+    else:
+        vectorized = min(timeit.repeat(weigh, number=1, repeat=repeat))
+        print('vectorized: %8.2f ms for %d pools' % (vectorized * 1000,
+                                                     count))
+
+    capacity.numpy = None
+    try:
+        scalar = min(timeit.repeat(weigh, number=1, repeat=repeat))
+    finally:
+        capacity.numpy = numpy
+    print('scalar:     %8.2f ms for %d pools' % (scalar * 1000, count))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Benchmark for the Neutron port allocation of share servers.
+
+Allocates and deallocates the ports of a share server with the Neutron
+network plugin against a fake Neutron client, that answers each request
+after the given latency, and prints the time taken when ports are created
+one at a time, concurrently and with a single bulk request.
+
+Usage: python tools/benchmarks/neutron_ports.py [ports] [latency_ms]
+       [concurrency]
+"""
+
+from __future__ import print_function
+
+import sys
+import time
+import uuid
+
+import eventlet
+from oslo_config import cfg
+
+from manila import context
+from manila.network.neutron import neutron_network_plugin
+
+
+class FakeNeutronClient(object):
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.requests = 0
+
+    def _request(self):
+        self.requests += 1
+        eventlet.sleep(self.latency)
+
+    def _port(self, port):
+        port = dict(port)
+        port.update({
+            'id': str(uuid.uuid4()),
+            'mac_address': 'fa:16:3e:00:00:00',
+            'fixed_ips': [{'subnet_id': 'fake_subnet_id',
+                           'ip_address': '10.0.0.1'}],
+        })
+        return port
+
+    def create_port(self, body):
+        self._request()
+        if 'ports' in body:
+            return {'ports': [self._port(port) for port in body['ports']]}
+        return {'port': self._port(body['port'])}
+
+    def delete_port(self, port_id):
+        self._request()
+
+    def list_extensions(self):
+        return {'extensions': []}
+
+
+class FakeDB(object):
+
+    def __init__(self):
+        self.allocations = {}
+
+    def network_allocation_create(self, context, values):
+        self.allocations[values['id']] = values
+        return values
+
+    def network_allocation_delete(self, context, id):
+        del self.allocations[id]
+
+    def network_allocations_get_for_share_server(self, context,
+                                                 share_server_id):
+        return list(self.allocations.values())
+
+
+def _run(plugin, count):
+    ctxt = context.get_admin_context()
+    share_server = {'id': 'fake_server_id'}
+    share_network = {
+        'project_id': 'fake_project_id',
+        'neutron_net_id': 'fake_net_id',
+        'neutron_subnet_id': 'fake_subnet_id',
+        'network_type': 'vlan',
+        'segmentation_id': 1000,
+        'ip_version': 4,
+        'cidr': '10.0.0.0/24',
+    }
+    start = time.time()
+    plugin._create_ports(ctxt, share_server, share_network, 'share', count)
+    allocated = time.time()
+    plugin.deallocate_network(ctxt, share_server['id'])
+    return allocated - start, time.time() - allocated
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    latency = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.05
+    concurrency = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+
+    cfg.CONF([], project='manila', default_config_files=[])
+    plugin = neutron_network_plugin.NeutronNetworkPlugin()
+    plugin.db = FakeDB()
+    client = FakeNeutronClient(latency)
+    plugin.neutron_api.get_client = lambda context: client
+    group = plugin.neutron_api.config_group_name
+
+    modes = (
+        ('sequential', False, 1),
+        ('concurrent', False, concurrency),
+        ('bulk', True, concurrency),
+    )
+    for name, bulk, workers in modes:
+        cfg.CONF.set_override('neutron_port_bulk_create', bulk, group=group)
+        cfg.CONF.set_override('neutron_port_concurrency', workers,
+                              group=group)
+        client.requests = 0
+        create, delete = _run(plugin, count)
+        print('%-10s: create %8.1f ms, delete %8.1f ms, %3d requests for '
+              '%d ports' % (name, create * 1000, delete * 1000,
+                            client.requests, count))
+
+
+if __name__ == '__main__':
+    main()
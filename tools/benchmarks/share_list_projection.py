@@ -0,0 +1,143 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Benchmark for the projected share and share instance list read paths.
+
+Fills an in-memory SQLite database with synthetic shares and renders the
+share summary list and the share instance list from ORM models (before)
+and from projected records (after), printing the time taken and, where
+tracemalloc is available, the peak memory allocated by each of them.
+
+Usage: python tools/benchmarks/share_list_projection.py [rows] [repeat]
+"""
+
+from __future__ import print_function
+
+import sys
+import time
+
+from oslo_config import cfg
+from oslo_utils import uuidutils
+from sqlalchemy.orm import joinedload
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+from manila.api.openstack import api_version_request
+from manila.api.openstack import wsgi
+from manila.api.views import share_instance as instance_views
+from manila.api.views import shares as share_views
+from manila.common import constants
+from manila import context
+from manila.db.sqlalchemy import api as db_api
+from manila.db.sqlalchemy import models
+
+
+def _populate(count):
+    engine = db_api.get_engine()
+    models.BASE.metadata.create_all(engine)
+    shares = []
+    instances = []
+    export_locations = []
+    for i in range(count):
+        share_id = uuidutils.generate_uuid()
+        instance_id = uuidutils.generate_uuid()
+        shares.append({'id': share_id, 'deleted': 'False',
+                       'project_id': 'fake', 'display_name': 'share%d' % i,
+                       'size': 1, 'share_proto': 'NFS'})
+        instances.append({'id': instance_id, 'share_id': share_id,
+                          'deleted': 'False', 'host': 'host@backend#pool',
+                          'status': constants.STATUS_AVAILABLE})
+        export_locations.append({'uuid': uuidutils.generate_uuid(),
+                                 'share_instance_id': instance_id,
+                                 'path': '10.0.0.1:/share%d' % i,
+                                 'deleted': 0})
+    with engine.begin() as conn:
+        conn.execute(models.Share.__table__.insert(), shares)
+        conn.execute(models.ShareInstance.__table__.insert(), instances)
+        conn.execute(models.ShareInstanceExportLocations.__table__.insert(),
+                     export_locations)
+
+
+def _request():
+    req = wsgi.Request.blank('/v2/fake/shares',
+                             base_url='http://localhost/v2')
+    req.environ['manila.context'] = context.RequestContext(
+        'fake_user', 'fake', is_admin=True)
+    req.api_version_request = api_version_request.APIVersionRequest('2.11')
+    return req
+
+
+def _measure(func, repeat):
+    best = None
+    for __ in range(repeat):
+        start = time.time()
+        func()
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    peak = None
+    if tracemalloc is not None:
+        tracemalloc.start()
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return best, peak
+
+
+def _report(name, count, result):
+    elapsed, peak = result
+    memory = ('%8.1f MiB' % (peak / 1024.0 / 1024.0)
+              if peak is not None else '     n/a')
+    print('%-28s %8.2f s %s for %d rows' % (name, elapsed, memory, count))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    cfg.CONF([], project='manila', default_config_files=[])
+    cfg.CONF.set_override('connection', 'sqlite://', group='database')
+    _populate(count)
+
+    req = _request()
+    ctxt = req.environ['manila.context']
+    share_view = share_views.ViewBuilder()
+    instance_view = instance_views.ViewBuilder()
+
+    def share_summary(view):
+        share_view.summary_list(
+            req, db_api.share_get_all(ctxt, view=view))
+
+    def instance_list_models():
+        instance_view.detail_list(req, db_api.model_query(
+            ctxt, models.ShareInstance, read_deleted='no').options(
+                joinedload('export_locations')).all())
+
+    def instance_list_records():
+        instance_view.detail_list(req, db_api.share_instances_get_all(ctxt))
+
+    if tracemalloc is None:
+        print('tracemalloc is not available, only time is measured.')
+    _report('share summary (models)', count, _measure(
+        lambda: share_summary(constants.SHARE_VIEW_DETAIL), repeat))
+    _report('share summary (records)', count, _measure(
+        lambda: share_summary(constants.SHARE_VIEW_SUMMARY), repeat))
+    _report('share instances (models)', count, _measure(
+        instance_list_models, repeat))
+    _report('share instances (records)', count, _measure(
+        instance_list_records, repeat))
+
+
+if __name__ == '__main__':
+    main()